@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2017 F5 Networks Inc.
+# GNU General Public License v3.0 (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+"""Compares the f5-sdk and the lightweight iControl REST client
+
+Two things are measured for each client.
+
+  * import: the time taken to import the client in a fresh interpreter.
+    Every module run is a fresh interpreter, so this is paid on every task.
+  * first-request: the time taken, in a fresh interpreter, to import the
+    client, connect to a device and load a single resource. This is only
+    measured when a device is given.
+
+Usage:
+
+    benchmark-rest-client.py [--server HOST --user USER --password PASS] [--runs N]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from os.path import dirname
+
+tld = dirname(dirname(dirname(os.path.realpath(__file__))))
+
+IMPORTS = dict(
+    sdk='from library.module_utils.network.f5.bigip import F5Client',
+    rest='from library.module_utils.network.f5.icontrol import F5RestClient',
+)
+
+FIRST_REQUEST = dict(
+    sdk="""
+from library.module_utils.network.f5.bigip import F5Client
+client = F5Client(server='{server}', server_port={port}, user='{user}', password='{password}', validate_certs=False)
+client.api.tm.sys.dbs.db.load(name='setup.run')
+client.delete_token()
+""",
+    rest="""
+from library.module_utils.network.f5.icontrol import F5RestClient
+client = F5RestClient(server='{server}', server_port={port}, user='{user}', password='{password}', validate_certs=False)
+client.api.load('/mgmt/tm/sys/db/setup.run')
+client.delete_token()
+""",
+)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--server', help='Address of a BIG-IP to run the first-request benchmark against.')
+    parser.add_argument('--port', type=int, default=443)
+    parser.add_argument('--user', default='admin')
+    parser.add_argument('--password', default='admin')
+    parser.add_argument('--runs', type=int, default=10, help='Number of runs of each benchmark.')
+    return parser.parse_args()
+
+
+def time_code(code, runs):
+    results = []
+    for x in range(runs):
+        start = time.time()
+        subprocess.check_call([sys.executable, '-c', code], cwd=tld)
+        results.append(time.time() - start)
+    results.sort()
+    return results
+
+
+def report(name, results):
+    print('{0:<24} min {1:7.3f}s  median {2:7.3f}s  max {3:7.3f}s'.format(
+        name, results[0], results[len(results) // 2], results[-1]
+    ))
+
+
+def main():
+    args = parse_args()
+
+    baseline = time_code('pass', args.runs)
+    report('interpreter', baseline)
+    for name in ['sdk', 'rest']:
+        report('import ({0})'.format(name), time_code(IMPORTS[name], args.runs))
+
+    if not args.server:
+        return
+    for name in ['sdk', 'rest']:
+        code = FIRST_REQUEST[name].format(
+            server=args.server, port=args.port, user=args.user, password=args.password
+        )
+        report('first-request ({0})'.format(name), time_code(code, args.runs))
+
+
+if __name__ == '__main__':
+    main()
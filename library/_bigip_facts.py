@@ -30,6 +30,12 @@ notes:
   - Best run as a local_action in your playbook
   - Tested with manager and above account privilege level
   - C(provision) facts were added in 2.2
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
 requirements:
   - bigsuds
 options:
@@ -75,6 +81,24 @@ options:
     default: null
     choices: []
     aliases: []
+  timings:
+    description:
+      - When C(yes), the iControl calls made by the module, and the time
+        each took, are returned in the C(_timings) key of the result.
+      - The time taken by each fact category is returned in the C(phases)
+        of the C(_timings).
+    required: false
+    default: no
+    type: bool
+    version_added: 2.6
+  concurrency:
+    description:
+      - Number of iControl sessions to fetch the fields of each fact
+        category over, concurrently.
+      - The default of C(1) fetches them one at a time.
+    required: false
+    default: 1
+    version_added: 2.6
 extends_documentation_fragment: f5
 '''
 
@@ -88,10 +112,14 @@ EXAMPLES = r'''
   delegate_to: localhost
 '''
 
+import copy
 import fnmatch
 import re
+import threading
 import traceback
 
+from multiprocessing.pool import ThreadPool
+
 try:
     from suds import MethodNotFound, WebFault
 except ImportError:
@@ -101,6 +129,11 @@ from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.f5_utils import bigip_api, bigsuds_found, f5_argument_spec
 from ansible.module_utils.six.moves import map, zip
 
+try:
+    from library.module_utils.network.f5.common import F5Timings
+except ImportError:
+    from ansible.module_utils.network.f5.common import F5Timings
+
 
 class F5(object):
     """F5 iControl class.
@@ -112,10 +145,20 @@ class F5(object):
     """
 
     def __init__(self, host, user, password, session=False, validate_certs=True, port=443):
+        self.args = (host, user, password, session, validate_certs, port)
         self.api = bigip_api(host, user, password, validate_certs, port)
+        self.pool = None
         if session:
             self.start_session()
 
+    def clone(self):
+        """Returns a new connection to the same device, set up for queries
+        """
+        result = F5(*self.args)
+        result.set_active_folder("/")
+        result.enable_recursive_query_state()
+        return result
+
     def start_session(self):
         self.api = self.api.with_session_id()
 
@@ -156,7 +199,7 @@ class Interfaces(object):
         self.interfaces = api.Networking.Interfaces.get_list()
         if regex:
             re_filter = re.compile(regex)
-            self.interfaces = filter(re_filter.search, self.interfaces)
+            self.interfaces = list(filter(re_filter.search, self.interfaces))
 
     def get_list(self):
         return self.interfaces
@@ -261,7 +304,7 @@ class SelfIPs(object):
         self.self_ips = api.Networking.SelfIPV2.get_list()
         if regex:
             re_filter = re.compile(regex)
-            self.self_ips = filter(re_filter.search, self.self_ips)
+            self.self_ips = list(filter(re_filter.search, self.self_ips))
 
     def get_list(self):
         return self.self_ips
@@ -315,7 +358,7 @@ class Trunks(object):
         self.trunks = api.Networking.Trunk.get_list()
         if regex:
             re_filter = re.compile(regex)
-            self.trunks = filter(re_filter.search, self.trunks)
+            self.trunks = list(filter(re_filter.search, self.trunks))
 
     def get_list(self):
         return self.trunks
@@ -375,7 +418,7 @@ class Vlans(object):
         self.vlans = api.Networking.VLAN.get_list()
         if regex:
             re_filter = re.compile(regex)
-            self.vlans = filter(re_filter.search, self.vlans)
+            self.vlans = list(filter(re_filter.search, self.vlans))
 
     def get_list(self):
         return self.vlans
@@ -469,7 +512,7 @@ class VirtualServers(object):
         self.virtual_servers = api.LocalLB.VirtualServer.get_list()
         if regex:
             re_filter = re.compile(regex)
-            self.virtual_servers = filter(re_filter.search, self.virtual_servers)
+            self.virtual_servers = list(filter(re_filter.search, self.virtual_servers))
 
     def get_list(self):
         return self.virtual_servers
@@ -622,7 +665,7 @@ class Pools(object):
         self.pool_names = api.LocalLB.Pool.get_list()
         if regex:
             re_filter = re.compile(regex)
-            self.pool_names = filter(re_filter.search, self.pool_names)
+            self.pool_names = list(filter(re_filter.search, self.pool_names))
 
     def get_list(self):
         return self.pool_names
@@ -755,7 +798,7 @@ class Devices(object):
         self.devices = api.Management.Device.get_list()
         if regex:
             re_filter = re.compile(regex)
-            self.devices = filter(re_filter.search, self.devices)
+            self.devices = list(filter(re_filter.search, self.devices))
 
     def get_list(self):
         return self.devices
@@ -860,7 +903,7 @@ class DeviceGroups(object):
         self.device_groups = api.Management.DeviceGroup.get_list()
         if regex:
             re_filter = re.compile(regex)
-            self.device_groups = filter(re_filter.search, self.device_groups)
+            self.device_groups = list(filter(re_filter.search, self.device_groups))
 
     def get_list(self):
         return self.device_groups
@@ -908,7 +951,7 @@ class TrafficGroups(object):
         self.traffic_groups = api.Management.TrafficGroup.get_list()
         if regex:
             re_filter = re.compile(regex)
-            self.traffic_groups = filter(re_filter.search, self.traffic_groups)
+            self.traffic_groups = list(filter(re_filter.search, self.traffic_groups))
 
     def get_list(self):
         return self.traffic_groups
@@ -956,7 +999,7 @@ class Rules(object):
         self.rules = api.LocalLB.Rule.get_list()
         if regex:
             re_filter = re.compile(regex)
-            self.traffic_groups = filter(re_filter.search, self.rules)
+            self.rules = list(filter(re_filter.search, self.rules))
 
     def get_list(self):
         return self.rules
@@ -989,7 +1032,7 @@ class Nodes(object):
         self.nodes = api.LocalLB.NodeAddressV2.get_list()
         if regex:
             re_filter = re.compile(regex)
-            self.nodes = filter(re_filter.search, self.nodes)
+            self.nodes = list(filter(re_filter.search, self.nodes))
 
     def get_list(self):
         return self.nodes
@@ -1046,7 +1089,7 @@ class VirtualAddresses(object):
         self.virtual_addresses = api.LocalLB.VirtualAddressV2.get_list()
         if regex:
             re_filter = re.compile(regex)
-            self.virtual_addresses = filter(re_filter.search, self.virtual_addresses)
+            self.virtual_addresses = list(filter(re_filter.search, self.virtual_addresses))
 
     def get_list(self):
         return self.virtual_addresses
@@ -1103,7 +1146,7 @@ class AddressClasses(object):
         self.address_classes = api.LocalLB.Class.get_address_class_list()
         if regex:
             re_filter = re.compile(regex)
-            self.address_classes = filter(re_filter.search, self.address_classes)
+            self.address_classes = list(filter(re_filter.search, self.address_classes))
 
     def get_list(self):
         return self.address_classes
@@ -1135,7 +1178,7 @@ class Certificates(object):
         self.certificates = [x['certificate']['cert_info']['id'] for x in self.certificate_list]
         if regex:
             re_filter = re.compile(regex)
-            self.certificates = filter(re_filter.search, self.certificates)
+            self.certificates = list(filter(re_filter.search, self.certificates))
             self.certificate_list = [x for x in self.certificate_list if x['certificate']['cert_info']['id'] in self.certificates]
 
     def get_list(self):
@@ -1162,7 +1205,7 @@ class Keys(object):
         self.keys = [x['key_info']['id'] for x in self.key_list]
         if regex:
             re_filter = re.compile(regex)
-            self.keys = filter(re_filter.search, self.keys)
+            self.keys = list(filter(re_filter.search, self.keys))
             self.key_list = [x for x in self.key_list if x['key_info']['id'] in self.keys]
 
     def get_list(self):
@@ -1187,7 +1230,7 @@ class ProfileClientSSL(object):
         self.profiles = api.LocalLB.ProfileClientSSL.get_list()
         if regex:
             re_filter = re.compile(regex)
-            self.profiles = filter(re_filter.search, self.profiles)
+            self.profiles = list(filter(re_filter.search, self.profiles))
 
     def get_list(self):
         return self.profiles
@@ -1403,38 +1446,83 @@ class ProvisionInfo(object):
         return result
 
 
-def generate_dict(api_obj, fields):
-    result_dict = {}
-    lists = []
-    supported_fields = []
-    if api_obj.get_list():
-        for field in fields:
-            try:
-                api_response = getattr(api_obj, "get_" + field)()
-            except (MethodNotFound, WebFault):
-                pass
-            else:
-                lists.append(api_response)
-                supported_fields.append(field)
-        for i, j in enumerate(api_obj.get_list()):
-            temp = {}
-            temp.update([(item[0], item[1][i]) for item in zip(supported_fields, lists)])
-            result_dict[j] = temp
-    return result_dict
+class FieldPool(object):
+    """Fetches fields concurrently over a small pool of iControl sessions
+
+    Each field of a fact category is a separate SOAP call. Fetched one after
+    the other, a category such as virtual_server costs dozens of round trips.
+    The pool issues them concurrently instead, with each worker thread using
+    its own connection to the device, since bigsuds connections are not
+    thread safe.
 
+    Attributes:
+        f5: The F5 connection to clone for each worker.
+        size: Number of worker threads, and therefore connections.
+        wrap: Optional callable applied to the API of each worker.
+    """
+
+    def __init__(self, f5, size, wrap=None):
+        self.f5 = f5
+        self.wrap = wrap
+        self.local = threading.local()
+        self.pool = ThreadPool(size)
+
+    def get_api(self):
+        api = getattr(self.local, 'api', None)
+        if api is None:
+            api = self.f5.clone().get_api()
+            if self.wrap:
+                api = self.wrap(api)
+            self.local.api = api
+        return api
+
+    def _get_field(self, args):
+        api_obj, field = args
+        # The field getters call the device through the api attribute, so a
+        # copy pointing at this worker's connection is used.
+        api_obj = copy.copy(api_obj)
+        api_obj.api = self.get_api()
+        return get_field(api_obj, field)
+
+    def map(self, api_obj, fields):
+        return self.pool.map(self._get_field, [(api_obj, field) for field in fields])
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+
+def get_field(api_obj, field):
+    """Returns a tuple of whether the field is supported, and its value
+    """
+    try:
+        return True, getattr(api_obj, "get_" + field)()
+    except (MethodNotFound, WebFault):
+        return False, None
 
-def generate_simple_dict(api_obj, fields):
+
+def get_fields(api_obj, fields, pool=None):
+    if pool is None:
+        responses = [get_field(api_obj, field) for field in fields]
+    else:
+        responses = pool.map(api_obj, fields)
+    return [(field, value) for field, (supported, value) in zip(fields, responses) if supported]
+
+
+def generate_dict(api_obj, fields, pool=None):
     result_dict = {}
-    for field in fields:
-        try:
-            api_response = getattr(api_obj, "get_" + field)()
-        except (MethodNotFound, WebFault):
-            pass
-        else:
-            result_dict[field] = api_response
+    names = api_obj.get_list()
+    if names:
+        supported = get_fields(api_obj, fields, pool)
+        for i, name in enumerate(names):
+            result_dict[name] = dict((field, value[i]) for field, value in supported)
     return result_dict
 
 
+def generate_simple_dict(api_obj, fields, pool=None):
+    return dict(get_fields(api_obj, fields, pool))
+
+
 def generate_interface_dict(f5, regex):
     interfaces = Interfaces(f5.get_api(), regex)
     fields = ['active_media', 'actual_flow_control', 'bundle_state',
@@ -1447,7 +1535,7 @@ def generate_interface_dict(f5, regex):
               'sfp_media_state', 'stp_active_edge_port_state',
               'stp_enabled_state', 'stp_link_type',
               'stp_protocol_detection_reset_state']
-    return generate_dict(interfaces, fields)
+    return generate_dict(interfaces, fields, f5.pool)
 
 
 def generate_self_ip_dict(f5, regex):
@@ -1456,7 +1544,7 @@ def generate_self_ip_dict(f5, regex):
               'enforced_firewall_policy', 'floating_state', 'fw_rule',
               'netmask', 'staged_firewall_policy', 'traffic_group',
               'vlan', 'is_traffic_group_inherited']
-    return generate_dict(self_ips, fields)
+    return generate_dict(self_ips, fields, f5.pool)
 
 
 def generate_trunk_dict(f5, regex):
@@ -1466,7 +1554,7 @@ def generate_trunk_dict(f5, regex):
               'lacp_timeout_option', 'link_selection_policy', 'media_speed',
               'media_status', 'operational_member_count', 'stp_enabled_state',
               'stp_protocol_detection_reset_state']
-    return generate_dict(trunks, fields)
+    return generate_dict(trunks, fields, f5.pool)
 
 
 def generate_vlan_dict(f5, regex):
@@ -1478,7 +1566,7 @@ def generate_vlan_dict(f5, regex):
               'sflow_poll_interval', 'sflow_poll_interval_global',
               'sflow_sampling_rate', 'sflow_sampling_rate_global',
               'source_check_state', 'true_mac_address', 'vlan_id']
-    return generate_dict(vlans, fields)
+    return generate_dict(vlans, fields, f5.pool)
 
 
 def generate_vs_dict(f5, regex):
@@ -1500,7 +1588,7 @@ def generate_vs_dict(f5, regex):
               'staged_firewall_policy', 'translate_address_state',
               'translate_port_state', 'type', 'vlan', 'wildmask',
               'name']
-    return generate_dict(virtual_servers, fields)
+    return generate_dict(virtual_servers, fields, f5.pool)
 
 
 def generate_pool_dict(f5, regex):
@@ -1517,7 +1605,7 @@ def generate_pool_dict(f5, regex):
               'queue_on_connection_limit_state', 'queue_time_limit',
               'reselect_tries', 'server_ip_tos', 'server_link_qos',
               'simple_timeout', 'slow_ramp_time', 'name']
-    return generate_dict(pools, fields)
+    return generate_dict(pools, fields, f5.pool)
 
 
 def generate_device_dict(f5, regex):
@@ -1530,7 +1618,7 @@ def generate_device_dict(f5, regex):
               'optional_modules', 'platform_id', 'primary_mirror_address',
               'product', 'secondary_mirror_address', 'software_version',
               'timelimited_modules', 'timezone', 'unicast_addresses']
-    return generate_dict(devices, fields)
+    return generate_dict(devices, fields, f5.pool)
 
 
 def generate_device_group_dict(f5, regex):
@@ -1539,7 +1627,7 @@ def generate_device_group_dict(f5, regex):
               'device', 'full_load_on_sync_state',
               'incremental_config_sync_size_maximum',
               'network_failover_enabled_state', 'sync_status', 'type']
-    return generate_dict(device_groups, fields)
+    return generate_dict(device_groups, fields, f5.pool)
 
 
 def generate_traffic_group_dict(f5, regex):
@@ -1548,14 +1636,14 @@ def generate_traffic_group_dict(f5, regex):
               'default_device', 'description', 'ha_load_factor',
               'ha_order', 'is_floating', 'mac_masquerade_address',
               'unit_id']
-    return generate_dict(traffic_groups, fields)
+    return generate_dict(traffic_groups, fields, f5.pool)
 
 
 def generate_rule_dict(f5, regex):
     rules = Rules(f5.get_api(), regex)
     fields = ['definition', 'description', 'ignore_vertification',
               'verification_status']
-    return generate_dict(rules, fields)
+    return generate_dict(rules, fields, f5.pool)
 
 
 def generate_node_dict(f5, regex):
@@ -1563,7 +1651,7 @@ def generate_node_dict(f5, regex):
     fields = ['name', 'address', 'connection_limit', 'description', 'dynamic_ratio',
               'monitor_instance', 'monitor_rule', 'monitor_status',
               'object_status', 'rate_limit', 'ratio', 'session_status']
-    return generate_dict(nodes, fields)
+    return generate_dict(nodes, fields, f5.pool)
 
 
 def generate_virtual_address_dict(f5, regex):
@@ -1572,13 +1660,13 @@ def generate_virtual_address_dict(f5, regex):
               'description', 'enabled_state', 'icmp_echo_state',
               'is_floating_state', 'netmask', 'object_status',
               'route_advertisement_state', 'traffic_group']
-    return generate_dict(virtual_addresses, fields)
+    return generate_dict(virtual_addresses, fields, f5.pool)
 
 
 def generate_address_class_dict(f5, regex):
     address_classes = AddressClasses(f5.get_api(), regex)
     fields = ['address_class', 'description']
-    return generate_dict(address_classes, fields)
+    return generate_dict(address_classes, fields, f5.pool)
 
 
 def generate_certificate_dict(f5, regex):
@@ -1612,7 +1700,7 @@ def generate_client_ssl_profile_dict(f5, regex):
               'server_name', 'session_ticket_state', 'sni_default_state',
               'sni_require_state', 'ssl_option', 'strict_resume_state',
               'unclean_shutdown_state', 'is_base_profile', 'is_system_profile']
-    return generate_dict(profiles, fields)
+    return generate_dict(profiles, fields, f5.pool)
 
 
 def generate_system_info_dict(f5):
@@ -1625,7 +1713,7 @@ def generate_system_info_dict(f5):
               'product_information', 'pva_version', 'system_id',
               'system_information', 'time',
               'time_zone', 'uptime']
-    return generate_simple_dict(system_info, fields)
+    return generate_simple_dict(system_info, fields, f5.pool)
 
 
 def generate_software_list(f5):
@@ -1637,7 +1725,32 @@ def generate_software_list(f5):
 def generate_provision_dict(f5):
     provisioned = ProvisionInfo(f5.get_api())
     fields = ['list', 'provisioned_list']
-    return generate_simple_dict(provisioned, fields)
+    return generate_simple_dict(provisioned, fields, f5.pool)
+
+
+# Fact categories, in the order they are gathered, and the function that
+# gathers each.
+FACTS = [
+    ('interface', generate_interface_dict),
+    ('self_ip', generate_self_ip_dict),
+    ('trunk', generate_trunk_dict),
+    ('vlan', generate_vlan_dict),
+    ('virtual_server', generate_vs_dict),
+    ('pool', generate_pool_dict),
+    ('provision', lambda f5, regex: generate_provision_dict(f5)),
+    ('device', generate_device_dict),
+    ('device_group', generate_device_group_dict),
+    ('traffic_group', generate_traffic_group_dict),
+    ('rule', generate_rule_dict),
+    ('node', generate_node_dict),
+    ('virtual_address', generate_virtual_address_dict),
+    ('address_class', generate_address_class_dict),
+    ('software', lambda f5, regex: generate_software_list(f5)),
+    ('certificate', generate_certificate_dict),
+    ('key', generate_key_dict),
+    ('client_ssl_profile', generate_client_ssl_profile_dict),
+    ('system_info', lambda f5, regex: generate_system_info_dict(f5)),
+]
 
 
 def main():
@@ -1647,6 +1760,8 @@ def main():
         session=dict(type='bool', default=False),
         include=dict(type='list', required=True),
         filter=dict(type='str', required=False),
+        timings=dict(type='bool', default=False),
+        concurrency=dict(type='int', default=1),
     )
     argument_spec.update(meta_args)
 
@@ -1664,6 +1779,8 @@ def main():
     validate_certs = module.params['validate_certs']
     session = module.params['session']
     fact_filter = module.params['filter']
+    timings = F5Timings() if module.params['timings'] else None
+    concurrency = module.params['concurrency']
 
     if validate_certs:
         import ssl
@@ -1691,6 +1808,11 @@ def main():
 
         if len(include) > 0:
             f5 = F5(server, user, password, session, validate_certs, server_port)
+            if timings:
+                f5.api = timings.instrument_bigsuds(f5.api)
+            if concurrency > 1:
+                wrap = timings.instrument_bigsuds if timings else None
+                f5.pool = FieldPool(f5, concurrency, wrap=wrap)
             saved_active_folder = f5.get_active_folder()
             saved_recursive_query_state = f5.get_recursive_query_state()
             if saved_active_folder != "/":
@@ -1698,44 +1820,14 @@ def main():
             if saved_recursive_query_state != "STATE_ENABLED":
                 f5.enable_recursive_query_state()
 
-            if 'interface' in include:
-                facts['interface'] = generate_interface_dict(f5, regex)
-            if 'self_ip' in include:
-                facts['self_ip'] = generate_self_ip_dict(f5, regex)
-            if 'trunk' in include:
-                facts['trunk'] = generate_trunk_dict(f5, regex)
-            if 'vlan' in include:
-                facts['vlan'] = generate_vlan_dict(f5, regex)
-            if 'virtual_server' in include:
-                facts['virtual_server'] = generate_vs_dict(f5, regex)
-            if 'pool' in include:
-                facts['pool'] = generate_pool_dict(f5, regex)
-            if 'provision' in include:
-                facts['provision'] = generate_provision_dict(f5)
-            if 'device' in include:
-                facts['device'] = generate_device_dict(f5, regex)
-            if 'device_group' in include:
-                facts['device_group'] = generate_device_group_dict(f5, regex)
-            if 'traffic_group' in include:
-                facts['traffic_group'] = generate_traffic_group_dict(f5, regex)
-            if 'rule' in include:
-                facts['rule'] = generate_rule_dict(f5, regex)
-            if 'node' in include:
-                facts['node'] = generate_node_dict(f5, regex)
-            if 'virtual_address' in include:
-                facts['virtual_address'] = generate_virtual_address_dict(f5, regex)
-            if 'address_class' in include:
-                facts['address_class'] = generate_address_class_dict(f5, regex)
-            if 'software' in include:
-                facts['software'] = generate_software_list(f5)
-            if 'certificate' in include:
-                facts['certificate'] = generate_certificate_dict(f5, regex)
-            if 'key' in include:
-                facts['key'] = generate_key_dict(f5, regex)
-            if 'client_ssl_profile' in include:
-                facts['client_ssl_profile'] = generate_client_ssl_profile_dict(f5, regex)
-            if 'system_info' in include:
-                facts['system_info'] = generate_system_info_dict(f5)
+            for name, generate in FACTS:
+                if name not in include:
+                    continue
+                if timings:
+                    with timings.phase(name):
+                        facts[name] = generate(f5, regex)
+                else:
+                    facts[name] = generate(f5, regex)
 
             # restore saved state
             if saved_active_folder and saved_active_folder != "/":
@@ -1743,11 +1835,15 @@ def main():
             if saved_recursive_query_state and \
                saved_recursive_query_state != "STATE_ENABLED":
                 f5.set_recursive_query_state(saved_recursive_query_state)
+            if f5.pool:
+                f5.pool.close()
 
         result = dict(
             ansible_facts=facts,
         )
         result.update(**facts)
+        if timings:
+            result['_timings'] = timings.to_return()
 
     except Exception as e:
         module.fail_json(msg="received exception: %s\ntraceback: %s" % (e, traceback.format_exc()))
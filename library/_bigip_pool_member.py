@@ -29,6 +29,12 @@ notes:
   - F5 developed module 'bigsuds' required (see http://devcentral.f5.com)
   - Best run as a local_action in your playbook
   - Supersedes bigip_pool for managing pool members
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
 requirements:
   - bigsuds
 options:
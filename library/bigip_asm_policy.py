@@ -97,6 +97,13 @@ options:
     description:
       - Device partition to manage resources on.
     default: Common
+notes:
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
 extends_documentation_fragment: f5
 author:
   - Wojciech Wypior (@wojtek0806)
@@ -229,9 +236,12 @@ try:
     from library.module_utils.network.f5.bigip import F5Client
     from library.module_utils.network.f5.common import F5ModuleError
     from library.module_utils.network.f5.common import AnsibleF5Parameters
+    from library.module_utils.network.f5.common import F5CollectionIndex
+    from library.module_utils.network.f5.common import F5Poller
     from library.module_utils.network.f5.common import cleanup_tokens
     from library.module_utils.network.f5.common import fqdn_name
     from library.module_utils.network.f5.common import f5_argument_spec
+    from library.module_utils.network.f5.common import filter_params
     try:
         from library.module_utils.network.f5.common import iControlUnexpectedHTTPError
     except ImportError:
@@ -243,9 +253,12 @@ except ImportError:
     from ansible.module_utils.network.f5.bigip import F5Client
     from ansible.module_utils.network.f5.common import F5ModuleError
     from ansible.module_utils.network.f5.common import AnsibleF5Parameters
+    from ansible.module_utils.network.f5.common import F5CollectionIndex
+    from ansible.module_utils.network.f5.common import F5Poller
     from ansible.module_utils.network.f5.common import cleanup_tokens
     from ansible.module_utils.network.f5.common import fqdn_name
     from ansible.module_utils.network.f5.common import f5_argument_spec
+    from ansible.module_utils.network.f5.common import filter_params
     try:
         from ansible.module_utils.network.f5.common import iControlUnexpectedHTTPError
     except ImportError:
@@ -463,6 +476,7 @@ class BaseManager(object):
         self.module = kwargs.get('module', None)
         self.have = None
         self.changes = Changes()
+        self.policies = F5CollectionIndex(self.read_policies_from_device)
 
     def exec_module(self):
         changed = False
@@ -526,12 +540,19 @@ class BaseManager(object):
         else:
             return self.remove()
 
-    def exists(self):
-        policies = self.client.api.tm.asm.policies_s.get_collection()
-        if any(p.name == self.want.name and p.partition == self.want.partition for p in policies):
-            return True
+    def read_policies_from_device(self):
+        # ASM filters on the name, so at most one policy in each partition
+        # is read. The same read serves every later lookup.
+        params = filter_params(name="'{0}'".format(self.want.name))
+        return self.client.api.tm.asm.policies_s.get_collection(
+            requests_params=dict(params=params)
+        )
 
-        return False
+    def _get_policy(self):
+        return self.policies.get(fqdn_name(self.want.partition, self.want.name))
+
+    def exists(self):
+        return self._get_policy() is not None
 
     def _file_is_missing(self):
         if self.want.template and self.want.file is None:
@@ -590,25 +611,24 @@ class BaseManager(object):
             raise F5ModuleError('Apply policy task failed.')
 
     def wait_for_task(self, task):
-        while True:
+        def check():
             task.refresh()
-            if task.status in ['COMPLETED', 'FAILURE']:
-                break
-            time.sleep(1)
-        if task.status == 'FAILURE':
-            return False
-        if task.status == 'COMPLETED':
-            return True
+            return task.status
+
+        poller = F5Poller(
+            'the ASM task to finish', delay=1, max_delay=10, timeout=1800,
+            timings=getattr(self.client, 'timings', None)
+        )
+        status = poller.wait(check, success=lambda x: x in ['COMPLETED', 'FAILURE'])
+        return status == 'COMPLETED'
 
     def update_on_device(self):
         params = self.changes.api_params()
-        policies = self.client.api.tm.asm.policies_s.get_collection()
-        name = self.want.name
-        partition = self.want.partition
-        resource = next((p for p in policies if p.name == name and p.partition == partition), None)
+        resource = self._get_policy()
         if resource:
             if not params['active']:
                 resource.modify(**params)
+                self.policies.invalidate()
 
     def create_blank(self):
         self.create_on_device()
@@ -636,13 +656,12 @@ class BaseManager(object):
             return False
 
     def read_current_from_device(self):
-        policies = self.client.api.tm.asm.policies_s.get_collection()
-        for policy in policies:
-            if policy.name == self.want.name and policy.partition == self.want.partition:
-                params = policy.attrs
-                params.update(dict(self_link=policy.selfLink))
-                return Parameters(params=params)
-        raise F5ModuleError("The policy was not found")
+        policy = self._get_policy()
+        if policy is None:
+            raise F5ModuleError("The policy was not found")
+        params = policy.attrs
+        params.update(dict(self_link=policy.selfLink))
+        return Parameters(params=params)
 
     def import_to_device(self):
         self.client.api.tm.asm.file_transfer.uploads.upload_file(self.want.file)
@@ -654,6 +673,7 @@ class BaseManager(object):
             partition=self.want.partition,
             filename=name
         )
+        self.policies.invalidate()
         return result
 
     def apply_on_device(self):
@@ -661,6 +681,7 @@ class BaseManager(object):
         result = tasks.apply_policy_s.apply_policy.create(
             policyReference={'link': self.have.self_link}
         )
+        self.policies.invalidate()
         return result
 
     def create_from_template_on_device(self):
@@ -670,6 +691,7 @@ class BaseManager(object):
             partition=self.want.partition,
             policyTemplateReference=self.want.template_link
         )
+        self.policies.invalidate()
         return result
 
     def create_on_device(self):
@@ -677,15 +699,14 @@ class BaseManager(object):
             name=self.want.name,
             partition=self.want.partition
         )
+        self.policies.invalidate()
         return result
 
     def remove_from_device(self):
-        policies = self.client.api.tm.asm.policies_s.get_collection()
-        name = self.want.name
-        partition = self.want.partition
-        resource = next((p for p in policies if p.name == name and p.partition == partition), None)
+        resource = self._get_policy()
         if resource:
             resource.delete()
+            self.policies.invalidate()
 
 
 class ModuleManager(object):
@@ -809,10 +830,14 @@ def main():
         module.fail_json(msg="The python f5-sdk module is required")
 
     try:
-        client = F5Client(**module.params)
+        client = F5Client(socket_path=module._socket_path, **module.params)
         mm = ModuleManager(module=module, client=client)
+        if client.timings:
+            client.timings.instrument(mm)
         results = mm.exec_module()
         cleanup_tokens(client)
+        if client.timings:
+            results['_timings'] = client.timings.to_return()
         module.exit_json(**results)
     except F5ModuleError as e:
         cleanup_tokens(client)
@@ -24,7 +24,9 @@ version_added: "2.4"
 options:
   device_group:
     description:
-      - The device group that you want to perform config-sync actions on.
+      - The device groups that you want to perform config-sync actions on.
+      - Either a single device group, or a list of them. The groups are
+        synced at the same time.
     required: True
   sync_device_to_group:
     description:
@@ -53,8 +55,15 @@ options:
       - yes
       - no
 notes:
-  - Requires the objectpath Python package on the host. This is as easy as
-    C(pip install objectpath).
+  - The status of every device group is read with a single request, however
+    many groups there are. The module returns once every group is in sync,
+    or has failed to sync.
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
 extends_documentation_fragment: f5
 author:
   - Tim Rupp (@caphrim007)
@@ -81,6 +90,19 @@ EXAMPLES = r'''
     validate_certs: no
   delegate_to: localhost
 
+- name: Sync configuration from device to several groups
+  bigip_configsync_actions:
+    device_group:
+      - sync-failover-1
+      - sync-only-1
+      - sync-only-2
+    sync_device_to_group: yes
+    server: lb.mydomain.com
+    user: admin
+    password: secret
+    validate_certs: no
+  delegate_to: localhost
+
 - name: Perform an initial sync of a device to a new device group
   bigip_configsync_actions:
     device_group: new-device-group
@@ -93,17 +115,19 @@ EXAMPLES = r'''
 '''
 
 RETURN = r'''
-# only common fields returned
+device_groups:
+  description:
+    - The device groups that were synced, each with the status it reached and
+      the number of seconds it took to reach it.
+  returned: changed
+  type: list
+  sample:
+    - name: sync-only-1
+      status: In Sync
+      elapsed: 4.5
 '''
 
 import re
-import time
-
-try:
-    from objectpath import Tree
-    HAS_OBJPATH = True
-except ImportError:
-    HAS_OBJPATH = False
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.basic import BOOLEANS_TRUE
@@ -115,10 +139,13 @@ try:
     from library.module_utils.network.f5.bigip import HAS_F5SDK
     from library.module_utils.network.f5.bigip import F5Client
     from library.module_utils.network.f5.common import F5ModuleError
+    from library.module_utils.network.f5.common import F5Poller
+    from library.module_utils.network.f5.common import F5PollTimeout
     from library.module_utils.network.f5.common import AnsibleF5Parameters
     from library.module_utils.network.f5.common import cleanup_tokens
     from library.module_utils.network.f5.common import fqdn_name
     from library.module_utils.network.f5.common import f5_argument_spec
+    from library.module_utils.network.f5.common import map_requests
     try:
         from library.module_utils.network.f5.common import iControlUnexpectedHTTPError
     except ImportError:
@@ -129,16 +156,49 @@ except ImportError:
     from ansible.module_utils.network.f5.bigip import HAS_F5SDK
     from ansible.module_utils.network.f5.bigip import F5Client
     from ansible.module_utils.network.f5.common import F5ModuleError
+    from ansible.module_utils.network.f5.common import F5Poller
+    from ansible.module_utils.network.f5.common import F5PollTimeout
     from ansible.module_utils.network.f5.common import AnsibleF5Parameters
     from ansible.module_utils.network.f5.common import cleanup_tokens
     from ansible.module_utils.network.f5.common import fqdn_name
     from ansible.module_utils.network.f5.common import f5_argument_spec
+    from ansible.module_utils.network.f5.common import map_requests
     try:
         from ansible.module_utils.network.f5.common import iControlUnexpectedHTTPError
     except ImportError:
         HAS_F5SDK = False
 
 
+# Statuses of a device group that is still syncing.
+#
+# Changes Pending:
+#     The existing device has changes made to it that
+#     need to be sync'd to the group.
+#
+# Awaiting Initial Sync:
+#     This is a new device group and has not had any sync
+#     done yet. You _must_ `sync_device_to_group` in this
+#     case.
+#
+# Not All Devices Synced:
+#     A device group will go into this state immediately
+#     after starting the sync and stay until all devices finish.
+PENDING_STATUSES = ['Changes Pending', 'Awaiting Initial Sync', 'Not All Devices Synced']
+
+
+def get_details(stats):
+    """Returns the details of the sync status, at any depth of its stats
+    """
+    result = []
+    if isinstance(stats, dict):
+        for key, value in stats.items():
+            if key == 'details' and isinstance(value, dict) and 'description' in value:
+                result.append(value['description'])
+            else:
+                result += get_details(value)
+    return result
+
+
 class Parameters(AnsibleF5Parameters):
     api_attributes = []
     returnables = []
@@ -150,6 +210,19 @@ class Parameters(AnsibleF5Parameters):
         else:
             return 'from-group'
 
+    @property
+    def device_groups(self):
+        groups = self._values['device_group']
+        if groups is None:
+            return []
+        if not isinstance(groups, list):
+            groups = [groups]
+        result = []
+        for group in groups:
+            if group not in result:
+                result.append(group)
+        return result
+
     @property
     def sync_device_to_group(self):
         result = self._cast_to_bool(self._values['sync_device_to_group'])
@@ -207,6 +280,7 @@ class ModuleManager(object):
         self.client = kwargs.get('client', None)
         self.want = Parameters(params=self.module.params)
         self.changes = Parameters()
+        self.results = []
 
     def exec_module(self):
         result = dict()
@@ -217,53 +291,47 @@ class ModuleManager(object):
             raise F5ModuleError(str(e))
 
         result.update(dict(changed=changed))
+        if changed:
+            result.update(dict(device_groups=self.results))
         return result
 
     def present(self):
-        if not self._device_group_exists():
+        missing = self._get_missing_device_groups()
+        if missing:
             raise F5ModuleError(
-                "The specified 'device_group' not not exist."
+                "The specified 'device_group' {0} does not exist.".format(', '.join(missing))
             )
-        if self._sync_to_group_required():
+        statuses = self.read_statuses_from_device()[0]
+        if self._sync_to_group_required(statuses):
             raise F5ModuleError(
                 "This device group needs an initial sync. Please use "
                 "'sync_device_to_group'"
             )
-        if self.exists():
+        groups = [x for x in self.want.device_groups if statuses[x] != 'In Sync']
+        if not groups:
             return False
-        else:
-            return self.execute()
+        return self.execute(groups)
 
-    def _sync_to_group_required(self):
-        resource = self.read_current_from_device()
-        status = self._get_status_from_resource(resource)
-        if status == 'Awaiting Initial Sync' and self.want.sync_group_to_device:
-            return True
-        return False
+    def _sync_to_group_required(self, statuses):
+        if not self.want.sync_group_to_device:
+            return False
+        return any(x == 'Awaiting Initial Sync' for x in statuses.values())
 
-    def _device_group_exists(self):
-        result = self.client.api.tm.cm.device_groups.device_group.exists(
-            name=self.want.device_group
-        )
-        return result
+    def _get_missing_device_groups(self):
+        collection = self.client.api.tm.cm.device_groups.get_collection()
+        names = [x.name for x in collection]
+        return [x for x in self.want.device_groups if x not in names]
 
-    def execute(self):
-        self.execute_on_device()
-        self._wait_for_sync()
+    def execute(self, groups):
+        # The syncs are started together, and then watched together.
+        map_requests(self.client, self.execute_on_device, groups)
+        self._wait_for_sync(groups)
         return True
 
-    def exists(self):
-        resource = self.read_current_from_device()
-        status = self._get_status_from_resource(resource)
-        if status == 'In Sync':
-            return True
-        else:
-            return False
-
-    def execute_on_device(self):
+    def execute_on_device(self, device_group):
         sync_cmd = 'config-sync {0} {1} {2}'.format(
             self.want.direction,
-            self.want.device_group,
+            device_group,
             self.want.force_full_push
         )
         self.client.api.tm.cm.exec_cmd(
@@ -271,53 +339,106 @@ class ModuleManager(object):
             utilCmdArgs=sync_cmd
         )
 
-    def _wait_for_sync(self):
-        # Wait no more than half an hour
-        resource = self.read_current_from_device()
-        for x in range(1, 180):
-            time.sleep(3)
-            status = self._get_status_from_resource(resource)
-
-            # Changes Pending:
-            #     The existing device has changes made to it that
-            #     need to be sync'd to the group.
-            #
-            # Awaiting Initial Sync:
-            #     This is a new device group and has not had any sync
-            #     done yet. You _must_ `sync_device_to_group` in this
-            #     case.
-            #
-            # Not All Devices Synced:
-            #     A device group will go into this state immediately
-            #     after starting the sync and stay until all devices finish.
-            #
-            if status in ['Changes Pending']:
-                details = self._get_details_from_resource(resource)
-                self._validate_pending_status(details)
-            elif status in ['Awaiting Initial Sync', 'Not All Devices Synced']:
-                pass
-            elif status == 'In Sync':
-                return
-            else:
-                raise F5ModuleError(status)
+    def _wait_for_sync(self, groups):
+        """Waits until each of the groups is in sync, or has failed to sync
+
+        Every group is checked with the one read of the sync status, and a
+        group is finished with as soon as it is in sync or has failed. How
+        long each group took is kept in the results.
+        """
+        # Wait no more than nine minutes
+        poller = F5Poller(
+            'the device groups to sync', delay=3, max_delay=15, timeout=540,
+            initial_delay=3, timings=getattr(self.client, 'timings', None)
+        )
+        start = poller.clock()
+        results = dict()
+        last = dict()
+
+        def check():
+            statuses, details = self.read_statuses_from_device()
+            for group in groups:
+                if group in results:
+                    continue
+                status = last[group] = statuses[group]
+                error = None
+                if status == 'Changes Pending':
+                    try:
+                        self._validate_pending_status(self._get_details_of_group(details, group))
+                    except F5ModuleError as ex:
+                        error = str(ex)
+                elif status != 'In Sync' and status not in PENDING_STATUSES:
+                    error = status
+                if status == 'In Sync' or error:
+                    results[group] = dict(
+                        name=group,
+                        status=status,
+                        elapsed=round(poller.clock() - start, 2)
+                    )
+                    if error:
+                        results[group]['error'] = error
+            return [x for x in groups if x not in results]
+
+        try:
+            poller.wait(check, success=lambda x: not x)
+        except F5PollTimeout:
+            raise F5ModuleError(
+                "Timed out after {0} seconds waiting for the device groups to sync. {1}".format(
+                    poller.timeout,
+                    ' '.join('{0}: {1}'.format(x, last.get(x)) for x in groups if x not in results)
+                )
+            )
+        self.results = [results[x] for x in groups]
+        failed = [x for x in self.results if 'error' in x]
+        if failed:
+            raise F5ModuleError(
+                "The following device groups failed to sync. {0}".format(
+                    ' '.join('{0}: {1}'.format(x['name'], x['error']) for x in failed)
+                )
+            )
 
     def read_current_from_device(self):
         result = self.client.api.tm.cm.sync_status.load()
         return result
 
+    def read_statuses_from_device(self):
+        """Returns the status of each device group, and the details
+
+        The sync status has an overall status, and a detail for each device
+        group, such as ``foo (In Sync): All devices in the device group are
+        in sync``. Groups without a detail have the overall status.
+        """
+        resource = self.read_current_from_device()
+        status = self._get_status_from_resource(resource)
+        details = get_details(resource.entries)
+        result = dict()
+        for group in self.want.device_groups:
+            result[group] = status
+            pattern = r'^{0} \((?P<status>[^)]+)\)'.format(re.escape(group))
+            for detail in details:
+                matches = re.search(pattern, detail)
+                if matches:
+                    result[group] = matches.group('status')
+                    break
+        return result, details
+
     def _get_status_from_resource(self, resource):
-        resource.refresh()
         entries = resource.entries.copy()
         k, v = entries.popitem()
         status = v['nestedStats']['entries']['status']['description']
         return status
 
-    def _get_details_from_resource(self, resource):
-        resource.refresh()
-        stats = resource.entries.copy()
-        tree = Tree(stats)
-        details = list(tree.execute('$..*["details"]["description"]'))
-        result = details[::-1]
+    def _get_details_of_group(self, details, group):
+        """Returns the details that are about the group
+
+        Details that name none of the groups, such as the connection status
+        of a device, are about every group.
+        """
+        result = []
+        for detail in details:
+            named = [x for x in self.want.device_groups if re.search(r'\b{0}\b'.format(re.escape(x)), detail)]
+            if not named or group in named:
+                result.append(detail)
         return result
 
     def _validate_pending_status(self, details):
@@ -353,6 +474,7 @@ class ArgumentSpec(object):
                 default='no'
             ),
             device_group=dict(
+                type='list',
                 required=True
             )
         )
@@ -384,10 +506,14 @@ def main():
         module.fail_json(msg="The python f5-sdk module is required")
 
     try:
-        client = F5Client(**module.params)
+        client = F5Client(socket_path=module._socket_path, **module.params)
         mm = ModuleManager(module=module, client=client)
+        if client.timings:
+            client.timings.instrument(mm)
         results = mm.exec_module()
         cleanup_tokens(client)
+        if client.timings:
+            results['_timings'] = client.timings.to_return()
         module.exit_json(**results)
     except F5ModuleError as ex:
         cleanup_tokens(client)
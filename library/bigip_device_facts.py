@@ -0,0 +1,693 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017 F5 Networks Inc.
+# GNU General Public License v3.0 (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'community'}
+
+DOCUMENTATION = r'''
+---
+module: bigip_device_facts
+short_description: Collect facts from F5 BIG-IP devices over iControl REST
+description:
+  - Collect facts from F5 BIG-IP devices over iControl REST.
+  - This module accepts the same fact categories as the C(bigip_facts) module,
+    but does not require bigsuds. Each category is read with one or two
+    collection requests, and the categories are read concurrently.
+version_added: "2.6"
+options:
+  include:
+    description:
+      - Fact category or list of categories to collect.
+      - The C(all) category collects every other category.
+    required: True
+    choices:
+      - address_class
+      - all
+      - certificate
+      - client_ssl_profile
+      - device
+      - device_group
+      - interface
+      - key
+      - node
+      - pool
+      - provision
+      - rule
+      - self_ip
+      - software
+      - system_info
+      - traffic_group
+      - trunk
+      - virtual_address
+      - virtual_server
+      - vlan
+  filter:
+    description:
+      - Shell-style glob matching string used to filter the full names of the
+        collected objects. Not applicable for the C(software), C(provision),
+        and C(system_info) fact categories.
+  workers:
+    description:
+      - Number of fact categories to collect concurrently.
+      - It is also limited by the C(max_in_flight) of the C(provider).
+    default: 4
+  dest:
+    description:
+      - Path of a file to stream the facts to, instead of returning them.
+      - Each line of the file is a JSON object with the C(section) that the
+        facts belong to, and the C(facts) of one object. Only the number of
+        objects in each section is returned.
+      - Collections are read a page at a time, so memory use does not grow
+        with the size of the configuration.
+  page_size:
+    description:
+      - Number of objects to read in each request when C(dest) is specified.
+    default: 100
+  snapshot_dir:
+    description:
+      - Directory to keep a snapshot of the facts of each device in.
+      - When specified, only the generations of the objects in each
+        collection are read from the device. A collection is read again
+        only when the number of its objects, or the highest generation among
+        them, has changed since the snapshot was taken. The other
+        collections are served from the snapshot.
+      - The C(system_info) category is always read from the device.
+      - Mutually exclusive with C(dest).
+  force_refresh:
+    description:
+      - When C(yes), every collection is read from the device, and the
+        snapshot in C(snapshot_dir) is replaced.
+    type: bool
+    default: no
+  ucs:
+    description:
+      - Path of a UCS archive to read the facts from, instead of the device.
+      - Only the configuration files of the archive are read, and nothing is
+        unpacked to disk. The facts have the same structure as those read
+        from the device.
+      - The C(system_info) and C(software) categories are not part of the
+        configuration, and are empty.
+      - Mutually exclusive with C(dest) and C(snapshot_dir).
+    version_added: 2.6
+notes:
+  - Requires BIG-IP software version >= 12
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
+extends_documentation_fragment: f5
+author:
+  - Tim Rupp (@caphrim007)
+'''
+
+EXAMPLES = r'''
+- name: Collect BIG-IP facts
+  bigip_device_facts:
+    server: lb.mydomain.com
+    user: admin
+    password: secret
+    include:
+      - interface
+      - vlan
+  delegate_to: localhost
+
+- name: Collect the virtual servers and pools in the Common partition
+  bigip_device_facts:
+    server: lb.mydomain.com
+    user: admin
+    password: secret
+    include:
+      - virtual_server
+      - pool
+    filter: /Common/*
+  delegate_to: localhost
+
+- name: Collect the virtual servers, reading only what changed since the last run
+  bigip_device_facts:
+    server: lb.mydomain.com
+    user: admin
+    password: secret
+    include: virtual_server
+    snapshot_dir: /var/cache/f5-facts
+  delegate_to: localhost
+
+- name: Collect the pools from a UCS archive, without connecting to the device
+  bigip_device_facts:
+    include: pool
+    ucs: /var/backups/lb-nightly.ucs
+  delegate_to: localhost
+
+- name: Stream the virtual servers of a large configuration to a file
+  bigip_device_facts:
+    server: lb.mydomain.com
+    user: admin
+    password: secret
+    include: virtual_server
+    dest: /tmp/virtual_servers.jsonl
+  delegate_to: localhost
+'''
+
+RETURN = r'''
+virtual_server:
+  description:
+    - Virtual servers, keyed by their full names.
+    - The attributes of each category are those of the iControl REST
+      resource, with names converted to snake case. Expanded subcollections,
+      such as the profiles of a virtual server, are returned as lists.
+  returned: When C(virtual_server) is included.
+  type: complex
+  sample: hash/dictionary of values
+pool:
+  description: Pools, and their members, keyed by their full names.
+  returned: When C(pool) is included.
+  type: complex
+  sample: hash/dictionary of values
+system_info:
+  description: The hardware and software version of the device.
+  returned: When C(system_info) is included.
+  type: complex
+  sample: hash/dictionary of values
+cached_sections:
+  description: The fact categories that were served from the snapshot.
+  returned: When C(snapshot_dir) is specified.
+  type: list
+  sample: ['pool', 'virtual_server']
+dest:
+  description: The file that the facts were written to.
+  returned: When C(dest) is specified.
+  type: string
+  sample: /tmp/virtual_servers.jsonl
+counts:
+  description: Number of objects written to C(dest) for each section.
+  returned: When C(dest) is specified.
+  type: dict
+  sample: {"virtual_server": 5000}
+total:
+  description: Number of objects written to C(dest).
+  returned: When C(dest) is specified.
+  type: int
+  sample: 5000
+'''
+
+import fnmatch
+import re
+import tarfile
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.six import iteritems
+from ansible.module_utils.six import string_types
+
+HAS_DEVEL_IMPORTS = False
+
+try:
+    # Sideband repository used for dev
+    from library.module_utils.network.f5.icontrol import HAS_REQUESTS
+    from library.module_utils.network.f5.icontrol import F5RestClient
+    from library.module_utils.network.f5.common import F5ModuleError
+    from library.module_utils.network.f5.common import AnsibleF5Parameters
+    from library.module_utils.network.f5.common import F5Snapshot
+    from library.module_utils.network.f5.common import cleanup_tokens
+    from library.module_utils.network.f5.common import f5_argument_spec
+    from library.module_utils.network.f5.common import iter_pages
+    from library.module_utils.network.f5.common import map_requests
+    from library.module_utils.network.f5.config import F5FactsWriter
+    from library.module_utils.network.f5.config import iter_ucs_configs
+    from library.module_utils.network.f5.config import parse_tmsh_config
+    HAS_DEVEL_IMPORTS = True
+except ImportError:
+    # Upstream Ansible
+    from ansible.module_utils.network.f5.icontrol import HAS_REQUESTS
+    from ansible.module_utils.network.f5.icontrol import F5RestClient
+    from ansible.module_utils.network.f5.common import F5ModuleError
+    from ansible.module_utils.network.f5.common import AnsibleF5Parameters
+    from ansible.module_utils.network.f5.common import F5Snapshot
+    from ansible.module_utils.network.f5.common import cleanup_tokens
+    from ansible.module_utils.network.f5.common import f5_argument_spec
+    from ansible.module_utils.network.f5.common import iter_pages
+    from ansible.module_utils.network.f5.common import map_requests
+    from ansible.module_utils.network.f5.config import F5FactsWriter
+    from ansible.module_utils.network.f5.config import iter_ucs_configs
+    from ansible.module_utils.network.f5.config import parse_tmsh_config
+
+
+EXPAND = dict(expandSubcollections='true')
+
+# The collections read for each fact category. Subcollections, such as the
+# members of a pool, are expanded so that they are read in the same request.
+SECTIONS = dict(
+    address_class=[('/mgmt/tm/ltm/data-group/internal', None)],
+    certificate=[('/mgmt/tm/sys/file/ssl-cert', None)],
+    client_ssl_profile=[('/mgmt/tm/ltm/profile/client-ssl', None)],
+    device=[('/mgmt/tm/cm/device', None)],
+    device_group=[('/mgmt/tm/cm/device-group', EXPAND)],
+    interface=[('/mgmt/tm/net/interface', None)],
+    key=[('/mgmt/tm/sys/file/ssl-key', None)],
+    node=[('/mgmt/tm/ltm/node', None)],
+    pool=[('/mgmt/tm/ltm/pool', EXPAND)],
+    provision=[('/mgmt/tm/sys/provision', None)],
+    rule=[('/mgmt/tm/ltm/rule', None)],
+    self_ip=[('/mgmt/tm/net/self', None)],
+    software=[('/mgmt/tm/sys/software/volume', None)],
+    system_info=[
+        ('/mgmt/tm/sys/hardware', None),
+        ('/mgmt/tm/sys/version', None)
+    ],
+    traffic_group=[('/mgmt/tm/cm/traffic-group', None)],
+    trunk=[('/mgmt/tm/net/trunk', None)],
+    virtual_address=[('/mgmt/tm/ltm/virtual-address', None)],
+    virtual_server=[('/mgmt/tm/ltm/virtual', EXPAND)],
+    vlan=[('/mgmt/tm/net/vlan', EXPAND)],
+)
+
+# The tmsh object types of each category, as they appear in the
+# configuration files of a UCS archive.
+UCS_SECTIONS = dict(
+    address_class=['ltm data-group internal'],
+    certificate=['sys file ssl-cert'],
+    client_ssl_profile=['ltm profile client-ssl'],
+    device=['cm device'],
+    device_group=['cm device-group'],
+    interface=['net interface'],
+    key=['sys file ssl-key'],
+    node=['ltm node'],
+    pool=['ltm pool'],
+    provision=['sys provision'],
+    rule=['ltm rule'],
+    self_ip=['net self'],
+    traffic_group=['cm traffic-group'],
+    trunk=['net trunk'],
+    virtual_address=['ltm virtual-address'],
+    virtual_server=['ltm virtual'],
+    vlan=['net vlan'],
+)
+
+# Object types whose bodies are not tmsh syntax.
+RAW_OBJECT_TYPES = ['ltm rule']
+
+# Categories that are not filtered by name.
+UNFILTERED = ['provision', 'software', 'system_info']
+
+# Attributes of the REST resources that have no meaning outside of the API.
+INTERNAL_KEYS = ['kind', 'selfLink', 'generation']
+
+
+def snake_case(name):
+    """Converts an iControl REST attribute name to snake case
+
+    For example, ``fullPath`` becomes ``full_path``.
+    """
+    name = re.sub(r'([a-z0-9])([A-Z])', r'\1_\2', name)
+    return name.replace('-', '_').lower()
+
+
+def flatten_resource(resource):
+    """Returns the attributes of a resource as facts
+
+    The internal attributes of the resource are removed. Subcollections that
+    were expanded are returned as a list of their items. References to
+    subcollections that were not expanded are removed.
+    """
+    result = dict()
+    for key, value in iteritems(resource):
+        if key in INTERNAL_KEYS:
+            continue
+        if key.endswith('Reference') and isinstance(value, dict):
+            if 'items' in value:
+                result[snake_case(key[:-len('Reference')])] = [
+                    flatten_resource(x) for x in value['items']
+                ]
+            elif 'link' not in value:
+                result[snake_case(key)] = value
+            continue
+        if isinstance(value, dict):
+            value = flatten_resource(value)
+        elif isinstance(value, list):
+            value = [flatten_resource(x) if isinstance(x, dict) else x for x in value]
+        result[snake_case(key)] = value
+    return result
+
+
+def flatten_stats(entries):
+    """Returns the nested stats entries of a response as facts
+
+    The keys of the entries are URLs, such as
+    ``https://localhost/mgmt/tm/sys/version/0``, or names. Only the last part
+    of each is kept. Single, numbered, entries are collapsed into their parent.
+    """
+    result = dict()
+    for key, value in iteritems(entries):
+        name = snake_case(key.rsplit('/', 1)[-1])
+        if 'nestedStats' in value:
+            value = flatten_stats(value['nestedStats'].get('entries', {}))
+        elif 'description' in value:
+            value = value['description']
+        else:
+            value = value.get('value')
+        result[name] = value
+    if len(result) == 1:
+        key, value = list(result.items())[0]
+        if key.isdigit() and isinstance(value, dict):
+            return value
+    return result
+
+
+def flatten_config_object(name, body):
+    """Returns the attributes of an object of a tmsh configuration as facts
+
+    The facts have the same form as those of ``flatten_resource``. Blocks of
+    named objects, such as the members of a pool, are returned as lists, and
+    the bodies of iRules are returned as their ``api_anonymous`` attribute.
+    """
+    if name.startswith('/'):
+        result = dict(
+            name=name.rsplit('/', 1)[-1],
+            partition=name.split('/')[1],
+            full_path=name
+        )
+    else:
+        result = dict(name=name, full_path=name)
+    if not isinstance(body, dict):
+        result['api_anonymous'] = body
+        return result
+    for key, value in iteritems(body):
+        result[snake_case(key)] = _flatten_config_value(value)
+    return result
+
+
+def _flatten_config_value(value):
+    if isinstance(value, dict):
+        if value and all(isinstance(x, dict) for x in value.values()):
+            return [flatten_config_object(k, v) for k, v in sorted(iteritems(value))]
+        return dict((snake_case(k), _flatten_config_value(v)) for k, v in iteritems(value))
+    if isinstance(value, list):
+        return [_flatten_config_value(x) for x in value]
+    if isinstance(value, string_types) and value.isdigit():
+        return int(value)
+    return value
+
+
+def get_collection_version(response):
+    """Returns the number of objects in a collection, and their highest generation
+
+    Every change to an object moves its generation past that of every other
+    object on the device. So, together with the number of objects, it tells
+    whether objects were created, modified or deleted.
+    """
+    generations = [x.get('generation', 0) for x in response.get('items', [])]
+    return [len(generations), max(generations or [0])]
+
+
+class Parameters(AnsibleF5Parameters):
+    @property
+    def include(self):
+        requested = [str(x).lower() for x in self._values['include']]
+        if 'all' in requested:
+            return sorted(SECTIONS.keys())
+        invalid = [x for x in requested if x not in SECTIONS]
+        if invalid:
+            raise F5ModuleError(
+                "Value of include must be one or more of: {0}, got: {1}".format(
+                    ', '.join(['all'] + sorted(SECTIONS.keys())), ', '.join(invalid)
+                )
+            )
+        # Each category is only read once, however often it is requested.
+        result = []
+        for name in requested:
+            if name not in result:
+                result.append(name)
+        return result
+
+    @property
+    def filter(self):
+        if self._values['filter'] is None:
+            return None
+        return re.compile(fnmatch.translate(self._values['filter']))
+
+    @property
+    def page_size(self):
+        if self._values['page_size'] is None:
+            return 100
+        return max(1, int(self._values['page_size']))
+
+    @property
+    def workers(self):
+        if self._values['workers'] is None:
+            return 4
+        return max(1, int(self._values['workers']))
+
+
+class ModuleManager(object):
+    def __init__(self, *args, **kwargs):
+        self.module = kwargs.get('module', None)
+        self.client = kwargs.get('client', None)
+        self.want = Parameters(params=self.module.params)
+        self.cached_sections = set()
+
+    def exec_module(self):
+        if self.want.dest:
+            return self.write_facts_to_file()
+        if self.want.ucs:
+            facts = self.read_current_from_ucs()
+        else:
+            facts = self.read_current_from_device()
+        result = dict(
+            ansible_facts=facts,
+            changed=False
+        )
+        result.update(**facts)
+        if self.want.snapshot_dir:
+            result['cached_sections'] = sorted(self.cached_sections)
+        return result
+
+    def get_requests(self):
+        return [(name, path, params) for name in self.want.include for path, params in SECTIONS[name]]
+
+    def read_current_from_device(self):
+        names = self.want.include
+        requests = self.get_requests()
+        responses = dict((name, []) for name in names)
+        if self.want.snapshot_dir:
+            results = self.read_collections_incrementally(requests)
+        else:
+            results = map_requests(
+                self.client, lambda x: self.read_collection_from_device(x[1], x[2]), requests,
+                workers=self.want.workers
+            )
+        for request, response in zip(requests, results):
+            responses[request[0]].append(response)
+
+        result = dict()
+        for name in names:
+            result[name] = self.format_facts(name, responses[name])
+        return result
+
+    def read_current_from_ucs(self):
+        """Reads the facts from the configuration files of a UCS archive
+
+        Objects are read from the archive in the order of its files, so an
+        object that appears in more than one file has the attributes of the
+        last.
+        """
+        types = dict()
+        for name in self.want.include:
+            for object_type in UCS_SECTIONS.get(name, []):
+                types[object_type] = name
+
+        result = dict((name, dict()) for name in self.want.include)
+        try:
+            for filename, text in iter_ucs_configs(self.want.ucs):
+                for words, body in parse_tmsh_config(text, raw=RAW_OBJECT_TYPES):
+                    name = types.get(' '.join(words[:-1]))
+                    if name is None:
+                        continue
+                    regex = None if name in UNFILTERED else self.want.filter
+                    if regex is not None and not regex.search(words[-1]):
+                        continue
+                    result[name][words[-1]] = flatten_config_object(words[-1], body)
+        except (IOError, OSError, tarfile.TarError) as ex:
+            raise F5ModuleError(
+                "Failed to read the UCS archive {0}: {1}".format(self.want.ucs, ex)
+            )
+        return result
+
+    def read_collections_incrementally(self, requests):
+        """Reads the collections that changed since the snapshot was taken
+
+        Only the generations of the objects in each collection are read. The
+        collection itself is re-read when the number of its objects, or the
+        highest generation among them, differs from the snapshot. Otherwise
+        the collection is served from the snapshot.
+
+        :return: The responses, in the order of the requests.
+        """
+        snapshot = F5Snapshot(self.want.snapshot_dir)
+        server = self.module.params['server']
+        port = self.module.params['server_port']
+
+        previous = None
+        if not self.want.force_refresh:
+            previous = snapshot.get(server, port, 'facts')
+        previous = previous or dict()
+
+        results = map_requests(
+            self.client, lambda x: self.read_collection_incrementally(previous, *x), requests,
+            workers=self.want.workers
+        )
+
+        current = dict(previous)
+        refreshed = set()
+        for request, result in zip(requests, results):
+            name, path = request[0], request[1]
+            response, version, cached = result
+            if not cached:
+                refreshed.add(name)
+            if version is not None:
+                current[path] = dict(version=version, response=response)
+        self.cached_sections = set(x[0] for x in requests) - refreshed
+
+        snapshot.set(server, port, 'facts', current)
+        return [x[0] for x in results]
+
+    def read_collection_incrementally(self, previous, name, path, params):
+        if name == 'system_info':
+            # Stats have no generation, so they are always read.
+            return self.read_collection_from_device(path, params), None, False
+        entry = previous.get(path)
+        if entry:
+            version = self.read_collection_version_from_device(path)
+            if entry['version'] == version:
+                return entry['response'], version, True
+        # The version of a collection that is read in full is taken from the
+        # collection itself.
+        response = self.read_collection_from_device(path, params)
+        return response, get_collection_version(response), False
+
+    def read_collection_version_from_device(self, path):
+        response = self.read_collection_from_device(path, {'$select': 'generation'})
+        return get_collection_version(response)
+
+    def write_facts_to_file(self):
+        """Streams the facts to the destination file
+
+        Collections are read a page at a time, and each object is written as
+        soon as its page is read. Only the number of objects written is kept.
+        """
+        with F5FactsWriter(self.want.dest) as writer:
+            map_requests(
+                self.client, lambda x: self.write_collection_to_file(writer, *x), self.get_requests(),
+                workers=self.want.workers
+            )
+        result = writer.to_return()
+        result['changed'] = False
+        return result
+
+    def write_collection_to_file(self, writer, name, path, params):
+        if name == 'system_info':
+            response = self.read_collection_from_device(path, params)
+            writer.write(name, {path.rsplit('/', 1)[-1]: flatten_stats(response.get('entries', {}))})
+            return
+
+        regex = None if name in UNFILTERED else self.want.filter
+        for item in iter_pages(lambda top, skip: self.read_page_from_device(path, params, top, skip),
+                               self.want.page_size):
+            key = item.get('fullPath', item.get('name'))
+            if regex is not None and not regex.search(str(key)):
+                continue
+            writer.write(name, flatten_resource(item))
+
+    def read_page_from_device(self, path, params, top, skip):
+        params = dict(params or {})
+        params.update({'$top': top, '$skip': skip})
+        return self.read_collection_from_device(path, params).get('items', [])
+
+    def read_collection_from_device(self, path, params=None):
+        return self.client.api.load(path, params=params)
+
+    def format_facts(self, name, responses):
+        if name == 'system_info':
+            hardware, version = responses
+            return dict(
+                hardware=flatten_stats(hardware.get('entries', {})),
+                version=flatten_stats(version.get('entries', {}))
+            )
+
+        regex = None if name in UNFILTERED else self.want.filter
+        result = dict()
+        for response in responses:
+            for item in response.get('items', []):
+                key = item.get('fullPath', item.get('name'))
+                if regex is not None and not regex.search(str(key)):
+                    continue
+                result[key] = flatten_resource(item)
+        return result
+
+
+class ArgumentSpec(object):
+    def __init__(self):
+        self.supports_check_mode = True
+        argument_spec = dict(
+            include=dict(type='list', required=True),
+            filter=dict(),
+            workers=dict(type='int', default=4),
+            dest=dict(type='path'),
+            page_size=dict(type='int', default=100),
+            snapshot_dir=dict(type='path'),
+            force_refresh=dict(type='bool', default=False),
+            ucs=dict(type='path')
+        )
+        self.argument_spec = {}
+        self.argument_spec.update(f5_argument_spec)
+        self.argument_spec.update(argument_spec)
+        self.mutually_exclusive = [
+            ['dest', 'snapshot_dir'],
+            ['ucs', 'dest'],
+            ['ucs', 'snapshot_dir']
+        ]
+
+
+def main():
+    spec = ArgumentSpec()
+
+    module = AnsibleModule(
+        argument_spec=spec.argument_spec,
+        supports_check_mode=spec.supports_check_mode,
+        mutually_exclusive=spec.mutually_exclusive
+    )
+    if module.params['ucs']:
+        # The facts are read from the archive, so no client is needed.
+        try:
+            mm = ModuleManager(module=module)
+            module.exit_json(**mm.exec_module())
+        except F5ModuleError as ex:
+            module.fail_json(msg=str(ex))
+
+    if not HAS_REQUESTS:
+        module.fail_json(msg="The python requests module is required")
+
+    try:
+        client = F5RestClient(socket_path=module._socket_path, **module.params)
+        mm = ModuleManager(module=module, client=client)
+        if client.timings:
+            client.timings.instrument(mm)
+        results = mm.exec_module()
+        cleanup_tokens(client)
+        if client.timings:
+            results['_timings'] = client.timings.to_return()
+        module.exit_json(**results)
+    except F5ModuleError as ex:
+        cleanup_tokens(client)
+        module.fail_json(msg=str(ex))
+
+
+if __name__ == '__main__':
+    main()
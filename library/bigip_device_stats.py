@@ -0,0 +1,432 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017 F5 Networks Inc.
+# GNU General Public License v3.0 (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'community'}
+
+DOCUMENTATION = r'''
+---
+module: bigip_device_stats
+short_description: Collect LTM statistics from F5 BIG-IP devices
+description:
+  - Collect the statistics of the virtual servers, pools, pool members and
+    nodes of a BIG-IP over iControl REST.
+  - The statistics of every object of a type are read with one request, and
+    the types are read concurrently.
+  - When C(snapshot_dir) is specified, the per-second rates of the counters
+    are computed against the sample taken by the previous run.
+version_added: "2.6"
+options:
+  include:
+    description:
+      - Type or list of types of objects to collect the statistics of.
+      - The C(all) type collects every other type.
+    required: True
+    choices:
+      - all
+      - node
+      - pool
+      - pool_member
+      - virtual_server
+  filter:
+    description:
+      - Shell-style glob matching string used to filter the full names of the
+        objects. Pool members are filtered by the full names of their pools.
+  workers:
+    description:
+      - Number of types to collect concurrently.
+      - It is also limited by the C(max_in_flight) of the C(provider).
+    default: 4
+  snapshot_dir:
+    description:
+      - Directory to keep the last sample of the statistics of each device in.
+      - When specified, the C(rates) of each object are computed against the
+        previous sample, and the sample is then replaced.
+notes:
+  - Requires BIG-IP software version >= 12
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
+extends_documentation_fragment: f5
+author:
+  - Tim Rupp (@caphrim007)
+'''
+
+EXAMPLES = r'''
+- name: Collect the statistics of every virtual server and pool
+  bigip_device_stats:
+    server: lb.mydomain.com
+    user: admin
+    password: secret
+    include:
+      - virtual_server
+      - pool
+  delegate_to: localhost
+
+- name: Collect the rates of the pool members in the Common partition
+  bigip_device_stats:
+    server: lb.mydomain.com
+    user: admin
+    password: secret
+    include: pool_member
+    filter: /Common/*
+    snapshot_dir: /var/cache/f5-stats
+  delegate_to: localhost
+'''
+
+RETURN = r'''
+virtual_server:
+  description:
+    - Statistics of the virtual servers, keyed by their full names.
+    - The names of the statistics are those of the iControl REST stats,
+      converted to snake case. For example, C(clientside.bitsIn) becomes
+      C(clientside_bits_in).
+    - When a previous sample exists, the C(rates) of each object hold the
+      per-second rate of each of its counters.
+  returned: When C(virtual_server) is included.
+  type: complex
+  sample: hash/dictionary of values
+pool:
+  description: Statistics of the pools, keyed by their full names.
+  returned: When C(pool) is included.
+  type: complex
+  sample: hash/dictionary of values
+pool_member:
+  description:
+    - Statistics of the pool members, keyed by the full names of their pools,
+      and then by their own names.
+  returned: When C(pool_member) is included.
+  type: complex
+  sample: hash/dictionary of values
+node:
+  description: Statistics of the nodes, keyed by their full names.
+  returned: When C(node) is included.
+  type: complex
+  sample: hash/dictionary of values
+interval:
+  description:
+    - Number of seconds between the previous sample of each type and this one.
+  returned: When C(snapshot_dir) is specified, and a previous sample exists.
+  type: dict
+  sample: {"virtual_server": 60.2}
+'''
+
+import fnmatch
+import re
+import time
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.six import iteritems
+from ansible.module_utils.six import integer_types
+
+HAS_DEVEL_IMPORTS = False
+
+try:
+    # Sideband repository used for dev
+    from library.module_utils.network.f5.icontrol import HAS_REQUESTS
+    from library.module_utils.network.f5.icontrol import F5RestClient
+    from library.module_utils.network.f5.common import F5ModuleError
+    from library.module_utils.network.f5.common import AnsibleF5Parameters
+    from library.module_utils.network.f5.common import F5Snapshot
+    from library.module_utils.network.f5.common import cleanup_tokens
+    from library.module_utils.network.f5.common import f5_argument_spec
+    from library.module_utils.network.f5.common import map_requests
+    HAS_DEVEL_IMPORTS = True
+except ImportError:
+    # Upstream Ansible
+    from ansible.module_utils.network.f5.icontrol import HAS_REQUESTS
+    from ansible.module_utils.network.f5.icontrol import F5RestClient
+    from ansible.module_utils.network.f5.common import F5ModuleError
+    from ansible.module_utils.network.f5.common import AnsibleF5Parameters
+    from ansible.module_utils.network.f5.common import F5Snapshot
+    from ansible.module_utils.network.f5.common import cleanup_tokens
+    from ansible.module_utils.network.f5.common import f5_argument_spec
+    from ansible.module_utils.network.f5.common import map_requests
+
+
+# The collection-level stats read for each type. The stats of pool members
+# are a subcollection of the stats of their pools.
+SECTIONS = dict(
+    node='/mgmt/tm/ltm/node/stats',
+    pool='/mgmt/tm/ltm/pool/stats',
+    pool_member='/mgmt/tm/ltm/pool/stats',
+    virtual_server='/mgmt/tm/ltm/virtual/stats',
+)
+
+# Statistics that only ever grow, until they are reset. The others, such as
+# the current number of connections, are gauges and have no rate.
+COUNTERS = re.compile(
+    r'(bits_in|bits_out|pkts_in|pkts_out|tot_conns|tot_requests|evicted_conns|'
+    r'slow_killed|syncookie_accepts|syncookie_hw_accepts|syncookie_syncookies|'
+    r'syncookie_hw_syncookies|connq_all_serviced|connq_serviced)$'
+)
+
+
+def snake_case(name):
+    """Converts an iControl REST stat name to snake case
+
+    For example, ``clientside.bitsIn`` becomes ``clientside_bits_in``.
+    """
+    name = re.sub(r'([a-z0-9])([A-Z])', r'\1_\2', name)
+    return name.replace('.', '_').replace('-', '_').lower()
+
+
+def flatten_stats(entries):
+    """Returns the stats entries of one object as a flat dictionary
+
+    Nested stats, such as those of the members of a pool, are left out.
+    """
+    result = dict()
+    for key, value in iteritems(entries):
+        if 'nestedStats' in value:
+            continue
+        if 'description' in value:
+            value = value['description']
+        else:
+            value = value.get('value')
+        result[snake_case(key)] = value
+    return result
+
+
+def parse_collection_stats(response):
+    """Returns the stats of each object in a collection-level stats response
+
+    :return: The stats, keyed by the full name of each object, and the nested
+             stats entries of each object, keyed the same way.
+    """
+    stats = dict()
+    nested = dict()
+    for entry in response.get('entries', {}).values():
+        entries = entry.get('nestedStats', {}).get('entries', {})
+        name = entries.get('tmName', {}).get('description')
+        if name is None:
+            continue
+        stats[name] = flatten_stats(entries)
+        nested[name] = entries
+    return stats, nested
+
+
+def parse_member_stats(entries):
+    """Returns the stats of the members of a pool, keyed by their names
+
+    The members are found in the expanded ``members/stats`` subcollection of
+    the stats entries of the pool.
+    """
+    result = dict()
+    for key, value in iteritems(entries):
+        if not key.endswith('/members/stats') or 'nestedStats' not in value:
+            continue
+        for member in value['nestedStats'].get('entries', {}).values():
+            stats = flatten_stats(member.get('nestedStats', {}).get('entries', {}))
+            name = '{0}:{1}'.format(stats.get('node_name'), stats.get('port'))
+            result[name] = stats
+    return result
+
+
+def compute_rates(current, previous, interval):
+    """Returns the per-second rate of each counter of an object
+
+    Counters that are missing from the previous sample, or that went down
+    because they were reset, have no rate.
+    """
+    result = dict()
+    if not previous or interval <= 0:
+        return result
+    for key, value in iteritems(current):
+        if not COUNTERS.search(key) or not isinstance(value, integer_types):
+            continue
+        before = previous.get(key)
+        if not isinstance(before, integer_types) or value < before:
+            continue
+        result[key] = round((value - before) / interval, 3)
+    return result
+
+
+class Parameters(AnsibleF5Parameters):
+    @property
+    def include(self):
+        requested = [str(x).lower() for x in self._values['include']]
+        if 'all' in requested:
+            return sorted(SECTIONS.keys())
+        invalid = [x for x in requested if x not in SECTIONS]
+        if invalid:
+            raise F5ModuleError(
+                "Value of include must be one or more of: {0}, got: {1}".format(
+                    ', '.join(['all'] + sorted(SECTIONS.keys())), ', '.join(invalid)
+                )
+            )
+        result = []
+        for name in requested:
+            if name not in result:
+                result.append(name)
+        return result
+
+    @property
+    def filter(self):
+        if self._values['filter'] is None:
+            return None
+        return re.compile(fnmatch.translate(self._values['filter']))
+
+    @property
+    def workers(self):
+        if self._values['workers'] is None:
+            return 4
+        return max(1, int(self._values['workers']))
+
+
+class ModuleManager(object):
+    def __init__(self, *args, **kwargs):
+        self.module = kwargs.get('module', None)
+        self.client = kwargs.get('client', None)
+        self.want = Parameters(params=self.module.params)
+
+    def exec_module(self):
+        sample = self.read_current_from_device()
+        result = dict(changed=False)
+        if self.want.snapshot_dir:
+            result.update(self.compute_rates(sample))
+        else:
+            result.update(dict((k, v['objects']) for k, v in iteritems(sample)))
+        return result
+
+    def get_requests(self):
+        """Returns the stats collections to read
+
+        The pools and their members share a request. Their members are only
+        expanded when they are included.
+        """
+        result = []
+        for name in self.want.include:
+            path = SECTIONS[name]
+            if path not in result:
+                result.append(path)
+        return result
+
+    def read_current_from_device(self):
+        """Reads the stats of each included type
+
+        :return: The stats of each type, and the time they were read at.
+        """
+        requests = self.get_requests()
+        results = map_requests(
+            self.client, self.read_timed_stats_from_device, requests, workers=self.want.workers
+        )
+        responses = dict(zip(requests, results))
+
+        result = dict()
+        for name in self.want.include:
+            sampled_at, response = responses[SECTIONS[name]]
+            stats, nested = parse_collection_stats(response)
+            if name == 'pool_member':
+                stats = dict((k, parse_member_stats(v)) for k, v in iteritems(nested))
+            result[name] = dict(time=sampled_at, objects=self.filter_objects(stats))
+        return result
+
+    def filter_objects(self, stats):
+        regex = self.want.filter
+        if regex is None:
+            return stats
+        return dict((k, v) for k, v in iteritems(stats) if regex.search(str(k)))
+
+    def read_timed_stats_from_device(self, path):
+        params = None
+        if path == SECTIONS['pool_member'] and 'pool_member' in self.want.include:
+            params = dict(expandSubcollections='true')
+        sampled_at = time.time()
+        return sampled_at, self.read_stats_from_device(path, params)
+
+    def read_stats_from_device(self, path, params=None):
+        return self.client.api.load(path, params=params)
+
+    def compute_rates(self, sample):
+        """Adds the rates of the counters to the sample, and stores the sample
+
+        The sample of each type is kept separately, so that runs which include
+        different types do not discard each other's samples.
+        """
+        snapshot = F5Snapshot(self.want.snapshot_dir)
+        server = self.module.params['server']
+        port = self.module.params['server_port']
+        previous = snapshot.get(server, port, 'stats') or dict()
+
+        result = dict()
+        intervals = dict()
+        for name, current in iteritems(sample):
+            before = previous.get(name)
+            interval = 0
+            if before:
+                interval = current['time'] - before['time']
+                intervals[name] = round(interval, 3)
+            result[name] = self.add_rates(name, current['objects'], before['objects'] if before else {}, interval)
+        if intervals:
+            result['interval'] = intervals
+
+        stored = dict(previous)
+        stored.update(sample)
+        snapshot.set(server, port, 'stats', stored)
+        return result
+
+    def add_rates(self, name, objects, previous, interval):
+        result = dict()
+        for key, stats in iteritems(objects):
+            if name == 'pool_member':
+                result[key] = self.add_rates(None, stats, previous.get(key) or {}, interval)
+                continue
+            stats = dict(stats)
+            stats['rates'] = compute_rates(stats, previous.get(key), interval)
+            result[key] = stats
+        return result
+
+
+class ArgumentSpec(object):
+    def __init__(self):
+        self.supports_check_mode = True
+        argument_spec = dict(
+            include=dict(type='list', required=True),
+            filter=dict(),
+            workers=dict(type='int', default=4),
+            snapshot_dir=dict(type='path')
+        )
+        self.argument_spec = {}
+        self.argument_spec.update(f5_argument_spec)
+        self.argument_spec.update(argument_spec)
+
+
+def main():
+    spec = ArgumentSpec()
+
+    module = AnsibleModule(
+        argument_spec=spec.argument_spec,
+        supports_check_mode=spec.supports_check_mode
+    )
+    if not HAS_REQUESTS:
+        module.fail_json(msg="The python requests module is required")
+
+    try:
+        client = F5RestClient(socket_path=module._socket_path, **module.params)
+        mm = ModuleManager(module=module, client=client)
+        if client.timings:
+            client.timings.instrument(mm)
+        results = mm.exec_module()
+        cleanup_tokens(client)
+        if client.timings:
+            results['_timings'] = client.timings.to_return()
+        module.exit_json(**results)
+    except F5ModuleError as ex:
+        cleanup_tokens(client)
+        module.fail_json(msg=str(ex))
+
+
+if __name__ == '__main__':
+    main()
@@ -70,6 +70,13 @@ options:
       - present
 requirements:
   - netaddr
+notes:
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
 extends_documentation_fragment: f5
 author:
   - Tim Rupp (@caphrim007)
@@ -115,6 +122,8 @@ try:
     from library.module_utils.network.f5.bigip import F5Client
     from library.module_utils.network.f5.common import F5ModuleError
     from library.module_utils.network.f5.common import AnsibleF5Parameters
+    from library.module_utils.network.f5.common import F5CollectionIndex
+    from library.module_utils.network.f5.common import _get_resource_attr
     from library.module_utils.network.f5.common import cleanup_tokens
     from library.module_utils.network.f5.common import fqdn_name
     from library.module_utils.network.f5.common import f5_argument_spec
@@ -129,6 +138,8 @@ except ImportError:
     from ansible.module_utils.network.f5.bigip import F5Client
     from ansible.module_utils.network.f5.common import F5ModuleError
     from ansible.module_utils.network.f5.common import AnsibleF5Parameters
+    from ansible.module_utils.network.f5.common import F5CollectionIndex
+    from ansible.module_utils.network.f5.common import _get_resource_attr
     from ansible.module_utils.network.f5.common import cleanup_tokens
     from ansible.module_utils.network.f5.common import fqdn_name
     from ansible.module_utils.network.f5.common import f5_argument_spec
@@ -207,6 +218,9 @@ class ModuleManager(object):
         self.have = None
         self.want = Parameters(params=self.module.params)
         self.changes = Parameters()
+        self.devices = F5CollectionIndex(
+            self.read_devices_from_device, key=lambda x: _get_resource_attr(x, 'managementIp')
+        )
 
     def _set_changed_options(self):
         changed = {}
@@ -268,14 +282,14 @@ class ModuleManager(object):
         return True
 
     def exists(self):
-        result = self.client.api.tm.cm.devices.get_collection()
-        for device in result:
-            try:
-                if device.managementIp == self.want.peer_server:
-                    return True
-            except AttributeError:
-                pass
-        return False
+        return self.want.peer_server in self.devices
+
+    def read_devices_from_device(self):
+        # The cm endpoints cannot filter on managementIp, so instead only that
+        # attribute is fetched for each device.
+        return self.client.api.tm.cm.devices.get_collection(
+            requests_params=dict(params={'$select': 'name,managementIp'})
+        )
 
     def create_on_device(self):
         params = self.want.api_params()
@@ -284,6 +298,7 @@ class ModuleManager(object):
             name='Root',
             **params
         )
+        self.devices.invalidate()
 
     def remove_from_device(self):
         result = self.client.api.tm.cm.remove_from_trust.exec_cmd(
@@ -291,6 +306,7 @@ class ModuleManager(object):
         )
         if result:
             result.delete()
+        self.devices.invalidate()
 
 
 class ArgumentSpec(object):
@@ -328,7 +344,7 @@ def main():
         module.fail_json(msg="The python netaddr module is required")
 
     try:
-        client = F5Client(**module.params)
+        client = F5Client(socket_path=module._socket_path, **module.params)
         mm = ModuleManager(module=module, client=client)
         results = mm.exec_module()
         cleanup_tokens(client)
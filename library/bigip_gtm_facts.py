@@ -33,6 +33,34 @@ options:
       - Perform regex filter of response. Filtering is done on the name of
         the resource. Valid filters are anything that can be provided to
         Python's C(re) module.
+  dest:
+    description:
+      - Path of a file to stream the facts to, instead of returning them.
+      - Each line of the file is a JSON object with the C(section) that the
+        facts belong to, and the C(facts) of one object. Only the number of
+        objects in each section is returned.
+      - Collections are read a page at a time, so memory use does not grow
+        with the size of the configuration.
+    version_added: 2.6
+  page_size:
+    description:
+      - Number of objects to read in each request when C(dest) is specified.
+    default: 100
+    version_added: 2.6
+  workers:
+    description:
+      - Number of record type collections, such as those of C(a) and
+        C(aaaa) pools, to read concurrently.
+      - It is also limited by the C(max_in_flight) of the C(provider).
+    default: 4
+    version_added: 2.6
+notes:
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
 extends_documentation_fragment: f5
 author:
   - Tim Rupp (@caphrim007)
@@ -47,6 +75,15 @@ EXAMPLES = r'''
     include: pool
     filter: my_pool
   delegate_to: localhost
+
+- name: Stream all wide IP facts to a file
+  bigip_gtm_facts:
+    server: lb.mydomain.com
+    user: admin
+    password: secret
+    include: wide_ip
+    dest: /tmp/wide_ips.jsonl
+  delegate_to: localhost
 '''
 
 RETURN = r'''
@@ -164,6 +201,21 @@ virtual_server:
             name: jsdfhsd
             translation_address: none
             translation_port: 0
+dest:
+  description: The file that the facts were written to.
+  returned: When C(dest) is specified.
+  type: string
+  sample: /tmp/wide_ips.jsonl
+counts:
+  description: Number of objects written to C(dest) for each section.
+  returned: When C(dest) is specified.
+  type: dict
+  sample: {"wide_ip": 12000}
+total:
+  description: Number of objects written to C(dest).
+  returned: When C(dest) is specified.
+  type: int
+  sample: 12000
 '''
 
 import re
@@ -181,6 +233,9 @@ try:
     from library.module_utils.network.f5.common import cleanup_tokens
     from library.module_utils.network.f5.common import fqdn_name
     from library.module_utils.network.f5.common import f5_argument_spec
+    from library.module_utils.network.f5.common import iter_pages
+    from library.module_utils.network.f5.common import map_requests
+    from library.module_utils.network.f5.config import F5FactsWriter
     try:
         from library.module_utils.network.f5.common import iControlUnexpectedHTTPError
     except ImportError:
@@ -195,6 +250,9 @@ except ImportError:
     from ansible.module_utils.network.f5.common import cleanup_tokens
     from ansible.module_utils.network.f5.common import fqdn_name
     from ansible.module_utils.network.f5.common import f5_argument_spec
+    from ansible.module_utils.network.f5.common import iter_pages
+    from ansible.module_utils.network.f5.common import map_requests
+    from ansible.module_utils.network.f5.config import F5FactsWriter
     try:
         from ansible.module_utils.network.f5.common import iControlUnexpectedHTTPError
     except ImportError:
@@ -216,10 +274,38 @@ except ImportError:
     HAS_F5SDK = False
 
 
+def parse_collection_stats(stats):
+    """Returns the stats of each resource in a collection-level stats response
+
+    The stats of a collection, such as ``/mgmt/tm/gtm/pool/a/stats``, hold
+    the stats of every resource in the collection. They are keyed here by the
+    full name of the resource, and are in the same form as the stats of a
+    single resource.
+    """
+    result = dict()
+    for entry in stats.get('entries', {}).values():
+        entries = entry.get('nestedStats', {}).get('entries', {})
+        name = entries.get('tmName', {}).get('description')
+        if name is None:
+            continue
+        result[name] = _replace_dots(entries)
+    return result
+
+
+def _replace_dots(stats):
+    result = dict()
+    for key, value in iteritems(stats):
+        if isinstance(value, dict):
+            value = _replace_dots(value)
+        result[key.replace('.', '_')] = value
+    return result
+
+
 class BaseManager(object):
     def __init__(self, *args, **kwargs):
         self.module = kwargs.get('module', None)
         self.client = kwargs.get('client', None)
+        self.writer = kwargs.get('writer', None)
         self.kwargs = kwargs
 
         self.types = dict(
@@ -264,6 +350,53 @@ class BaseManager(object):
         stats = Stats(resource.stats.load())
         return stats.stat
 
+    def read_collection_stats_from_device(self, path):
+        """Returns the stats of every resource in a collection, in one request
+
+        :param path: Path of the stats of the collection. For example
+                     ``/mgmt/tm/gtm/pool/a/stats``.
+        :return: The stats, keyed by the full name of each resource.
+        """
+        try:
+            response = self.client.request('GET', path)
+        except iControlUnexpectedHTTPError:
+            # Resources missing from the result fall back to reading
+            # their own stats.
+            return dict()
+        return parse_collection_stats(response.json())
+
+    def get_stats(self, resource, stats):
+        result = stats.get(resource.attrs.get('fullPath'))
+        if result is None:
+            result = self.read_stats_from_device(resource)
+        return result
+
+    def read_collection(self, collection):
+        """Returns the resources of a collection, with subcollections expanded
+
+        When the facts are streamed to a file, the collection is read a page
+        at a time instead of all at once.
+        """
+        params = 'expandSubcollections=true'
+        if self.writer is None:
+            return collection.get_collection(
+                requests_params=dict(params=params)
+            )
+        return iter_pages(
+            lambda top, skip: collection.get_collection(
+                requests_params=dict(
+                    params='{0}&$top={1}&$skip={2}'.format(params, top, skip)
+                )
+            ),
+            self.want.page_size or 100
+        )
+
+    def add_facts(self, results, facts):
+        if self.writer is None:
+            results.append(facts)
+        else:
+            self.writer.write(self.section, facts)
+
 
 class UntypedManager(BaseManager):
     def exec_module(self):
@@ -272,24 +405,31 @@ class UntypedManager(BaseManager):
         for item in facts:
             filtered = [(k, v) for k, v in iteritems(item) if self.filter_matches_name(k)]
             if filtered:
-                results.append(dict(filtered))
+                self.add_facts(results, dict(filtered))
         return results
 
 
 class TypedManager(BaseManager):
     def exec_module(self):
+        # The collections of each record type are independent, so they are
+        # read concurrently.
+        facts = map_requests(
+            self.client, lambda x: self.read_typed_facts(*x), iteritems(self.types),
+            workers=self.want.workers or 4
+        )
         results = []
-        for collection, type in iteritems(self.types):
-            facts = self.read_facts(collection)
-            if not facts:
-                continue
-            for x in facts:
-                x.update({'type': type})
-            for item in facts:
-                attrs = item.to_return()
-                filtered = [(k, v) for k, v in iteritems(attrs) if self.filter_matches_name(k)]
-                if filtered:
-                    results.append(dict(filtered))
+        for item in facts:
+            results += item
+        return results
+
+    def read_typed_facts(self, collection, type):
+        results = []
+        for item in self.read_facts(collection):
+            item.update({'type': type})
+            attrs = item.to_return()
+            filtered = [(k, v) for k, v in iteritems(attrs) if self.filter_matches_name(k)]
+            if filtered:
+                self.add_facts(results, dict(filtered))
         return results
 
 
@@ -712,6 +852,8 @@ class PoolFactManager(BaseManager):
 
 
 class TypedPoolFactManager(TypedManager):
+    section = 'pool'
+
     def __init__(self, *args, **kwargs):
         self.module = kwargs.get('module', None)
         self.client = kwargs.get('client', None)
@@ -719,27 +861,24 @@ class TypedPoolFactManager(TypedManager):
         self.want = PoolParameters(params=self.module.params)
 
     def read_facts(self, collection):
-        results = []
+        stats = self.read_collection_stats_from_device(
+            '/mgmt/tm/gtm/pool/{0}/stats'.format(self.types[collection])
+        )
         collection = self.read_collection_from_device(collection)
         for resource in collection:
             attrs = resource.attrs
-            attrs['stats'] = self.read_stats_from_device(resource)
-            params = PoolParameters(attrs)
-            results.append(params)
-        return results
+            attrs['stats'] = self.get_stats(resource, stats)
+            yield PoolParameters(params=attrs)
 
     def read_collection_from_device(self, collection_name):
         pools = self.client.api.tm.gtm.pools
         collection = getattr(pools, collection_name)
-        result = collection.get_collection(
-            requests_params=dict(
-                params='expandSubcollections=true'
-            )
-        )
-        return result
+        return self.read_collection(collection)
 
 
 class UntypedPoolFactManager(UntypedManager):
+    section = 'pool'
+
     def __init__(self, *args, **kwargs):
         self.client = kwargs.get('client', None)
         self.module = kwargs.get('module', None)
@@ -747,22 +886,15 @@ class UntypedPoolFactManager(UntypedManager):
         self.want = PoolParameters(params=self.module.params)
 
     def read_facts(self):
-        results = []
+        stats = self.read_collection_stats_from_device('/mgmt/tm/gtm/pool/stats')
         collection = self.read_collection_from_device()
         for resource in collection:
             attrs = resource.attrs
-            attrs['stats'] = self.read_stats_from_device(resource)
-            params = PoolParameters(attrs)
-            results.append(params)
-        return results
+            attrs['stats'] = self.get_stats(resource, stats)
+            yield PoolParameters(params=attrs)
 
     def read_collection_from_device(self):
-        result = self.client.api.tm.gtm.pools.get_collection(
-            requests_params=dict(
-                params='expandSubcollections=true'
-            )
-        )
-        return result
+        return self.read_collection(self.client.api.tm.gtm.pools)
 
 
 class WideIpFactManager(BaseManager):
@@ -783,6 +915,8 @@ class WideIpFactManager(BaseManager):
 
 
 class TypedWideIpFactManager(TypedManager):
+    section = 'wide_ip'
+
     def __init__(self, *args, **kwargs):
         self.client = kwargs.get('client', None)
         self.module = kwargs.get('module', None)
@@ -790,26 +924,19 @@ class TypedWideIpFactManager(TypedManager):
         self.want = WideIpParameters(params=self.module.params)
 
     def read_facts(self, collection):
-        results = []
         collection = self.read_collection_from_device(collection)
         for resource in collection:
-            attrs = resource.attrs
-            params = WideIpParameters(attrs)
-            results.append(params)
-        return results
+            yield WideIpParameters(params=resource.attrs)
 
     def read_collection_from_device(self, collection_name):
         wideips = self.client.api.tm.gtm.wideips
         collection = getattr(wideips, collection_name)
-        result = collection.get_collection(
-            requests_params=dict(
-                params='expandSubcollections=true'
-            )
-        )
-        return result
+        return self.read_collection(collection)
 
 
 class UntypedWideIpFactManager(UntypedManager):
+    section = 'wide_ip'
+
     def __init__(self, *args, **kwargs):
         self.client = kwargs.get('client', None)
         self.module = kwargs.get('module', None)
@@ -817,24 +944,17 @@ class UntypedWideIpFactManager(UntypedManager):
         self.want = WideIpParameters(params=self.module.params)
 
     def read_facts(self):
-        results = []
         collection = self.read_collection_from_device()
         for resource in collection:
-            attrs = resource.attrs
-            params = WideIpParameters(attrs)
-            results.append(params)
-        return results
+            yield WideIpParameters(params=resource.attrs)
 
     def read_collection_from_device(self):
-        result = self.client.api.tm.gtm.wideips.get_collection(
-            requests_params=dict(
-                params='expandSubcollections=true'
-            )
-        )
-        return result
+        return self.read_collection(self.client.api.tm.gtm.wideips)
 
 
 class ServerFactManager(UntypedManager):
+    section = 'server'
+
     def __init__(self, *args, **kwargs):
         self.client = kwargs.get('client', None)
         self.module = kwargs.get('module', None)
@@ -847,21 +967,12 @@ class ServerFactManager(UntypedManager):
         return result
 
     def read_facts(self):
-        results = []
         collection = self.read_collection_from_device()
         for resource in collection:
-            attrs = resource.attrs
-            params = WideIpParameters(attrs)
-            results.append(params)
-        return results
+            yield WideIpParameters(params=resource.attrs)
 
     def read_collection_from_device(self):
-        result = self.client.api.tm.gtm.servers.get_collection(
-            requests_params=dict(
-                params='expandSubcollections=true'
-            )
-        )
-        return result
+        return self.read_collection(self.client.api.tm.gtm.servers)
 
 
 class ModuleManager(object):
@@ -885,15 +996,27 @@ class ModuleManager(object):
             if 'virtual_server' in names:
                 names.append('server')
                 names.remove('virtual_server')
-        managers = [self.get_manager(name) for name in names]
-        result = self.execute_managers(managers)
-        if result:
-            result['changed'] = True
+        if self.want.dest:
+            result = self.write_facts_to_file(names)
         else:
-            result['changed'] = False
+            managers = [self.get_manager(name) for name in names]
+            result = self.execute_managers(managers)
+            if result:
+                result['changed'] = True
+            else:
+                result['changed'] = False
         self._announce_deprecations()
         return result
 
+    def write_facts_to_file(self, names):
+        with F5FactsWriter(self.want.dest) as writer:
+            self.kwargs['writer'] = writer
+            managers = [self.get_manager(name) for name in names]
+            self.execute_managers(managers)
+        result = writer.to_return()
+        result['changed'] = result['total'] > 0
+        return result
+
     def _announce_deprecations(self):
         warnings = []
         if self.want:
@@ -933,7 +1056,10 @@ class ArgumentSpec(object):
         self.supports_check_mode = False
         argument_spec = dict(
             include=dict(type='list', required=True),
-            filter=dict()
+            filter=dict(),
+            dest=dict(type='path'),
+            page_size=dict(type='int', default=100),
+            workers=dict(type='int', default=4)
         )
         self.argument_spec = {}
         self.argument_spec.update(f5_argument_spec)
@@ -951,7 +1077,7 @@ def main():
         module.fail_json(msg="The python f5-sdk module is required")
 
     try:
-        client = F5Client(**module.params)
+        client = F5Client(socket_path=module._socket_path, **module.params)
         mm = ModuleManager(module=module, client=client)
         results = mm.exec_module()
         cleanup_tokens(client)
@@ -43,6 +43,12 @@ notes:
     This command is already present on RedHat based systems.
   - Requires BIG-IP >= 12.1.0 because the required functionality is missing
     on versions earlier than that.
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
 requirements:
   - Requires BIG-IP >= 12.1.0
   - The 'rpm' tool installed on the Ansible controller
@@ -86,7 +92,6 @@ RETURN = r'''
 
 import os
 import subprocess
-import time
 
 from distutils.version import LooseVersion
 from ansible.module_utils.basic import AnsibleModule
@@ -98,6 +103,8 @@ try:
     from library.module_utils.network.f5.bigip import HAS_F5SDK
     from library.module_utils.network.f5.bigip import F5Client
     from library.module_utils.network.f5.common import F5ModuleError
+    from library.module_utils.network.f5.common import F5Poller
+    from library.module_utils.network.f5.common import F5PollTimeout
     from library.module_utils.network.f5.common import AnsibleF5Parameters
     from library.module_utils.network.f5.common import cleanup_tokens
     from library.module_utils.network.f5.common import fqdn_name
@@ -112,6 +119,8 @@ except ImportError:
     from ansible.module_utils.network.f5.bigip import HAS_F5SDK
     from ansible.module_utils.network.f5.bigip import F5Client
     from ansible.module_utils.network.f5.common import F5ModuleError
+    from ansible.module_utils.network.f5.common import F5Poller
+    from ansible.module_utils.network.f5.common import F5PollTimeout
     from ansible.module_utils.network.f5.common import AnsibleF5Parameters
     from ansible.module_utils.network.f5.common import cleanup_tokens
     from ansible.module_utils.network.f5.common import fqdn_name
@@ -315,12 +324,18 @@ class ModuleManager(object):
         return False
 
     def _wait_for_task(self, task):
-        for x in range(0, 60):
+        def check():
             task.refresh()
-            if task.status in ['FINISHED', 'FAILED']:
-                return task.status
-            time.sleep(1)
-        return task.status
+            return task.status
+
+        poller = F5Poller(
+            'the package task to finish', delay=1, max_delay=5, timeout=60,
+            timings=getattr(self.client, 'timings', None)
+        )
+        try:
+            return poller.wait(check, success=lambda x: x in ['FINISHED', 'FAILED'])
+        except F5PollTimeout as ex:
+            return ex.value
 
     def enable_iapplx_on_device(self):
         self.client.api.tm.util.bash.exec_cmd(
@@ -359,10 +374,14 @@ def main():
         module.fail_json(msg="The python f5-sdk module is required")
 
     try:
-        client = F5Client(**module.params)
+        client = F5Client(socket_path=module._socket_path, **module.params)
         mm = ModuleManager(module=module, client=client)
+        if client.timings:
+            client.timings.instrument(mm)
         results = mm.exec_module()
         cleanup_tokens(client)
+        if client.timings:
+            results['_timings'] = client.timings.to_return()
         module.exit_json(**results)
     except F5ModuleError as e:
         cleanup_tokens(client)
@@ -0,0 +1,377 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017 F5 Networks Inc.
+# GNU General Public License v3.0 (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'community'}
+
+DOCUMENTATION = r'''
+---
+module: bigip_job_status
+short_description: Check on jobs started on a BIG-IP with async_job
+description:
+  - Checks on the jobs returned by modules that were run with C(async_job),
+    such as C(bigip_software), C(bigip_ucs), C(bigip_qkview) and
+    C(bigip_provision).
+  - Every job is checked once, and the module returns at once. Use it with
+    C(until) to wait for the jobs to finish.
+  - The jobs are checked together, with at most one request for each type of
+    job, however many jobs there are.
+version_added: "2.6"
+options:
+  jobs:
+    description:
+      - The jobs to check, as returned in the C(job) of the modules that
+        started them.
+    required: True
+notes:
+  - A device that cannot be reached, such as while it reboots, has all of its
+    jobs reported as C(running).
+  - Finished qkview jobs are downloaded to their C(dest) and then removed
+    from the device. In check mode, they are neither downloaded nor removed.
+  - The markers of finished UCS jobs are removed from the device, so a UCS
+    job should not be checked again once it is finished.
+  - The module fails if any of the jobs failed.
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
+extends_documentation_fragment: f5
+author:
+  - Tim Rupp (@caphrim007)
+'''
+
+EXAMPLES = r'''
+- name: Start installing the software on every device
+  bigip_software:
+    server: "{{ inventory_hostname }}"
+    user: admin
+    password: secret
+    software: /root/BIGIP-13.1.0.5.0.0.5.iso
+    volume: HD1.2
+    state: installed
+    async_job: yes
+  delegate_to: localhost
+  register: install
+
+- name: Wait for the software to be installed
+  bigip_job_status:
+    server: "{{ inventory_hostname }}"
+    user: admin
+    password: secret
+    jobs:
+      - "{{ install.job }}"
+  delegate_to: localhost
+  register: status
+  until: status.finished
+  retries: 120
+  delay: 30
+'''
+
+RETURN = r'''
+jobs:
+  description:
+    - The jobs, in the order they were given, each with its C(status) and a
+      C(message) about it.
+    - The status is one of C(running), C(finished) or C(failed).
+  returned: always
+  type: list
+  sample:
+    - type: software
+      volume: HD1.2
+      status: running
+      message: installing 40.000 pct
+finished:
+  description: Whether every job is finished.
+  returned: always
+  type: bool
+  sample: no
+'''
+
+import os
+import re
+
+from ansible.module_utils.basic import AnsibleModule
+
+HAS_DEVEL_IMPORTS = False
+
+try:
+    # Sideband repository used for dev
+    from library.module_utils.network.f5.icontrol import HAS_REQUESTS
+    from library.module_utils.network.f5.icontrol import F5RestClient
+    from library.module_utils.network.f5.icontrol import iControlRestError
+    from library.module_utils.network.f5.common import F5ModuleError
+    from library.module_utils.network.f5.common import AnsibleF5Parameters
+    from library.module_utils.network.f5.common import cleanup_tokens
+    from library.module_utils.network.f5.common import f5_argument_spec
+    HAS_DEVEL_IMPORTS = True
+except ImportError:
+    # Upstream Ansible
+    from ansible.module_utils.network.f5.icontrol import HAS_REQUESTS
+    from ansible.module_utils.network.f5.icontrol import F5RestClient
+    from ansible.module_utils.network.f5.icontrol import iControlRestError
+    from ansible.module_utils.network.f5.common import F5ModuleError
+    from ansible.module_utils.network.f5.common import AnsibleF5Parameters
+    from ansible.module_utils.network.f5.common import cleanup_tokens
+    from ansible.module_utils.network.f5.common import f5_argument_spec
+
+try:
+    from requests.exceptions import ConnectionError
+    from requests.exceptions import Timeout
+except ImportError:
+    pass
+
+
+JOB_TYPES = ['provision', 'qkview', 'software', 'ucs']
+
+# Statuses of the device while it restarts, such as during a reboot.
+UNAVAILABLE_STATUSES = [502, 503, 504]
+
+MPROV_RUNNING = 'mprov-running'
+
+
+class Parameters(AnsibleF5Parameters):
+    @property
+    def jobs(self):
+        result = []
+        for job in self._values['jobs'] or []:
+            if not isinstance(job, dict) or job.get('type') not in JOB_TYPES:
+                raise F5ModuleError(
+                    "Each job must be the 'job' returned by a module run with "
+                    "'async_job', one of the types {0}.".format(', '.join(JOB_TYPES))
+                )
+            result.append(dict(job))
+        return result
+
+
+class ModuleManager(object):
+    def __init__(self, *args, **kwargs):
+        self.module = kwargs.get('module', None)
+        self.client = kwargs.get('client', None)
+        self.want = Parameters(params=self.module.params)
+        self.changed = False
+
+    def exec_module(self):
+        jobs = self.want.jobs
+        try:
+            self.check_jobs(jobs)
+        except (ConnectionError, Timeout) as ex:
+            self.set_unavailable(jobs, ex)
+        except iControlRestError as ex:
+            if ex.status_code not in UNAVAILABLE_STATUSES:
+                raise
+            self.set_unavailable(jobs, ex)
+
+        failed = [x for x in jobs if x['status'] == 'failed']
+        if failed:
+            raise F5ModuleError(
+                'The following jobs failed. {0}'.format(
+                    ' '.join('{0}: {1}'.format(x['type'], x['message']) for x in failed)
+                )
+            )
+        return dict(
+            changed=self.changed,
+            jobs=jobs,
+            finished=all(x['status'] == 'finished' for x in jobs)
+        )
+
+    def set_unavailable(self, jobs, ex):
+        for job in jobs:
+            job.update(status='running', message='The device is unavailable. {0}'.format(ex))
+
+    def check_jobs(self, jobs):
+        """Checks the jobs, with one request for each type of job
+        """
+        by_type = dict((x, [job for job in jobs if job['type'] == x]) for x in JOB_TYPES)
+
+        # The markers of the background jobs, and the state of the device
+        # that the jobs depend on, are read with a single command.
+        output = self.read_job_state_from_device(
+            by_type['qkview'] + by_type['ucs'],
+            mprov=bool(by_type['provision']),
+            mcp=bool(by_type['ucs'])
+        )
+        if by_type['software']:
+            volumes = self.read_volumes_from_device()
+            for job in by_type['software']:
+                self.check_software_job(job, volumes)
+        if by_type['provision']:
+            levels = self.read_provision_from_device()
+            for job in by_type['provision']:
+                self.check_provision_job(job, levels, output)
+        for job in by_type['ucs']:
+            self.check_ucs_job(job, output)
+        self.remove_markers_from_device(
+            [x['marker'] for x in by_type['ucs'] if x['status'] == 'finished']
+        )
+        for job in by_type['qkview']:
+            self.check_qkview_job(job, output)
+
+    def read_job_state_from_device(self, jobs, mprov=False, mcp=False):
+        commands = []
+        markers = [x['marker'] for x in jobs if x.get('marker')]
+        if markers:
+            commands.append('grep -H . {0} 2>/dev/null'.format(' '.join(markers)))
+        if mprov:
+            commands.append(
+                "ps aux | grep '[m]prov' | grep -vq /usr/libexec/qemu-kvm && echo {0}".format(MPROV_RUNNING)
+            )
+        if mcp:
+            commands.append('tmsh show sys mcp-state')
+        if not commands:
+            return ''
+        output = self.client.api.exec_cmd(
+            '/mgmt/tm/util/bash', 'run',
+            utilCmdArgs='-c "{0}"'.format('; '.join(commands))
+        )
+        return output.get('commandResult', '')
+
+    def read_volumes_from_device(self):
+        params = {'$select': 'name,status,active,version,build'}
+        items = self.client.api.collection('/mgmt/tm/sys/software/volume', params=params)
+        return dict((x['name'], x) for x in items)
+
+    def read_provision_from_device(self):
+        params = {'$select': 'name,level'}
+        items = self.client.api.collection('/mgmt/tm/sys/provision', params=params)
+        return dict((x['name'], x.get('level')) for x in items)
+
+    def get_marker_status(self, job, output):
+        """Returns the exit status the job wrote to its marker, if any
+        """
+        match = re.search(r'^{0}:(\d+)$'.format(re.escape(job['marker'])), output, re.M)
+        if match:
+            return int(match.group(1))
+        return None
+
+    def check_software_job(self, job, volumes):
+        volume = volumes.get(job['volume'])
+        if volume is None:
+            job.update(status='running', message='The volume is being created')
+            return
+        status = volume.get('status', '')
+        if 'failed' in status:
+            job.update(status='failed', message=status)
+        elif 'complete' not in status:
+            job.update(status='running', message=status)
+        elif job.get('activate') and volume.get('active') is not True:
+            job.update(status='running', message='The device is rebooting into the volume')
+        else:
+            job.update(status='finished', message=status)
+
+    def check_provision_job(self, job, levels, output):
+        # Jobs of several modules have the level of each one in 'modules'.
+        wanted = job.get('modules') or {job.get('module'): job.get('level')}
+        if MPROV_RUNNING in output:
+            job.update(status='running', message='The device is provisioning modules')
+        elif any(levels.get(k, 'none') != v for k, v in wanted.items()):
+            job.update(status='running', message='The provisioning has not been applied')
+        else:
+            job.update(status='finished', message='The module is provisioned')
+
+    def check_ucs_job(self, job, output):
+        code = self.get_marker_status(job, output)
+        if code is None:
+            job.update(status='running', message='The UCS is loading')
+        elif code != 0:
+            job.update(status='failed', message='Loading the UCS exited with status {0}'.format(code))
+        elif re.search(r'Last Configuration Load Status\s+base-config-load-failed', output):
+            job.update(status='failed', message='Failed to reload the configuration')
+        elif re.search(r'Last Configuration Load Status\s+full-config-load-succeed', output) and \
+                re.search(r'Running Phase\s+running', output):
+            job.update(status='finished', message='The configuration is loaded')
+        else:
+            job.update(status='running', message='The configuration is reloading')
+
+    def check_qkview_job(self, job, output):
+        code = self.get_marker_status(job, output)
+        if code is None:
+            if self.is_downloaded(job):
+                # Downloaded by an earlier check, which removed the marker.
+                job.update(status='finished', message='The qkview is downloaded')
+            else:
+                job.update(status='running', message='The qkview is being generated')
+        elif code != 0:
+            job.update(status='failed', message='The qkview exited with status {0}'.format(code))
+        elif self.module.check_mode:
+            job.update(status='finished', message='The qkview is ready to be downloaded')
+        else:
+            self.download_qkview_from_device(job)
+            job.update(status='finished', message='The qkview is downloaded')
+
+    def is_downloaded(self, job):
+        # A dest that is older than the job is left from before it, such as
+        # one that is replaced with force.
+        dest = job.get('dest')
+        if not dest or not os.path.exists(dest):
+            return False
+        return os.path.getmtime(dest) >= job.get('started', 0)
+
+    def remove_markers_from_device(self, markers):
+        if not markers or self.module.check_mode:
+            return
+        self.client.api.exec_cmd(
+            '/mgmt/tm/util/unix-rm', 'run',
+            utilCmdArgs=' '.join(markers)
+        )
+        self.changed = True
+
+    def download_qkview_from_device(self, job):
+        self.client.api.download(job['download'], job['dest'])
+        self.client.api.exec_cmd(
+            '/mgmt/tm/util/unix-rm', 'run',
+            utilCmdArgs='{0} {1}'.format(job['path'], job['marker'])
+        )
+        self.changed = True
+
+
+class ArgumentSpec(object):
+    def __init__(self):
+        self.supports_check_mode = True
+        argument_spec = dict(
+            jobs=dict(
+                type='list',
+                required=True
+            )
+        )
+        self.argument_spec = {}
+        self.argument_spec.update(f5_argument_spec)
+        self.argument_spec.update(argument_spec)
+
+
+def main():
+    spec = ArgumentSpec()
+
+    module = AnsibleModule(
+        argument_spec=spec.argument_spec,
+        supports_check_mode=spec.supports_check_mode
+    )
+    if not HAS_REQUESTS:
+        module.fail_json(msg="The python requests module is required")
+
+    try:
+        client = F5RestClient(socket_path=module._socket_path, **module.params)
+        mm = ModuleManager(module=module, client=client)
+        if client.timings:
+            client.timings.instrument(mm)
+        results = mm.exec_module()
+        cleanup_tokens(client)
+        if client.timings:
+            results['_timings'] = client.timings.to_return()
+        module.exit_json(**results)
+    except F5ModuleError as ex:
+        cleanup_tokens(client)
+        module.fail_json(msg=str(ex))
+
+
+if __name__ == '__main__':
+    main()
@@ -98,6 +98,12 @@ options:
 notes:
   - Requires the netaddr Python package on the host. This is as easy as
     pip install netaddr
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
 extends_documentation_fragment: f5
 author:
   - Tim Rupp (@caphrim007)
@@ -211,7 +217,6 @@ state:
 '''
 
 import re
-import time
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.basic import env_fallback
@@ -220,31 +225,29 @@ HAS_DEVEL_IMPORTS = False
 
 try:
     # Sideband repository used for dev
-    from library.module_utils.network.f5.bigip import HAS_F5SDK
-    from library.module_utils.network.f5.bigip import F5Client
+    from library.module_utils.network.f5.icontrol import HAS_REQUESTS
+    from library.module_utils.network.f5.icontrol import F5RestClient
     from library.module_utils.network.f5.common import F5ModuleError
+    from library.module_utils.network.f5.common import F5Poller
     from library.module_utils.network.f5.common import AnsibleF5Parameters
     from library.module_utils.network.f5.common import cleanup_tokens
     from library.module_utils.network.f5.common import fqdn_name
     from library.module_utils.network.f5.common import f5_argument_spec
-    try:
-        from library.module_utils.network.f5.common import iControlUnexpectedHTTPError
-    except ImportError:
-        HAS_F5SDK = False
+    from library.module_utils.network.f5.common import select_params
+    from library.module_utils.network.f5.common import transform_name
     HAS_DEVEL_IMPORTS = True
 except ImportError:
     # Upstream Ansible
-    from ansible.module_utils.network.f5.bigip import HAS_F5SDK
-    from ansible.module_utils.network.f5.bigip import F5Client
+    from ansible.module_utils.network.f5.icontrol import HAS_REQUESTS
+    from ansible.module_utils.network.f5.icontrol import F5RestClient
     from ansible.module_utils.network.f5.common import F5ModuleError
+    from ansible.module_utils.network.f5.common import F5Poller
     from ansible.module_utils.network.f5.common import AnsibleF5Parameters
     from ansible.module_utils.network.f5.common import cleanup_tokens
     from ansible.module_utils.network.f5.common import fqdn_name
     from ansible.module_utils.network.f5.common import f5_argument_spec
-    try:
-        from ansible.module_utils.network.f5.common import iControlUnexpectedHTTPError
-    except ImportError:
-        HAS_F5SDK = False
+    from ansible.module_utils.network.f5.common import select_params
+    from ansible.module_utils.network.f5.common import transform_name
 
 try:
     import netaddr
@@ -625,63 +628,59 @@ class ModuleManager(object):
         return True
 
     def read_current_from_device(self):
-        resource = self.client.api.tm.ltm.nodes.node.load(
-            name=self.want.name,
-            partition=self.want.partition
+        uri = '/mgmt/tm/ltm/node/{0}'.format(
+            transform_name(self.want.partition, self.want.name)
         )
-        result = resource.attrs
+        result = self.client.api.load(uri, params=select_params(Parameters))
         return Parameters(params=result)
 
     def exists(self):
-        result = self.client.api.tm.ltm.nodes.node.exists(
-            name=self.want.name,
-            partition=self.want.partition
+        uri = '/mgmt/tm/ltm/node/{0}'.format(
+            transform_name(self.want.partition, self.want.name)
         )
-        return result
+        return self.client.api.exists(uri)
 
     def update_node_offline_on_device(self):
         params = dict(
             session="user-disabled",
             state="user-down"
         )
-        result = self.client.api.tm.ltm.nodes.node.load(
-            name=self.want.name,
-            partition=self.want.partition
+        uri = '/mgmt/tm/ltm/node/{0}'.format(
+            transform_name(self.want.partition, self.want.name)
         )
-        result.modify(**params)
+        self.client.api.modify(uri, params)
 
     def update_on_device(self):
         params = self.changes.api_params()
-        result = self.client.api.tm.ltm.nodes.node.load(
-            name=self.want.name,
-            partition=self.want.partition
+        uri = '/mgmt/tm/ltm/node/{0}'.format(
+            transform_name(self.want.partition, self.want.name)
         )
-        result.modify(**params)
+        self.client.api.modify(uri, params)
 
     def create_on_device(self):
         params = self.want.api_params()
-        resource = self.client.api.tm.ltm.nodes.node.create(
-            name=self.want.name,
-            partition=self.want.partition,
-            **params
-        )
+        params['name'] = self.want.name
+        params['partition'] = self.want.partition
+        resource = self.client.api.create('/mgmt/tm/ltm/node/', params)
         self._wait_for_fqdn_checks(resource)
 
     def _wait_for_fqdn_checks(self, resource):
-        while True:
-            if resource.state == 'fqdn-checking':
-                resource.refresh()
-                time.sleep(1)
-            else:
-                break
+        uri = '/mgmt/tm/ltm/node/{0}'.format(
+            transform_name(self.want.partition, self.want.name)
+        )
+        if resource.get('state') != 'fqdn-checking':
+            return
+        poller = F5Poller(
+            'the FQDN of the node to be checked', delay=1, max_delay=5, timeout=300,
+            timings=getattr(self.client, 'timings', None)
+        )
+        poller.wait(lambda: self.client.api.load(uri).get('state') != 'fqdn-checking')
 
     def remove_from_device(self):
-        result = self.client.api.tm.ltm.nodes.node.load(
-            name=self.want.name,
-            partition=self.want.partition
+        uri = '/mgmt/tm/ltm/node/{0}'.format(
+            transform_name(self.want.partition, self.want.name)
         )
-        if result:
-            result.delete()
+        self.client.api.delete(uri)
 
 
 class ArgumentSpec(object):
@@ -724,16 +723,20 @@ def main():
         argument_spec=spec.argument_spec,
         supports_check_mode=spec.supports_check_mode
     )
-    if not HAS_F5SDK:
-        module.fail_json(msg="The python f5-sdk module is required")
+    if not HAS_REQUESTS:
+        module.fail_json(msg="The python requests module is required")
     if not HAS_NETADDR:
         module.fail_json(msg="The python netaddr module is required")
 
     try:
-        client = F5Client(**module.params)
+        client = F5RestClient(socket_path=module._socket_path, **module.params)
         mm = ModuleManager(module=module, client=client)
+        if client.timings:
+            client.timings.instrument(mm)
         results = mm.exec_module()
         cleanup_tokens(client)
+        if client.timings:
+            results['_timings'] = client.timings.to_return()
         module.exit_json(**results)
     except F5ModuleError as ex:
         cleanup_tokens(client)
@@ -72,6 +72,13 @@ options:
     description:
       - Device partition to manage resources on.
     default: Common
+notes:
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
 extends_documentation_fragment: f5
 author:
   - Tim Rupp (@caphrim007)
@@ -166,6 +173,7 @@ import re
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.basic import env_fallback
+from ansible.module_utils.six.moves.urllib.parse import urlparse
 from distutils.version import LooseVersion
 
 HAS_DEVEL_IMPORTS = False
@@ -175,6 +183,7 @@ try:
     from library.module_utils.network.f5.bigip import HAS_F5SDK
     from library.module_utils.network.f5.bigip import F5Client
     from library.module_utils.network.f5.common import F5ModuleError
+    from library.module_utils.network.f5.common import F5Transaction
     from library.module_utils.network.f5.common import AnsibleF5Parameters
     from library.module_utils.network.f5.common import cleanup_tokens
     from library.module_utils.network.f5.common import fqdn_name
@@ -189,6 +198,7 @@ except ImportError:
     from ansible.module_utils.network.f5.bigip import HAS_F5SDK
     from ansible.module_utils.network.f5.bigip import F5Client
     from ansible.module_utils.network.f5.common import F5ModuleError
+    from ansible.module_utils.network.f5.common import F5Transaction
     from ansible.module_utils.network.f5.common import AnsibleF5Parameters
     from ansible.module_utils.network.f5.common import cleanup_tokens
     from ansible.module_utils.network.f5.common import fqdn_name
@@ -198,11 +208,6 @@ except ImportError:
     except ImportError:
         HAS_F5SDK = False
 
-try:
-    from f5.sdk_exception import NonExtantPolicyRule
-except ImportError:
-    HAS_F5SDK = False
-
 
 class Parameters(AnsibleF5Parameters):
     def to_return(self):
@@ -348,24 +353,30 @@ class BaseManager(object):
         rules = self.changes.rules
         if rules is None:
             rules = []
-        for idx, rule in enumerate(rules):
-            try:
-                resource = policy.rules_s.rules.load(name=rule)
-                if int(resource.ordinal) != idx:
-                    resource.modify(ordinal=idx)
-            except NonExtantPolicyRule:
-                policy.rules_s.rules.create(name=rule, ordinal=idx)
-        self._remove_rule_difference(rules, policy)
-
-    def _remove_rule_difference(self, rules, policy=None):
+        uri = urlparse(policy.selfLink).path + '/rules'
+        current = dict(
+            (x.name, int(x.ordinal)) for x in policy.rules_s.get_collection()
+        )
+
+        # Each rule is its own resource on the device. Changing them one at a
+        # time means a configuration load per rule, so they are queued and
+        # applied together instead.
+        with F5Transaction(self.client) as tx:
+            for idx, rule in enumerate(rules):
+                if rule not in current:
+                    tx.create(uri, dict(name=rule, ordinal=idx))
+                elif current[rule] != idx:
+                    tx.modify('{0}/{1}'.format(uri, rule), dict(ordinal=idx))
+            self._remove_rule_difference(rules, tx, uri)
+
+    def _remove_rule_difference(self, rules, tx, uri):
         if not rules or not self.have.rules:
             return
         have_rules = set(self.have.rules)
         want_rules = set(rules)
         removable = have_rules.difference(want_rules)
         for remove in removable:
-            resource = policy.rules_s.rules.load(name=remove)
-            resource.delete()
+            tx.delete('{0}/{1}'.format(uri, remove))
 
 
 class SimpleManager(BaseManager):
@@ -833,7 +844,7 @@ def main():
         module.fail_json(msg="The python f5-sdk module is required")
 
     try:
-        client = F5Client(**module.params)
+        client = F5Client(socket_path=module._socket_path, **module.params)
         mm = ModuleManager(module=module, client=client)
         results = mm.exec_module()
         cleanup_tokens(client)
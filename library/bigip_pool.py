@@ -113,6 +113,12 @@ notes:
   - To add members do a pool, use the C(bigip_pool_member) module. Previously, the
     C(bigip_pool) module allowed the management of users, but this has been removed
     in version 2.5 of Ansible.
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
 extends_documentation_fragment: f5
 author:
   - Tim Rupp (@caphrim007)
@@ -303,31 +309,27 @@ HAS_DEVEL_IMPORTS = False
 
 try:
     # Sideband repository used for dev
-    from library.module_utils.network.f5.bigip import HAS_F5SDK
-    from library.module_utils.network.f5.bigip import F5Client
+    from library.module_utils.network.f5.icontrol import HAS_REQUESTS
+    from library.module_utils.network.f5.icontrol import F5RestClient
     from library.module_utils.network.f5.common import F5ModuleError
     from library.module_utils.network.f5.common import AnsibleF5Parameters
     from library.module_utils.network.f5.common import cleanup_tokens
     from library.module_utils.network.f5.common import fqdn_name
     from library.module_utils.network.f5.common import f5_argument_spec
-    try:
-        from library.module_utils.network.f5.common import iControlUnexpectedHTTPError
-    except ImportError:
-        HAS_F5SDK = False
+    from library.module_utils.network.f5.common import select_params
+    from library.module_utils.network.f5.common import transform_name
     HAS_DEVEL_IMPORTS = True
 except ImportError:
     # Upstream Ansible
-    from ansible.module_utils.network.f5.bigip import HAS_F5SDK
-    from ansible.module_utils.network.f5.bigip import F5Client
+    from ansible.module_utils.network.f5.icontrol import HAS_REQUESTS
+    from ansible.module_utils.network.f5.icontrol import F5RestClient
     from ansible.module_utils.network.f5.common import F5ModuleError
     from ansible.module_utils.network.f5.common import AnsibleF5Parameters
     from ansible.module_utils.network.f5.common import cleanup_tokens
     from ansible.module_utils.network.f5.common import fqdn_name
     from ansible.module_utils.network.f5.common import f5_argument_spec
-    try:
-        from ansible.module_utils.network.f5.common import iControlUnexpectedHTTPError
-    except ImportError:
-        HAS_F5SDK = False
+    from ansible.module_utils.network.f5.common import select_params
+    from ansible.module_utils.network.f5.common import transform_name
 
 try:
     from netaddr import IPAddress, AddrFormatError
@@ -641,13 +643,10 @@ class ModuleManager(object):
         result = dict()
         state = self.want.state
 
-        try:
-            if state == "present":
-                changed = self.present()
-            elif state == "absent":
-                changed = self.absent()
-        except iControlUnexpectedHTTPError as e:
-            raise F5ModuleError(str(e))
+        if state == "present":
+            changed = self.present()
+        elif state == "absent":
+            changed = self.absent()
 
         reportable = ReportableChanges(params=self.changes.to_return())
         changes = reportable.to_return()
@@ -751,40 +750,36 @@ class ModuleManager(object):
 
     def create_on_device(self):
         params = self.want.api_params()
-        self.client.api.tm.ltm.pools.pool.create(
-            partition=self.want.partition, **params
-        )
+        params['partition'] = self.want.partition
+        self.client.api.create('/mgmt/tm/ltm/pool/', params)
 
     def update_on_device(self):
         params = self.want.api_params()
-        result = self.client.api.tm.ltm.pools.pool.load(
-            name=self.want.name,
-            partition=self.want.partition
+        uri = '/mgmt/tm/ltm/pool/{0}'.format(
+            transform_name(self.want.partition, self.want.name)
         )
-        result.modify(**params)
+        self.client.api.modify(uri, params)
 
     def exists(self):
-        return self.client.api.tm.ltm.pools.pool.exists(
-            name=self.want.name,
-            partition=self.want.partition
+        uri = '/mgmt/tm/ltm/pool/{0}'.format(
+            transform_name(self.want.partition, self.want.name)
         )
+        return self.client.api.exists(uri)
 
     def remove_from_device(self):
-        result = self.client.api.tm.ltm.pools.pool.load(
-            name=self.want.name,
-            partition=self.want.partition
+        uri = '/mgmt/tm/ltm/pool/{0}'.format(
+            transform_name(self.want.partition, self.want.name)
         )
-        result.delete()
+        self.client.api.delete(uri)
 
     def read_current_from_device(self):
-        resource = self.client.api.tm.ltm.pools.pool.load(
-            name=self.want.name,
-            partition=self.want.partition,
-            requests_params=dict(
-                params='expandSubcollections=true'
-            )
+        uri = '/mgmt/tm/ltm/pool/{0}'.format(
+            transform_name(self.want.partition, self.want.name)
+        )
+        result = self.client.api.load(
+            uri, params=select_params(ApiParameters)
         )
-        return ApiParameters(params=resource.attrs)
+        return ApiParameters(params=result)
 
 
 class ArgumentSpec(object):
@@ -865,16 +860,20 @@ def main():
         argument_spec=spec.argument_spec,
         supports_check_mode=spec.supports_check_mode
     )
-    if not HAS_F5SDK:
-        module.fail_json(msg="The python f5-sdk module is required")
+    if not HAS_REQUESTS:
+        module.fail_json(msg="The python requests module is required")
     if not HAS_NETADDR:
         module.fail_json(msg="The python netaddr module is required")
 
     try:
-        client = F5Client(**module.params)
+        client = F5RestClient(socket_path=module._socket_path, **module.params)
         mm = ModuleManager(module=module, client=client)
+        if client.timings:
+            client.timings.instrument(mm)
         results = mm.exec_module()
         cleanup_tokens(client)
+        if client.timings:
+            results['_timings'] = client.timings.to_return()
         module.exit_json(**results)
     except F5ModuleError as ex:
         cleanup_tokens(client)
@@ -24,7 +24,7 @@ options:
   name:
     description:
       - The module to provision in BIG-IP.
-    required: true
+      - Either this or C(modules) is required.
     choices:
       - am
       - afm
@@ -65,6 +65,33 @@ options:
     choices:
       - present
       - absent
+  modules:
+    description:
+      - 'The modules to provision, each with its level. For example,
+        C({"ltm": "nominal", "asm": "nominal", "apm": "minimum"}).'
+      - The level of each module is one of C(dedicated), C(nominal),
+        C(minimum) or C(none). A level of C(none) de-provisions the module.
+      - Every module whose level changes is provisioned in one transaction,
+        and the device is waited on once for all of them.
+      - When C(state) is C(absent), each of the modules is de-provisioned
+        and the levels are ignored.
+      - Mutually exclusive with C(name).
+    version_added: 2.6
+  async_job:
+    description:
+      - When C(yes), the module returns a C(job) as soon as the provisioning
+        is changed, instead of waiting for the device to finish provisioning.
+      - The job is checked on with the C(bigip_job_status) module.
+    default: no
+    type: bool
+    version_added: 2.6
+notes:
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
 extends_documentation_fragment: f5
 author:
   - Tim Rupp (@caphrim007)
@@ -90,6 +117,29 @@ EXAMPLES = r'''
     user: admin
     validate_certs: no
   delegate_to: localhost
+
+- name: Provision LTM, ASM, AFM and APM at once
+  bigip_provision:
+    server: lb.mydomain.com
+    modules:
+      ltm: nominal
+      asm: nominal
+      afm: nominal
+      apm: minimum
+    password: secret
+    user: admin
+    validate_certs: no
+  delegate_to: localhost
+
+- name: Provision ASM without waiting for it
+  bigip_provision:
+    server: lb.mydomain.com
+    module: asm
+    password: secret
+    user: admin
+    async_job: yes
+  delegate_to: localhost
+  register: result
 '''
 
 RETURN = r'''
@@ -98,6 +148,16 @@ level:
   returned: changed
   type: string
   sample: minimum
+modules:
+  description: The modules whose levels were changed, with their new levels.
+  returned: changed and C(modules) is given
+  type: dict
+  sample: {"asm": "nominal", "apm": "minimum"}
+job:
+  description: The provisioning job, for the C(bigip_job_status) module.
+  returned: changed and C(async_job) is C(yes)
+  type: dict
+  sample: {"type": "provision", "module": "asm", "level": "nominal"}
 '''
 
 import time
@@ -111,6 +171,7 @@ try:
     from library.module_utils.network.f5.bigip import HAS_F5SDK
     from library.module_utils.network.f5.bigip import F5Client
     from library.module_utils.network.f5.common import F5ModuleError
+    from library.module_utils.network.f5.common import F5Poller
     from library.module_utils.network.f5.common import AnsibleF5Parameters
     from library.module_utils.network.f5.common import cleanup_tokens
     from library.module_utils.network.f5.common import fqdn_name
@@ -125,6 +186,7 @@ except ImportError:
     from ansible.module_utils.network.f5.bigip import HAS_F5SDK
     from ansible.module_utils.network.f5.bigip import F5Client
     from ansible.module_utils.network.f5.common import F5ModuleError
+    from ansible.module_utils.network.f5.common import F5Poller
     from ansible.module_utils.network.f5.common import AnsibleF5Parameters
     from ansible.module_utils.network.f5.common import cleanup_tokens
     from ansible.module_utils.network.f5.common import fqdn_name
@@ -141,10 +203,19 @@ except ImportError:
     HAS_F5SDK = False
 
 
+MODULES = [
+    'afm', 'am', 'sam', 'asm', 'avr', 'fps',
+    'gtm', 'lc', 'ltm', 'pem', 'swg', 'ilx',
+    'apm', 'vcmp'
+]
+
+LEVELS = ['dedicated', 'nominal', 'minimum', 'none']
+
+
 class Parameters(AnsibleF5Parameters):
     api_attributes = ['level']
 
-    returnables = ['level']
+    returnables = ['level', 'modules']
 
     updatables = ['level']
 
@@ -164,6 +235,29 @@ class Parameters(AnsibleF5Parameters):
             return None
         return str(self._values['level'])
 
+    @property
+    def modules(self):
+        if self._values['modules'] is None:
+            return None
+        result = dict()
+        for name, level in self._values['modules'].items():
+            name, level = str(name), str(level)
+            if name not in MODULES:
+                raise F5ModuleError(
+                    "The module '{0}' cannot be provisioned. It must be one of {1}.".format(name, ', '.join(MODULES))
+                )
+            if level not in LEVELS:
+                raise F5ModuleError(
+                    "The level of '{0}' must be one of {1}.".format(name, ', '.join(LEVELS))
+                )
+            result[name] = level
+        dedicated = [x for x in result if result[x] == 'dedicated']
+        if dedicated and any(result[x] != 'none' for x in result if x not in dedicated[:1]):
+            raise F5ModuleError(
+                "A module provisioned as 'dedicated' requires every other module to be 'none'."
+            )
+        return result
+
 
 class ModuleManager(object):
     def __init__(self, *args, **kwargs):
@@ -172,6 +266,7 @@ class ModuleManager(object):
         self.have = None
         self.want = Parameters(params=self.module.params)
         self.changes = Parameters()
+        self.job = None
 
     def _update_changed_options(self):
         changed = {}
@@ -195,7 +290,9 @@ class ModuleManager(object):
         state = self.want.state
 
         try:
-            if state == "present":
+            if self.want.modules is not None:
+                changed = self.update_modules()
+            elif state == "present":
                 changed = self.update()
             elif state == "absent":
                 changed = self.absent()
@@ -205,6 +302,8 @@ class ModuleManager(object):
         changes = self.changes.to_return()
         result.update(**changes)
         result.update(dict(changed=changed))
+        if self.job:
+            result['job'] = self.job
         return result
 
     def exists(self):
@@ -224,6 +323,9 @@ class ModuleManager(object):
             return True
 
         self.update_on_device()
+        if self.want.async_job:
+            self.job = self.get_job(self.want.level)
+            return True
         self._wait_for_module_provisioning()
 
         if self.want.module == 'vcmp':
@@ -234,6 +336,71 @@ class ModuleManager(object):
             self._wait_for_asm_ready()
         return True
 
+    def update_modules(self):
+        """Provisions several modules, with one wait for all of them
+        """
+        current = self.read_levels_from_device()
+        changes = self.get_module_changes(current)
+        if not changes:
+            return False
+        self.changes = Parameters(params=dict(modules=changes))
+        if self.module.check_mode:
+            return True
+
+        self.update_modules_on_device(changes)
+        if self.want.async_job:
+            self.job = dict(type='provision', modules=changes)
+            return True
+        self._wait_for_module_provisioning()
+
+        if 'vcmp' in changes:
+            self._wait_for_reboot()
+            self._wait_for_module_provisioning()
+
+        if changes.get('asm', 'none') != 'none':
+            self._wait_for_asm_ready()
+        return True
+
+    def get_module_changes(self, current):
+        """Returns the modules whose levels must change, with their new levels
+
+        A module provisioned as dedicated also de-provisions every other
+        module on the device.
+        """
+        wanted = self.want.modules
+        if self.want.state == 'absent':
+            wanted = dict((x, 'none') for x in wanted)
+        if 'dedicated' in wanted.values():
+            for name in current:
+                wanted.setdefault(name, 'none')
+        result = dict()
+        for name, level in wanted.items():
+            if current.get(name, 'none') != level:
+                result[name] = level
+        return result
+
+    def read_levels_from_device(self):
+        collection = self.client.api.tm.sys.provision.get_collection()
+        return dict((str(x['name']), str(x['level'])) for x in collection)
+
+    def update_modules_on_device(self, changes):
+        # The levels are changed in one transaction, so that mprov runs
+        # once for all of them instead of once for each module.
+        if len(changes) == 1:
+            name, level = list(changes.items())[0]
+            resource = getattr(self.client.api.tm.sys.provision, name).load()
+            resource.update(level=level)
+            return
+        tx = self.client.api.tm.transactions.transaction
+        with TransactionContextManager(tx) as api:
+            provision = api.tm.sys.provision
+            # Modules are de-provisioned first, to free their resources for
+            # the modules that are provisioned.
+            for name in sorted(changes, key=lambda x: (changes[x] != 'none', x)):
+                resource = getattr(provision, name)
+                resource = resource.load()
+                resource.update(level=changes[name])
+
     def should_update(self):
         result = self._update_changed_options()
         if result:
@@ -284,6 +451,9 @@ class ModuleManager(object):
         if self.module.check_mode:
             return True
         self.remove_from_device()
+        if self.want.async_job:
+            self.job = self.get_job('none')
+            return True
         self._wait_for_module_provisioning()
 
         # For vCMP, because it has to reboot, we also wait for mcpd to become available
@@ -297,34 +467,44 @@ class ModuleManager(object):
             raise F5ModuleError("Failed to de-provision the module")
         return True
 
+    def get_job(self, level):
+        return dict(
+            type='provision',
+            module=self.want.module,
+            level=level
+        )
+
     def remove_from_device(self):
         provision = self.client.api.tm.sys.provision
         resource = getattr(provision, self.want.module)
         resource = resource.load()
         resource.update(level='none')
 
+    def get_poller(self, name, **kwargs):
+        return F5Poller(name, timings=getattr(self.client, 'timings', None), **kwargs)
+
+    def _is_mprov_finished_on_device(self):
+        try:
+            return not self._is_mprov_running_on_device()
+        except Exception:
+            # This can be caused by restjavad restarting.
+            try:
+                self.client.reconnect()
+            except Exception:
+                pass
+            return False
+
     def _wait_for_module_provisioning(self):
         # To prevent things from running forever, the hack is to check
-        # for mprov's status twice. If mprov is finished, then in most
+        # for mprov's status thrice. If mprov is finished, then in most
         # cases (not ASM) the provisioning is probably ready.
-        nops = 0
-
+        #
         # Sleep a little to let provisioning settle and begin properly
-        time.sleep(5)
-
-        while nops < 3:
-            try:
-                if not self._is_mprov_running_on_device():
-                    nops += 1
-                else:
-                    nops = 0
-            except Exception:
-                # This can be caused by restjavad restarting.
-                try:
-                    self.client.reconnect()
-                except Exception:
-                    pass
-            time.sleep(5)
+        poller = self.get_poller(
+            'the module to provision', delay=5, max_delay=15, timeout=1800,
+            initial_delay=5, required=3
+        )
+        poller.wait(self._is_mprov_finished_on_device)
 
     def _is_mprov_running_on_device(self):
         # /usr/libexec/qemu-kvm is added here to prevent vcmp provisioning
@@ -355,20 +535,22 @@ class ModuleManager(object):
         the Policies API to stop raising errors
         :return:
         """
-        nops = 0
-        restarted_asm = False
-        while nops < 3:
+        restarted_asm = []
+
+        def check():
             try:
-                policies = self.client.api.tm.asm.policies_s.get_collection()
-                if len(policies) >= 0:
-                    nops += 1
-                else:
-                    nops = 0
+                self.client.api.tm.asm.policies_s.get_collection()
+                return True
             except Exception as ex:
                 if not restarted_asm:
                     self._restart_asm()
-                    restarted_asm = True
-            time.sleep(5)
+                    restarted_asm.append(True)
+                return False
+
+        poller = self.get_poller(
+            'ASM to be ready', delay=5, max_delay=15, timeout=1800, required=3
+        )
+        poller.wait(check)
 
     def _restart_asm(self):
         try:
@@ -395,27 +577,20 @@ class ModuleManager(object):
         return None
 
     def _wait_for_reboot(self):
-        nops = 0
-
         last_reboot = self._get_last_reboot()
 
-        # Sleep a little to let provisioning settle and begin properly
-        time.sleep(5)
+        def check():
+            self.client.reconnect()
+            next_reboot = self._get_last_reboot()
+            return next_reboot is not None and next_reboot != last_reboot
 
-        while nops < 6:
-            try:
-                self.client.reconnect()
-                next_reboot = self._get_last_reboot()
-                if next_reboot is None:
-                    nops = 0
-                if next_reboot == last_reboot:
-                    nops = 0
-                else:
-                    nops += 1
-            except Exception as ex:
-                # This can be caused by restjavad restarting.
-                pass
-            time.sleep(10)
+        # Sleep a little to let provisioning settle and begin properly.
+        # Exceptions can be caused by restjavad restarting.
+        poller = self.get_poller(
+            'the device to reboot', delay=10, max_delay=30, timeout=3600,
+            initial_delay=5, required=6
+        )
+        poller.wait(check, ignore=Exception)
 
 
 class ArgumentSpec(object):
@@ -423,14 +598,10 @@ class ArgumentSpec(object):
         self.supports_check_mode = True
         argument_spec = dict(
             module=dict(
-                required=True,
-                choices=[
-                    'afm', 'am', 'sam', 'asm', 'avr', 'fps',
-                    'gtm', 'lc', 'ltm', 'pem', 'swg', 'ilx',
-                    'apm', 'vcmp'
-                ],
+                choices=MODULES,
                 aliases=['name']
             ),
+            modules=dict(type='dict'),
             level=dict(
                 default='nominal',
                 choices=['nominal', 'dedicated', 'minimum']
@@ -438,13 +609,21 @@ class ArgumentSpec(object):
             state=dict(
                 default='present',
                 choices=['present', 'absent']
+            ),
+            async_job=dict(
+                type='bool',
+                default='no'
             )
         )
         self.argument_spec = {}
         self.argument_spec.update(f5_argument_spec)
         self.argument_spec.update(argument_spec)
         self.mutually_exclusive = [
-            ['parameters', 'parameters_src']
+            ['parameters', 'parameters_src'],
+            ['module', 'modules']
+        ]
+        self.required_one_of = [
+            ['module', 'modules']
         ]
 
 
@@ -454,16 +633,21 @@ def main():
     module = AnsibleModule(
         argument_spec=spec.argument_spec,
         supports_check_mode=spec.supports_check_mode,
-        mutually_exclusive=spec.mutually_exclusive
+        mutually_exclusive=spec.mutually_exclusive,
+        required_one_of=spec.required_one_of
     )
     if not HAS_F5SDK:
         module.fail_json(msg="The python f5-sdk module is required")
 
     try:
-        client = F5Client(**module.params)
+        client = F5Client(socket_path=module._socket_path, **module.params)
         mm = ModuleManager(module=module, client=client)
+        if client.timings:
+            client.timings.instrument(mm)
         results = mm.exec_module()
         cleanup_tokens(client)
+        if client.timings:
+            results['_timings'] = client.timings.to_return()
         module.exit_json(**results)
     except F5ModuleError as ex:
         cleanup_tokens(client)
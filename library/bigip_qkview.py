@@ -67,8 +67,23 @@ options:
         exist.
     default: yes
     type: bool
+  async_job:
+    description:
+      - When C(yes), the qkview is generated in the background, and the module
+        returns a C(job) at once instead of waiting for the qkview.
+      - The job is checked on with the C(bigip_job_status) module, which
+        downloads the qkview to C(dest) once it is finished.
+    default: no
+    type: bool
+    version_added: 2.6
 notes:
   - This module does not include the "max time" or "restrict to blade" options.
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
 extends_documentation_fragment: f5
 author:
   - Tim Rupp (@caphrim007)
@@ -83,6 +98,23 @@ EXAMPLES = r'''
       - secure
     dest: /tmp/localhost.localdomain.qkview
   delegate_to: localhost
+
+- name: Start generating a qkview without waiting for it
+  bigip_qkview:
+    dest: /tmp/localhost.localdomain.qkview
+    async_job: yes
+  delegate_to: localhost
+  register: result
+
+- name: Wait for the qkview and download it
+  bigip_job_status:
+    jobs:
+      - "{{ result.job }}"
+  delegate_to: localhost
+  register: status
+  until: status.finished
+  retries: 60
+  delay: 30
 '''
 
 RETURN = r'''
@@ -96,10 +128,16 @@ stdout_lines:
   returned: always
   type: list
   sample: [['...', '...'], ['...'], ['...']]
+job:
+  description: The job generating the qkview, for the C(bigip_job_status) module.
+  returned: When C(async_job) is C(yes)
+  type: dict
+  sample: {"type": "qkview", "filename": "localhost.localdomain.qkview"}
 '''
 
 import os
 import re
+import time
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.six import string_types
@@ -116,6 +154,8 @@ try:
     from library.module_utils.network.f5.common import cleanup_tokens
     from library.module_utils.network.f5.common import fqdn_name
     from library.module_utils.network.f5.common import f5_argument_spec
+    from library.module_utils.network.f5.jobs import background_command
+    from library.module_utils.network.f5.jobs import get_job_marker
     try:
         from library.module_utils.network.f5.common import iControlUnexpectedHTTPError
     except ImportError:
@@ -130,6 +170,8 @@ except ImportError:
     from ansible.module_utils.network.f5.common import cleanup_tokens
     from ansible.module_utils.network.f5.common import fqdn_name
     from ansible.module_utils.network.f5.common import f5_argument_spec
+    from ansible.module_utils.network.f5.jobs import background_command
+    from ansible.module_utils.network.f5.jobs import get_job_marker
     try:
         from ansible.module_utils.network.f5.common import iControlUnexpectedHTTPError
     except ImportError:
@@ -142,7 +184,7 @@ class Parameters(AnsibleF5Parameters):
         'asm_request_log', 'filename_cmd'
     ]
 
-    returnables = ['stdout', 'stdout_lines', 'warnings']
+    returnables = ['stdout', 'stdout_lines', 'warnings', 'job']
 
     @property
     def exclude(self):
@@ -313,6 +355,10 @@ class BaseManager(object):
             return False
 
     def execute(self):
+        if self.want.async_job:
+            self.changes = Parameters(params={'job': self.start_job_on_device()})
+            return
+
         response = self.execute_on_device()
         result = self._move_qkview_to_download()
         if not result:
@@ -333,7 +379,7 @@ class BaseManager(object):
                 "Failed to remove the remote qkview"
             )
 
-        self.changes = Parameters({
+        self.changes = Parameters(params={
             'stdout': response,
             'stdout_lines': self._to_lines(response)
         })
@@ -344,6 +390,33 @@ class BaseManager(object):
             'run', utilCmdArgs=tpath_name
         )
 
+    def start_job_on_device(self):
+        """Generates the qkview in the background
+
+        When the qkview is finished it is moved to the download location, so
+        that it can be downloaded by the job.
+        """
+        params = self.want.api_params().values()
+        path = '{0}/{1}'.format(self.remote_dir, self.want.filename)
+        marker = get_job_marker(self.want.filename)
+        started = time.time()
+        command = 'qkview {0} && mv /var/tmp/{1} {2}'.format(
+            ' '.join(params), self.want.filename, path
+        )
+        self.client.api.tm.util.bash.exec_cmd(
+            'run',
+            utilCmdArgs=background_command(command, marker)
+        )
+        return dict(
+            type='qkview',
+            filename=self.want.filename,
+            path=path,
+            download='{0}/{1}'.format(self.download_uri, self.want.filename),
+            marker=marker,
+            dest=self.want.dest,
+            started=started
+        )
+
     def execute_on_device(self):
         params = self.want.api_params().values()
         output = self.client.api.tm.util.qkview.exec_cmd(
@@ -359,6 +432,7 @@ class BulkLocationManager(BaseManager):
     def __init__(self, *args, **kwargs):
         super(BulkLocationManager, self).__init__(**kwargs)
         self.remote_dir = '/var/config/rest/bulk'
+        self.download_uri = '/mgmt/shared/file-transfer/bulk'
 
     def _move_qkview_to_download(self):
         try:
@@ -385,6 +459,7 @@ class MadmLocationManager(BaseManager):
     def __init__(self, *args, **kwargs):
         super(MadmLocationManager, self).__init__(**kwargs)
         self.remote_dir = '/var/config/rest/madm'
+        self.download_uri = '/mgmt/shared/file-transfer/madm'
 
     def _move_qkview_to_download(self):
         try:
@@ -436,6 +511,10 @@ class ArgumentSpec(object):
             exclude=dict(
                 type='list'
             ),
+            async_job=dict(
+                default='no',
+                type='bool'
+            ),
             dest=dict(
                 type='path',
                 required=True
@@ -457,7 +536,7 @@ def main():
         module.fail_json(msg="The python f5-sdk module is required")
 
     try:
-        client = F5Client(**module.params)
+        client = F5Client(socket_path=module._socket_path, **module.params)
         mm = ModuleManager(module=module, client=client)
         results = mm.exec_module()
         cleanup_tokens(client)
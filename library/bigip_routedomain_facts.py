@@ -1,7 +1,7 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 #
-# Copyright (c) 2016 F5 Networks Inc.
+# Copyright (c) 2017 F5 Networks Inc.
 # GNU General Public License v3.0 (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
 
 from __future__ import absolute_import, division, print_function
@@ -20,31 +20,31 @@ description:
   - Retrieve route domain attributes from a BIG-IP
 version_added: "2.2"
 options:
-  server:
+  name:
     description:
-      - BIG-IP host
-    required: True
-  password:
-    description:
-      - BIG-IP password
-    required: True
+      - Names of the route domains to retrieve. Each name may be a full name,
+        such as C(/Common/0), or a shell-style glob matching string.
+      - When no names are given, every route domain is retrieved.
   id:
     description:
-      - The unique identifying integer representing the route domain.
-    required: True
+      - The unique identifying integers of the route domains to retrieve.
   partition:
     description:
-      - The partition the route domain resides on
-    default: Common
-  user:
-    description:
-      - BIG-IP username
-    required: true
-  validate_certs:
-    description:
-      - If C(no), SSL certificates will not be validated. This should only be
-        used on personally controlled sites using self-signed certificates.
-    default: yes
+      - Partitions to retrieve route domains from.
+      - The device is asked for the route domains of each partition, instead
+        of for every route domain.
+      - When no partitions are given, route domains are retrieved from every
+        partition.
+notes:
+  - Names without globs are read with one request each. Globs, IDs, and
+    partitions are read with one request for each partition.
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
+extends_documentation_fragment: f5
 author:
   - Tim Rupp (@caphrim007)
 '''
@@ -57,127 +57,304 @@ EXAMPLES = r'''
     server: lb.mydomain.com
     user: admin
   delegate_to: localhost
+
+- name: Get the facts for the route domains of two tenants
+  bigip_routedomain_facts:
+    name: rd-*
+    partition:
+      - tenant-a
+      - tenant-b
+    password: secret
+    server: lb.mydomain.com
+    user: admin
+  delegate_to: localhost
 '''
 
 RETURN = r'''
-bwc_policy:
-  description: Bandwidth controller for the route domain
-  returned: changed
-  type: string
-  sample: /Common/foo
-connection_limit:
-  description: Maximum number of concurrent connections allowed for the route domain
-  returned: changed
-  type: integer
-  sample: 0
-description:
-  description: Descriptive text that identifies the route domain
-  returned: changed
-  type: string
-  sample: The foo route domain
-evict_policy:
-  description: Eviction policy to use with this route domain
-  returned: changed
-  type: string
-  sample: /Common/default-eviction-policy
-id:
-  description: ID of the route domain
-  returned: changed
-  type: integer
-  sample: 1234
-service_policy:
-  description: Service policy to associate with the route domain
-  returned: changed
-  type: string
-  sample: /Common/abc
-strict:
-  description: Whether the system enforces cross-routing restrictions
-  returned: changed
-  type: string
-  sample: enabled
-routing_protocol:
-  description: Dynamic routing protocols for the system to use in the route domain
-  returned: changed
-  type: list
-  sample: ["BGP", "OSPFv2"]
-vlans:
-  description: VLANs for the system to use in the route domain
-  returned: changed
-  type: list
-  sample: ["/Common/abc", "/Common/xyz"]
+route_domains:
+  description: The route domains that were found, ordered by their full names.
+  returned: always
+  type: complex
+  contains:
+    bwc_policy:
+      description: Bandwidth controller for the route domain
+      returned: changed
+      type: string
+      sample: /Common/foo
+    connection_limit:
+      description: Maximum number of concurrent connections allowed for the route domain
+      returned: changed
+      type: integer
+      sample: 0
+    description:
+      description: Descriptive text that identifies the route domain
+      returned: changed
+      type: string
+      sample: The foo route domain
+    evict_policy:
+      description: Eviction policy to use with this route domain
+      returned: changed
+      type: string
+      sample: /Common/default-eviction-policy
+    full_path:
+      description: Full name of the route domain
+      returned: changed
+      type: string
+      sample: /Common/rd-1234
+    id:
+      description: ID of the route domain
+      returned: changed
+      type: integer
+      sample: 1234
+    name:
+      description: Name of the route domain
+      returned: changed
+      type: string
+      sample: rd-1234
+    parent:
+      description: Parent route domain
+      returned: changed
+      type: string
+      sample: /Common/0
+    partition:
+      description: Partition of the route domain
+      returned: changed
+      type: string
+      sample: Common
+    service_policy:
+      description: Service policy to associate with the route domain
+      returned: changed
+      type: string
+      sample: /Common/abc
+    strict:
+      description: Whether the system enforces cross-routing restrictions
+      returned: changed
+      type: string
+      sample: enabled
+    routing_protocol:
+      description: Dynamic routing protocols for the system to use in the route domain
+      returned: changed
+      type: list
+      sample: ["BGP", "OSPFv2"]
+    vlans:
+      description: VLANs for the system to use in the route domain
+      returned: changed
+      type: list
+      sample: ["/Common/abc", "/Common/xyz"]
 '''
 
+import fnmatch
+import re
+
+from ansible.module_utils.basic import AnsibleModule
+
+HAS_DEVEL_IMPORTS = False
+
 try:
-    from f5.bigip import ManagementRoot
-    HAS_F5SDK = True
+    # Sideband repository used for dev
+    from library.module_utils.network.f5.icontrol import HAS_REQUESTS
+    from library.module_utils.network.f5.icontrol import F5RestClient
+    from library.module_utils.network.f5.icontrol import iControlRestError
+    from library.module_utils.network.f5.common import F5ModuleError
+    from library.module_utils.network.f5.common import AnsibleF5Parameters
+    from library.module_utils.network.f5.common import cleanup_tokens
+    from library.module_utils.network.f5.common import f5_argument_spec
+    from library.module_utils.network.f5.common import filter_params
+    from library.module_utils.network.f5.common import fqdn_name
+    from library.module_utils.network.f5.common import map_requests
+    from library.module_utils.network.f5.common import transform_name
+    HAS_DEVEL_IMPORTS = True
 except ImportError:
-    HAS_F5SDK = False
+    # Upstream Ansible
+    from ansible.module_utils.network.f5.icontrol import HAS_REQUESTS
+    from ansible.module_utils.network.f5.icontrol import F5RestClient
+    from ansible.module_utils.network.f5.icontrol import iControlRestError
+    from ansible.module_utils.network.f5.common import F5ModuleError
+    from ansible.module_utils.network.f5.common import AnsibleF5Parameters
+    from ansible.module_utils.network.f5.common import cleanup_tokens
+    from ansible.module_utils.network.f5.common import f5_argument_spec
+    from ansible.module_utils.network.f5.common import filter_params
+    from ansible.module_utils.network.f5.common import fqdn_name
+    from ansible.module_utils.network.f5.common import map_requests
+    from ansible.module_utils.network.f5.common import transform_name
 
 
-class BigIpRouteDomainFacts(object):
-    def __init__(self, *args, **kwargs):
-        if not HAS_F5SDK:
-            raise F5ModuleError("The python f5-sdk module is required")
-
-        self.params = kwargs
-        self.api = ManagementRoot(kwargs['server'],
-                                  kwargs['user'],
-                                  kwargs['password'],
-                                  port=kwargs['server_port'])
-
-    def flush(self):
-        result = dict()
-
-        rds = self.api.tm.net.route_domains
-        rd = rds.route_domain.load(name=kwargs['id'],
-                                   partition=kwargs['partition'])
-
-        result['id'] = rd.id
-        result['name'] = rd.name
-        result['parent'] = rd.parent
-
-        if hasattr(r, 'bwcPolicy'):
-            result['bwc_policy'] = rd.bwcPolicy
-        if hasattr(r, 'connectionLimit'):
-            result['connection_limit'] = rd.connectionLimit
-        if hasattr(r, 'description'):
-            result['description'] = rd.description
-        if hasattr(r, 'flowEvictionPolicy'):
-            result['evict_policy'] = rd.flowEvictionPolicy
-        if hasattr(r, 'servicePolicy'):
-            result['service_policy'] = rd.servicePolicy
-        if hasattr(r, 'strict'):
-            result['strict'] = rd.strict
-        if hasattr(r, 'routingProtocol'):
-            result['routing_protocol'] = rd.routingProtocol
-        if hasattr(r, 'vlans'):
-            result['vlans'] = rd.vlans
+COLLECTION = '/mgmt/tm/net/route-domain'
+
+# Characters that make a name a shell-style glob.
+GLOB_CHARS = re.compile(r'[*?\[]')
+
+
+class Parameters(AnsibleF5Parameters):
+    api_map = {
+        'bwcPolicy': 'bwc_policy',
+        'connectionLimit': 'connection_limit',
+        'flowEvictionPolicy': 'evict_policy',
+        'fullPath': 'full_path',
+        'routingProtocol': 'routing_protocol',
+        'servicePolicy': 'service_policy',
+    }
+
+    api_attributes = [
+        'name', 'partition', 'fullPath', 'id', 'parent', 'bwcPolicy',
+        'connectionLimit', 'description', 'flowEvictionPolicy', 'servicePolicy',
+        'strict', 'routingProtocol', 'vlans'
+    ]
+
+    returnables = [
+        'name', 'partition', 'full_path', 'id', 'parent', 'bwc_policy',
+        'connection_limit', 'description', 'evict_policy', 'service_policy',
+        'strict', 'routing_protocol', 'vlans'
+    ]
+
+    def to_return(self):
+        result = {}
+        for returnable in self.returnables:
+            result[returnable] = getattr(self, returnable)
+        result = self._filter_params(result)
         return result
 
 
-def main():
-    argument_spec = f5_argument_spec()
+class ModuleParameters(AnsibleF5Parameters):
+    @property
+    def name(self):
+        return self._values['name'] or []
 
-    meta_args = dict(
-        id=dict(required=True),
-    )
-    argument_spec.update(meta_args)
+    @property
+    def id(self):
+        return [int(x) for x in self._values['id'] or []]
+
+    @property
+    def partition(self):
+        return self._values['partition'] or []
+
+    @property
+    def patterns(self):
+        """Returns the names, compiled as regular expressions of full names
+        """
+        result = []
+        for name in self.name:
+            if not name.startswith('/'):
+                name = '/*/' + name
+            result.append(re.compile(fnmatch.translate(name)))
+        return result
+
+    @property
+    def exact_names(self):
+        """Returns the full names to read one at a time, if every name is exact
+
+        Names without a partition are exact only when partitions are given.
+        When any name is a glob, or there are no names, None is returned, and
+        the route domains are read from their collection instead.
+        """
+        if not self.name or any(GLOB_CHARS.search(x) for x in self.name):
+            return None
+        result = []
+        for name in self.name:
+            if name.startswith('/'):
+                result.append(name)
+            elif self.partition:
+                result += [fqdn_name(x, name) for x in self.partition]
+            else:
+                return None
+        return result
+
+
+class ModuleManager(object):
+    def __init__(self, *args, **kwargs):
+        self.module = kwargs.get('module', None)
+        self.client = kwargs.get('client', None)
+        self.want = ModuleParameters(params=self.module.params)
+
+    def exec_module(self):
+        route_domains = [x for x in self.read_current_from_device() if self.matches(x)]
+        route_domains.sort(key=lambda x: x.get('fullPath'))
+        return dict(
+            changed=False,
+            route_domains=[Parameters(params=x).to_return() for x in route_domains]
+        )
+
+    def matches(self, resource):
+        patterns = self.want.patterns
+        if patterns and not any(x.match(resource.get('fullPath', '')) for x in patterns):
+            return False
+        ids = self.want.id
+        if ids and resource.get('id') not in ids:
+            return False
+        return True
+
+    def get_requests(self):
+        names = self.want.exact_names
+        if names is not None:
+            return [('resource', x) for x in names]
+        if self.want.partition:
+            return [('partition', x) for x in self.want.partition]
+        return [('partition', None)]
+
+    def read_current_from_device(self):
+        requests = self.get_requests()
+        results = map_requests(self.client, lambda x: self.read_request_from_device(*x), requests)
+        return [resource for result in results for resource in result]
+
+    def read_request_from_device(self, kind, value):
+        if kind == 'resource':
+            return self.read_route_domain_from_device(value)
+        return self.read_route_domains_from_device(value)
+
+    def read_route_domain_from_device(self, name):
+        path = '{0}/{1}'.format(COLLECTION, transform_name(name=name))
+        try:
+            return [self.client.api.load(path)]
+        except iControlRestError as ex:
+            if ex.status_code == 404:
+                return []
+            raise
+
+    def read_route_domains_from_device(self, partition=None):
+        params = dict()
+        if partition:
+            params.update(filter_params(partition=partition))
+        params['$select'] = ','.join(Parameters.api_attributes)
+        return self.client.api.load(COLLECTION, params=params).get('items', [])
+
+
+class ArgumentSpec(object):
+    def __init__(self):
+        self.supports_check_mode = True
+        argument_spec = dict(
+            name=dict(type='list'),
+            id=dict(type='list'),
+            partition=dict(type='list')
+        )
+        self.argument_spec = {}
+        self.argument_spec.update(f5_argument_spec)
+        self.argument_spec.update(argument_spec)
+
+
+def main():
+    spec = ArgumentSpec()
 
     module = AnsibleModule(
-        argument_spec=argument_spec,
-        supports_check_mode=True
+        argument_spec=spec.argument_spec,
+        supports_check_mode=spec.supports_check_mode
     )
+    if not HAS_REQUESTS:
+        module.fail_json(msg="The python requests module is required")
 
     try:
-        obj = BigIpRouteDomainFacts(**module.params)
-        result = obj.flush()
-
-        module.exit_json(changed=True, bigip=result)
-    except F5ModuleError as e:
-        module.fail_json(msg=e.message)
+        client = F5RestClient(socket_path=module._socket_path, **module.params)
+        mm = ModuleManager(module=module, client=client)
+        if client.timings:
+            client.timings.instrument(mm)
+        results = mm.exec_module()
+        cleanup_tokens(client)
+        if client.timings:
+            results['_timings'] = client.timings.to_return()
+        module.exit_json(**results)
+    except F5ModuleError as ex:
+        cleanup_tokens(client)
+        module.fail_json(msg=str(ex))
 
-from ansible.module_utils.basic import *
-from ansible.module_utils.f5_utils import *
 
 if __name__ == '__main__':
     main()
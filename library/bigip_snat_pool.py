@@ -44,6 +44,12 @@ options:
 notes:
    - Requires the netaddr Python package on the host. This is as easy as
      pip install netaddr
+   - The C(provider) also takes the client options C(token_cache)
+     (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+     (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+     (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+     default 3), which may also be set with the environment variables given.
+     They are described in the client options page of the documentation.
 extends_documentation_fragment: f5
 author:
   - Tim Rupp (@caphrim007)
@@ -412,7 +418,7 @@ def main():
         module.fail_json(msg="The python netaddr module is required")
 
     try:
-        client = F5Client(**module.params)
+        client = F5Client(socket_path=module._socket_path, **module.params)
         mm = ModuleManager(module=module, client=client)
         results = mm.exec_module()
         cleanup_tokens(client)
@@ -110,11 +110,28 @@ options:
        - This parameter also makes the C(software_md5sum) and C(hotfix_md5sum)
          mandatory when C(state is C(present), C(activated) or C(installed).
     default: 'no'
+  async_job:
+    description:
+      - When C(yes), the module returns a C(job) as soon as the software
+        starts installing, or the device starts rebooting into it, instead of
+        waiting for it to finish.
+      - The job is checked on with the C(bigip_job_status) module.
+      - Uploading the images is not part of the job; the module still waits
+        for that.
+    default: no
+    type: bool
+    version_added: 2.6
 notes:
   - Requires the isoparser Python package on the host. This can be installed
     with pip install isoparser
   - Requires the lxml Python package on the host. This can be installed
     with pip install lxml
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
 extends_documentation_fragment: f5
 requirements:
   - isoparser
@@ -331,6 +348,31 @@ EXAMPLES = r'''
     state: activated
     reuse_inactive_volume: True
   delegate_to: localhost
+
+- name: Start activating a base image without waiting for the install and reboot
+  bigip_software:
+    server: lb.mydomain.com
+    user: admin
+    password: secret
+    software: /root/BIGIP-11.6.0.0.0.401.iso
+    volume: HD1.2
+    state: activated
+    async_job: yes
+  delegate_to: localhost
+  register: result
+
+- name: Wait for the device to run the new software
+  bigip_job_status:
+    server: lb.mydomain.com
+    user: admin
+    password: secret
+    jobs:
+      - "{{ result.job }}"
+  delegate_to: localhost
+  register: status
+  until: status.finished
+  retries: 120
+  delay: 30
 '''
 
 RETURN = r'''
@@ -384,12 +426,16 @@ volume:
   returned: changed
   type: string
   sample: HD1.2
+job:
+  description: The install or activation job, for the C(bigip_job_status) module.
+  returned: changed and C(async_job) is C(yes)
+  type: dict
+  sample: {"type": "software", "volume": "HD1.2", "version": "12.1.2", "activate": true}
 '''
 
 import io
 import isoparser
 import os
-import time
 
 from ansible.module_utils.basic import AnsibleModule
 from lxml import etree
@@ -402,6 +448,8 @@ try:
     from library.module_utils.network.f5.bigip import HAS_F5SDK
     from library.module_utils.network.f5.bigip import F5Client
     from library.module_utils.network.f5.common import F5ModuleError
+    from library.module_utils.network.f5.common import F5Poller
+    from library.module_utils.network.f5.common import F5PollTimeout
     from library.module_utils.network.f5.common import AnsibleF5Parameters
     from library.module_utils.network.f5.common import cleanup_tokens
     from library.module_utils.network.f5.common import fqdn_name
@@ -416,6 +464,8 @@ except ImportError:
     from ansible.module_utils.network.f5.bigip import HAS_F5SDK
     from ansible.module_utils.network.f5.bigip import F5Client
     from ansible.module_utils.network.f5.common import F5ModuleError
+    from ansible.module_utils.network.f5.common import F5Poller
+    from ansible.module_utils.network.f5.common import F5PollTimeout
     from ansible.module_utils.network.f5.common import AnsibleF5Parameters
     from ansible.module_utils.network.f5.common import cleanup_tokens
     from ansible.module_utils.network.f5.common import fqdn_name
@@ -748,6 +798,7 @@ class BaseManager(object):
         self.have = None
         self.want = Parameters(client=self.client, params=self.module.params)
         self.changes = Changes()
+        self.job = None
 
     def exec_module(self):
         changed = False
@@ -769,6 +820,8 @@ class BaseManager(object):
         changes = self.changes.to_return()
         result.update(**changes)
         result.update(dict(changed=changed))
+        if self.job:
+            result['job'] = self.job
         return result
 
     def _set_changed_options(self):
@@ -799,7 +852,8 @@ class BaseManager(object):
             return self.activate()
         else:
             self.install_volume()
-            self.wait_for_device_reboot()
+            if not self.want.async_job:
+                self.wait_for_device_reboot()
             return True
 
     def is_activated(self):
@@ -829,7 +883,10 @@ class BaseManager(object):
         if self.module.check_mode:
             return True
         self.reboot_volume_on_device()
-        self.wait_for_device_reboot()
+        if self.want.async_job:
+            self.job = self.get_job()
+        else:
+            self.wait_for_device_reboot()
         return True
 
     def present(self):
@@ -869,7 +926,19 @@ class BaseManager(object):
                 raise F5ModuleError(
                     'Base image of version: {0} must exist to install this hotfix.'.format(version)
                 )
-        self.wait_for_software_install_on_device()
+        if self.want.async_job:
+            self.job = self.get_job()
+        else:
+            self.wait_for_software_install_on_device()
+
+    def get_job(self):
+        return dict(
+            type='software',
+            volume=self.want.volume,
+            version=self.want.version,
+            build=self.want.build,
+            activate=self.want.state == 'activated'
+        )
 
     def upload(self):
         software_path = self.want.software
@@ -937,67 +1006,70 @@ class BaseManager(object):
             return False
 
     def _device_reconnect(self):
-        self.client.api = self.client._get_mgmt_root(
-            'bigip', **self.client._connect_params
-        )
+        self.client.reconnect()
+
+    def get_poller(self, name, **kwargs):
+        return F5Poller(name, timings=getattr(self.client, 'timings', None), **kwargs)
 
     def wait_for_images(self, count, hotfix=False):
         current = len(count)
         if hotfix:
-            while True:
-                if len(self.list_hotfixes_on_device()) != current:
-                    break
-            time.sleep(1)
+            list_images = self.list_hotfixes_on_device
         else:
-            while True:
-                if len(self.list_images_on_device()) != current:
-                    break
-            time.sleep(1)
+            list_images = self.list_images_on_device
+        poller = self.get_poller('the image to be listed', delay=1, max_delay=5, timeout=600)
+        poller.wait(lambda: len(list_images()) != current)
+
+    def _is_volume_active_on_device(self):
+        self._device_reconnect()
+        volume = self.client.api.tm.sys.software.volumes.volume.load(
+            name=self.want.volume
+        )
+        return hasattr(volume, 'active') and volume.active is True
 
     def wait_for_device_reboot(self):
-        vol = self.want.volume
-        while True:
-            time.sleep(5)
-            try:
-                self._device_reconnect()
-                volume = self.client.api.tm.sys.software.volumes.volume.load(
-                    name=vol
-                )
-                if hasattr(volume, 'active') and volume.active is True:
-                    break
-            except Exception:
-                # Handle all exceptions because if the system is offline (for a
-                # reboot) the REST client will raise exceptions about
-                # connections
-                pass
+        poller = self.get_poller(
+            'the device to reboot', delay=5, max_delay=30, timeout=3600, initial_delay=5
+        )
+
+        # Handle all exceptions because if the system is offline (for a
+        # reboot) the REST client will raise exceptions about connections
+        poller.wait(self._is_volume_active_on_device, ignore=Exception)
 
     def wait_for_software_install_on_device(self):
         # We need to delay this slightly in case the the volume needs to be
         # created first
-        for _ in range(10):
-            try:
-                if self.volume_exists_on_device():
-                    break
-            except ConnectionError:
-                pass
-            time.sleep(5)
+        poller = self.get_poller('the volume to be created', delay=5, backoff=1, timeout=50)
+        try:
+            poller.wait(self.volume_exists_on_device, ignore=ConnectionError)
+        except F5PollTimeout:
+            pass
+
         progress = self.load_volume_on_device()
-        while True:
-            time.sleep(10)
+
+        def check():
             progress.refresh()
-            status = progress.status
-            if 'complete' in status:
-                break
-            elif 'failed' in status:
-                raise F5ModuleError(status)
+            return progress.status
+
+        poller = self.get_poller(
+            'the software to install', delay=10, max_delay=60, timeout=7200, initial_delay=10
+        )
+        poller.wait(
+            check,
+            success=lambda x: 'complete' in x,
+            failure=lambda x: 'failed' in x
+        )
 
     def delete_volume_on_device(self):
         volume = self.load_volume_on_device()
         volume.delete()
-        for _ in range(10):
-            time.sleep(5)
-            if not self.volume_exists_on_device():
-                break
+        poller = self.get_poller(
+            'the volume to be deleted', delay=5, backoff=1, timeout=50, initial_delay=5
+        )
+        try:
+            poller.wait(lambda: not self.volume_exists_on_device())
+        except F5PollTimeout:
+            pass
 
     def get_current_active(self):
         volumes = self.list_volumes_on_device()
@@ -1279,7 +1351,11 @@ class ArgumentSpec(object):
             ),
             volume=dict(),
             software_md5sum=dict(),
-            hotfix_md5sum=dict()
+            hotfix_md5sum=dict(),
+            async_job=dict(
+                type='bool',
+                default='no'
+            )
         )
         self.argument_spec = {}
         self.argument_spec.update(f5_argument_spec)
@@ -1301,10 +1377,14 @@ def main():
         module.fail_json(msg="The python f5-sdk module is required")
 
     try:
-        client = F5Client(**module.params)
+        client = F5Client(socket_path=module._socket_path, **module.params)
         mm = ModuleManager(module=module, client=client)
+        if client.timings:
+            client.timings.instrument(mm)
         results = mm.exec_module()
         cleanup_tokens(client)
+        if client.timings:
+            results['_timings'] = client.timings.to_return()
         module.exit_json(**results)
     except F5ModuleError as ex:
         cleanup_tokens(client)
@@ -36,6 +36,29 @@ options:
       - Filter responses based on the attribute and value provided. Valid filters
         are required to be in C(key:value) format, with keys being one of the
         following; name, build, version, status, active.
+      - A list of filters may be specified. Objects must match a filter on
+        each of the keys given, and match any of the values given for a key.
+  dest:
+    description:
+      - Path of a file to stream the facts to, instead of returning them.
+      - Each line of the file is a JSON object with the C(section) that the
+        facts belong to, and the C(facts) of one image, hotfix or volume.
+        Only the number of objects in each section is returned.
+      - Collections are read a page at a time, so memory use does not grow
+        with the number of objects.
+    version_added: 2.6
+  page_size:
+    description:
+      - Number of objects to read in each request when C(dest) is specified.
+    default: 100
+    version_added: 2.6
+notes:
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
 extends_documentation_fragment: f5
 author:
   - Wojciech Wypior (@wojtek0806)
@@ -50,6 +73,25 @@ EXAMPLES = r'''
     include: image
     filter: version:12.1.1
   delegate_to: localhost
+
+- name: Gather facts of the volumes with a complete 13.1.0 install
+  bigip_software_facts:
+    server: lb.mydomain.com
+    user: admin
+    password: secret
+    include: volume
+    filter:
+      - version:13.1.0
+      - status:complete
+  delegate_to: localhost
+
+- name: Write the software facts to a file
+  bigip_software_facts:
+    server: lb.mydomain.com
+    user: admin
+    password: secret
+    dest: /tmp/software.jsonl
+  delegate_to: localhost
 '''
 
 RETURN = r'''
@@ -92,10 +134,28 @@ volumes:
         product: BIG-IP
         status: complete
         version: 12.1.1
+dest:
+  description: The file that the facts were written to.
+  returned: When C(dest) is specified.
+  type: string
+  sample: /tmp/software.jsonl
+counts:
+  description: Number of objects written to C(dest) for each section.
+  returned: When C(dest) is specified.
+  type: dict
+  sample: {"images": 8, "hotfixes": 5, "volumes": 4}
+total:
+  description: Number of objects written to C(dest).
+  returned: When C(dest) is specified.
+  type: int
+  sample: 17
 '''
 
+from collections import defaultdict
+
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.six import iteritems
+from ansible.module_utils.six import string_types
 
 HAS_DEVEL_IMPORTS = False
 
@@ -108,6 +168,9 @@ try:
     from library.module_utils.network.f5.common import cleanup_tokens
     from library.module_utils.network.f5.common import fqdn_name
     from library.module_utils.network.f5.common import f5_argument_spec
+    from library.module_utils.network.f5.common import iter_pages
+    from library.module_utils.network.f5.common import map_requests
+    from library.module_utils.network.f5.config import F5FactsWriter
     try:
         from library.module_utils.network.f5.common import iControlUnexpectedHTTPError
     except ImportError:
@@ -122,6 +185,9 @@ except ImportError:
     from ansible.module_utils.network.f5.common import cleanup_tokens
     from ansible.module_utils.network.f5.common import fqdn_name
     from ansible.module_utils.network.f5.common import f5_argument_spec
+    from ansible.module_utils.network.f5.common import iter_pages
+    from ansible.module_utils.network.f5.common import map_requests
+    from ansible.module_utils.network.f5.config import F5FactsWriter
     try:
         from ansible.module_utils.network.f5.common import iControlUnexpectedHTTPError
     except ImportError:
@@ -153,15 +219,20 @@ class Parameters(AnsibleF5Parameters):
     @property
     def filter(self):
         requested = self._values['filter']
-        keys = ['name', 'build', 'version', 'status', 'active']
-        error = '"{0}" is not a valid filter format. Filters must have key:value format'.format(requested)
         if requested is None:
             return None
+        if isinstance(requested, string_types):
+            requested = [requested]
+        return [self._parse_filter(x) for x in requested]
+
+    def _parse_filter(self, requested):
+        keys = ['name', 'build', 'version', 'status', 'active']
+        error = '"{0}" is not a valid filter format. Filters must have key:value format'.format(requested)
 
         if ':' not in requested:
             raise F5ModuleError(error)
 
-        key, value = requested.split(':')
+        key, value = requested.split(':', 1)
 
         if len(key) == 0 or len(value) == 0:
             raise F5ModuleError(error)
@@ -191,14 +262,24 @@ class ModuleManager(object):
             names = ['image', 'hotfix', 'volume']
         else:
             names = self.include
+        if self.want.dest:
+            return self.write_facts_to_file(names)
         managers = [self.get_manager(name) for name in names]
         result = self.execute_managers(managers)
         return result
 
+    def write_facts_to_file(self, names):
+        with F5FactsWriter(self.want.dest) as writer:
+            self.kwargs['writer'] = writer
+            managers = [self.get_manager(name) for name in names]
+            self.execute_managers(managers)
+        result = writer.to_return()
+        result['changed'] = True
+        return result
+
     def execute_managers(self, managers):
         results = dict(changed=False)
-        for manager in managers:
-            result = manager.exec_module()
+        for result in map_requests(self.client, lambda x: x.exec_module(), managers):
             for k, v in iteritems(result):
                 if k == 'changed':
                     if v is True:
@@ -223,9 +304,10 @@ class BaseManager(object):
         self.have = None
         self.want = Parameters(params=self.module.params)
         self.changes = Changes()
+        self.writer = kwargs.get('writer', None)
 
         self.result = dict()
-        self.filter = self.want.filter
+        self.filter = self.get_filter()
 
     def exec_module(self):
         result = dict()
@@ -237,29 +319,107 @@ class BaseManager(object):
     def _filter_and_format_facts(self, fact):
         filtered = dict()
         listing = fact.attrs
-        for k, v in listing.viewitems():
+        for k, v in iteritems(listing):
             if k in Parameters.returnables:
                 filtered[str(k)] = str(v)
         return filtered
 
+    def get_filter(self):
+        """Returns the values that each filtered attribute may have
+        """
+        if self.want.filter is None:
+            return None
+        result = defaultdict(set)
+        for key, value in self.want.filter:
+            result[key].add(self._normalize(value))
+        return dict(result)
+
+    def _normalize(self, value):
+        # Booleans, such as the active attribute of a volume, are matched
+        # by the values true and false, in any case.
+        if isinstance(value, bool) or str(value).lower() in ['true', 'false']:
+            return str(value).lower()
+        return str(value)
+
+    def _get_value(self, item, key):
+        # Only the active volume has the active attribute.
+        default = False if key == 'active' else None
+        return getattr(item, key, default)
+
+    def matches(self, item):
+        for key, values in iteritems(self.filter):
+            if self._normalize(self._get_value(item, key)) not in values:
+                return False
+        return True
+
+    def build_index(self, items):
+        """Returns the positions of the items with each value of each filtered attribute
+        """
+        result = dict((key, defaultdict(set)) for key in self.filter)
+        for position, item in enumerate(items):
+            for key, index in iteritems(result):
+                value = self._get_value(item, key)
+                if value is not None:
+                    index[self._normalize(value)].add(position)
+        return result
+
+    def select(self, items):
+        """Returns the items that match the filter, in their original order
+
+        The items are indexed once by each filtered attribute. The positions
+        matching any value of an attribute are then intersected across the
+        attributes, instead of matching every item against every filter.
+        """
+        index = self.build_index(items)
+        positions = None
+        for key, values in iteritems(self.filter):
+            matched = set()
+            for value in values:
+                matched |= index[key].get(value, set())
+            positions = matched if positions is None else positions & matched
+        return [items[x] for x in sorted(positions)]
+
     def collection_parser(self, collection):
         output = list()
         if self.filter is None:
-            for item in collection:
-                output.append(self._filter_and_format_facts(item))
+            selected = collection
+        elif self.writer is not None:
+            # Streamed pages are only read once, so each item is matched as
+            # its page is read instead of being indexed.
+            selected = (x for x in collection if self.matches(x))
         else:
-            bools = ['true', 'True', 'false', 'False']
-            key, value = self.filter
-            if value in bools:
-                value = bool(value)
-            for item in collection:
-                if hasattr(item, key):
-                    if getattr(item, key) == value:
-                        output.append(self._filter_and_format_facts(item))
+            selected = self.select(list(collection))
+        for item in selected:
+            self.add_facts(output, self._filter_and_format_facts(item))
         return output
 
+    def add_facts(self, output, facts):
+        if self.writer is None:
+            output.append(facts)
+        else:
+            self.writer.write(self.section, facts)
+
+    def read_collection(self, collection):
+        """Returns the resources of a collection
+
+        When the facts are streamed to a file, the collection is read a page
+        at a time instead of all at once.
+        """
+        if self.writer is None:
+            return collection.get_collection()
+        return iter_pages(
+            lambda top, skip: collection.get_collection(
+                requests_params=dict(
+                    params='$top={0}&$skip={1}'.format(top, skip)
+                )
+            ),
+            self.want.page_size or 100
+        )
+
 
 class ImageFactManager(BaseManager):
+    section = 'images'
+
     def get_facts(self):
         to_return = dict()
         collection = self.get_facts_from_device()
@@ -267,11 +427,12 @@ class ImageFactManager(BaseManager):
         return to_return
 
     def get_facts_from_device(self):
-        images = self.client.api.tm.sys.software.images.get_collection()
-        return images
+        return self.read_collection(self.client.api.tm.sys.software.images)
 
 
 class HotfixFactManager(BaseManager):
+    section = 'hotfixes'
+
     def get_facts(self):
         to_return = dict()
         collection = self.get_facts_from_device()
@@ -279,11 +440,12 @@ class HotfixFactManager(BaseManager):
         return to_return
 
     def get_facts_from_device(self):
-        hotfixes = self.client.api.tm.sys.software.hotfix_s.get_collection()
-        return hotfixes
+        return self.read_collection(self.client.api.tm.sys.software.hotfix_s)
 
 
 class VolumeFactManager(BaseManager):
+    section = 'volumes'
+
     def get_facts(self):
         to_return = dict()
         collection = self.get_facts_from_device()
@@ -291,8 +453,7 @@ class VolumeFactManager(BaseManager):
         return to_return
 
     def get_facts_from_device(self):
-        volumes = self.client.api.tm.sys.software.volumes.get_collection()
-        return volumes
+        return self.read_collection(self.client.api.tm.sys.software.volumes)
 
 
 class ArgumentSpec(object):
@@ -303,7 +464,9 @@ class ArgumentSpec(object):
                 type='list',
                 default=['all'],
             ),
-            filter=dict()
+            filter=dict(type='list'),
+            dest=dict(type='path'),
+            page_size=dict(type='int', default=100)
         )
         self.argument_spec = {}
         self.argument_spec.update(f5_argument_spec)
@@ -321,7 +484,7 @@ def main():
         module.fail_json(msg="The python f5-sdk module is required")
 
     try:
-        client = F5Client(**module.params)
+        client = F5Client(socket_path=module._socket_path, **module.params)
         mm = ModuleManager(module=module, client=client)
         results = mm.exec_module()
         cleanup_tokens(client)
@@ -79,6 +79,12 @@ options:
 notes:
   - Requires the netaddr Python package on the host. This is as easy as pip
     install netaddr.
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
 extends_documentation_fragment: f5
 requirements:
     - netaddr
@@ -143,9 +149,11 @@ try:
     from library.module_utils.network.f5.bigip import F5Client
     from library.module_utils.network.f5.common import F5ModuleError
     from library.module_utils.network.f5.common import AnsibleF5Parameters
+    from library.module_utils.network.f5.common import F5CollectionIndex
     from library.module_utils.network.f5.common import cleanup_tokens
     from library.module_utils.network.f5.common import fqdn_name
     from library.module_utils.network.f5.common import f5_argument_spec
+    from library.module_utils.network.f5.common import filter_params
     try:
         from library.module_utils.network.f5.common import iControlUnexpectedHTTPError
     except ImportError:
@@ -157,9 +165,11 @@ except ImportError:
     from ansible.module_utils.network.f5.bigip import F5Client
     from ansible.module_utils.network.f5.common import F5ModuleError
     from ansible.module_utils.network.f5.common import AnsibleF5Parameters
+    from ansible.module_utils.network.f5.common import F5CollectionIndex
     from ansible.module_utils.network.f5.common import cleanup_tokens
     from ansible.module_utils.network.f5.common import fqdn_name
     from ansible.module_utils.network.f5.common import f5_argument_spec
+    from ansible.module_utils.network.f5.common import filter_params
     try:
         from ansible.module_utils.network.f5.common import iControlUnexpectedHTTPError
     except ImportError:
@@ -256,6 +266,7 @@ class ModuleManager(object):
         self.have = None
         self.want = Parameters(params=self.module.params)
         self.changes = Changes()
+        self.routes = F5CollectionIndex(self.read_routes_from_device)
 
     def _set_changed_options(self):
         changed = {}
@@ -297,12 +308,15 @@ class ModuleManager(object):
         return result
 
     def exists(self):
-        collection = self.client.api.tm.net.routes.get_collection()
-        for resource in collection:
-            if resource.name == self.want.name:
-                if resource.partition == self.want.partition:
-                    return True
-        return False
+        return fqdn_name(self.want.partition, self.want.name) in self.routes
+
+    def read_routes_from_device(self):
+        # Only the routes in the partition are fetched, and only their names.
+        params = filter_params(partition=self.want.partition)
+        params['$select'] = 'name,partition'
+        return self.client.api.tm.net.routes.get_collection(
+            requests_params=dict(params=params)
+        )
 
     def present(self):
         if self.exists():
@@ -373,6 +387,7 @@ class ModuleManager(object):
             partition=self.want.partition,
             **params
         )
+        self.routes.invalidate()
 
     def absent(self):
         if self.exists():
@@ -394,6 +409,7 @@ class ModuleManager(object):
         )
         if result:
             result.delete()
+        self.routes.invalidate()
 
 
 class ArgumentSpec(object):
@@ -437,7 +453,7 @@ def main():
         module.fail_json(msg="The python netaddr module is required")
 
     try:
-        client = F5Client(**module.params)
+        client = F5Client(socket_path=module._socket_path, **module.params)
         mm = ModuleManager(module=module, client=client)
         results = mm.exec_module()
         cleanup_tokens(client)
@@ -40,6 +40,12 @@ options:
         are required.
 notes:
   - Requires BIG-IP version 12.0.0 or greater
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
 extends_documentation_fragment: f5
 author:
   - Tim Rupp (@caphrim007)
@@ -98,31 +104,21 @@ HAS_DEVEL_IMPORTS = False
 
 try:
     # Sideband repository used for dev
-    from library.module_utils.network.f5.bigip import HAS_F5SDK
-    from library.module_utils.network.f5.bigip import F5Client
+    from library.module_utils.network.f5.icontrol import HAS_REQUESTS
+    from library.module_utils.network.f5.icontrol import F5RestClient
     from library.module_utils.network.f5.common import F5ModuleError
     from library.module_utils.network.f5.common import AnsibleF5Parameters
     from library.module_utils.network.f5.common import cleanup_tokens
-    from library.module_utils.network.f5.common import fqdn_name
     from library.module_utils.network.f5.common import f5_argument_spec
-    try:
-        from library.module_utils.network.f5.common import iControlUnexpectedHTTPError
-    except ImportError:
-        HAS_F5SDK = False
     HAS_DEVEL_IMPORTS = True
 except ImportError:
     # Upstream Ansible
-    from ansible.module_utils.network.f5.bigip import HAS_F5SDK
-    from ansible.module_utils.network.f5.bigip import F5Client
+    from ansible.module_utils.network.f5.icontrol import HAS_REQUESTS
+    from ansible.module_utils.network.f5.icontrol import F5RestClient
     from ansible.module_utils.network.f5.common import F5ModuleError
     from ansible.module_utils.network.f5.common import AnsibleF5Parameters
     from ansible.module_utils.network.f5.common import cleanup_tokens
-    from ansible.module_utils.network.f5.common import fqdn_name
     from ansible.module_utils.network.f5.common import f5_argument_spec
-    try:
-        from ansible.module_utils.network.f5.common import iControlUnexpectedHTTPError
-    except ImportError:
-        HAS_F5SDK = False
 
 
 class Parameters(AnsibleF5Parameters):
@@ -182,13 +178,10 @@ class ModuleManager(object):
         result = dict()
         state = self.want.state
 
-        try:
-            if state == "present":
-                changed = self.present()
-            elif state == "reset":
-                changed = self.reset()
-        except iControlUnexpectedHTTPError as e:
-            raise F5ModuleError(str(e))
+        if state == "present":
+            changed = self.present()
+        elif state == "reset":
+            changed = self.reset()
 
         changes = self.changes.to_return()
         result.update(**changes)
@@ -196,17 +189,16 @@ class ModuleManager(object):
         return result
 
     def read_current_from_device(self):
-        resource = self.client.api.tm.sys.dbs.db.load(
-            name=self.want.key
+        result = self.client.api.load(
+            '/mgmt/tm/sys/db/{0}'.format(self.want.key)
         )
-        result = resource.attrs
         return Parameters(params=result)
 
     def exists(self):
-        resource = self.client.api.tm.sys.dbs.db.load(
-            name=self.want.key
+        resource = self.client.api.load(
+            '/mgmt/tm/sys/db/{0}'.format(self.want.key)
         )
-        if str(resource.value) == str(self.want.value):
+        if str(resource.get('value')) == str(self.want.value):
             return True
         return False
 
@@ -237,10 +229,9 @@ class ModuleManager(object):
 
     def update_on_device(self):
         params = self.want.api_params()
-        resource = self.client.api.tm.sys.dbs.db.load(
-            name=self.want.key
+        self.client.api.modify(
+            '/mgmt/tm/sys/db/{0}'.format(self.want.key), params
         )
-        resource.update(**params)
 
     def reset(self):
         self.have = self.read_current_from_device()
@@ -259,10 +250,10 @@ class ModuleManager(object):
             )
 
     def reset_on_device(self):
-        resource = self.client.api.tm.sys.dbs.db.load(
-            name=self.want.key
+        self.client.api.modify(
+            '/mgmt/tm/sys/db/{0}'.format(self.want.key),
+            dict(value=self.have.default_value)
         )
-        resource.update(value=self.have.default_value)
 
 
 class ArgumentSpec(object):
@@ -288,14 +279,18 @@ def main():
         argument_spec=spec.argument_spec,
         supports_check_mode=spec.supports_check_mode
     )
-    if not HAS_F5SDK:
-        module.fail_json(msg="The python f5-sdk module is required")
+    if not HAS_REQUESTS:
+        module.fail_json(msg="The python requests module is required")
 
     try:
-        client = F5Client(**module.params)
+        client = F5RestClient(socket_path=module._socket_path, **module.params)
         mm = ModuleManager(module=module, client=client)
+        if client.timings:
+            client.timings.instrument(mm)
         results = mm.exec_module()
         cleanup_tokens(client)
+        if client.timings:
+            results['_timings'] = client.timings.to_return()
         module.exit_json(**results)
     except F5ModuleError as ex:
         cleanup_tokens(client)
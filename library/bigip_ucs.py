@@ -86,6 +86,15 @@ options:
       - absent
       - installed
       - present
+  async_job:
+    description:
+      - When C(yes), the UCS is loaded in the background, and the module
+        returns a C(job) at once instead of waiting for the configuration to
+        reload.
+      - The job is checked on with the C(bigip_job_status) module.
+    default: no
+    type: bool
+    version_added: 2.6
 notes:
    - Only the most basic checks are performed by this module. Other checks and
      considerations need to be taken into account. See the following URL.
@@ -107,6 +116,12 @@ notes:
    - This module does not support re-licensing a BIG-IP restored from a UCS
    - This module does not support restoring encrypted archives on replacement
      RMA units.
+   - The C(provider) also takes the client options C(token_cache)
+     (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+     (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+     (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+     default 3), which may also be set with the environment variables given.
+     They are described in the client options page of the documentation.
 extends_documentation_fragment: f5
 author:
   - Tim Rupp (@caphrim007)
@@ -170,15 +185,29 @@ EXAMPLES = r'''
     ucs: bigip.localhost.localdomain.ucs
     state: absent
   delegate_to: localhost
+
+- name: Start installing a UCS without waiting for the configuration to reload
+  bigip_ucs:
+    server: lb.mydomain.com
+    user: admin
+    password: secret
+    ucs: /root/bigip.localhost.localdomain.ucs
+    state: installed
+    async_job: yes
+  delegate_to: localhost
+  register: result
 '''
 
 RETURN = r'''
-# only common fields returned
+job:
+  description: The job loading the UCS, for the C(bigip_job_status) module.
+  returned: changed and C(async_job) is C(yes)
+  type: dict
+  sample: {"type": "ucs", "ucs": "bigip.localhost.localdomain.ucs"}
 '''
 
 import os
 import re
-import time
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.six import iteritems
@@ -191,10 +220,14 @@ try:
     from library.module_utils.network.f5.bigip import HAS_F5SDK
     from library.module_utils.network.f5.bigip import F5Client
     from library.module_utils.network.f5.common import F5ModuleError
+    from library.module_utils.network.f5.common import F5Poller
+    from library.module_utils.network.f5.common import F5PollTimeout
     from library.module_utils.network.f5.common import AnsibleF5Parameters
     from library.module_utils.network.f5.common import cleanup_tokens
     from library.module_utils.network.f5.common import fqdn_name
     from library.module_utils.network.f5.common import f5_argument_spec
+    from library.module_utils.network.f5.jobs import background_command
+    from library.module_utils.network.f5.jobs import get_job_marker
     try:
         from library.module_utils.network.f5.common import iControlUnexpectedHTTPError
     except ImportError:
@@ -205,10 +238,14 @@ except ImportError:
     from ansible.module_utils.network.f5.bigip import HAS_F5SDK
     from ansible.module_utils.network.f5.bigip import F5Client
     from ansible.module_utils.network.f5.common import F5ModuleError
+    from ansible.module_utils.network.f5.common import F5Poller
+    from ansible.module_utils.network.f5.common import F5PollTimeout
     from ansible.module_utils.network.f5.common import AnsibleF5Parameters
     from ansible.module_utils.network.f5.common import cleanup_tokens
     from ansible.module_utils.network.f5.common import fqdn_name
     from ansible.module_utils.network.f5.common import f5_argument_spec
+    from ansible.module_utils.network.f5.jobs import background_command
+    from ansible.module_utils.network.f5.jobs import get_job_marker
     try:
         from ansible.module_utils.network.f5.common import iControlUnexpectedHTTPError
     except ImportError:
@@ -344,6 +381,7 @@ class BaseManager(object):
         self.client = kwargs.get('client', None)
         self.want = Parameters(params=self.module.params)
         self.changes = Parameters()
+        self.job = None
 
     def exec_module(self):
         changed = False
@@ -361,6 +399,8 @@ class BaseManager(object):
         changes = self.changes.to_return()
         result.update(**changes)
         result.update(dict(changed=changed))
+        if self.job:
+            result['job'] = self.job
         return result
 
     def present(self):
@@ -411,44 +451,51 @@ class BaseManager(object):
             raise F5ModuleError("Failed to delete the UCS file")
         return True
 
-    def wait_for_rest_api_restart(self):
-        time.sleep(5)
-        for x in range(0, 60):
-            try:
-                self.client.reconnect()
-                break
-            except Exception:
-                time.sleep(3)
+    def get_poller(self, name, **kwargs):
+        return F5Poller(name, timings=getattr(self.client, 'timings', None), **kwargs)
 
-    def wait_for_configuration_reload(self):
-        noops = 0
-        while noops < 4:
-            time.sleep(3)
-            try:
-                output = self.client.api.tm.util.bash.exec_cmd(
-                    'run',
-                    utilCmdArgs='-c "tmsh show sys mcp-state"'
-                )
-            except Exception as ex:
-                # This can be caused by restjavad restarting.
-                continue
+    def wait_for_rest_api_restart(self):
+        poller = self.get_poller(
+            'the REST API to restart', delay=3, max_delay=10, timeout=185, initial_delay=5
+        )
+        try:
+            poller.wait(self.client.reconnect, success=lambda x: True, ignore=Exception)
+        except F5PollTimeout:
+            pass
 
-            if not hasattr(output, 'commandResult'):
-                continue
+    def _read_mcp_state_from_device(self):
+        try:
+            output = self.client.api.tm.util.bash.exec_cmd(
+                'run',
+                utilCmdArgs='-c "tmsh show sys mcp-state"'
+            )
+        except Exception as ex:
+            # This can be caused by restjavad restarting.
+            return None
+        if not hasattr(output, 'commandResult'):
+            return None
+        return output.commandResult
+
+    def _is_config_reloaded(self, result):
+        if result is None:
+            return False
+        if self._is_config_reloading_success_on_device(result):
+            if self._is_config_reloading_running_on_device(result):
+                return True
+        return False
 
-            # Need to re-connect here because the REST framework will be restarting
-            # and thus be clearing its authorization cache
-            result = output.commandResult
-            if self._is_config_reloading_failed_on_device(result):
-                raise F5ModuleError(
-                    "Failed to reload the configuration. This may be due "
-                    "to a cross-version incompatibility. {0}".format(result)
-                )
-            if self._is_config_reloading_success_on_device(result):
-                if self._is_config_reloading_running_on_device(result):
-                    noops += 1
-                    continue
-            noops = 0
+    def wait_for_configuration_reload(self):
+        poller = self.get_poller(
+            'the configuration to reload', delay=3, max_delay=15, timeout=1800,
+            initial_delay=3, required=4
+        )
+        poller.wait(
+            self._read_mcp_state_from_device,
+            success=self._is_config_reloaded,
+            failure=lambda x: x is not None and self._is_config_reloading_failed_on_device(x),
+            error=lambda x: "Failed to reload the configuration. This may be due "
+                            "to a cross-version incompatibility. {0}".format(x)
+        )
 
     def _is_config_reloading_success_on_device(self, output):
         succeed = r'Last Configuration Load Status\s+full-config-load-succeed'
@@ -532,6 +579,8 @@ class V1Manager(BaseManager):
         return False
 
     def install_on_device(self):
+        if self.want.async_job:
+            return self.start_job_on_device()
         try:
             self.client.api.tm.util.bash.exec_cmd(
                 'run',
@@ -551,6 +600,19 @@ class V1Manager(BaseManager):
         self.wait_for_configuration_reload()
         return True
 
+    def start_job_on_device(self):
+        marker = get_job_marker(self.want.basename)
+        self.client.api.tm.util.bash.exec_cmd(
+            'run',
+            utilCmdArgs=background_command(self.want.install_command, marker)
+        )
+        self.job = dict(
+            type='ucs',
+            ucs=self.want.basename,
+            marker=marker
+        )
+        return True
+
 
 class V2Manager(V1Manager):
     """Manager class for V2 product
@@ -600,6 +662,10 @@ class ArgumentSpec(object):
                 default='present',
                 choices=['absent', 'installed', 'present']
             ),
+            async_job=dict(
+                type='bool',
+                default='no'
+            ),
             ucs=dict(required=True)
         )
         self.argument_spec = {}
@@ -618,10 +684,14 @@ def main():
         module.fail_json(msg="The python f5-sdk module is required")
 
     try:
-        client = F5Client(**module.params)
+        client = F5Client(socket_path=module._socket_path, **module.params)
         mm = ModuleManager(module=module, client=client)
+        if client.timings:
+            client.timings.instrument(mm)
         results = mm.exec_module()
         cleanup_tokens(client)
+        if client.timings:
+            results['_timings'] = client.timings.to_return()
         module.exit_json(**results)
     except F5ModuleError as ex:
         cleanup_tokens(client)
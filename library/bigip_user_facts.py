@@ -1,7 +1,7 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 #
-# Copyright (c) 2016 F5 Networks Inc.
+# Copyright (c) 2017 F5 Networks Inc.
 # GNU General Public License v3.0 (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
 
 from __future__ import absolute_import, division, print_function
@@ -22,10 +22,26 @@ version_added: "2.2"
 options:
   username_credential:
     description:
-      - Name of the user to retrieve facts for
-    required: true
+      - Names of the users to retrieve facts for. Each name may be a
+        shell-style glob matching string.
+      - When no names are given, every user is retrieved.
+    aliases:
+      - name
+  partition:
+    description:
+      - Partitions that the users must have access to. Users with access to
+        all partitions match every partition.
 notes:
-  - Facts are placed in the C(bigip) variable
+  - Names without globs are read with one request each. Otherwise, the users
+    are read with a single request.
+  - User accounts do not reside in partitions, so they cannot be filtered
+    by partition on the device. They are filtered after they are read.
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
 extends_documentation_fragment: f5
 author:
   - Tim Rupp (@caphrim007)
@@ -40,133 +56,224 @@ EXAMPLES = r'''
     user: admin
     validate_certs: no
   delegate_to: localhost
+  register: result
 
 - name: Display the user facts
   debug:
-    var: bigip
+    var: result.users
+
+- name: Gather facts about the operators with access to a tenant
+  bigip_user_facts:
+    name: op-*
+    partition: tenant-a
+    password: secret
+    server: lb.mydomain.com
+    user: admin
+  delegate_to: localhost
 '''
 
 RETURN = r'''
-description:
-  description: The description of the user
-  returned: changed
-  type: string
-  sample: John Doe
-username_credential:
-  description: The username beign searched for
-  returned: changed
-  type: string
-  sample: jdoe
-encrypted_password:
-  description: The encrypted value of the password
-  returned: changed
-  type: string
-  sample: $6$/cgtFz0....yzv465uAJ/
-partition_access:
-  description: Access permissions for the account
-  returned: changed
-  type: list
-  sample:
-    - name: all-partitions
-      role: admin
+users:
+  description: The users that were found, ordered by their names.
+  returned: always
+  type: complex
+  contains:
+    description:
+      description: The description of the user
+      returned: changed
+      type: string
+      sample: John Doe
+    username_credential:
+      description: The name of the user
+      returned: changed
+      type: string
+      sample: jdoe
+    encrypted_password:
+      description: The encrypted value of the password
+      returned: changed
+      type: string
+      sample: $6$/cgtFz0....yzv465uAJ/
+    shell:
+      description: The shell of the user
+      returned: changed
+      type: string
+      sample: tmsh
+    partition_access:
+      description: Access permissions for the account
+      returned: changed
+      type: list
+      sample:
+        - name: all-partitions
+          role: admin
 '''
 
+import fnmatch
+import re
+
+from ansible.module_utils.basic import AnsibleModule
+
+HAS_DEVEL_IMPORTS = False
+
 try:
-    from f5.bigip import ManagementRoot
-    HAS_F5SDK = True
+    # Sideband repository used for dev
+    from library.module_utils.network.f5.icontrol import HAS_REQUESTS
+    from library.module_utils.network.f5.icontrol import F5RestClient
+    from library.module_utils.network.f5.icontrol import iControlRestError
+    from library.module_utils.network.f5.common import F5ModuleError
+    from library.module_utils.network.f5.common import AnsibleF5Parameters
+    from library.module_utils.network.f5.common import cleanup_tokens
+    from library.module_utils.network.f5.common import f5_argument_spec
+    from library.module_utils.network.f5.common import map_requests
+    HAS_DEVEL_IMPORTS = True
 except ImportError:
-    HAS_F5SDK = False
+    # Upstream Ansible
+    from ansible.module_utils.network.f5.icontrol import HAS_REQUESTS
+    from ansible.module_utils.network.f5.icontrol import F5RestClient
+    from ansible.module_utils.network.f5.icontrol import iControlRestError
+    from ansible.module_utils.network.f5.common import F5ModuleError
+    from ansible.module_utils.network.f5.common import AnsibleF5Parameters
+    from ansible.module_utils.network.f5.common import cleanup_tokens
+    from ansible.module_utils.network.f5.common import f5_argument_spec
+    from ansible.module_utils.network.f5.common import map_requests
 
 
-class BigIpUserFacts(object):
-    def __init__(self, *args, **kwargs):
-        if not HAS_F5SDK:
-            raise F5ModuleError("The python f5-sdk module is required")
-
-        self.params = kwargs
-        self.api = ManagementRoot(kwargs['server'],
-                                  kwargs['user'],
-                                  kwargs['password'],
-                                  port=kwargs['server_port'])
-
-    def exists(self):
-        username_credential = self.params['username_credential']
-        if self.api.tm.auth.users.user.exists(name=username_credential):
-            return True
-        else:
-            return False
+COLLECTION = '/mgmt/tm/auth/user'
 
-    def flush(self):
-        if self.exists:
-            result = dict(
-                changed=True,
-                ansible_facts=dict(
-                    bigip=self.read()
-                )
-            )
-        else:
-            result = dict(
-                changed=False
-            )
-        return result
+# Characters that make a name a shell-style glob.
+GLOB_CHARS = re.compile(r'[*?\[]')
+
+
+class Parameters(AnsibleF5Parameters):
+    api_map = {
+        'name': 'username_credential',
+        'encryptedPassword': 'encrypted_password',
+        'partitionAccess': 'partition_access',
+    }
 
-    def read(self):
+    api_attributes = [
+        'name', 'description', 'encryptedPassword', 'shell', 'partitionAccess'
+    ]
+
+    returnables = [
+        'username_credential', 'description', 'encrypted_password', 'shell',
+        'partition_access'
+    ]
+
+    def to_return(self):
         result = {}
+        for returnable in self.returnables:
+            result[returnable] = getattr(self, returnable)
+        result = self._filter_params(result)
+        return result
 
-        username_credential = self.params['username_credential']
-        user = self.api.tm.auth.users.user.load(name=username_credential)
 
-        result['username_credential'] = username_credential
+class ModuleParameters(AnsibleF5Parameters):
+    @property
+    def username_credential(self):
+        return self._values['username_credential'] or []
 
-        if hasattr(user, 'description'):
-            result['description'] = user.description
+    @property
+    def partition(self):
+        return self._values['partition'] or []
 
-        if hasattr(user, 'encryptedPassword'):
-            result['encrypted_password'] = user.encryptedPassword
+    @property
+    def patterns(self):
+        return [re.compile(fnmatch.translate(x)) for x in self.username_credential]
 
-        if hasattr(user, 'shell'):
-            result['shell'] = user.shell
+    @property
+    def exact_names(self):
+        """Returns the names to read one at a time, if every name is exact
+        """
+        names = self.username_credential
+        if not names or any(GLOB_CHARS.search(x) for x in names):
+            return None
+        return names
 
-        if hasattr(user, 'partitionAccess'):
-            result['partition_access'] = user.partitionAccess
 
-        return result
+class ModuleManager(object):
+    def __init__(self, *args, **kwargs):
+        self.module = kwargs.get('module', None)
+        self.client = kwargs.get('client', None)
+        self.want = ModuleParameters(params=self.module.params)
 
+    def exec_module(self):
+        users = [x for x in self.read_current_from_device() if self.matches(x)]
+        users.sort(key=lambda x: x.get('name'))
+        return dict(
+            changed=False,
+            users=[Parameters(params=x).to_return() for x in users]
+        )
 
-def cleanup_tokens(client):
-    try:
-        resource = client.api.shared.authz.tokens_s.token.load(
-            name=client.api.icrs.token
+    def matches(self, resource):
+        patterns = self.want.patterns
+        if patterns and not any(x.match(resource.get('name', '')) for x in patterns):
+            return False
+        partitions = self.want.partition
+        if partitions:
+            access = [x.get('name') for x in resource.get('partitionAccess') or []]
+            if 'all-partitions' not in access and not set(access) & set(partitions):
+                return False
+        return True
+
+    def read_current_from_device(self):
+        names = self.want.exact_names
+        if names is None:
+            return self.read_users_from_device()
+
+        # Each user is read with a single request, which is a not found error
+        # for users that do not exist, instead of an exists check and a load.
+        results = map_requests(self.client, self.read_user_from_device, names)
+        return [x for x in results if x is not None]
+
+    def read_user_from_device(self, name):
+        try:
+            return self.client.api.load('{0}/{1}'.format(COLLECTION, name))
+        except iControlRestError as ex:
+            if ex.status_code == 404:
+                return None
+            raise
+
+    def read_users_from_device(self):
+        params = {'$select': ','.join(Parameters.api_attributes)}
+        return self.client.api.load(COLLECTION, params=params).get('items', [])
+
+
+class ArgumentSpec(object):
+    def __init__(self):
+        self.supports_check_mode = True
+        argument_spec = dict(
+            username_credential=dict(type='list', aliases=['name'], no_log=False),
+            partition=dict(type='list')
         )
-        resource.delete()
-    except Exception:
-        pass
+        self.argument_spec = {}
+        self.argument_spec.update(f5_argument_spec)
+        self.argument_spec.update(argument_spec)
 
 
 def main():
-    argument_spec = f5_argument_spec()
-
-    meta_args = dict(
-        username_credential=dict(required=True, aliases=['name'], no_log=False)
-    )
-    argument_spec.update(meta_args)
+    spec = ArgumentSpec()
 
     module = AnsibleModule(
-        argument_spec=argument_spec,
-        supports_check_mode=True
+        argument_spec=spec.argument_spec,
+        supports_check_mode=spec.supports_check_mode
     )
+    if not HAS_REQUESTS:
+        module.fail_json(msg="The python requests module is required")
 
     try:
-        result = dict()
-        obj = BigIpUserFacts(check_mode=module.check_mode, **module.params)
-        result = obj.flush()
-
-        module.exit_json(**result)
-    except F5ModuleError as e:
-        module.fail_json(msg=str(e))
+        client = F5RestClient(socket_path=module._socket_path, **module.params)
+        mm = ModuleManager(module=module, client=client)
+        if client.timings:
+            client.timings.instrument(mm)
+        results = mm.exec_module()
+        cleanup_tokens(client)
+        if client.timings:
+            results['_timings'] = client.timings.to_return()
+        module.exit_json(**results)
+    except F5ModuleError as ex:
+        cleanup_tokens(client)
+        module.fail_json(msg=str(ex))
 
-from ansible.module_utils.basic import *
-from ansible.module_utils.f5_utils import *
 
 if __name__ == '__main__':
     main()
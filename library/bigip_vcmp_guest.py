@@ -126,6 +126,12 @@ notes:
     long time (60+ minutes) to reboot and bring all the guests online. The
     BIG-IP chassis will be available before all vCMP guests are online.
   - netaddr
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
 extends_documentation_fragment: f5
 author:
   - Tim Rupp (@caphrim007)
@@ -173,7 +179,6 @@ vlans:
   sample: ['/Common/vlan1', '/Common/vlan2']
 '''
 
-import time
 
 from ansible.module_utils.basic import AnsibleModule
 from ansible.module_utils.basic import env_fallback
@@ -186,6 +191,7 @@ try:
     from library.module_utils.network.f5.bigip import HAS_F5SDK
     from library.module_utils.network.f5.bigip import F5Client
     from library.module_utils.network.f5.common import F5ModuleError
+    from library.module_utils.network.f5.common import F5Poller
     from library.module_utils.network.f5.common import AnsibleF5Parameters
     from library.module_utils.network.f5.common import cleanup_tokens
     from library.module_utils.network.f5.common import fqdn_name
@@ -200,6 +206,7 @@ except ImportError:
     from ansible.module_utils.network.f5.bigip import HAS_F5SDK
     from ansible.module_utils.network.f5.bigip import F5Client
     from ansible.module_utils.network.f5.common import F5ModuleError
+    from ansible.module_utils.network.f5.common import F5Poller
     from ansible.module_utils.network.f5.common import AnsibleF5Parameters
     from ansible.module_utils.network.f5.common import cleanup_tokens
     from ansible.module_utils.network.f5.common import fqdn_name
@@ -605,12 +612,15 @@ class ModuleManager(object):
         resource = self.client.api.tm.vcmp.guests.guest.load(name=self.want.name)
         resource.modify(state='configured')
 
+    def get_poller(self, name):
+        return F5Poller(
+            name, delay=1, max_delay=10, timeout=1800, required=3,
+            timings=getattr(self.client, 'timings', None)
+        )
+
     def wait_for_configured(self):
-        nops = 0
-        while nops < 3:
-            if self.is_configured():
-                nops += 1
-            time.sleep(1)
+        poller = self.get_poller('the guest to be configured')
+        poller.wait(self.is_configured)
 
     def provision(self):
         if self.is_provisioned():
@@ -623,11 +633,8 @@ class ModuleManager(object):
         resource.modify(state='provisioned')
 
     def wait_for_provisioned(self):
-        nops = 0
-        while nops < 3:
-            if self.is_provisioned():
-                nops += 1
-            time.sleep(1)
+        poller = self.get_poller('the guest to be provisioned')
+        poller.wait(self.is_provisioned)
 
     def deploy(self):
         if self.is_deployed():
@@ -640,11 +647,8 @@ class ModuleManager(object):
         resource.modify(state='deployed')
 
     def wait_for_deployed(self):
-        nops = 0
-        while nops < 3:
-            if self.is_deployed():
-                nops += 1
-            time.sleep(1)
+        poller = self.get_poller('the guest to be deployed')
+        poller.wait(self.is_deployed)
 
 
 class ArgumentSpec(object):
@@ -691,10 +695,14 @@ def main():
         module.fail_json(msg="The python netaddr module is required")
 
     try:
-        client = F5Client(**module.params)
+        client = F5Client(socket_path=module._socket_path, **module.params)
         mm = ModuleManager(module=module, client=client)
+        if client.timings:
+            client.timings.instrument(mm)
         results = mm.exec_module()
         cleanup_tokens(client)
+        if client.timings:
+            results['_timings'] = client.timings.to_return()
         module.exit_json(**results)
     except F5ModuleError as ex:
         cleanup_tokens(client)
@@ -20,6 +20,8 @@ description:
     to accept configuration.
   - This module can take into account situations where the device is in the middle
     of rebooting due to a configuration change.
+  - You can also wait for specific conditions, such as ASM being ready or a
+    device group being in sync.
 version_added: "2.5"
 options:
   timeout:
@@ -36,10 +38,59 @@ options:
   sleep:
     default: 1
     description:
-      - Number of seconds to sleep between checks, before 2.3 this was hardcoded to 1 second.
+      - Number of seconds to sleep after the first check, before 2.3 this was hardcoded to 1 second.
+      - The time between checks grows after each check, up to 10 seconds or
+        this value, whichever is larger.
   msg:
     description:
       - This overrides the normal error message from a failure to meet the required conditions.
+  conditions:
+    description:
+      - The conditions to wait for.
+      - C(rest_available) waits for the REST API to accept logins, and for
+        the device not to be rebooting. The runlevel of the device is read
+        only until it is known not to be rebooting. It is always checked
+        first, because none of the other conditions can be checked until it
+        is met.
+      - C(mcpd_running) waits for mcpd to be in the running phase.
+      - C(provisioning_done) waits for the provisioning of modules to finish.
+      - C(asm_ready) waits for the ASM policies API to be available.
+      - C(in_sync) waits for the C(device_group), or the device when no
+        group is given, to be in sync.
+      - C(services_running) waits for each of the C(services) to be running.
+    choices:
+      - rest_available
+      - mcpd_running
+      - provisioning_done
+      - asm_ready
+      - in_sync
+      - services_running
+    default:
+      - rest_available
+      - mcpd_running
+      - provisioning_done
+    version_added: 2.6
+  device_group:
+    description:
+      - The device group to wait for with the C(in_sync) condition.
+    version_added: 2.6
+  services:
+    description:
+      - The services, such as C(tmm) or C(asm), to wait for with the
+        C(services_running) condition.
+    version_added: 2.6
+notes:
+  - Each condition is checked with a single read of a REST endpoint. The
+    conditions are checked at the same time.
+  - Requests are not retried, and each one times out by the C(timeout) at
+    the latest, so that a device that does not answer cannot hold the module
+    past it.
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
 extends_documentation_fragment: f5
 author:
   - Tim Rupp (@caphrim007)
@@ -68,14 +119,40 @@ EXAMPLES = r'''
     server: lb.mydomain.com
     user: admin
   delegate_to: localhost
+
+- name: Wait for ASM to be ready and the device group to be in sync
+  bigip_wait:
+    conditions:
+      - asm_ready
+      - in_sync
+    device_group: device-group-failover
+    password: secret
+    server: lb.mydomain.com
+    user: admin
+  delegate_to: localhost
+
+- name: Wait for tmm and asm to be running
+  bigip_wait:
+    conditions:
+      - services_running
+    services:
+      - tmm
+      - asm
+    password: secret
+    server: lb.mydomain.com
+    user: admin
+  delegate_to: localhost
 '''
 
 RETURN = r'''
-# only common fields returned
+elapsed:
+  description: The number of seconds that were waited for.
+  returned: always
+  type: int
+  sample: 23
 '''
 
-import datetime
-import signal
+import re
 import time
 
 from ansible.module_utils.basic import AnsibleModule
@@ -84,38 +161,71 @@ HAS_DEVEL_IMPORTS = False
 
 try:
     # Sideband repository used for dev
-    from library.module_utils.network.f5.bigip import HAS_F5SDK
-    from library.module_utils.network.f5.bigip import F5Client
+    from library.module_utils.network.f5.icontrol import HAS_REQUESTS
+    from library.module_utils.network.f5.icontrol import F5RestClient
+    from library.module_utils.network.f5.icontrol import iControlRestError
     from library.module_utils.network.f5.common import F5ModuleError
+    from library.module_utils.network.f5.common import F5Poller
+    from library.module_utils.network.f5.common import F5PollTimeout
     from library.module_utils.network.f5.common import AnsibleF5Parameters
     from library.module_utils.network.f5.common import cleanup_tokens
-    from library.module_utils.network.f5.common import fqdn_name
     from library.module_utils.network.f5.common import f5_argument_spec
-    try:
-        from library.module_utils.network.f5.common import iControlUnexpectedHTTPError
-    except ImportError:
-        HAS_F5SDK = False
+    from library.module_utils.network.f5.common import map_requests
     HAS_DEVEL_IMPORTS = True
 except ImportError:
     # Upstream Ansible
-    from ansible.module_utils.network.f5.bigip import HAS_F5SDK
-    from ansible.module_utils.network.f5.bigip import F5Client
+    from ansible.module_utils.network.f5.icontrol import HAS_REQUESTS
+    from ansible.module_utils.network.f5.icontrol import F5RestClient
+    from ansible.module_utils.network.f5.icontrol import iControlRestError
     from ansible.module_utils.network.f5.common import F5ModuleError
+    from ansible.module_utils.network.f5.common import F5Poller
+    from ansible.module_utils.network.f5.common import F5PollTimeout
     from ansible.module_utils.network.f5.common import AnsibleF5Parameters
     from ansible.module_utils.network.f5.common import cleanup_tokens
-    from ansible.module_utils.network.f5.common import fqdn_name
     from ansible.module_utils.network.f5.common import f5_argument_spec
-    try:
-        from ansible.module_utils.network.f5.common import iControlUnexpectedHTTPError
-    except ImportError:
-        HAS_F5SDK = False
+    from ansible.module_utils.network.f5.common import map_requests
 
 
-def hard_timeout(module, want, start):
-    elapsed = datetime.datetime.utcnow() - start
-    module.fail_json(
-        want.msg or "Timeout when waiting for BIG-IP", elapsed=elapsed.seconds
-    )
+CONDITIONS = [
+    'rest_available', 'mcpd_running', 'provisioning_done', 'asm_ready',
+    'in_sync', 'services_running'
+]
+
+DEFAULT_CONDITIONS = ['rest_available', 'mcpd_running', 'provisioning_done']
+
+# Sync statuses of a device that has nothing left to sync.
+SYNCED_STATUSES = ['In Sync', 'Standalone']
+
+# Seconds that each request may take, when more than that is left of the
+# timeout.
+REQUEST_TIMEOUT = 30
+
+
+def get_stats(stats, name):
+    """Returns the descriptions of the stats with the name, at any depth
+
+    Stats endpoints nest their values in ``entries`` and ``nestedStats``
+    keyed by self links, which differ between versions. They are searched
+    for the name instead of being addressed by their paths.
+    """
+    result = []
+    if isinstance(stats, dict):
+        for key, value in stats.items():
+            if key == name and isinstance(value, dict) and 'description' in value:
+                result.append(value['description'])
+            else:
+                result += get_stats(value, name)
+    elif isinstance(stats, list):
+        for value in stats:
+            result += get_stats(value, name)
+    return result
+
+
+def get_stat(stats, name):
+    result = get_stats(stats, name)
+    if result:
+        return result[0]
+    return None
 
 
 class Parameters(AnsibleF5Parameters):
@@ -151,6 +261,21 @@ class Parameters(AnsibleF5Parameters):
             return None
         return int(self._values['sleep'])
 
+    @property
+    def conditions(self):
+        conditions = self._values['conditions'] or DEFAULT_CONDITIONS
+        result = ['rest_available']
+        result += [x for x in CONDITIONS if x in conditions and x not in result]
+        if 'services_running' in result and not self.services:
+            raise F5ModuleError(
+                "The 'services' must be provided with the 'services_running' condition."
+            )
+        return result
+
+    @property
+    def services(self):
+        return self._values['services'] or []
+
 
 class Changes(Parameters):
     pass
@@ -163,14 +288,13 @@ class ModuleManager(object):
         self.have = None
         self.want = Parameters(params=self.module.params)
         self.changes = Parameters()
+        self.deadline = None
+        self.reboot_ruled_out = False
 
     def exec_module(self):
         result = dict()
 
-        try:
-            changed = self.execute()
-        except iControlUnexpectedHTTPError as e:
-            raise F5ModuleError(str(e))
+        changed = self.execute()
 
         changes = self.changes.to_return()
         result.update(**changes)
@@ -186,111 +310,157 @@ class ModuleManager(object):
                 version=warning['version']
             )
 
+    def get_poller(self, name, **kwargs):
+        return F5Poller(name, timings=getattr(self.client, 'timings', None), **kwargs)
+
     def execute(self):
-        signal.signal(
-            signal.SIGALRM,
-            lambda sig, frame: hard_timeout(self.module, self.want, start)
+        conditions = self.want.conditions
+        poller = self.get_poller(
+            'BIG-IP to be ready',
+            delay=self.want.sleep or 1,
+            max_delay=max(self.want.sleep, 10),
+            timeout=self.want.timeout,
+            initial_delay=self.want.delay
         )
-
-        # setup handler before scheduling signal, to eliminate a race
-        signal.alarm(int(self.want.timeout))
-
-        start = datetime.datetime.utcnow()
-        if self.want.delay:
-            time.sleep(float(self.want.delay))
-        end = start + datetime.timedelta(seconds=int(self.want.timeout))
-        while datetime.datetime.utcnow() < end:
-            time.sleep(int(self.want.sleep))
-            try:
-                # The first test verifies that the REST API is available; this is done
-                # by repeatedly trying to login to it.
-                self.client = F5Client(**self.module.params)
-                if not self.client:
-                    continue
-
-                if self._device_is_rebooting():
-                    # Wait for the reboot to happen and then start from the beginning
-                    # of the waiting.
-                    continue
-
-                if self._is_mprov_running_on_device():
-                    self._wait_for_module_provisioning()
-                break
-            except Exception:
-                # The types of exception's we're handling here are "REST API is not
-                # ready" exceptions.
-                #
-                # For example,
-                #
-                # Typically caused by device starting up:
-                #
-                #   icontrol.exceptions.iControlUnexpectedHTTPError: 404 Unexpected Error:
-                #       Not Found for uri: https://localhost:10443/mgmt/tm/sys/
-                #   icontrol.exceptions.iControlUnexpectedHTTPError: 503 Unexpected Error:
-                #       Service Temporarily Unavailable for uri: https://localhost:10443/mgmt/tm/sys/
-                #
-                #
-                # Typically caused by a device being down
-                #
-                #   requests.exceptions.SSLError: HTTPSConnectionPool(host='localhost', port=10443):
-                #       Max retries exceeded with url: /mgmt/tm/sys/ (Caused by SSLError(
-                #       SSLError("bad handshake: SysCallError(-1, 'Unexpected EOF')",),))
-                #
-                #
-                # Typically caused by device still booting
-                #
-                #   raise SSLError(e, request=request)\nrequests.exceptions.SSLError:
-                #   HTTPSConnectionPool(host='localhost', port=10443): Max retries
-                #   exceeded with url: /mgmt/shared/authn/login (Caused by
-                #   SSLError(SSLError(\"bad handshake: SysCallError(-1, 'Unexpected EOF')\",),)),
-                continue
-        else:
-            elapsed = datetime.datetime.utcnow() - start
-            self.module.fail_json(
-                msg=self.want.msg or "Timeout when waiting for BIG-IP", elapsed=elapsed.seconds
+        self.deadline = poller.clock() + self.want.timeout
+        try:
+            poller.wait(
+                lambda: self.check_conditions(conditions),
+                success=lambda x: all(v is None for v in x.values())
             )
-        elapsed = datetime.datetime.utcnow() - start
-        self.changes.update({'elapsed': elapsed.seconds})
+        except F5PollTimeout as ex:
+            self.changes.update({'elapsed': int(poller.elapsed)})
+            raise F5ModuleError(self.want.msg or self.get_timeout_message(ex.value))
+        self.changes.update({'elapsed': int(poller.elapsed)})
         return False
 
+    def get_timeout_message(self, results):
+        result = "Timeout when waiting for BIG-IP."
+        if results:
+            reasons = [
+                '{0}: {1}'.format(x, results[x]) for x in CONDITIONS if results.get(x) is not None
+            ]
+            result += " The following conditions were not met. {0}".format('; '.join(reasons))
+        return result
+
+    def check_conditions(self, conditions):
+        """Checks the conditions, and returns why each of them is not met
+
+        :return: A dict of the conditions, with None for the conditions that
+                 are met.
+        """
+        result = dict(rest_available=self.check_condition('rest_available'))
+        remaining = conditions[1:]
+        if result['rest_available'] is not None:
+            # Nothing else can be checked until REST is available, so only
+            # one request is made while the device is down.
+            for condition in remaining:
+                result[condition] = 'The REST API is not available'
+        else:
+            result.update(zip(remaining, map_requests(self.client, self.check_condition, remaining)))
+        return result
+
+    def get_request_timeout(self):
+        if self.deadline is None:
+            return REQUEST_TIMEOUT
+        return max(min(self.deadline - time.time(), REQUEST_TIMEOUT), 1)
+
+    def check_condition(self, condition):
+        try:
+            self.client.api.timeout = self.get_request_timeout()
+            return getattr(self, '_check_{0}'.format(condition))()
+        except Exception as ex:
+            # The types of exception's we're handling here are "REST API is not
+            # ready" exceptions, such as connection failures while the device
+            # is down and 404 or 503 responses while it is starting up.
+            lines = str(ex).splitlines()
+            return lines[0] if lines else type(ex).__name__
+
+    def _check_rest_available(self):
+        self.client.api.load('/mgmt/shared/echo')
+        if self.reboot_ruled_out:
+            return None
+        # The REST API may answer for a while after a reboot has started, so
+        # the runlevel is checked when REST first answers. Once the device is
+        # known not to be rebooting, only REST is read for the rest of the
+        # wait, since a device that comes back up is not at runlevel 6.
+        if self._device_is_rebooting():
+            return 'The device is rebooting'
+        self.reboot_ruled_out = True
+        return None
+
     def _device_is_rebooting(self):
-        output = self.client.api.tm.util.bash.exec_cmd(
-            'run',
+        # The current runlevel is the last word of the output.
+        output = self.client.api.exec_cmd(
+            '/mgmt/tm/util/bash', 'run',
             utilCmdArgs='-c "runlevel"'
         )
+        return output.get('commandResult', '').split()[-1:] == ['6']
+
+    def _check_mcpd_running(self):
+        stats = self.client.api.load('/mgmt/tm/sys/mcp-state/stats')
+        phase = get_stat(stats, 'phase')
+        if phase != 'running':
+            return 'mcpd is in the {0} phase'.format(phase)
+        if get_stat(stats, 'endPlatformIdReceived') == 'false':
+            return 'mcpd has not received the platform ID'
+        return None
+
+    def _check_provisioning_done(self):
         try:
-            if '6' in output.commandResult:
-                return True
-        except AttributeError:
-            return False
-
-    def _wait_for_module_provisioning(self):
-        # To prevent things from running forever, the hack is to check
-        # for mprov's status twice. If mprov is finished, then in most
-        # cases (not ASM) the provisioning is probably ready.
-        nops = 0
-        # Sleep a little to let provisioning settle and begin properly
-        time.sleep(5)
-        while nops < 4:
-            try:
-                if not self._is_mprov_running_on_device():
-                    nops += 1
-                else:
-                    nops = 0
-            except Exception:
-                # This can be caused by restjavad restarting.
-                pass
-            time.sleep(10)
+            stats = self.client.api.load('/mgmt/tm/sys/ready')
+        except iControlRestError as ex:
+            if ex.status_code != 404:
+                raise
+            # Versions without the readiness endpoint
+            if self._is_mprov_running_on_device():
+                return 'Modules are being provisioned'
+            return None
+        if get_stat(stats, 'provisionReady') != 'yes':
+            return 'Modules are being provisioned'
+        return None
 
     def _is_mprov_running_on_device(self):
-        output = self.client.api.tm.util.bash.exec_cmd(
-            'run',
+        output = self.client.api.exec_cmd(
+            '/mgmt/tm/util/bash', 'run',
             utilCmdArgs='-c "ps aux | grep \'[m]prov\'"'
         )
-        if hasattr(output, 'commandResult'):
+        if output.get('commandResult'):
             return True
         return False
 
+    def _check_asm_ready(self):
+        params = {'$top': 1, '$select': 'name'}
+        self.client.api.load('/mgmt/tm/asm/policies', params=params)
+        return None
+
+    def _check_in_sync(self):
+        stats = self.client.api.load('/mgmt/tm/cm/sync-status')
+        group = self.want.device_group
+        if not group:
+            status = get_stat(stats, 'status')
+            if status not in SYNCED_STATUSES:
+                return 'The device is {0}'.format(status)
+            return None
+        for detail in get_stats(stats, 'details'):
+            matches = re.match(r'{0} \((?P<status>[^)]+)\)'.format(re.escape(group)), detail)
+            if matches:
+                if matches.group('status') != 'In Sync':
+                    return 'The device group is {0}'.format(matches.group('status'))
+                return None
+        return 'The device group {0} was not found'.format(group)
+
+    def _check_services_running(self):
+        stopped = []
+        for service in self.want.services:
+            stats = self.client.api.load('/mgmt/tm/sys/service/{0}/stats'.format(service))
+            output = stats.get('apiRawValues', {}).get('apiAnonymous', '')
+            if not re.search(r'\brun\b', output):
+                stopped.append(service)
+        if stopped:
+            return 'The services are not running: {0}'.format(', '.join(stopped))
+        return None
+
 
 class ArgumentSpec(object):
     def __init__(self):
@@ -299,7 +469,14 @@ class ArgumentSpec(object):
             timeout=dict(default=7200, type='int'),
             delay=dict(default=0, type='int'),
             sleep=dict(default=1, type='int'),
-            msg=dict()
+            msg=dict(),
+            conditions=dict(
+                type='list',
+                choices=CONDITIONS,
+                default=DEFAULT_CONDITIONS
+            ),
+            device_group=dict(),
+            services=dict(type='list')
         )
         self.argument_spec = {}
         self.argument_spec.update(f5_argument_spec)
@@ -313,15 +490,27 @@ def main():
         argument_spec=spec.argument_spec,
         supports_check_mode=spec.supports_check_mode
     )
-    if not HAS_F5SDK:
-        module.fail_json(msg="The python f5-sdk module is required")
+    if not HAS_REQUESTS:
+        module.fail_json(msg="The python requests module is required")
+
+    client = F5RestClient(socket_path=module._socket_path, **module.params)
+
+    # Failed checks are retried by the wait itself. Retrying the requests
+    # too could run past its timeout.
+    client.retry_policy = None
 
+    mm = ModuleManager(module=module, client=client)
     try:
-        mm = ModuleManager(module=module)
+        if client.timings:
+            client.timings.instrument(mm)
         results = mm.exec_module()
+        cleanup_tokens(client)
+        if client.timings:
+            results['_timings'] = client.timings.to_return()
         module.exit_json(**results)
-    except F5ModuleError as e:
-        module.fail_json(msg=str(e))
+    except F5ModuleError as ex:
+        cleanup_tokens(client)
+        module.fail_json(msg=str(ex), **mm.changes.to_return())
 
 
 if __name__ == '__main__':
@@ -51,6 +51,13 @@ options:
       - present
 requirements:
   - BIG-IQ >= 5.3.0
+notes:
+  - The C(provider) also takes the client options C(token_cache)
+    (C(F5_TOKEN_CACHE)), C(timings) (C(F5_TIMINGS)), C(max_in_flight)
+    (C(F5_MAX_IN_FLIGHT)), C(max_requests_per_second)
+    (C(F5_MAX_REQUESTS_PER_SECOND)) and C(rest_retries) (C(F5_REST_RETRIES),
+    default 3), which may also be set with the environment variables given.
+    They are described in the client options page of the documentation.
 extends_documentation_fragment: f5
 author:
   - Tim Rupp (@caphrim007)
@@ -87,7 +94,6 @@ description:
   sample: My license for BIG-IP 1
 '''
 
-import time
 
 from ansible.module_utils.basic import AnsibleModule
 
@@ -98,6 +104,8 @@ try:
     from library.module_utils.network.f5.bigiq import HAS_F5SDK
     from library.module_utils.network.f5.bigiq import F5Client
     from library.module_utils.network.f5.common import F5ModuleError
+    from library.module_utils.network.f5.common import F5Poller
+    from library.module_utils.network.f5.common import F5PollTimeout
     from library.module_utils.network.f5.common import AnsibleF5Parameters
     from library.module_utils.network.f5.common import cleanup_tokens
     from library.module_utils.network.f5.common import fqdn_name
@@ -112,6 +120,8 @@ except ImportError:
     from ansible.module_utils.network.f5.bigiq import HAS_F5SDK
     from ansible.module_utils.network.f5.bigiq import F5Client
     from ansible.module_utils.network.f5.common import F5ModuleError
+    from ansible.module_utils.network.f5.common import F5Poller
+    from ansible.module_utils.network.f5.common import F5PollTimeout
     from ansible.module_utils.network.f5.common import AnsibleF5Parameters
     from ansible.module_utils.network.f5.common import cleanup_tokens
     from ansible.module_utils.network.f5.common import fqdn_name
@@ -328,25 +338,42 @@ class ModuleManager(object):
             status='ACTIVATING_AUTOMATIC',
             **params
         )
-        for x in range(60):
+
+        def check():
             resource.refresh()
-            if resource.status == 'READY':
-                break
-            elif resource.status == 'ACTIVATING_AUTOMATIC_NEED_EULA_ACCEPT':
+            if resource.status == 'ACTIVATING_AUTOMATIC_NEED_EULA_ACCEPT':
                 resource.modify(
                     status='ACTIVATING_AUTOMATIC_EULA_ACCEPTED',
                     eulaText=resource.eulaText
                 )
-            elif resource.status == 'ACTIVATION_FAILED':
-                raise F5ModuleError(str(resource.message))
-            time.sleep(1)
+            return resource.status
+
+        poller = self.get_poller('the license to activate')
+        try:
+            poller.wait(
+                check,
+                success=lambda x: x == 'READY',
+                failure=lambda x: x == 'ACTIVATION_FAILED',
+                error=lambda x: resource.message
+            )
+        except F5PollTimeout:
+            pass
+
+    def get_poller(self, name):
+        return F5Poller(
+            name, delay=1, max_delay=5, timeout=60, timings=getattr(self.client, 'timings', None)
+        )
 
     def wait_for_status(self, resource, status):
-        for x in range(60):
+        def check():
             resource.refresh()
-            if resource.status == status:
-                return
-            time.sleep(1)
+            return resource.status
+
+        poller = self.get_poller('the license to be {0}'.format(status))
+        try:
+            poller.wait(check, success=lambda x: x == status)
+        except F5PollTimeout:
+            pass
 
     def update_on_device(self):
         params = self.changes.api_params()
@@ -419,7 +446,11 @@ def main():
     try:
         client = F5Client(**module.params)
         mm = ModuleManager(module=module, client=client)
+        if client.timings:
+            client.timings.instrument(mm)
         results = mm.exec_module()
+        if client.timings:
+            results['_timings'] = client.timings.to_return()
         module.exit_json(**results)
     except F5ModuleError as e:
         module.fail_json(msg=str(e))
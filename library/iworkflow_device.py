@@ -64,7 +64,6 @@ RETURN = r'''
 # only common fields returned
 '''
 
-import time
 from ansible.module_utils.f5_utils import (
     AnsibleF5Client,
     AnsibleF5Parameters,
@@ -73,6 +72,15 @@ from ansible.module_utils.f5_utils import (
     iControlUnexpectedHTTPError
 )
 
+try:
+    # Sideband repository used for dev
+    from library.module_utils.network.f5.common import F5Poller
+    from library.module_utils.network.f5.common import F5PollTimeout
+except ImportError:
+    # Upstream Ansible
+    from ansible.module_utils.network.f5.common import F5Poller
+    from ansible.module_utils.network.f5.common import F5PollTimeout
+
 
 class Parameters(AnsibleF5Parameters):
     api_map = {
@@ -240,14 +248,19 @@ class ModuleManager(object):
 
     def _wait_for_state_to_activate(self, resource):
         error_values = ['POST_FAILED', 'VALIDATION_FAILED']
-        # Wait no more than half an hour
-        for x in range(1, 180):
+
+        def check():
             resource.refresh()
-            if resource.state == 'ACTIVE':
-                break
-            elif resource.state in error_values:
-                raise F5ModuleError(resource.errors)
-            time.sleep(10)
+            return resource.state
+
+        # Wait no more than half an hour
+        poller = F5Poller('the device to activate', delay=10, max_delay=60, timeout=1800)
+        try:
+            state = poller.wait(check, success=lambda x: x == 'ACTIVE' or x in error_values)
+        except F5PollTimeout:
+            return
+        if state in error_values:
+            raise F5ModuleError(resource.errors)
 
     def absent(self):
         if self.exists():
@@ -80,8 +80,6 @@ RETURN = r'''
 # only common fields returned
 '''
 
-import time
-
 from ansible.module_utils.basic import BOOLEANS
 from ansible.module_utils.f5_utils import (
     AnsibleF5Client,
@@ -91,6 +89,15 @@ from ansible.module_utils.f5_utils import (
     iControlUnexpectedHTTPError
 )
 
+try:
+    # Sideband repository used for dev
+    from library.module_utils.network.f5.common import F5Poller
+    from library.module_utils.network.f5.common import F5PollTimeout
+except ImportError:
+    # Upstream Ansible
+    from ansible.module_utils.network.f5.common import F5Poller
+    from ansible.module_utils.network.f5.common import F5PollTimeout
+
 
 class Parameters(AnsibleF5Parameters):
     api_map = {
@@ -267,19 +274,25 @@ class ModuleManager(object):
 
     def _wait_for_license_pool_state_to_activate(self, pool):
         error_values = ['EXPIRED', 'FAILED']
-        # Wait no more than 5 minutes
-        for x in range(1, 30):
+
+        def check():
             pool.refresh()
-            if pool.state == 'LICENSED':
-                return True
-            elif pool.state == 'WAITING_FOR_EULA_ACCEPTANCE':
+            if pool.state == 'WAITING_FOR_EULA_ACCEPTANCE':
                 pool.modify(
                     eulaText=pool.eulaText,
                     state='ACCEPTED_EULA'
                 )
-            elif pool.state in error_values:
-                raise F5ModuleError(pool.errorText)
-            time.sleep(10)
+            return pool.state
+
+        # Wait no more than 5 minutes
+        poller = F5Poller('the license pool to activate', delay=10, max_delay=30, timeout=300)
+        try:
+            state = poller.wait(check, success=lambda x: x == 'LICENSED' or x in error_values)
+        except F5PollTimeout:
+            return None
+        if state in error_values:
+            raise F5ModuleError(pool.errorText)
+        return True
 
     def absent(self):
         if self.exists():
@@ -153,7 +153,6 @@ RETURN = r'''
 
 import re
 import netaddr
-import time
 
 from ansible.module_utils.f5_utils import (
     AnsibleF5Client,
@@ -165,6 +164,19 @@ from ansible.module_utils.f5_utils import (
     iControlUnexpectedHTTPError
 )
 
+try:
+    # Sideband repository used for dev
+    from library.module_utils.network.f5.common import F5CollectionIndex
+    from library.module_utils.network.f5.common import _get_resource_attr
+    from library.module_utils.network.f5.common import F5Poller
+    from library.module_utils.network.f5.common import F5PollTimeout
+except ImportError:
+    # Upstream Ansible
+    from ansible.module_utils.network.f5.common import F5CollectionIndex
+    from ansible.module_utils.network.f5.common import _get_resource_attr
+    from ansible.module_utils.network.f5.common import F5Poller
+    from ansible.module_utils.network.f5.common import F5PollTimeout
+
 
 class Device(object):
     def __init__(self, *args, **kwargs):
@@ -620,6 +632,9 @@ class ModuleManager(object):
         self.want.client = self.client
         self.want.update(self.client.module.params)
         self.changes = Parameters()
+        self.nodes = F5CollectionIndex(
+            self.read_nodes_from_device, key=lambda x: _get_resource_attr(x, 'ipAddress')
+        )
 
     def _set_changed_options(self):
         changed = {}
@@ -665,12 +680,15 @@ class ModuleManager(object):
         return result
 
     def exists(self):
+        return self.want.device.address in self.nodes
+
+    def read_nodes_from_device(self):
         connector = self.want.connector.resource
-        collection = connector.nodes_s.get_collection()
-        for resource in collection:
-            if resource.ipAddress == self.want.device.address:
-                return True
-        return False
+        return connector.nodes_s.get_collection(
+            requests_params=dict(
+                params="$filter=ipAddress+eq+'{0}'".format(self.want.device.address)
+            )
+        )
 
     def present(self):
         if self.exists():
@@ -694,38 +712,33 @@ class ModuleManager(object):
         params = self.want.api_params()
         connector = self.want.connector.resource
         resource = connector.nodes_s.node.create(**params)
+        self.nodes.invalidate()
         self._wait_for_state_to_activate(resource)
 
     def _wait_for_state_to_activate(self, resource):
-        for x in range(360):
+        def check():
             resource.refresh(
                 requests_params=dict(
                     params='$expand=currentConfigDeviceTaskReference'
                 )
             )
-            if not hasattr(resource, 'currentConfigDeviceTaskReference'):
-                pass
-            elif 'status' not in resource.currentConfigDeviceTaskReference:
-                pass
-            elif resource.currentConfigDeviceTaskReference['status'] == 'FINISHED':
-                return
-            elif resource.currentConfigDeviceTaskReference['status'] == 'FAILED':
-                raise F5ModuleError(
-                    str(resource.currentConfigDeviceTaskReference['errorMessage'])
-                )
-            time.sleep(10)
-        raise F5ModuleError(
-            "Timed out waiting 30 minutes for node to finish."
-        )
+            task = getattr(resource, 'currentConfigDeviceTaskReference', None) or {}
+            return task.get('status')
 
-    def read_current_from_device(self):
-        connector = self.want.connector.resource
-        collection = connector.nodes_s.get_collection(
-            requests_params=dict(
-                params="$filter=ipAddress+eq+'{0}'".format(self.want.device.address)
+        poller = F5Poller('the node to finish', delay=10, max_delay=60, timeout=3600)
+        try:
+            status = poller.wait(check, success=lambda x: x in ['FINISHED', 'FAILED'])
+        except F5PollTimeout:
+            raise F5ModuleError(
+                "Timed out waiting 60 minutes for node to finish."
             )
-        )
-        resource = collection.pop()
+        if status == 'FAILED':
+            raise F5ModuleError(
+                str(resource.currentConfigDeviceTaskReference['errorMessage'])
+            )
+
+    def read_current_from_device(self):
+        resource = self.nodes.get(self.want.device.address)
         resource.refresh(
             requests_params=dict(
                 params='$expand=currentConfigDeviceTaskReference'
@@ -760,7 +773,7 @@ class ModuleManager(object):
     def remove(self):
         if self.module.check_mode:
             return True
-        self.remove_connector_node_from_device()
+        self.remove_from_device()
         if self.exists():
             raise F5ModuleError(
                 "Failed to remove the node from the connector"
@@ -768,13 +781,12 @@ class ModuleManager(object):
         return True
 
     def remove_from_device(self):
-        connector = self.want.connector.resource
-        collection = connector.nodes_s.get_collection()
-        for resource in collection:
-            if resource.ipAddress == self.want.device.ip_address:
-                resource.delete()
-                return True
-        return False
+        resource = self.nodes.get(self.want.device.address)
+        if resource is None:
+            return False
+        resource.delete()
+        self.nodes.invalidate()
+        return True
 
 
 class ArgumentSpec(object):
@@ -16,19 +16,52 @@ except ImportError:
 
 try:
     from library.module_utils.network.f5.common import F5BaseClient
+    from library.module_utils.network.f5.common import PersistentConnectionAdapter
 except ImportError:
     from ansible.module_utils.network.f5.common import F5BaseClient
+    from ansible.module_utils.network.f5.common import PersistentConnectionAdapter
+
+
+if HAS_F5SDK:
+    class PersistentManagementRoot(ManagementRoot):
+        """ManagementRoot that sends its requests over a persistent connection
+
+        The adapter must be mounted before the first request is made, which
+        happens while the ManagementRoot is being constructed.
+        """
+        def __init__(self, hostname, username, password, socket_path=None, **kwargs):
+            self.socket_path = socket_path
+            super(PersistentManagementRoot, self).__init__(
+                hostname, username, password, **kwargs
+            )
+
+        def _get_icr_session(self, *args, **kwargs):
+            result = super(PersistentManagementRoot, self)._get_icr_session(*args, **kwargs)
+            result.session.mount('https://', PersistentConnectionAdapter(self.socket_path))
+            return result
 
 
 class F5Client(F5BaseClient):
-    @property
-    def api(self):
+    def _get_mgmt_root(self, **kwargs):
+        if self.socket_path:
+            # The persistent connection authenticates on our behalf. The
+            # placeholder token is replaced by the connection's own.
+            result = PersistentManagementRoot(
+                self.params['server'] or 'localhost',
+                self.params['user'],
+                self.params['password'],
+                port=self.params['server_port'],
+                socket_path=self.socket_path,
+                token_to_use='persistent'
+            )
+            return result
         result = ManagementRoot(
             self.params['server'],
             self.params['user'],
             self.params['password'],
             port=self.params['server_port'],
             verify=self.params['validate_certs'],
-            token='tmos'
+            token='tmos',
+            **kwargs
         )
         return result
@@ -18,14 +18,16 @@ from ansible.module_utils.network.f5.common import F5BaseClient
 
 
 class F5Client(F5BaseClient):
-    @property
-    def api(self):
+    login_provider = 'local'
+
+    def _get_mgmt_root(self, **kwargs):
         result = ManagementRoot(
             self.params['server'],
             self.params['user'],
             self.params['password'],
             port=self.params['server_port'],
             verify=self.params['validate_certs'],
-            token='local'
+            token='local',
+            **kwargs
         )
         return result
@@ -6,12 +6,35 @@
 from __future__ import absolute_import, division, print_function
 __metaclass__ = type
 
+import base64
+import errno
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+from ansible.module_utils._text import to_bytes
 from ansible.module_utils._text import to_text
 from ansible.module_utils.basic import env_fallback
+from ansible.module_utils.connection import Connection
 from ansible.module_utils.connection import exec_command
 from ansible.module_utils.network.common.utils import to_list, ComplexList
+from ansible.module_utils.parsing.convert_bool import boolean
 from ansible.module_utils.six import iteritems
+from ansible.module_utils.six.moves.urllib.parse import urlparse
 from collections import defaultdict
+from contextlib import contextmanager
+from multiprocessing.pool import ThreadPool
+from random import random as _random
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
 
 try:
     from icontrol.exceptions import iControlUnexpectedHTTPError
@@ -19,6 +42,18 @@ try:
 except ImportError:
     HAS_F5SDK = False
 
+try:
+    from requests.adapters import BaseAdapter
+    from requests.exceptions import ConnectionError as RequestsConnectionError
+    from requests.exceptions import ConnectTimeout
+    from requests.exceptions import Timeout
+    from requests.models import Response
+    from requests.structures import CaseInsensitiveDict
+    HAS_REQUESTS = True
+except ImportError:
+    BaseAdapter = object
+    HAS_REQUESTS = False
+
 
 f5_provider_spec = {
     'server': dict(fallback=(env_fallback, ['F5_SERVER'])),
@@ -27,7 +62,12 @@ f5_provider_spec = {
     'password': dict(no_log=True, fallback=(env_fallback, ['F5_PASSWORD', 'ANSIBLE_NET_PASSWORD'])),
     'ssh_keyfile': dict(fallback=(env_fallback, ['ANSIBLE_NET_SSH_KEYFILE']), type='path'),
     'validate_certs': dict(type='bool', fallback=(env_fallback, ['F5_VALIDATE_CERTS'])),
-    'transport': dict(default='rest', choices=['cli', 'rest'])
+    'transport': dict(default='rest', choices=['cli', 'rest']),
+    'token_cache': dict(type='path', fallback=(env_fallback, ['F5_TOKEN_CACHE'])),
+    'timings': dict(type='bool', fallback=(env_fallback, ['F5_TIMINGS'])),
+    'max_in_flight': dict(type='int', fallback=(env_fallback, ['F5_MAX_IN_FLIGHT'])),
+    'max_requests_per_second': dict(type='float', fallback=(env_fallback, ['F5_MAX_REQUESTS_PER_SECOND'])),
+    'rest_retries': dict(type='int', fallback=(env_fallback, ['F5_REST_RETRIES']))
 }
 
 f5_argument_spec = {
@@ -45,6 +85,17 @@ f5_top_spec = {
 f5_argument_spec.update(f5_top_spec)
 
 
+# Environment variables of the client options that are only accepted in the
+# provider, and the types they are converted to.
+CLIENT_OPTION_ENV = {
+    'token_cache': ('F5_TOKEN_CACHE', os.path.expanduser),
+    'timings': ('F5_TIMINGS', boolean),
+    'max_in_flight': ('F5_MAX_IN_FLIGHT', int),
+    'max_requests_per_second': ('F5_MAX_REQUESTS_PER_SECOND', float),
+    'rest_retries': ('F5_REST_RETRIES', int),
+}
+
+
 def get_provider_argspec():
     return f5_provider_spec
 
@@ -63,6 +114,75 @@ def fq_list_names(partition, list_names):
     return map(lambda x: fqdn_name(partition, x), list_names)
 
 
+def transform_name(partition='', name='', sub_path=''):
+    """Returns a resource name in the form used in iControl REST URIs
+
+    For example, the pool ``foo`` in partition ``Common`` is addressed as
+    ``~Common~foo``.
+    """
+    if name:
+        name = name.replace('/', '~')
+    if partition:
+        partition = '~' + partition
+    elif sub_path:
+        raise F5ModuleError(
+            'When giving the subPath component include partition as well.'
+        )
+    if sub_path and partition:
+        sub_path = '~' + sub_path
+    if name and partition:
+        name = '~' + name
+    result = partition + sub_path + name
+    return result
+
+
+def select_params(parameters, subcollections=None, extra=None):
+    """Returns query parameters that limit a read to what a module uses
+
+    The ``$select`` list is derived from the ``api_attributes`` of the
+    parameters class, plus the API names of its ``updatables``. Identifying
+    attributes such as ``name`` and ``kind`` are always included. Only the
+    given subcollections are expanded.
+
+    :param parameters: The parameters class, or instance, of the module.
+    :param subcollections: List of subcollection references to expand. For
+                           example, ``['membersReference']``.
+    :param extra: List of additional API attributes to select.
+    :return: A dict suitable for use as the query parameters of a request.
+    """
+    fields = set(['name', 'partition', 'fullPath', 'kind'])
+    fields.update(getattr(parameters, 'api_attributes', None) or [])
+    api_map = getattr(parameters, 'api_map', None) or {}
+    updatables = getattr(parameters, 'updatables', None) or []
+    for api_attribute, attribute in iteritems(api_map):
+        if attribute in updatables:
+            fields.add(api_attribute)
+    fields.update(extra or [])
+    fields.update(subcollections or [])
+    result = {
+        '$select': ','.join(sorted(fields))
+    }
+    if subcollections:
+        result['expandSubcollections'] = 'true'
+    return result
+
+
+def filter_params(**conditions):
+    """Returns query parameters that filter a collection on the device
+
+    Conditions are joined with ``and``. Note that the ``tm`` endpoints only
+    support filtering on ``partition``; other endpoints, such as ASM, support
+    filtering on arbitrary attributes.
+
+    :param conditions: Attribute names and the values they must equal.
+    :return: A dict suitable for use as the query parameters of a request.
+    """
+    result = ' and '.join(
+        "{0} eq {1}".format(k, v) for k, v in sorted(iteritems(conditions))
+    )
+    return {'$filter': result}
+
+
 def to_commands(module, commands):
     spec = {
         'command': dict(key=True),
@@ -86,11 +206,26 @@ def run_commands(module, commands, check_rc=True):
 
 
 def cleanup_tokens(client):
+    if getattr(client, '_api', True) is None:
+        # Nothing was ever connected, so there is no token to remove. Accessing
+        # the api here would otherwise create a login only to delete it.
+        return
+    if getattr(client, 'token_is_cached', False):
+        # Cached tokens are shared with other tasks and are left to expire
+        # on their own.
+        return
+    if getattr(client, 'socket_path', None):
+        # The token belongs to the persistent connection, which removes it
+        # when the connection is closed.
+        return
     try:
-        resource = client.api.shared.authz.tokens_s.token.load(
-            name=client.api.icrs.token
-        )
-        resource.delete()
+        if hasattr(client, 'delete_token'):
+            client.delete_token()
+        else:
+            resource = client.api.shared.authz.tokens_s.token.load(
+                name=client.api.icrs.token
+            )
+            resource.delete()
     except Exception:
         pass
 
@@ -109,14 +244,390 @@ class Noop(object):
     pass
 
 
+class F5TokenCache(object):
+    """On-disk cache of authentication tokens
+
+    Tokens are stored one file per (server, port, user) in the cache
+    directory, alongside the local time at which they expire. Access to
+    an entry is serialized with an exclusive file lock so that concurrent
+    Ansible forks which find the cache empty will perform a single login
+    between them, rather than one each.
+
+    :param path: Directory to store tokens in. It is created if it does not
+                 exist.
+    :param clock: Callable returning the current time in seconds. Defaults
+                  to ``time.time``.
+    """
+    def __init__(self, path, clock=None):
+        self.path = path
+        self.clock = clock or time.time
+
+    def _filename(self, server, port, user):
+        key = '{0}:{1}:{2}'.format(server, port, user)
+        digest = hashlib.sha1(to_bytes(key)).hexdigest()
+        return os.path.join(self.path, digest)
+
+    def _ensure_path(self):
+        try:
+            os.makedirs(self.path, 0o700)
+        except OSError as ex:
+            if ex.errno != errno.EEXIST:
+                raise
+
+    @contextmanager
+    def lock(self, server, port, user):
+        """Exclusively locks the cache entry for a device and user
+
+        The lock is held across processes for the duration of the context.
+        """
+        self._ensure_path()
+        filename = self._filename(server, port, user) + '.lock'
+        fd = os.open(filename, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if HAS_FCNTL:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            if HAS_FCNTL:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def get(self, server, port, user):
+        """Returns a cached token, or None if missing or expired
+        """
+        filename = self._filename(server, port, user)
+        try:
+            with open(filename) as fh:
+                entry = json.load(fh)
+        except (IOError, OSError, ValueError):
+            return None
+        if entry.get('expiration') is None:
+            return None
+        if self.clock() >= entry['expiration']:
+            return None
+        return entry.get('token')
+
+    def set(self, server, port, user, token, expiration):
+        self._ensure_path()
+        filename = self._filename(server, port, user)
+        tmp = filename + '.tmp'
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(dict(token=token, expiration=expiration), fh)
+        os.rename(tmp, filename)
+
+    def invalidate(self, server, port, user):
+        try:
+            os.remove(self._filename(server, port, user))
+        except OSError:
+            pass
+
+
+class F5Snapshot(object):
+    """On-disk store of data read from a device in a previous run
+
+    Data is stored as JSON, one file per (server, port, name) in the
+    snapshot directory. The name distinguishes the kinds of data kept for
+    the same device, such as ``facts`` or ``stats``.
+
+    :param path: Directory to store snapshots in. It is created if it does
+                 not exist.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def _filename(self, server, port, name):
+        key = '{0}:{1}:{2}'.format(server, port, name)
+        digest = hashlib.sha1(to_bytes(key)).hexdigest()
+        return os.path.join(self.path, digest + '.json')
+
+    def get(self, server, port, name):
+        """Returns the stored data, or None if there is none
+        """
+        try:
+            with open(self._filename(server, port, name)) as fh:
+                return json.load(fh)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def set(self, server, port, name, data):
+        try:
+            os.makedirs(self.path, 0o700)
+        except OSError as ex:
+            if ex.errno != errno.EEXIST:
+                raise
+        filename = self._filename(server, port, name)
+        # Written under a unique name, so that concurrent runs against the
+        # same device never read a partial snapshot.
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix='.tmp.')
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(data, fh)
+        os.rename(tmp, filename)
+
+
+class PersistentConnectionAdapter(BaseAdapter):
+    """Transport adapter that sends requests over a persistent connection
+
+    When a module is run with ``connection=httpapi``, Ansible keeps a
+    persistent connection process alive for the device across the tasks of
+    a play. Mounting this adapter on a ``requests`` session makes that
+    session proxy every request through the persistent connection, which
+    owns the TLS session and authentication token, instead of opening its
+    own.
+
+    :param socket_path: Path to the socket of the persistent connection.
+    """
+    def __init__(self, socket_path):
+        super(PersistentConnectionAdapter, self).__init__()
+        self.connection = Connection(socket_path)
+
+    def send(self, request, **kwargs):
+        url = urlparse(request.url)
+        path = url.path
+        if url.query:
+            path += '?' + url.query
+
+        body = request.body
+        if body is not None:
+            body = to_text(base64.b64encode(to_bytes(body)))
+
+        result = self.connection.send_request(
+            body,
+            method=request.method,
+            path=path,
+            headers=dict(request.headers)
+        )
+
+        response = Response()
+        response.status_code = result['code']
+        response.reason = result['reason']
+        response.headers = CaseInsensitiveDict(result['headers'])
+        response._content = base64.b64decode(to_bytes(result['contents']))
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.encoding = 'utf-8'
+        return response
+
+    def close(self):
+        pass
+
+
 class F5BaseClient(object):
+    # Login provider that tokens are requested from.
+    login_provider = 'tmos'
+
     def __init__(self, *args, **kwargs):
+        # Socket of the persistent connection, when the module is run with
+        # connection=httpapi. REST calls are then proxied through it.
+        self.socket_path = kwargs.pop('socket_path', None)
         self.params = kwargs
+        self._api = None
+
+        # Number of times a login has been performed by this client. Useful
+        # for verifying that connections are being re-used across the
+        # lifetime of a module.
+        self.login_count = 0
+
+        # Set when the token in use is shared through the token cache and
+        # therefore must not be deleted when the module finishes.
+        self.token_is_cached = False
+
+        self.token_cache = None
+        path = self._get_option('token_cache')
+        if path:
+            self.token_cache = F5TokenCache(path)
+
+        # Records the REST calls made by this client when timings are
+        # requested. It is None otherwise, so that nothing is recorded.
+        self.timings = None
+        if self._get_option('timings'):
+            self.timings = F5Timings(client=self)
+
+        # Limits the requests made to the device by all of the modules
+        # running on this host, when either limit is set.
+        self.governor = None
+        max_in_flight = self._get_option('max_in_flight')
+        rate = self._get_option('max_requests_per_second')
+        if max_in_flight or rate:
+            self.governor = F5Governor(
+                self.params.get('server'),
+                self.params.get('server_port'),
+                max_in_flight=max_in_flight,
+                rate=rate,
+                timings=self.timings
+            )
+
+        # Retries requests that fail for transient reasons. It is on by
+        # default and is turned off by setting rest_retries to 0.
+        self.retry_policy = None
+        retries = self._get_option('rest_retries')
+        if retries is None:
+            retries = 3
+        if retries > 0:
+            self.retry_policy = F5RetryPolicy(retries=retries)
+
+    def _get_option(self, name):
+        result = self.params.get(name)
+        if result is None and self.params.get('provider'):
+            result = self.params['provider'].get(name)
+        if result is None and name in CLIENT_OPTION_ENV:
+            # The fallbacks of the provider options are only applied when a
+            # provider is given, so they are also read here for tasks that
+            # use the top-level connection options.
+            value = os.environ.get(CLIENT_OPTION_ENV[name][0])
+            if value:
+                result = CLIENT_OPTION_ENV[name][1](value)
+        return result
 
     @property
     def api(self):
+        """Returns the management root for this module run
+
+        The management root is created lazily on first access and is then
+        re-used for every subsequent call. Creating a management root is
+        expensive; it includes the TLS handshake, a token login and the
+        construction of the resource tree.
+
+        :return:
+        """
+        if self._api is None:
+            if self.retry_policy is None:
+                api = self._governed_connect()
+            else:
+                api = self.retry_policy.call(self._governed_connect)
+                self.retry_policy.instrument_session(api, self.reauthenticate)
+            self._api = api
+        return self._api
+
+    def _governed_connect(self):
+        if self.governor is None:
+            return self._timed_connect()
+        # The login is made while connecting, so it is limited too.
+        with self.governor.slot():
+            result = self._timed_connect()
+        self.governor.instrument_session(result)
+        return result
+
+    def _timed_connect(self):
+        if self.timings is None:
+            return self._connect()
+        with self.timings.phase('connect'):
+            result = self._connect()
+        self.timings.instrument_session(result)
+        return result
+
+    @property
+    def token_cache_key(self):
+        return (
+            self.params['server'],
+            self.params['server_port'],
+            self.params['user']
+        )
+
+    def _connect(self):
+        if self.socket_path:
+            # Authentication is the responsibility of the persistent
+            # connection, so no login happens here.
+            return self._get_mgmt_root()
+        elif self.token_cache is None:
+            result = self._get_mgmt_root()
+            self.login_count += 1
+            return result
+        return self._get_cached_mgmt_root()
+
+    def _get_mgmt_root(self, **kwargs):
         raise F5ModuleError("Management root must be used from the concrete product classes.")
 
+    def _get_cached_mgmt_root(self):
+        key = self.token_cache_key
+        with self.token_cache.lock(*key):
+            token = self.token_cache.get(*key)
+            if token:
+                try:
+                    result = self._get_mgmt_root(token_to_use=token)
+                    self.token_is_cached = True
+                    return result
+                except iControlUnexpectedHTTPError as ex:
+                    # The token was revoked or expired early on the device.
+                    if getattr(ex.response, 'status_code', None) != 401:
+                        raise
+                    self.token_cache.invalidate(*key)
+
+            result = self._get_mgmt_root()
+            self.login_count += 1
+            token = result.icrs.token
+            expiration = result.icrs.session.auth.expiration
+            if token and expiration:
+                self.token_cache.set(*key, token=token, expiration=expiration)
+                self.token_is_cached = True
+            return result
+
+    def invalidate(self):
+        """Discards the cached management root
+
+        The next access of the ``api`` property will create a new management
+        root. If the token cache is in use, the cached token for this device
+        is discarded as well.
+
+        :return:
+        """
+        self._api = None
+        if self.token_cache is not None:
+            self.token_cache.invalidate(*self.token_cache_key)
+
+    def delete_token(self):
+        """Deletes the token of the management root from the device
+        """
+        resource = self.api.shared.authz.tokens_s.token.load(
+            name=self.api.icrs.token
+        )
+        resource.delete()
+
+    def request(self, method, path, **kwargs):
+        """Sends a raw request to the device and returns the response
+
+        This is an escape hatch for the REST features that have no resource
+        in the f5-sdk, such as transactions.
+
+        :param method: HTTP method of the request.
+        :param path: Path of the request, relative to the device. For example
+                     ``/mgmt/tm/transaction``.
+        :param kwargs: Keyword arguments passed through to ``requests``.
+        :return: The ``requests`` response.
+        :raises iControlUnexpectedHTTPError
+        """
+        url = urlparse(self.api._meta_data['uri'])
+        uri = '{0}://{1}{2}'.format(url.scheme, url.netloc, path)
+        return getattr(self.api.icrs, method.lower())(uri, **kwargs)
+
+    def reauthenticate(self, request):
+        """Replaces a token that the device rejected in the middle of a run
+
+        :param request: The prepared request that was rejected. Its token
+                        header is replaced with the new token.
+        :return: True if a new token was obtained, False otherwise.
+        """
+        if self.socket_path:
+            # The persistent connection logs in again on its own.
+            return False
+        auth = self._api.icrs.session.auth
+        if not hasattr(auth, 'get_new_token'):
+            return False
+
+        # Sessions made from a cached token are given placeholder
+        # credentials by the f5-sdk, so the real ones are set here.
+        auth.username = self.params['user']
+        auth.password = self.params['password']
+        auth.login_provider_name = self.login_provider
+        auth.token = None
+        auth.expiration = None
+        auth(request)
+        self.login_count += 1
+        if self.token_cache is not None and auth.expiration:
+            self.token_cache.set(*self.token_cache_key, token=auth.token, expiration=auth.expiration)
+        return True
+
     def reconnect(self):
         """Attempts to reconnect to a device
 
@@ -132,7 +643,1009 @@ class F5BaseClient(object):
         :return:
         :raises iControlUnexpectedHTTPError
         """
-        self.api = self.mgmt
+        self.invalidate()
+        return self.api
+
+
+def _get_requests_session(api):
+    """Returns the requests session of a management root or REST session
+    """
+    return getattr(getattr(api, 'icrs', api), 'session', None)
+
+
+class F5Governor(object):
+    """Limits the requests made to a device by every process on this host
+
+    Many Ansible forks running tasks against one device can overwhelm its
+    REST service, leading to 503 errors and restarts of restjavad. The
+    governor bounds the load that the forks place on the device together.
+
+      * ``max_in_flight`` bounds the number of requests in flight at once.
+        Each request holds one of that many slot files, with an exclusive
+        lock, until its response is received.
+      * ``rate`` bounds the number of requests started per second. Requests
+        are spaced evenly, by reserving start times in a shared state file.
+
+    The time spent waiting is counted in the ``queue`` phase of the timings,
+    if they are in use, and in the ``delay`` attribute.
+
+    :param server: Address of the device.
+    :param port: Port of the management interface.
+    :param max_in_flight: Maximum number of concurrent requests, or None.
+    :param rate: Maximum number of requests per second, or None.
+    :param path: Directory to store the lock files in. Defaults to a
+                 directory, for the current user, in the temp directory.
+    :param timings: An F5Timings to record the time spent waiting in.
+    :param timeout: Seconds to wait for the limits to allow a request before
+                    failing. Defaults to the timeout of a request, so that a
+                    slot that is never released cannot hang the module.
+    :param clock: Callable returning the current time in seconds.
+    :param sleep: Callable that sleeps for the given seconds.
+    """
+
+    # Time, in seconds, to wait between checks for a free slot.
+    poll_interval = 0.05
+
+    def __init__(self, server, port, max_in_flight=None, rate=None, path=None,
+                 timings=None, timeout=30, clock=None, sleep=None):
+        if path is None:
+            path = os.path.join(
+                tempfile.gettempdir(), 'f5-ansible-governor-{0}'.format(os.getuid())
+            )
+        self.path = path
+        self.key = hashlib.sha1(to_bytes('{0}:{1}'.format(server, port))).hexdigest()
+        self.max_in_flight = max_in_flight if HAS_FCNTL else None
+        self.rate = rate
+        self.timings = timings
+        self.timeout = timeout
+        self.clock = clock or time.time
+        self.sleep = sleep or time.sleep
+        self.delay = 0.0
+        # Nesting is tracked per thread so that concurrent requests, made
+        # from a pool of workers, each wait for their own slot.
+        self._local = threading.local()
+
+    @property
+    def _depth(self):
+        return getattr(self._local, 'depth', 0)
+
+    @_depth.setter
+    def _depth(self, value):
+        self._local.depth = value
+
+    def _open(self, suffix):
+        try:
+            os.makedirs(self.path, 0o700)
+        except OSError as ex:
+            if ex.errno != errno.EEXIST:
+                raise
+        filename = os.path.join(self.path, '{0}.{1}'.format(self.key, suffix))
+        return os.open(filename, os.O_RDWR | os.O_CREAT, 0o600)
+
+    @contextmanager
+    def slot(self):
+        """Waits for the limits to allow a request, for the context duration
+
+        Nested slots, such as requests made while connecting, are allowed
+        through without waiting again.
+        """
+        if self._depth:
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+            return
+
+        start = self.clock()
+        if self.timings is None:
+            fd = self._wait()
+        else:
+            with self.timings.phase('queue'):
+                fd = self._wait()
+        self.delay += self.clock() - start
+
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if fd is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+
+    def _wait(self):
+        deadline = self.clock() + self.timeout
+        fd = None
+        if self.max_in_flight:
+            fd = self._acquire_slot(deadline)
+        if self.rate:
+            try:
+                self._wait_for_rate(deadline)
+            except Exception:
+                if fd is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                    os.close(fd)
+                raise
+        return fd
+
+    def _timed_out(self):
+        return F5ModuleError(
+            "Timed out after {0} seconds waiting to send a request to the device. "
+            "Other tasks may be holding every request slot in {1}.".format(self.timeout, self.path)
+        )
+
+    def _acquire_slot(self, deadline):
+        # Start at a different slot in each process to spread the contention.
+        offset = os.getpid()
+        while True:
+            for x in range(self.max_in_flight):
+                fd = self._open('slot.{0}'.format((offset + x) % self.max_in_flight))
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fd
+                except (IOError, OSError) as ex:
+                    os.close(fd)
+                    if ex.errno not in (errno.EAGAIN, errno.EACCES):
+                        raise
+            if self.clock() >= deadline:
+                raise self._timed_out()
+            self.sleep(self.poll_interval)
+
+    def _wait_for_rate(self, deadline):
+        fd = self._open('rate')
+        try:
+            if HAS_FCNTL:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                next_start = float(os.read(fd, 64))
+            except ValueError:
+                next_start = 0.0
+            now = self.clock()
+            start = max(now, next_start)
+            if start > deadline:
+                # Too many requests are queued ahead of this one. Nothing is
+                # reserved, so the requests after it are not delayed.
+                raise self._timed_out()
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, to_bytes(repr(start + 1.0 / self.rate)))
+        finally:
+            if HAS_FCNTL:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+        if start > now:
+            self.sleep(start - now)
+
+    def instrument_session(self, api):
+        """Limits every request made by the management root or session
+
+        :param api: An f5-sdk management root, or an iControlRestSession.
+        """
+        session = _get_requests_session(api)
+        if session is None:
+            return
+        adapter = session.get_adapter('https://')
+        if not isinstance(adapter, GovernedAdapter):
+            session.mount('https://', GovernedAdapter(self, adapter))
+
+
+class GovernedAdapter(BaseAdapter):
+    """Transport adapter that sends requests within the limits of a governor
+
+    :param governor: The F5Governor to wait on.
+    :param adapter: The adapter that sends the requests.
+    """
+    def __init__(self, governor, adapter):
+        super(GovernedAdapter, self).__init__()
+        self.governor = governor
+        self.adapter = adapter
+
+    def send(self, request, **kwargs):
+        with self.governor.slot():
+            return self.adapter.send(request, **kwargs)
+
+    def close(self):
+        self.adapter.close()
+
+
+class F5RetryPolicy(object):
+    """Retries requests that fail for transient reasons
+
+    Failures are classified as one of the following.
+
+      * Rejected tokens, a 401 status. The token can expire or be revoked in
+        the middle of a run. A new token is obtained and the request is sent
+        again, once.
+      * Transient failures. These are a 502, 503 or 504 status, such as when
+        restjavad is busy or restarting, and connection errors. Reads are
+        retried with exponential backoff and full jitter. Writes are only
+        retried when the connection could not be made, because otherwise
+        the device may have applied the change already.
+      * Everything else, which is returned to the caller as-is.
+
+    Consecutive transient failures are counted across requests. When there
+    are ``breaker_threshold`` of them the device is considered unhealthy and
+    the circuit breaker opens; requests then fail at once, without being
+    sent, for ``breaker_cooldown`` seconds. After that, a single request is
+    let through to probe the device. Any response that is not a transient
+    failure closes the breaker again.
+
+    :param retries: Maximum number of times to retry a request.
+    :param backoff: Base delay, in seconds, between retries.
+    :param max_backoff: Maximum delay, in seconds, between retries.
+    :param breaker_threshold: Consecutive transient failures that open the
+                              circuit breaker.
+    :param breaker_cooldown: Seconds the circuit breaker stays open.
+    :param clock: Callable returning the current time in seconds.
+    :param sleep: Callable that sleeps for the given seconds.
+    :param random: Callable returning a random float in [0, 1).
+    """
+    idempotent_methods = frozenset(['GET', 'HEAD', 'OPTIONS'])
+    retryable_statuses = frozenset([502, 503, 504])
+
+    def __init__(self, retries=3, backoff=0.5, max_backoff=8.0, breaker_threshold=5,
+                 breaker_cooldown=30.0, clock=None, sleep=None, random=None):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.clock = clock or time.time
+        self.sleep = sleep or time.sleep
+        self.random = random or _random
+        self.failures = 0
+        self.open_until = None
+
+        # Number of retries made, across every request.
+        self.retry_count = 0
+
+    def classify(self, method, status=None, error=None):
+        """Classifies the outcome of a request
+
+        :param method: HTTP method of the request.
+        :param status: Status of the response, if one was received.
+        :param error: Exception raised by the request, if any.
+        :return: ``reauthenticate``, ``retry``, or None if the outcome is to
+                 be returned to the caller.
+        """
+        if error is not None:
+            if not HAS_REQUESTS:
+                return None
+            if isinstance(error, ConnectTimeout):
+                return 'retry'
+            if isinstance(error, (RequestsConnectionError, Timeout)) and method in self.idempotent_methods:
+                return 'retry'
+            return None
+        if status == 401:
+            return 'reauthenticate'
+        if status in self.retryable_statuses and method in self.idempotent_methods:
+            return 'retry'
+        return None
+
+    def get_delay(self, attempt):
+        ceiling = min(self.max_backoff, self.backoff * (2 ** attempt))
+        return self.random() * ceiling
+
+    @property
+    def is_open(self):
+        return self.open_until is not None
+
+    def _check_breaker(self):
+        if self.open_until is None:
+            return
+        if self.clock() < self.open_until:
+            raise F5ModuleError(
+                "The device has failed {0} consecutive requests and is considered "
+                "unhealthy. Requests are paused until it recovers.".format(self.failures)
+            )
+        # Let one request through to probe the device. If it fails, the
+        # breaker opens again at once.
+        self.open_until = None
+        self.failures = self.breaker_threshold - 1
+
+    def _record(self, healthy):
+        if healthy:
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.failures >= self.breaker_threshold:
+            self.open_until = self.clock() + self.breaker_cooldown
+
+    def _should_retry(self, attempt):
+        if attempt >= self.retries or self.is_open:
+            return False
+        self.sleep(self.get_delay(attempt))
+        self.retry_count += 1
+        return True
+
+    def send(self, send, request, reauthenticate=None, **kwargs):
+        """Sends a prepared request, retrying it according to the policy
+
+        :param send: Callable that sends the request, such as the ``send``
+                     method of a transport adapter.
+        :param request: The prepared request.
+        :param reauthenticate: Callable that obtains a new token and updates
+                               the request with it. It returns False if a new
+                               token could not be obtained.
+        :param kwargs: Keyword arguments passed through to ``send``.
+        :return: The response.
+        """
+        method = request.method.upper()
+        attempt = 0
+        reauthenticated = False
+        while True:
+            self._check_breaker()
+            response = error = None
+            try:
+                response = send(request, **kwargs)
+            except Exception as ex:
+                error = ex
+            action = self.classify(method, getattr(response, 'status_code', None), error)
+
+            if action == 'retry':
+                self._record(False)
+                if self._should_retry(attempt):
+                    attempt += 1
+                    _release(response)
+                    continue
+            else:
+                self._record(True)
+                if action == 'reauthenticate' and not reauthenticated and reauthenticate is not None:
+                    reauthenticated = True
+                    if reauthenticate(request):
+                        _release(response)
+                        continue
+
+            if error is not None:
+                raise error
+            return response
+
+    def call(self, func, method='GET'):
+        """Calls a function, retrying it according to the policy
+
+        This is for requests that are not made through a session that the
+        policy is mounted on, such as those made while connecting.
+
+        :param func: Callable to call.
+        :param method: HTTP method of the requests made by the function.
+        :return: The result of the function.
+        """
+        attempt = 0
+        while True:
+            self._check_breaker()
+            try:
+                result = func()
+            except Exception as ex:
+                # HTTP errors from both clients carry their response.
+                response = getattr(ex, 'response', None)
+                if response is None:
+                    action = self.classify(method, error=ex)
+                else:
+                    action = self.classify(method, status=response.status_code)
+                if action == 'retry':
+                    self._record(False)
+                    if self._should_retry(attempt):
+                        attempt += 1
+                        continue
+                else:
+                    self._record(True)
+                raise
+            self._record(True)
+            return result
+
+    def instrument_session(self, api, reauthenticate=None):
+        """Retries every request made by the management root or session
+
+        :param api: An f5-sdk management root, or an iControlRestSession.
+        :param reauthenticate: Callable used to replace rejected tokens.
+        """
+        session = _get_requests_session(api)
+        if session is None:
+            return
+        adapter = session.get_adapter('https://')
+        if not isinstance(adapter, RetryAdapter):
+            session.mount('https://', RetryAdapter(self, adapter, reauthenticate))
+
+
+def _release(response):
+    # Returns the connection of a discarded response to the pool. Responses
+    # from the persistent connection adapter have no connection.
+    if getattr(response, 'raw', None) is not None:
+        response.close()
+
+
+class RetryAdapter(BaseAdapter):
+    """Transport adapter that sends requests according to a retry policy
+
+    :param policy: The F5RetryPolicy to follow.
+    :param adapter: The adapter that sends the requests.
+    :param reauthenticate: Callable used to replace rejected tokens.
+    """
+    def __init__(self, policy, adapter, reauthenticate=None):
+        super(RetryAdapter, self).__init__()
+        self.policy = policy
+        self.adapter = adapter
+        self.reauthenticate = reauthenticate
+
+    def send(self, request, **kwargs):
+        return self.policy.send(self.adapter.send, request, self.reauthenticate, **kwargs)
+
+    def close(self):
+        self.adapter.close()
+
+
+class F5Timings(object):
+    """Records where the time of a module run is spent
+
+    Three things are recorded.
+
+      * Every REST call made through an instrumented session, with its
+        method, path, status, the bytes sent and received, and its latency.
+      * The time spent in each phase of the module run; ``connect``, ``read``,
+        ``diff``, ``write`` and ``wait``. Phases may nest, such as a ``read``
+        that causes a ``connect``. The time is then counted only against the
+        innermost phase, so the phases add up to no more than the total.
+      * Every wait made by an F5Poller, with the number of checks made and
+        how it ended.
+
+    Instrumentation is opt-in through the ``timings`` option. When it is off,
+    F5BaseClient.timings is None and nothing is wrapped or recorded.
+
+    :param client: The client whose logins are reported, if any.
+    :param clock: Callable returning the current time in seconds. Defaults
+                  to ``time.time``.
+    """
+
+    # Methods of a module manager, and the phase their time is counted
+    # against.
+    manager_phases = dict(
+        exists='read',
+        read_current_from_device='read',
+        should_update='diff',
+        _set_changed_options='diff',
+        _update_changed_options='diff',
+        create_on_device='write',
+        update_on_device='write',
+        remove_from_device='write',
+    )
+
+    def __init__(self, client=None, clock=None):
+        self.client = client
+        self.clock = clock or time.time
+        self.calls = []
+        self.polls = []
+        self.phases = defaultdict(float)
+        self.start = self.clock()
+        self._stack = []
+        self._mark = None
+
+    @contextmanager
+    def phase(self, name):
+        self._switch()
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            self._switch()
+            self._stack.pop()
+
+    def _switch(self):
+        now = self.clock()
+        if self._stack:
+            self.phases[self._stack[-1]] += now - self._mark
+        self._mark = now
+
+    def record(self, method, path, status, size, elapsed):
+        self.calls.append(dict(
+            method=method,
+            path=path,
+            status=status,
+            bytes=size,
+            elapsed=round(elapsed, 4)
+        ))
+
+    def record_poll(self, poll):
+        """Records a wait made by an F5Poller
+
+        :param poll: The telemetry of the poller, from its ``to_return``.
+        """
+        self.polls.append(poll)
+
+    def instrument_session(self, api):
+        """Records every request made by the management root or session
+
+        :param api: An f5-sdk management root, or an iControlRestSession.
+        """
+        session = _get_requests_session(api)
+        if session is not None and self._on_response not in session.hooks['response']:
+            session.hooks['response'].append(self._on_response)
+
+    def _on_response(self, response, *args, **kwargs):
+        request = response.request
+        size = len(request.body or b'')
+        if kwargs.get('stream'):
+            # Reading the content here would consume the stream before the
+            # caller can.
+            size += int(response.headers.get('Content-Length', 0))
+        else:
+            size += len(response.content or b'')
+        self.record(
+            request.method,
+            urlparse(request.url).path,
+            response.status_code,
+            size,
+            response.elapsed.total_seconds()
+        )
+
+    def instrument(self, manager):
+        """Counts the time spent in the methods of a module manager
+
+        Methods are wrapped on the instance, so calls made from within the
+        manager are counted too. Managers that delegate to another manager
+        through ``get_manager`` have that manager instrumented as well.
+
+        :param manager: The ModuleManager of the module.
+        """
+        for name in dir(manager):
+            phase = self.manager_phases.get(name)
+            if phase is None and (name.startswith('wait_') or name.startswith('_wait')):
+                phase = 'wait'
+            if phase is None:
+                continue
+            method = getattr(manager, name, None)
+            if callable(method):
+                setattr(manager, name, self._wrap(method, phase))
+        if callable(getattr(manager, 'get_manager', None)):
+            get_manager = manager.get_manager
+
+            def wrapper(*args, **kwargs):
+                result = get_manager(*args, **kwargs)
+                self.instrument(result)
+                return result
+            manager.get_manager = wrapper
+
+    def _wrap(self, method, phase):
+        def wrapper(*args, **kwargs):
+            with self.phase(phase):
+                return method(*args, **kwargs)
+        return wrapper
+
+    def instrument_bigsuds(self, api):
+        """Records every call made through a bigsuds BIGIP object
+
+        :param api: A bigsuds BIGIP object.
+        :return: A proxy of the object that should be used in its place.
+        """
+        return _SoapTimingsProxy(api, self)
+
+    def to_return(self):
+        result = dict(
+            total=round(self.clock() - self.start, 4),
+            phases=dict((k, round(v, 4)) for k, v in iteritems(self.phases)),
+            requests=len(self.calls),
+            bytes=sum(x['bytes'] or 0 for x in self.calls),
+            calls=self.calls,
+            polls=self.polls
+        )
+        if self.client is not None:
+            result['logins'] = self.client.login_count
+            if self.client.governor is not None:
+                result['queue_delay'] = round(self.client.governor.delay, 4)
+        return result
+
+
+class _SoapTimingsProxy(object):
+    """Stands in for a bigsuds object and records the iControl calls made
+
+    Calls are addressed as ``Interface.Component.method``, such as
+    ``LocalLB.Pool.get_list``. Their size is not known to bigsuds, so it is
+    recorded as None.
+    """
+    def __init__(self, target, timings, path=()):
+        self._target = target
+        self._timings = timings
+        self._path = path
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        path = self._path + (name,)
+        if not self._path and name[:1].islower():
+            # Methods of the BIGIP object itself, such as with_session_id,
+            # return new BIGIP objects which are instrumented too.
+            if not callable(value):
+                return value
+
+            def wrapper(*args, **kwargs):
+                result = value(*args, **kwargs)
+                if isinstance(result, type(self._target)):
+                    result = _SoapTimingsProxy(result, self._timings)
+                return result
+            return wrapper
+        if len(path) < 3:
+            return _SoapTimingsProxy(value, self._timings, path)
+
+        def call(*args, **kwargs):
+            start = time.time()
+            status = 200
+            try:
+                return value(*args, **kwargs)
+            except Exception:
+                status = 500
+                raise
+            finally:
+                self._timings.record('SOAP', '.'.join(path), status, None, time.time() - start)
+        return call
+
+
+class F5Transaction(object):
+    """Queues changes to many resources and commits them together
+
+    Changes made inside the transaction are sent to the device as they are
+    queued, so each one is validated individually, but none of them take
+    effect until the transaction is committed. The commit applies them in a
+    single configuration load; this is far cheaper for the device than
+    applying each change on its own and, if any change fails, none of them
+    are applied.
+
+    Usage:
+
+        with F5Transaction(client) as tx:
+            tx.create('/mgmt/tm/ltm/policy/~Common~foo/rules', dict(name='bar'))
+            tx.modify('/mgmt/tm/ltm/policy/~Common~foo/rules/baz', dict(ordinal=1))
+            tx.delete('/mgmt/tm/ltm/policy/~Common~foo/rules/qux')
+
+    The transaction is committed when the context exits and discarded if an
+    exception is raised within it.
+
+    :param client: An F5Client or F5RestClient.
+    """
+    def __init__(self, client):
+        self.client = client
+        self.transaction_id = None
+        self.operations = []
+        self.failure_reason = None
+
+    def __enter__(self):
+        self.begin()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+        return False
+
+    @property
+    def uri(self):
+        return '/mgmt/tm/transaction/{0}'.format(self.transaction_id)
+
+    def begin(self):
+        response = self.client.request('POST', '/mgmt/tm/transaction', json={})
+        self.transaction_id = response.json()['transId']
+
+    def create(self, path, params):
+        """Queues the creation of a resource in the collection at the path
+        """
+        self._queue('POST', path, params)
+
+    def modify(self, path, params):
+        self._queue('PATCH', path, params)
+
+    def delete(self, path):
+        self._queue('DELETE', path)
+
+    def _queue(self, method, path, params=None):
+        operation = dict(method=method, path=path, status=None, error=None)
+        self.operations.append(operation)
+        kwargs = dict(
+            headers={'X-F5-REST-Coordination-Id': str(self.transaction_id)}
+        )
+        if params is not None:
+            kwargs['json'] = params
+        try:
+            response = self.client.request(method, path, **kwargs)
+        except Exception as ex:
+            # Errors without a response are not the device rejecting the
+            # operation; for example, a dropped connection.
+            response = getattr(ex, 'response', None)
+            if response is None:
+                raise
+            operation['error'] = _get_response_message(response)
+        operation['status'] = response.status_code
+
+    def commit(self):
+        """Commits the queued operations
+
+        :raises F5TransactionError: If any operation could not be queued or
+                                    the device rejected the commit.
+        """
+        if any(x['error'] for x in self.operations):
+            self.discard()
+            raise F5TransactionError(
+                "One or more operations in the transaction failed",
+                operations=self.operations
+            )
+        if not self.operations:
+            self.discard()
+            return
+        try:
+            response = self.client.request('PATCH', self.uri, json=dict(state='VALIDATING'))
+            result = response.json()
+            self.failure_reason = result.get('failureReason')
+            if result.get('state') == 'FAILED' and not self.failure_reason:
+                self.failure_reason = 'The transaction failed'
+        except Exception as ex:
+            response = getattr(ex, 'response', None)
+            if response is None:
+                raise
+            self.failure_reason = _get_response_message(response)
+        if self.failure_reason:
+            raise F5TransactionError(
+                "The transaction failed to commit: {0}".format(self.failure_reason),
+                operations=self.operations
+            )
+
+    def discard(self):
+        if self.transaction_id is None:
+            return
+        try:
+            self.client.request('DELETE', self.uri)
+        except Exception:
+            pass
+
+
+def _get_response_message(response):
+    try:
+        return response.json()['message']
+    except (ValueError, KeyError, TypeError):
+        return response.text
+
+
+def iter_pages(fetch, page_size=100):
+    """Yields the items of a collection that is read a page at a time
+
+    Pages are requested with the ``$top`` and ``$skip`` query parameters, so
+    only one page of the collection is held in memory at a time.
+
+    :param fetch: Callable that takes the ``$top`` and ``$skip`` of a page and
+                  returns the items of that page.
+    :param page_size: Number of items to request in each page.
+    """
+    skip = 0
+    previous = None
+    while True:
+        items = fetch(page_size, skip)
+        # A device that ignores $skip returns the same page every time, and
+        # one that ignores $top may return exactly a page of items anyway.
+        # Either way, a page that repeats the previous one ends the paging.
+        key = [_get_page_item_key(x) for x in items]
+        if not items or key == previous:
+            break
+        for item in items:
+            yield item
+        # A short page is the last one. A long page means that the device
+        # ignored the paging parameters and returned the whole collection.
+        if len(items) != page_size:
+            break
+        previous = key
+        skip += page_size
+
+
+def map_requests(client, func, items, workers=4):
+    """Calls the function with each item, concurrently
+
+    The first item is done before the others, so that it logs in and the
+    threads share its token, instead of each logging in. The threads are
+    bounded by ``workers`` and by the ``max_in_flight`` of the governor of
+    the client, since any more threads than that only wait for a slot.
+
+    :param client: The client that the function makes its requests with.
+    :param func: Callable that takes an item and makes its requests.
+    :param items: The items to call the function with.
+    :param workers: Maximum number of threads.
+    :return: The results of the calls, in the order of the items.
+    """
+    items = list(items)
+    if not items:
+        return []
+    results = [func(items[0])]
+    remaining = items[1:]
+    size = min(workers or 1, len(remaining))
+    governor = getattr(client, 'governor', None)
+    if isinstance(governor, F5Governor) and governor.max_in_flight:
+        size = min(size, governor.max_in_flight)
+    if size <= 1:
+        results += [func(x) for x in remaining]
+        return results
+    pool = ThreadPool(size)
+    try:
+        results += pool.map(func, remaining)
+    finally:
+        pool.close()
+        pool.join()
+    return results
+
+
+def _get_page_item_key(item):
+    # Resources are compared by their self links, because f5-sdk resources
+    # read twice are not equal to each other.
+    return _get_resource_attr(item, 'selfLink') or item
+
+
+def _get_resource_attr(resource, name):
+    # Collections read with $select are returned as plain dicts by the
+    # f5-sdk, because their items have no kind.
+    if isinstance(resource, dict):
+        return resource.get(name)
+    return getattr(resource, name, None)
+
+
+def _get_resource_full_name(resource):
+    return fqdn_name(
+        _get_resource_attr(resource, 'partition'),
+        _get_resource_attr(resource, 'name')
+    )
+
+
+class F5CollectionIndex(object):
+    """Index of the resources of a collection, for lookups by key
+
+    The collection is read the first time a lookup is made, and later
+    lookups are served from the index instead of reading and scanning the
+    collection again. Managers that change the collection call
+    ``invalidate`` so that the next lookup reads it again.
+
+    :param fetch: Callable that returns the resources of the collection. It
+                  should read as little of the collection as the lookups need,
+                  for example with ``filter_params`` and a ``$select``.
+    :param key: Callable that returns the key of a resource. Defaults to the
+                full name of the resource, such as ``/Common/foo``.
+    """
+    def __init__(self, fetch, key=None):
+        self.fetch = fetch
+        self.key = key or _get_resource_full_name
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = dict()
+            for resource in self.fetch():
+                self._index.setdefault(self.key(resource), resource)
+        return self._index
+
+    def get(self, key, default=None):
+        return self.index.get(key, default)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def invalidate(self):
+        self._index = None
+
+
+class F5Poller(object):
+    """Polls the device until an operation finishes
+
+    The device is checked, and then checked again after a delay, until the
+    value returned by the check is a success, or a failure, or the deadline
+    passes. The delay starts at ``delay`` and grows by ``backoff`` after
+    each check, up to ``max_delay``. Operations that finish quickly are
+    noticed quickly, and long ones, such as a reboot, are not checked more
+    often than they need to be.
+
+    When ``required`` is more than one, that many successes in a row are
+    needed. This is for states that flap while the device settles, such as
+    the provisioning of a module.
+
+    How long the wait took, and how many checks were made, is kept on the
+    poller and recorded in ``timings``, if given.
+
+    :param name: What is being waited for, as used in messages.
+    :param delay: Seconds to wait after the first check.
+    :param backoff: Factor the delay grows by after each check.
+    :param max_delay: Maximum seconds to wait between checks.
+    :param timeout: Seconds after which the wait fails. None waits forever.
+    :param initial_delay: Seconds to wait before the first check.
+    :param required: Successes in a row that are needed.
+    :param timings: An F5Timings to record the wait in.
+    :param clock: Callable returning the current time in seconds.
+    :param sleep: Callable that sleeps for the given seconds.
+    """
+    def __init__(self, name, delay=1.0, backoff=1.5, max_delay=30.0, timeout=None,
+                 initial_delay=0, required=1, timings=None, clock=None, sleep=None):
+        self.name = name
+        self.delay = delay
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.initial_delay = initial_delay
+        self.required = required
+        self.timings = timings
+        self.clock = clock or time.time
+        self.sleep = sleep or time.sleep
+
+        self.attempts = 0
+        self.waited = 0.0
+        self.elapsed = 0.0
+        self.outcome = None
+
+    def wait(self, check, success=bool, failure=None, error=None, ignore=()):
+        """Calls the check until its value is a success or a failure
+
+        :param check: Callable that checks the device, and returns a value
+                      for the predicates.
+        :param success: Predicate that is true of the values being waited
+                        for.
+        :param failure: Predicate that is true of values that mean the
+                        operation failed, and the wait should stop.
+        :param error: Callable that returns the message of a failure, from
+                      its value. Defaults to the value itself.
+        :param ignore: Exceptions that may be raised by the check while the
+                       device is unavailable, such as during a reboot. They
+                       are counted as a check that did not succeed.
+        :return: The value that was a success.
+        :raises F5ModuleError: If the value was a failure.
+        :raises F5PollTimeout: If the deadline passed first.
+        """
+        self.attempts = 0
+        self.waited = 0.0
+        self.outcome = None
+        start = self.clock()
+        deadline = None if self.timeout is None else start + self.timeout
+        delay = self.delay
+        successes = 0
+        value = None
+
+        try:
+            self._sleep(self.initial_delay, deadline)
+            while True:
+                self.attempts += 1
+                try:
+                    value = check()
+                except ignore:
+                    successes = 0
+                else:
+                    if failure is not None and failure(value):
+                        self.outcome = 'failure'
+                        raise F5ModuleError(str(error(value) if error else value))
+                    if success(value):
+                        successes += 1
+                        if successes >= self.required:
+                            self.outcome = 'success'
+                            return value
+                    else:
+                        successes = 0
+                if deadline is not None and self.clock() >= deadline:
+                    self.outcome = 'timeout'
+                    raise F5PollTimeout(
+                        "Timed out after {0} seconds waiting for {1}.".format(self.timeout, self.name),
+                        value=value
+                    )
+                self._sleep(delay, deadline)
+                delay = min(delay * self.backoff, self.max_delay)
+        finally:
+            self.elapsed = self.clock() - start
+            if self.timings is not None:
+                self.timings.record_poll(self.to_return())
+
+    def _sleep(self, seconds, deadline):
+        if deadline is not None:
+            seconds = min(seconds, max(deadline - self.clock(), 0))
+        if seconds > 0:
+            self.sleep(seconds)
+            self.waited += seconds
+
+    def to_return(self):
+        return dict(
+            name=self.name,
+            attempts=self.attempts,
+            waited=round(self.waited, 4),
+            elapsed=round(self.elapsed, 4),
+            outcome=self.outcome
+        )
 
 
 class AnsibleF5Parameters(object):
@@ -199,3 +1712,31 @@ class AnsibleF5Parameters(object):
 
 class F5ModuleError(Exception):
     pass
+
+
+class F5TransactionError(F5ModuleError):
+    """Raised when a transaction cannot be committed
+
+    :param message: Description of the failure.
+    :param operations: Each operation in the transaction, with its ``method``,
+                       ``path``, ``status`` and ``error``.
+    """
+    def __init__(self, message, operations=None):
+        self.operations = operations or []
+        failed = [x for x in self.operations if x['error']]
+        if failed:
+            message += ''.join(
+                '\n{0} {1}: {2}'.format(x['method'], x['path'], x['error']) for x in failed
+            )
+        super(F5TransactionError, self).__init__(message)
+
+
+class F5PollTimeout(F5ModuleError):
+    """Raised when a poller's deadline passes before the operation finishes
+
+    :param message: Description of the failure.
+    :param value: The value of the last check, if any.
+    """
+    def __init__(self, message, value=None):
+        self.value = value
+        super(F5PollTimeout, self).__init__(message)
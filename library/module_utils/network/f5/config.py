@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017 F5 Networks Inc.
+# GNU General Public License v3.0 (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import json
+import os
+import re
+import tarfile
+import tempfile
+import threading
+
+from ansible.module_utils._text import to_text
+from collections import defaultdict
+
+
+# The configuration files of a UCS archive. Each partition other than
+# Common has its own files.
+UCS_CONFIG_FILES = re.compile(
+    r'^(\./)?config/(partitions/[^/]+/)?(bigip|bigip_base)\.conf$'
+)
+
+_TMSH_TOKENS = re.compile(
+    r'[ \t\r]*(?:(#[^\n]*)|("(?:[^"\\]|\\.)*")|(\{)|(\})|(\n)|([^\s{}"]+))'
+)
+
+
+def iter_ucs_configs(path):
+    """Yields the configuration files of a UCS archive
+
+    The archive is read as a stream. Only the configuration files are read
+    into memory, and nothing is unpacked to disk.
+
+    :param path: Path of the UCS archive.
+    :return: Tuples of the name of each configuration file and its text.
+    """
+    with tarfile.open(path, mode='r|gz') as archive:
+        for member in archive:
+            if not member.isfile() or not UCS_CONFIG_FILES.match(member.name):
+                continue
+            fh = archive.extractfile(member)
+            yield member.name, to_text(fh.read(), errors='surrogate_then_replace')
+
+
+def parse_tmsh_config(text, raw=None):
+    """Parses tmsh configuration, such as the contents of bigip.conf
+
+    Each object is returned as the words of its header, such as
+    ``['ltm', 'pool', '/Common/foo']``, and its body. Bodies are dicts of the
+    attributes of the object. Flags, such as ``disabled``, are True. Nested
+    blocks are dicts, and blocks of single words, such as a list of VLANs,
+    are lists. As in the files saved by tmsh, the items of a list are
+    expected on lines of their own.
+
+    :param text: The configuration to parse.
+    :param raw: Object types, such as ``ltm rule``, whose bodies are not tmsh
+                syntax. Their bodies are returned as text.
+    :return: A list of the header and body of each object.
+    """
+    raw = raw or []
+    result = []
+    words = []
+    pos = 0
+    while pos < len(text):
+        match = _TMSH_TOKENS.match(text, pos)
+        if match is None or match.end() == pos:
+            break
+        pos = match.end()
+        comment, quoted, opening, closing, newline, word = match.groups()
+        if opening:
+            if ' '.join(words[:2]) in raw:
+                body, pos = _read_tmsh_raw_block(text, pos)
+            else:
+                entries, pos = _read_tmsh_block(text, pos)
+                body = _tmsh_entries_to_dict(entries)
+            result.append((words, body))
+            words = []
+        elif newline:
+            words = []
+        elif quoted or word:
+            words.append(_unquote_tmsh(quoted) if quoted else word)
+    return result
+
+
+def _unquote_tmsh(value):
+    return re.sub(r'\\(.)', r'\1', value[1:-1])
+
+
+def _read_tmsh_block(text, pos):
+    # Returns the entries of the block that starts at pos, and the position
+    # after its closing brace. Each entry is a list of words, and the entries
+    # of its nested block, if it has one.
+    entries = []
+    words = []
+    while pos < len(text):
+        match = _TMSH_TOKENS.match(text, pos)
+        if match is None or match.end() == pos:
+            break
+        pos = match.end()
+        comment, quoted, opening, closing, newline, word = match.groups()
+        if opening:
+            block, pos = _read_tmsh_block(text, pos)
+            entries.append((words, block))
+            words = []
+        elif closing:
+            break
+        elif newline:
+            if words:
+                entries.append((words, None))
+            words = []
+        elif quoted or word:
+            words.append(_unquote_tmsh(quoted) if quoted else word)
+    if words:
+        entries.append((words, None))
+    return entries, pos
+
+
+def _read_tmsh_raw_block(text, pos):
+    depth = 1
+    start = pos
+    while pos < len(text):
+        char = text[pos]
+        if char == '\\':
+            pos += 2
+            continue
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return text[start:pos].strip('\n'), pos + 1
+        pos += 1
+    return text[start:], pos
+
+
+def _tmsh_entries_to_dict(entries):
+    result = dict()
+    for words, block in entries:
+        key = words[0] if words else ''
+        if block is not None:
+            if block and all(len(w) == 1 and b is None for w, b in block):
+                value = [w[0] for w, b in block]
+            else:
+                value = _tmsh_entries_to_dict(block)
+        elif len(words) == 1:
+            value = True
+        else:
+            value = ' '.join(words[1:])
+        result[key] = value
+    return result
+
+
+class F5FactsWriter(object):
+    """Streams facts to a file, one JSON object per line
+
+    Each line is an object with the ``section`` the facts belong to, such as
+    ``pool``, and the ``facts`` themselves. The file is written next to its
+    destination and moved into place when the writer is closed, so a failed
+    run does not leave a partial file behind.
+
+    Writes are serialized, so facts may be written from many threads.
+
+    :param path: Path of the file to write the facts to.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.counts = defaultdict(int)
+        self._lock = threading.Lock()
+        fd, self._tmp = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(path)),
+            prefix='.{0}.'.format(os.path.basename(path))
+        )
+        self._fh = os.fdopen(fd, 'w')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def write(self, section, facts):
+        line = json.dumps(dict(section=section, facts=facts), sort_keys=True)
+        with self._lock:
+            self._fh.write(line + '\n')
+            self.counts[section] += 1
+
+    def close(self):
+        self._fh.close()
+        os.rename(self._tmp, self.path)
+
+    def discard(self):
+        self._fh.close()
+        os.remove(self._tmp)
+
+    def to_return(self):
+        return dict(
+            dest=self.path,
+            counts=dict(self.counts),
+            total=sum(self.counts.values())
+        )
@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017 F5 Networks Inc.
+# GNU General Public License v3.0 (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import os
+import time
+
+from ansible.module_utils.six.moves.urllib.parse import urlparse
+
+try:
+    import requests
+    HAS_REQUESTS = True
+except ImportError:
+    HAS_REQUESTS = False
+
+try:
+    from library.module_utils.network.f5.common import F5BaseClient
+    from library.module_utils.network.f5.common import F5ModuleError
+    from library.module_utils.network.f5.common import PersistentConnectionAdapter
+except ImportError:
+    from ansible.module_utils.network.f5.common import F5BaseClient
+    from ansible.module_utils.network.f5.common import F5ModuleError
+    from ansible.module_utils.network.f5.common import PersistentConnectionAdapter
+
+
+LOGIN_PATH = '/mgmt/shared/authn/login'
+
+# Size of the chunks used when uploading and downloading files. This matches
+# the chunk size used by the f5-sdk.
+CHUNK_SIZE = 512 * 1024
+
+
+class iControlRestError(F5ModuleError):
+    """Raised when the device returns an unexpected HTTP status
+
+    :param message: Description of the failure.
+    :param response: The ``requests`` response that caused the failure.
+    """
+    def __init__(self, message, response=None):
+        super(iControlRestError, self).__init__(message)
+        self.response = response
+
+    @property
+    def status_code(self):
+        if self.response is None:
+            return None
+        return self.response.status_code
+
+
+class iControlRestSession(object):
+    """A minimal iControl REST client
+
+    This client is a lightweight alternative to the f5-sdk's ManagementRoot.
+    It does not build a resource tree or query the device when it is created.
+    Instead, it exposes a handful of primitives that operate directly on URI
+    paths such as ``/mgmt/tm/ltm/pool/~Common~foo``.
+
+    Authentication is done lazily with a token on the first request. A token
+    that is rejected by the device is replaced once with a new login.
+
+    :param server: Address of the device.
+    :param user: Username to login with.
+    :param password: Password to login with.
+    :param port: Port of the management interface.
+    :param validate_certs: Whether or not to validate the device certificate.
+    :param token: An existing token to use instead of logging in.
+    :param login_provider: Login provider to request the token from.
+    :param timeout: Timeout, in seconds, of each request.
+    :param on_login: Callable invoked with the token and its local expiration
+                     time after every successful login.
+    """
+    def __init__(self, server, user, password, port=443, validate_certs=True,
+                 token=None, login_provider='tmos', timeout=30, on_login=None):
+        self.base_url = 'https://{0}:{1}'.format(server, port)
+        self.user = user
+        self.password = password
+        self.login_provider = login_provider
+        self.timeout = timeout
+        self.on_login = on_login
+        self.token = token
+        self.expiration = None
+
+        self.session = requests.Session()
+        self.session.verify = validate_certs
+        self.session.headers.update({'Content-Type': 'application/json'})
+
+    def login(self):
+        body = dict(
+            username=self.user,
+            password=self.password,
+            loginProviderName=self.login_provider
+        )
+        start = time.time()
+        self.session.headers.pop('X-F5-Auth-Token', None)
+        response = self.session.post(
+            self.base_url + LOGIN_PATH,
+            json=body,
+            timeout=self.timeout
+        )
+        if response.status_code != 200:
+            raise iControlRestError(
+                '{0} Unexpected Error: {1} for uri: {2}\nText: {3}'.format(
+                    response.status_code, response.reason, response.url, response.text
+                ),
+                response=response
+            )
+        try:
+            token = response.json()['token']
+            self.token = token['token']
+        except (ValueError, KeyError):
+            raise iControlRestError(
+                "Token field not found in the response", response=response
+            )
+        self.expiration = start + self._get_token_lifetime(token)
+        if self.on_login:
+            self.on_login(self.token, self.expiration)
+
+    def _get_token_lifetime(self, token):
+        try:
+            lifetime = (int(token['expirationMicros']) - int(token['lastUpdateMicros'])) / 1000000.0
+        except (KeyError, ValueError):
+            lifetime = float(token.get('timeout', 1200))
+
+        # Expire the token locally a little early to allow for clock skew
+        # between us and the device.
+        if lifetime > 120.0:
+            lifetime -= 60.0
+        return lifetime
+
+    def logout(self):
+        if self.token is None:
+            return
+        try:
+            self.session.delete(
+                self.base_url + '/mgmt/shared/authz/tokens/{0}'.format(self.token),
+                timeout=self.timeout
+            )
+        except Exception:
+            pass
+        self.token = None
+
+    def request(self, method, path, **kwargs):
+        """Sends a request and returns the response
+
+        :param method: HTTP method of the request.
+        :param path: Path of the request, relative to the device.
+        :param kwargs: Keyword arguments passed through to ``requests``.
+        :return: The ``requests`` response.
+        :raises iControlRestError: If the response status is an error.
+        """
+        if self.token is None:
+            self.login()
+        kwargs.setdefault('timeout', self.timeout)
+        response = self._send(method, path, **kwargs)
+        if response.status_code == 401 and self.password is not None:
+            # The token expired or was revoked. Login again and retry once.
+            self.login()
+            response = self._send(method, path, **kwargs)
+        if response.status_code >= 400:
+            raise iControlRestError(
+                '{0} Unexpected Error: {1} for uri: {2}\nText: {3}'.format(
+                    response.status_code, response.reason, response.url, response.text
+                ),
+                response=response
+            )
+        return response
+
+    def _send(self, method, path, **kwargs):
+        self.session.headers['X-F5-Auth-Token'] = self.token
+        return self.session.request(method, self.base_url + path, **kwargs)
+
+    def load(self, path, params=None):
+        """Returns the attributes of the resource at the path
+        """
+        response = self.request('GET', path, params=params)
+        return response.json()
+
+    def exists(self, path):
+        try:
+            self.request('GET', path)
+        except iControlRestError as ex:
+            if ex.status_code == 404:
+                return False
+            raise
+        return True
+
+    def create(self, path, params):
+        """Creates a resource in the collection at the path
+
+        :return: The attributes of the created resource.
+        """
+        response = self.request('POST', path, json=params)
+        return response.json()
+
+    def modify(self, path, params):
+        response = self.request('PATCH', path, json=params)
+        return response.json()
+
+    def delete(self, path):
+        self.request('DELETE', path)
+
+    def collection(self, path, params=None):
+        """Returns the items of the collection at the path
+        """
+        response = self.request('GET', path, params=params)
+        return response.json().get('items', [])
+
+    def exec_cmd(self, path, command, **kwargs):
+        """Runs a command endpoint, such as ``/mgmt/tm/util/bash``
+
+        :param path: Path of the command endpoint.
+        :param command: The command to run; for example ``run`` or ``save``.
+        :param kwargs: Additional attributes of the command.
+        :return: The attributes of the command result.
+        """
+        params = dict(command=command)
+        params.update(kwargs)
+        response = self.request('POST', path, json=params)
+        return response.json()
+
+    def upload(self, path, src):
+        """Uploads a local file to the path in chunks
+
+        :param path: Path of the upload endpoint, including the file name. For
+                     example ``/mgmt/shared/file-transfer/uploads/foo.iso``.
+        :param src: Path of the local file to upload.
+        :raises F5ModuleError: If the file is empty.
+        """
+        size = os.stat(src).st_size
+        if size == 0:
+            # There is no range of an empty file that the device accepts.
+            raise F5ModuleError(
+                "The file {0} is empty, and cannot be uploaded.".format(src)
+            )
+        headers = {'Content-Type': 'application/octet-stream'}
+        with open(src, 'rb') as fh:
+            start = 0
+            while True:
+                chunk = fh.read(CHUNK_SIZE)
+                end = start + len(chunk) - 1
+                headers['Content-Range'] = '{0}-{1}/{2}'.format(start, end, size)
+                self.request('POST', path, data=chunk, headers=headers)
+                start += len(chunk)
+                if start >= size:
+                    break
+
+    def download(self, path, dest):
+        """Downloads the file at the path to a local file in chunks
+
+        :param path: Path of the download endpoint, including the file name.
+                     For example ``/mgmt/shared/file-transfer/ucs-downloads/foo.ucs``.
+        :param dest: Path of the local file to write.
+        """
+        headers = {'Content-Type': 'application/octet-stream'}
+        with open(dest, 'wb') as fh:
+            start = 0
+            size = None
+            while size is None or start < size:
+                end = start + CHUNK_SIZE - 1
+                if size is not None:
+                    end = min(end, size - 1)
+                headers['Content-Range'] = '{0}-{1}/{2}'.format(start, end, size or 0)
+                response = self.request('GET', path, headers=headers)
+                fh.write(response.content)
+                if size is None:
+                    content_range = response.headers.get('Content-Range', '')
+                    if '/' not in content_range:
+                        break
+                    size = int(content_range.split('/')[-1])
+                start = end + 1
+
+
+class F5RestClient(F5BaseClient):
+    """Client that uses the lightweight iControl REST session
+
+    Modules that use this client address resources by their URI paths and
+    do not require the f5-sdk.
+    """
+    def _get_mgmt_root(self, **kwargs):
+        result = iControlRestSession(
+            self.params['server'] or 'localhost',
+            self.params['user'],
+            self.params['password'],
+            port=self.params['server_port'],
+            validate_certs=self.params['validate_certs'],
+            token=kwargs.get('token_to_use'),
+            on_login=self._on_login
+        )
+        if self.socket_path:
+            # The persistent connection authenticates on our behalf. The
+            # placeholder token is replaced by the connection's own.
+            result.session.mount('https://', PersistentConnectionAdapter(self.socket_path))
+            result.token = 'persistent'
+            result.password = None
+        return result
+
+    def _connect(self):
+        # Logins happen lazily, on the first request, so they are counted by
+        # the on_login callback instead of here.
+        if self.token_cache is None or self.socket_path:
+            return self._get_mgmt_root()
+        with self.token_cache.lock(*self.token_cache_key):
+            token = self.token_cache.get(*self.token_cache_key)
+            result = self._get_mgmt_root(token_to_use=token)
+            if token is None:
+                result.login()
+            self.token_is_cached = True
+        return result
+
+    def _on_login(self, token, expiration):
+        self.login_count += 1
+        if self.token_cache is not None:
+            # Also keeps the cache current when an expired token is
+            # replaced in the middle of a run.
+            self.token_cache.set(*self.token_cache_key, token=token, expiration=expiration)
+            self.token_is_cached = True
+
+    def request(self, method, path, **kwargs):
+        return self.api.request(method, path, **kwargs)
+
+    def reauthenticate(self, request):
+        if self.socket_path:
+            return False
+        if urlparse(request.url).path == LOGIN_PATH:
+            # The login itself was rejected, so the credentials are wrong.
+            return False
+        self.api.login()
+        request.headers['X-F5-Auth-Token'] = self.api.token
+        return True
+
+    def delete_token(self):
+        self.api.logout()
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017 F5 Networks Inc.
+# GNU General Public License v3.0 (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+import os
+
+
+# Directory that the markers of background jobs are written to.
+JOB_MARKER_DIR = '/var/tmp'
+
+
+def get_job_marker(name):
+    """Returns the path of the marker file of a background job
+
+    :param name: Name of the file the job works on, such as a qkview.
+    """
+    return '{0}/{1}.job'.format(JOB_MARKER_DIR, os.path.basename(name))
+
+
+def background_command(command, marker):
+    """Returns the arguments to run a command in the background with bash
+
+    The arguments are for ``/mgmt/tm/util/bash``, which then returns at once
+    instead of when the command finishes. The exit status of the command is
+    written to the marker file when it finishes; until then the marker does
+    not exist. This is how the job is checked on later, such as by the
+    ``bigip_job_status`` module.
+
+    :param command: The command to run. It must not contain double quotes.
+    :param marker: Path of the marker file, from ``get_job_marker``.
+    """
+    return '-c "rm -f {1}; {{ {0}; echo $? > {1}; }} > /dev/null 2>&1 &"'.format(
+        command, marker
+    )
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017 F5 Networks Inc.
+# GNU General Public License v3.0 (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = """
+    callback: f5_timings
+    type: aggregate
+    short_description: Summarizes the iControl calls made by F5 modules
+    version_added: "2.6"
+    description:
+      - Collects the C(_timings) returned by F5 modules run with the
+        C(timings) option of their C(provider), and summarizes them at the
+        end of the playbook.
+      - Calls are summarized per host, per module and per endpoint. Each
+        summary has the call count, the 50th, 95th and 99th percentile latency,
+        the bytes transferred, the number of logins and the time spent polling
+        the device.
+      - Object names in paths are replaced with C({name}) so that, for
+        example, the calls for every pool are counted against one endpoint.
+    requirements:
+      - whitelisting in configuration
+      - the C(timings) option of the C(provider), or the F5_TIMINGS
+        environment variable, set on the F5 modules
+    options:
+      output_limit:
+        description: Number of endpoints, slowest first, to display in the summary.
+        default: 20
+        env:
+          - name: F5_TIMINGS_OUTPUT_LIMIT
+        ini:
+          - section: callback_f5_timings
+            key: output_limit
+      report:
+        description:
+          - Path of a file to write the full report to.
+          - When the path ends in C(.csv), one row is written per host, module
+            and endpoint. Otherwise the report is written as JSON.
+        env:
+          - name: F5_TIMINGS_REPORT
+        ini:
+          - section: callback_f5_timings
+            key: report
+"""
+
+EXAMPLES = """
+# In ansible.cfg
+#
+#   [defaults]
+#   callback_whitelist = f5_timings
+#
+#   [callback_f5_timings]
+#   report = /tmp/f5_timings.json
+#
+# Then run the playbook with F5_TIMINGS=yes in the environment.
+"""
+
+import csv
+import json
+import math
+
+from collections import defaultdict
+
+from ansible.module_utils._text import to_text
+from ansible.plugins.callback import CallbackBase
+
+
+def percentile(values, pct):
+    """Returns the nearest-rank percentile of sorted values
+    """
+    if not values:
+        return None
+    rank = int(math.ceil(pct / 100.0 * len(values))) - 1
+    return values[max(0, min(rank, len(values) - 1))]
+
+
+def endpoint(method, path):
+    """Returns the endpoint of a call, with object names removed
+
+    Both the REST form, ``/mgmt/tm/ltm/pool/~Common~foo/members``, and the
+    member form, ``/mgmt/tm/ltm/pool/~Common~foo/members/~Common~bar:80``, of
+    object names are replaced.
+    """
+    parts = [
+        '{name}' if part.startswith('~') else part for part in path.split('/')
+    ]
+    return '{0} {1}'.format(method, '/'.join(parts))
+
+
+def get_polling(timings):
+    """Returns the seconds that a module run spent polling the device
+
+    The waits of each F5Poller are recorded in ``polls``. Runs without them
+    fall back to the time counted against the ``wait`` phase of the module.
+    """
+    polls = timings.get('polls')
+    if polls:
+        return sum(x.get('elapsed') or 0.0 for x in polls)
+    return timings.get('phases', {}).get('wait', 0.0)
+
+
+class Summary(object):
+    def __init__(self):
+        self.latencies = []
+        self.bytes = 0
+        self.logins = 0
+        self.polling = 0.0
+        self.tasks = 0
+
+    def add_call(self, call):
+        self.latencies.append(call.get('elapsed') or 0.0)
+        self.bytes += call.get('bytes') or 0
+
+    def to_return(self):
+        latencies = sorted(self.latencies)
+        return dict(
+            calls=len(latencies),
+            p50=percentile(latencies, 50),
+            p95=percentile(latencies, 95),
+            p99=percentile(latencies, 99),
+            total=round(sum(latencies), 4),
+            bytes=self.bytes,
+            logins=self.logins,
+            polling=round(self.polling, 4),
+            tasks=self.tasks
+        )
+
+
+class CallbackModule(CallbackBase):
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = 'aggregate'
+    CALLBACK_NAME = 'f5_timings'
+    CALLBACK_NEEDS_WHITELIST = True
+
+    def __init__(self):
+        super(CallbackModule, self).__init__()
+        self.hosts = defaultdict(Summary)
+        self.modules = defaultdict(Summary)
+        self.endpoints = defaultdict(Summary)
+        self.output_limit = 20
+        self.report = None
+
+    def set_options(self, task_keys=None, var_options=None, direct=None):
+        super(CallbackModule, self).set_options(task_keys=task_keys, var_options=var_options, direct=direct)
+        self.output_limit = int(self.get_option('output_limit'))
+        self.report = self.get_option('report')
+
+    def _get_timings(self, result):
+        if '_timings' in result:
+            yield result['_timings']
+        # Loops return the result of each item separately.
+        for item in result.get('results', []):
+            if isinstance(item, dict) and '_timings' in item:
+                yield item['_timings']
+
+    def _record(self, result):
+        host = result._host.get_name()
+        module = result._task.action
+        for timings in self._get_timings(result._result):
+            summaries = [self.hosts[host], self.modules[module]]
+            for summary in summaries:
+                summary.tasks += 1
+                summary.logins += timings.get('logins') or 0
+                summary.polling += get_polling(timings)
+            for call in timings.get('calls', []):
+                key = (host, module, endpoint(call['method'], call['path']))
+                self.endpoints[key].add_call(call)
+                for summary in summaries:
+                    summary.add_call(call)
+
+    def v2_runner_on_ok(self, result):
+        self._record(result)
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        self._record(result)
+
+    def to_return(self):
+        return dict(
+            hosts=dict((k, v.to_return()) for k, v in self.hosts.items()),
+            modules=dict((k, v.to_return()) for k, v in self.modules.items()),
+            endpoints=[
+                self._endpoint_to_return(k, v) for k, v in sorted(self.endpoints.items())
+            ]
+        )
+
+    def _endpoint_to_return(self, key, summary):
+        result = summary.to_return()
+        # Logins and polling are known per task, not per call.
+        for k in ['logins', 'polling', 'tasks']:
+            result.pop(k)
+        result.update(dict(host=key[0], module=key[1], endpoint=key[2]))
+        return result
+
+    def _write_report(self, report):
+        if self.report.endswith('.csv'):
+            fields = [
+                'host', 'module', 'endpoint', 'calls', 'p50', 'p95', 'p99',
+                'total', 'bytes'
+            ]
+            with open(self.report, 'w') as fh:
+                writer = csv.DictWriter(fh, fieldnames=fields, extrasaction='ignore')
+                writer.writeheader()
+                writer.writerows(report['endpoints'])
+        else:
+            with open(self.report, 'w') as fh:
+                json.dump(report, fh, indent=4, sort_keys=True)
+
+    def v2_playbook_on_stats(self, stats):
+        if not self.endpoints and not self.hosts:
+            return
+        report = self.to_return()
+
+        self._display.banner('F5 ICONTROL CALLS')
+        for host, summary in sorted(report['hosts'].items()):
+            self._display.display(
+                u'{0}: {1} calls, {2} logins, {3:.2f}s polling, {4} bytes'.format(
+                    host, summary['calls'], summary['logins'], summary['polling'], summary['bytes']
+                )
+            )
+        endpoints = sorted(report['endpoints'], key=lambda x: x['total'], reverse=True)
+        for item in endpoints[:self.output_limit]:
+            self._display.display(
+                u'{0} {1} {2}: {3} calls, p50 {4:.3f}s, p95 {5:.3f}s, p99 {6:.3f}s'.format(
+                    item['host'], item['module'], item['endpoint'], item['calls'],
+                    item['p50'], item['p95'], item['p99']
+                )
+            )
+
+        if self.report:
+            try:
+                self._write_report(report)
+            except (IOError, OSError) as ex:
+                self._display.warning(
+                    u'Unable to write the F5 timings report: {0}'.format(to_text(ex))
+                )
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017 F5 Networks Inc.
+# GNU General Public License v3.0 (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = """
+---
+author: F5 Networks (@F5Networks)
+httpapi: bigip
+short_description: HttpApi Plugin for BIG-IP devices
+description:
+  - This HttpApi plugin keeps a single, authenticated, keep-alive HTTPS session
+    open to a BIG-IP for the lifetime of a play.
+  - F5 modules that are run with C(connection=httpapi) send their iControl REST
+    requests through this session instead of opening their own. The TLS
+    handshake and token login are therefore paid once per device, instead of
+    once per task.
+version_added: "2.6"
+options:
+  login_provider:
+    type: str
+    description:
+      - The login provider to request the authentication token from.
+    default: tmos
+    vars:
+      - name: ansible_httpapi_bigip_login_provider
+"""
+
+EXAMPLES = """
+# In the inventory
+#
+#   [bigips]
+#   bigip1 ansible_host=10.10.10.10
+#
+#   [bigips:vars]
+#   ansible_connection=httpapi
+#   ansible_network_os=bigip
+#   ansible_httpapi_use_ssl=yes
+#   ansible_httpapi_validate_certs=no
+#   ansible_user=admin
+#   ansible_httpapi_password=secret
+
+- name: Set the hostname
+  bigip_hostname:
+    hostname: bigip1.localhost.localdomain
+"""
+
+import base64
+
+from ansible.errors import AnsibleConnectionFailure
+from ansible.module_utils._text import to_bytes
+from ansible.module_utils._text import to_text
+from ansible.plugins.httpapi import HttpApiBase
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    HAS_REQUESTS = True
+except ImportError:
+    HAS_REQUESTS = False
+
+try:
+    from __main__ import display
+except ImportError:
+    from ansible.utils.display import Display
+    display = Display()
+
+
+LOGIN_PATH = '/mgmt/shared/authn/login'
+TOKEN_PATH = '/mgmt/shared/authz/tokens/{0}'
+
+# Headers from the module side which must not be forwarded. The plugin owns
+# authentication and the connection itself.
+HOP_BY_HOP_HEADERS = frozenset([
+    'x-f5-auth-token', 'authorization', 'connection', 'host', 'content-length'
+])
+
+
+class HttpApi(HttpApiBase):
+    def __init__(self, connection):
+        super(HttpApi, self).__init__(connection)
+        self.session = None
+        self.token = None
+        self._credentials = None
+
+    def _get_session(self):
+        if self.session is None:
+            if not HAS_REQUESTS:
+                raise AnsibleConnectionFailure(
+                    "The python requests module is required by the bigip httpapi plugin"
+                )
+            self.session = requests.Session()
+            self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+            self.session.verify = self.connection.get_option('validate_certs')
+            self.session.headers.update({'Content-Type': 'application/json'})
+        return self.session
+
+    def _get_login_provider(self):
+        try:
+            result = self.get_option('login_provider')
+        except KeyError:
+            result = None
+        return result or 'tmos'
+
+    def login(self, username, password):
+        self._credentials = (username, password)
+        body = dict(
+            username=username,
+            password=password,
+            loginProviderName=self._get_login_provider()
+        )
+        session = self._get_session()
+        session.headers.pop('X-F5-Auth-Token', None)
+        response = session.post(
+            self.connection._url + LOGIN_PATH,
+            json=body,
+            timeout=self.connection.get_option('timeout')
+        )
+        if response.status_code != 200:
+            raise AnsibleConnectionFailure(
+                'Authentication process failed, server returned: {0}'.format(response.text)
+            )
+        try:
+            self.token = response.json()['token']['token']
+        except (ValueError, KeyError):
+            raise AnsibleConnectionFailure(
+                'Server returned invalid response during connection authentication.'
+            )
+        session.headers['X-F5-Auth-Token'] = self.token
+
+    def logout(self):
+        if self.token is None or self.session is None:
+            return
+        try:
+            self.session.delete(
+                self.connection._url + TOKEN_PATH.format(self.token),
+                timeout=self.connection.get_option('timeout')
+            )
+        except Exception:
+            pass
+        self.token = None
+        self.session.close()
+        self.session = None
+
+    def send_request(self, data, **message_kwargs):
+        """Sends a request over the shared session
+
+        Bodies are base64 encoded in both directions so that binary uploads
+        and downloads survive the JSON-RPC trip between the module and the
+        persistent connection.
+
+        :param data: Base64 encoded request body, or None.
+        :param message_kwargs: ``method``, ``path`` and ``headers`` of the request.
+        :return: A dict containing the ``code``, ``reason``, ``headers`` and
+                 base64 encoded ``contents`` of the response.
+        """
+        method = message_kwargs.get('method', 'GET')
+        path = message_kwargs['path']
+        headers = dict(
+            (k, v) for k, v in message_kwargs.get('headers', {}).items()
+            if k.lower() not in HOP_BY_HOP_HEADERS
+        )
+        if data is not None:
+            data = base64.b64decode(to_bytes(data))
+
+        response = self._send(method, path, data, headers)
+        if response.status_code == 401 and self._credentials:
+            # The token expired or was revoked. Login again and retry once.
+            display.vvvv('bigip token rejected; logging in again')
+            self.login(*self._credentials)
+            response = self._send(method, path, data, headers)
+
+        return dict(
+            code=response.status_code,
+            reason=response.reason,
+            headers=dict(response.headers),
+            contents=to_text(base64.b64encode(response.content))
+        )
+
+    def _send(self, method, path, data, headers):
+        session = self._get_session()
+        return session.request(
+            method,
+            self.connection._url + path,
+            data=data,
+            headers=headers,
+            timeout=self.connection.get_option('timeout')
+        )
@@ -2,12 +2,18 @@
 # https://raw.githubusercontent.com/ansible/ansible/devel/test/units/modules/utils.py
 
 import json
+import threading
 
 from ansible.compat.tests import unittest
 from ansible.compat.tests.mock import patch
 from ansible.module_utils import basic
 from ansible.module_utils._text import to_bytes
 
+try:
+    from library.module_utils.network.f5.icontrol import iControlRestError
+except ImportError:
+    from ansible.module_utils.network.f5.icontrol import iControlRestError
+
 
 def set_module_args(args):
     args = json.dumps({'ANSIBLE_MODULE_ARGS': args})
@@ -39,3 +45,97 @@ class ModuleTestCase(unittest.TestCase):
         self.mock_module = patch.multiple(basic.AnsibleModule, exit_json=exit_json, fail_json=fail_json)
         self.mock_module.start()
         self.addCleanup(self.mock_module.stop)
+
+
+class FakeResponse(object):
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class InTurn(list):
+    """Values of a path of the FakeApi that are returned one per request
+
+    The last value is returned for all the requests after it.
+    """
+    def next(self):
+        return self.pop(0) if len(self) > 1 else self[0]
+
+
+def in_turn(*values):
+    return InTurn(values)
+
+
+class FakeApi(object):
+    """Stands in for the api of the client, for managers that send their requests with it
+
+    ``resources`` maps each path to what is read from it, and ``outputs`` maps a
+    text found in the path or the arguments of a command to its output. Either
+    may be an exception, which is raised, or the values of ``in_turn``. Paths
+    without a resource are not found, unless there is a ``default`` for them.
+
+    Collections are paged, filtered on one field and selected like the device
+    does. The requests that are sent are recorded in ``calls``, ``commands`` and
+    ``downloads``.
+    """
+    def __init__(self, resources=None, outputs=None, default=None):
+        self.resources = resources if resources is not None else {}
+        self.outputs = outputs or {}
+        self.default = default
+        self.calls = []
+        self.threads = []
+        self.commands = []
+        self.downloads = []
+
+    def answer(self, value):
+        if isinstance(value, InTurn):
+            value = value.next()
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    def load(self, path, params=None):
+        self.calls.append((path, params))
+        self.threads.append(threading.current_thread().name)
+        if path in self.resources:
+            resource = self.answer(self.resources[path])
+        elif self.default is not None:
+            resource = self.default
+        else:
+            raise iControlRestError('404 Unexpected Error: Not Found', response=FakeResponse(404))
+        if params and isinstance(resource, dict) and 'items' in resource:
+            resource = dict(resource, items=query(resource['items'], params))
+        return resource
+
+    def collection(self, path, params=None):
+        return self.load(path, params=params)
+
+    def exec_cmd(self, path, command, **kwargs):
+        args = kwargs.get('utilCmdArgs')
+        self.commands.append((path, args))
+        for text, output in self.outputs.items():
+            if text in path or text in (args or ''):
+                return dict(commandResult=self.answer(output))
+        return dict()
+
+    def download(self, path, dest):
+        self.downloads.append((path, dest))
+        with open(dest, 'w') as fh:
+            fh.write('downloaded')
+
+
+class FakeClient(object):
+    def __init__(self, api):
+        self.api = api
+
+
+def query(items, params):
+    if '$filter' in params:
+        key, value = params['$filter'].split(' eq ')
+        items = [x for x in items if x.get(key) == value]
+    if '$top' in params:
+        skip = params.get('$skip', 0)
+        items = items[skip:skip + params['$top']]
+    if '$select' in params:
+        keys = params['$select'].split(',')
+        items = [dict((k, v) for k, v in x.items() if k in keys) for x in items]
+    return items
@@ -20,17 +20,17 @@ from ansible.compat.tests.mock import patch
 from ansible.module_utils.basic import AnsibleModule
 
 try:
-    from library.bigip_configsync_actions import Parameters
-    from library.bigip_configsync_actions import ModuleManager
-    from library.bigip_configsync_actions import ArgumentSpec
+    from library.bigip_configsync_action import Parameters
+    from library.bigip_configsync_action import ModuleManager
+    from library.bigip_configsync_action import ArgumentSpec
     from library.module_utils.network.f5.common import F5ModuleError
     from library.module_utils.network.f5.common import iControlUnexpectedHTTPError
     from test.unit.modules.utils import set_module_args
 except ImportError:
     try:
-        from ansible.modules.network.f5.bigip_configsync_actions import Parameters
-        from ansible.modules.network.f5.bigip_configsync_actions import ModuleManager
-        from ansible.modules.network.f5.bigip_configsync_actions import ArgumentSpec
+        from ansible.modules.network.f5.bigip_configsync_action import Parameters
+        from ansible.modules.network.f5.bigip_configsync_action import ModuleManager
+        from ansible.modules.network.f5.bigip_configsync_action import ArgumentSpec
         from ansible.module_utils.network.f5.common import F5ModuleError
         from ansible.module_utils.network.f5.common import iControlUnexpectedHTTPError
         from units.modules.utils import set_module_args
@@ -59,6 +59,20 @@ def load_fixture(name):
     return data
 
 
+def sync_status(status, *details):
+    entries = {
+        'status': dict(description=status),
+        'https://localhost/mgmt/tm/cm/syncStatus/0/details': dict(nestedStats=dict(entries=dict(
+            ('https://localhost/mgmt/tm/cm/syncStatus/0/details/{0}'.format(i), dict(nestedStats=dict(entries=dict(
+                details=dict(description=detail)
+            )))) for i, detail in enumerate(details)
+        )))
+    }
+    return Mock(entries={
+        'https://localhost/mgmt/tm/cm/sync-status/0': dict(nestedStats=dict(entries=entries))
+    })
+
+
 class TestParameters(unittest.TestCase):
     def test_module_parameters(self):
         args = dict(
@@ -72,6 +86,7 @@ class TestParameters(unittest.TestCase):
         assert p.sync_group_to_device is True
         assert p.overwrite_config is True
         assert p.device_group == 'foo'
+        assert p.device_groups == ['foo']
 
     def test_module_parameters_yes_no(self):
         args = dict(
@@ -86,16 +101,23 @@ class TestParameters(unittest.TestCase):
         assert p.overwrite_config is True
         assert p.device_group == 'foo'
 
+    def test_module_parameters_groups(self):
+        args = dict(
+            device_group=['foo', 'bar', 'foo']
+        )
+        p = Parameters(params=args)
+        assert p.device_groups == ['foo', 'bar']
+
 
 class TestManager(unittest.TestCase):
 
     def setUp(self):
         self.spec = ArgumentSpec()
 
-    def test_update_agent_status_traps(self, *args):
+    def get_manager(self, device_group):
         set_module_args(dict(
             sync_device_to_group='yes',
-            device_group="foo",
+            device_group=device_group,
             password='passsword',
             server='localhost',
             user='admin'
@@ -108,16 +130,96 @@ class TestManager(unittest.TestCase):
         mm = ModuleManager(module=module)
 
         # Override methods to force specific logic in the module to happen
-        mm._device_group_exists = Mock(return_value=True)
-        mm._sync_to_group_required = Mock(return_value=False)
+        mm._get_missing_device_groups = Mock(return_value=[])
         mm.execute_on_device = Mock(return_value=True)
-        mm.read_current_from_device = Mock(return_value=None)
+        return mm
 
-        mm._get_status_from_resource = Mock()
-        mm._get_status_from_resource.side_effect = [
-            'Changes Pending', 'Awaiting Initial Sync', 'In Sync'
+    def test_update_agent_status_traps(self, *args):
+        mm = self.get_manager('foo')
+        mm.read_current_from_device = Mock(side_effect=[
+            sync_status('Changes Pending'),
+            sync_status('Awaiting Initial Sync'),
+            sync_status('Not All Devices Synced'),
+            sync_status('In Sync'),
+        ])
+
+        with patch('library.module_utils.network.f5.common.time.sleep'):
+            results = mm.exec_module()
+
+        assert results['changed'] is True
+        assert results['device_groups'][0]['name'] == 'foo'
+        assert results['device_groups'][0]['status'] == 'In Sync'
+
+    def test_sync_several_groups(self, *args):
+        mm = self.get_manager(['foo', 'bar', 'baz'])
+        mm.read_current_from_device = Mock(side_effect=[
+            sync_status(
+                'Changes Pending',
+                'foo (Changes Pending): There is a possible change conflict',
+                'bar (Changes Pending): There is a possible change conflict',
+                'baz (In Sync): All devices in the device group are in sync'
+            ),
+            sync_status(
+                'Not All Devices Synced',
+                'foo (In Sync): All devices in the device group are in sync',
+                'bar (Not All Devices Synced): bigip2 did not receive last sync successfully',
+                'baz (In Sync): All devices in the device group are in sync'
+            ),
+            sync_status(
+                'In Sync',
+                'foo (In Sync): All devices in the device group are in sync',
+                'bar (In Sync): All devices in the device group are in sync',
+                'baz (In Sync): All devices in the device group are in sync'
+            ),
+        ])
+
+        clock = [1000.0]
+
+        def sleep(seconds):
+            clock[0] += seconds
+
+        with patch('library.module_utils.network.f5.common.time.time', side_effect=lambda: clock[0]):
+            with patch('library.module_utils.network.f5.common.time.sleep', side_effect=sleep):
+                results = mm.exec_module()
+
+        # Only the groups that are not in sync are synced, and every group
+        # is watched with the one read of the status.
+        assert [x[0][0] for x in mm.execute_on_device.call_args_list] == ['foo', 'bar']
+        assert mm.read_current_from_device.call_count == 3
+        assert results['device_groups'] == [
+            dict(name='foo', status='In Sync', elapsed=3),
+            dict(name='bar', status='In Sync', elapsed=6),
         ]
 
+    def test_sync_fails_for_one_group(self, *args):
+        mm = self.get_manager(['foo', 'bar'])
+        mm.read_current_from_device = Mock(side_effect=[
+            sync_status(
+                'Changes Pending',
+                'foo (Changes Pending): There is a possible change conflict',
+                'bar (Changes Pending): There is a possible change conflict',
+            ),
+            sync_status(
+                'Changes Pending',
+                'foo (Changes Pending): There is a possible change conflict',
+                ' - Recommended action: Synchronize bigip1 to group foo',
+                'bar (In Sync): All devices in the device group are in sync',
+            ),
+        ])
+
+        with patch('library.module_utils.network.f5.common.time.sleep'):
+            with self.assertRaises(F5ModuleError) as ex:
+                mm.exec_module()
+
+        assert 'foo: Recommended action: Synchronize bigip1 to group foo' in str(ex.exception)
+        assert 'bar:' not in str(ex.exception)
+        assert mm.results[1] == dict(name='bar', status='In Sync', elapsed=mm.results[1]['elapsed'])
+
+    def test_already_in_sync(self, *args):
+        mm = self.get_manager(['foo', 'bar'])
+        mm.read_current_from_device = Mock(return_value=sync_status('In Sync'))
+
         results = mm.exec_module()
 
-        assert results['changed'] is True
+        assert results['changed'] is False
+        assert mm.execute_on_device.call_count == 0
@@ -0,0 +1,297 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017 F5 Networks Inc.
+# GNU General Public License v3.0 (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import os
+import json
+import shutil
+import sys
+import tarfile
+import tempfile
+import threading
+
+from nose.plugins.skip import SkipTest
+if sys.version_info < (2, 7):
+    raise SkipTest("F5 Ansible modules require Python >= 2.7")
+
+from ansible.compat.tests import unittest
+from ansible.module_utils.basic import AnsibleModule
+
+try:
+    from library.bigip_device_facts import Parameters
+    from library.bigip_device_facts import ModuleManager
+    from library.bigip_device_facts import ArgumentSpec
+    from library.bigip_device_facts import flatten_resource
+    from library.bigip_device_facts import snake_case
+    from library.module_utils.network.f5.common import F5ModuleError
+    from test.unit.modules.utils import set_module_args
+    from test.unit.modules.utils import FakeApi
+    from test.unit.modules.utils import FakeClient
+except ImportError:
+    try:
+        from ansible.modules.network.f5.bigip_device_facts import Parameters
+        from ansible.modules.network.f5.bigip_device_facts import ModuleManager
+        from ansible.modules.network.f5.bigip_device_facts import ArgumentSpec
+        from ansible.modules.network.f5.bigip_device_facts import flatten_resource
+        from ansible.modules.network.f5.bigip_device_facts import snake_case
+        from ansible.module_utils.network.f5.common import F5ModuleError
+        from units.modules.utils import set_module_args
+        from units.modules.utils import FakeApi
+        from units.modules.utils import FakeClient
+    except ImportError:
+        raise SkipTest("F5 Ansible modules require the requests Python library")
+
+fixture_path = os.path.join(os.path.dirname(__file__), 'fixtures')
+fixture_data = {}
+
+
+def load_fixture(name):
+    path = os.path.join(fixture_path, name)
+
+    if path in fixture_data:
+        return fixture_data[path]
+
+    with open(path) as f:
+        data = f.read()
+
+    try:
+        data = json.loads(data)
+    except Exception:
+        pass
+
+    fixture_data[path] = data
+    return data
+
+
+class TestParameters(unittest.TestCase):
+    def test_module_parameters(self):
+        args = dict(
+            include=['Pool', 'vlan', 'pool'],
+            filter='/Common/*'
+        )
+        p = Parameters(params=args)
+        assert p.include == ['pool', 'vlan']
+        assert p.filter.search('/Common/foo')
+        assert not p.filter.search('/Other/foo')
+        assert p.workers == 4
+
+    def test_include_all(self):
+        p = Parameters(params=dict(include=['all']))
+        assert 'virtual_server' in p.include
+        assert 'all' not in p.include
+
+    def test_invalid_include(self):
+        p = Parameters(params=dict(include=['pool', 'foo']))
+        with self.assertRaises(F5ModuleError) as ex:
+            p.include
+        assert 'foo' in str(ex.exception)
+
+    def test_snake_case(self):
+        assert snake_case('fullPath') == 'full_path'
+        assert snake_case('minActiveMembers') == 'min_active_members'
+        assert snake_case('ip-protocol') == 'ip_protocol'
+
+    def test_flatten_resource(self):
+        pool = load_fixture('load_ltm_pool_collection_expanded.json')['items'][0]
+        result = flatten_resource(pool)
+        assert 'kind' not in result
+        assert 'self_link' not in result
+        assert result['full_path'] == '/Common/foo'
+        assert result['load_balancing_mode'] == 'round-robin'
+        assert result['members'] == [dict(
+            name='10.10.10.10:80',
+            partition='Common',
+            full_path='/Common/10.10.10.10:80',
+            address='10.10.10.10',
+            connection_limit=0,
+            state='unchecked'
+        )]
+
+
+class TestManager(unittest.TestCase):
+    def setUp(self):
+        self.spec = ArgumentSpec()
+        self.responses = {
+            '/mgmt/tm/ltm/pool': load_fixture('load_ltm_pool_collection_expanded.json'),
+            '/mgmt/tm/sys/version': load_fixture('load_sys_version.json'),
+            '/mgmt/tm/sys/provision': dict(items=[
+                dict(name='ltm', fullPath='ltm', level='nominal')
+            ]),
+        }
+
+    def get_manager(self, **kwargs):
+        args = dict(
+            server='localhost',
+            password='password',
+            user='admin'
+        )
+        args.update(kwargs)
+        set_module_args(args)
+        module = AnsibleModule(
+            argument_spec=self.spec.argument_spec,
+            supports_check_mode=self.spec.supports_check_mode
+        )
+        client = FakeClient(FakeApi(self.responses, default=dict(items=[])))
+        return ModuleManager(module=module, client=client), client
+
+    def test_read_facts(self, *args):
+        mm, client = self.get_manager(include=['pool', 'system_info', 'provision'])
+        results = mm.exec_module()
+
+        assert results['changed'] is False
+        assert results['ansible_facts']['pool'] == results['pool']
+        assert sorted(results['pool'].keys()) == ['/Common/foo', '/Other/bar']
+        assert results['pool']['/Other/bar']['load_balancing_mode'] == 'least-connections-member'
+        assert 'members' not in results['pool']['/Other/bar']
+        assert results['system_info']['version']['version'] == '13.1.0'
+        assert results['system_info']['version']['product'] == 'BIG-IP'
+        assert results['provision'] == dict(ltm=dict(name='ltm', full_path='ltm', level='nominal'))
+
+        # One request is made for each collection, and subcollections are
+        # expanded in the same request.
+        paths = [x[0] for x in client.api.calls]
+        assert sorted(paths) == [
+            '/mgmt/tm/ltm/pool', '/mgmt/tm/sys/hardware', '/mgmt/tm/sys/provision',
+            '/mgmt/tm/sys/version'
+        ]
+        assert client.api.calls[0][1] == dict(expandSubcollections='true')
+
+    def test_read_facts_concurrently(self, *args):
+        mm, client = self.get_manager(include=['pool', 'vlan', 'node', 'rule'], workers=3)
+        mm.exec_module()
+
+        main = threading.current_thread().name
+
+        # The first request logs in, so it is made before the others.
+        assert client.api.threads[0] == main
+        assert all(x != main for x in client.api.threads[1:])
+        assert len(client.api.calls) == 4
+
+    def test_filter(self, *args):
+        mm, client = self.get_manager(include=['pool', 'provision'], filter='/Common/*')
+        results = mm.exec_module()
+
+        assert list(results['pool'].keys()) == ['/Common/foo']
+
+        # The provision category is not filtered by name.
+        assert list(results['provision'].keys()) == ['ltm']
+
+    def test_write_facts_to_file(self, *args):
+        path = tempfile.mkdtemp()
+        dest = os.path.join(path, 'facts.jsonl')
+        try:
+            mm, client = self.get_manager(
+                include=['pool', 'system_info'], filter='/Common/*', dest=dest, page_size=1
+            )
+            results = mm.exec_module()
+
+            with open(dest) as fh:
+                lines = [json.loads(x) for x in fh]
+        finally:
+            shutil.rmtree(path)
+
+        assert results == dict(
+            changed=False, dest=dest, counts=dict(pool=1, system_info=2), total=3
+        )
+        assert 'ansible_facts' not in results
+
+        pools = [x['facts'] for x in lines if x['section'] == 'pool']
+        assert [x['full_path'] for x in pools] == ['/Common/foo']
+        versions = [x['facts'] for x in lines if 'version' in x['facts']]
+        assert versions[0]['version']['version'] == '13.1.0'
+
+        # The pools are read a page at a time, and subcollections are still
+        # expanded in each page.
+        pages = [x[1] for x in client.api.calls if x[0] == '/mgmt/tm/ltm/pool']
+        assert pages == [
+            {'expandSubcollections': 'true', '$top': 1, '$skip': 0},
+            {'expandSubcollections': 'true', '$top': 1, '$skip': 1},
+            {'expandSubcollections': 'true', '$top': 1, '$skip': 2},
+        ]
+
+    def test_snapshot(self, *args):
+        path = tempfile.mkdtemp()
+        try:
+            mm, client = self.get_manager(include=['pool', 'provision', 'system_info'], snapshot_dir=path)
+            first = mm.exec_module()
+            assert first['cached_sections'] == []
+
+            # Nothing changed, so the collections are served from the
+            # snapshot. Only their generations are read.
+            mm, client = self.get_manager(include=['pool', 'provision', 'system_info'], snapshot_dir=path)
+            second = mm.exec_module()
+            assert second['cached_sections'] == ['pool', 'provision']
+            assert second['pool'] == first['pool']
+            full_reads = [
+                x[0] for x in client.api.calls if x[1] is None or '$select' not in x[1]
+            ]
+            assert sorted(full_reads) == ['/mgmt/tm/sys/hardware', '/mgmt/tm/sys/version']
+
+            # A pool is modified, which moves the generation of its
+            # collection, so only the pools are read again.
+            pool = dict(self.responses['/mgmt/tm/ltm/pool']['items'][0])
+            pool['generation'] = 300
+            pool['description'] = 'changed'
+            self.responses['/mgmt/tm/ltm/pool'] = dict(items=[pool])
+            mm, client = self.get_manager(include=['pool', 'provision'], snapshot_dir=path)
+            third = mm.exec_module()
+            assert third['cached_sections'] == ['provision']
+            assert list(third['pool'].keys()) == ['/Common/foo']
+            assert third['pool']['/Common/foo']['description'] == 'changed'
+
+            mm, client = self.get_manager(include=['pool', 'provision'], snapshot_dir=path, force_refresh=True)
+            forced = mm.exec_module()
+            assert forced['cached_sections'] == []
+            assert all('$select' not in (x[1] or {}) for x in client.api.calls)
+        finally:
+            shutil.rmtree(path)
+
+    def test_read_facts_from_ucs(self, *args):
+        path = tempfile.mkdtemp()
+        ucs = os.path.join(path, 'backup.ucs')
+        try:
+            with tarfile.open(ucs, 'w:gz') as archive:
+                archive.add(os.path.join(fixture_path, 'ucs_bigip.conf'), 'config/bigip.conf')
+                archive.add(os.path.join(fixture_path, 'ucs_bigip_base.conf'), 'config/bigip_base.conf')
+                archive.add(os.path.join(fixture_path, 'ucs_partition_bigip.conf'), 'config/partitions/Other/bigip.conf')
+                archive.add(os.path.join(fixture_path, 'load_sys_version.json'), 'config/BigDB.dat')
+
+            mm, client = self.get_manager(
+                include=['pool', 'rule', 'virtual_server', 'vlan', 'provision', 'system_info'], ucs=ucs
+            )
+            results = mm.exec_module()
+        finally:
+            shutil.rmtree(path)
+
+        assert client.api.calls == []
+        assert sorted(results['pool'].keys()) == ['/Common/foo', '/Other/bar']
+
+        # The facts have the same form as those read from the device.
+        pool = results['pool']['/Common/foo']
+        expected = flatten_resource(self.responses['/mgmt/tm/ltm/pool']['items'][0])
+        for key in ['name', 'partition', 'full_path', 'load_balancing_mode']:
+            assert pool[key] == expected[key]
+        assert pool['description'] == 'The "foo" pool'
+        assert pool['members'] == [dict(
+            name='10.10.10.10:80',
+            partition='Common',
+            full_path='/Common/10.10.10.10:80',
+            address='10.10.10.10',
+            connection_limit=0
+        )]
+
+        virtual = results['virtual_server']['/Common/vs']
+        assert [x['full_path'] for x in virtual['profiles']] == ['/Common/http', '/Common/tcp']
+        assert virtual['profiles'][1]['context'] == 'all'
+        assert virtual['rules'] == ['/Common/redirect']
+        assert virtual['source_address_translation'] == dict(type='automap')
+        assert virtual['vlans_disabled'] is True
+
+        assert 'HTTP::redirect "/index.html"' in results['rule']['/Common/redirect']['api_anonymous']
+        assert results['vlan']['/Common/internal']['tag'] == 4094
+        assert results['provision'] == dict(ltm=dict(name='ltm', full_path='ltm', level='nominal'))
+        assert results['system_info'] == dict()
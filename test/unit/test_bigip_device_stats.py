@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017 F5 Networks Inc.
+# GNU General Public License v3.0 (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import copy
+import os
+import json
+import shutil
+import sys
+import tempfile
+
+from nose.plugins.skip import SkipTest
+if sys.version_info < (2, 7):
+    raise SkipTest("F5 Ansible modules require Python >= 2.7")
+
+from ansible.compat.tests import unittest
+from ansible.compat.tests.mock import patch
+from ansible.module_utils.basic import AnsibleModule
+
+try:
+    from library.bigip_device_stats import Parameters
+    from library.bigip_device_stats import ModuleManager
+    from library.bigip_device_stats import ArgumentSpec
+    from library.bigip_device_stats import compute_rates
+    from library.bigip_device_stats import snake_case
+    from library.module_utils.network.f5.common import F5ModuleError
+    from test.unit.modules.utils import set_module_args
+    from test.unit.modules.utils import FakeApi
+    from test.unit.modules.utils import FakeClient
+except ImportError:
+    try:
+        from ansible.modules.network.f5.bigip_device_stats import Parameters
+        from ansible.modules.network.f5.bigip_device_stats import ModuleManager
+        from ansible.modules.network.f5.bigip_device_stats import ArgumentSpec
+        from ansible.modules.network.f5.bigip_device_stats import compute_rates
+        from ansible.modules.network.f5.bigip_device_stats import snake_case
+        from ansible.module_utils.network.f5.common import F5ModuleError
+        from units.modules.utils import set_module_args
+        from units.modules.utils import FakeApi
+        from units.modules.utils import FakeClient
+    except ImportError:
+        raise SkipTest("F5 Ansible modules require the requests Python library")
+
+fixture_path = os.path.join(os.path.dirname(__file__), 'fixtures')
+fixture_data = {}
+
+
+def load_fixture(name):
+    path = os.path.join(fixture_path, name)
+
+    if path in fixture_data:
+        return fixture_data[path]
+
+    with open(path) as f:
+        data = f.read()
+
+    try:
+        data = json.loads(data)
+    except Exception:
+        pass
+
+    fixture_data[path] = data
+    return data
+
+
+class TestParameters(unittest.TestCase):
+    def test_module_parameters(self):
+        p = Parameters(params=dict(include=['Pool', 'node', 'pool']))
+        assert p.include == ['pool', 'node']
+        assert p.workers == 4
+
+    def test_invalid_include(self):
+        p = Parameters(params=dict(include=['pool', 'foo']))
+        with self.assertRaises(F5ModuleError) as ex:
+            p.include
+        assert 'foo' in str(ex.exception)
+
+    def test_snake_case(self):
+        assert snake_case('clientside.bitsIn') == 'clientside_bits_in'
+        assert snake_case('status.availabilityState') == 'status_availability_state'
+
+    def test_compute_rates(self):
+        previous = dict(clientside_bits_in=1000, clientside_cur_conns=4, tot_requests=50)
+        current = dict(clientside_bits_in=3000, clientside_cur_conns=8, tot_requests=10)
+
+        # Gauges have no rate, and counters that were reset are skipped.
+        assert compute_rates(current, previous, 10) == dict(clientside_bits_in=200)
+        assert compute_rates(current, None, 10) == dict()
+
+
+class TestManager(unittest.TestCase):
+    def setUp(self):
+        self.spec = ArgumentSpec()
+        self.responses = {
+            '/mgmt/tm/ltm/virtual/stats': copy.deepcopy(load_fixture('load_ltm_virtual_stats_collection.json')),
+            '/mgmt/tm/ltm/pool/stats': load_fixture('load_ltm_pool_stats_collection_expanded.json'),
+        }
+
+    def get_manager(self, **kwargs):
+        args = dict(
+            server='localhost',
+            password='password',
+            user='admin'
+        )
+        args.update(kwargs)
+        set_module_args(args)
+        module = AnsibleModule(
+            argument_spec=self.spec.argument_spec,
+            supports_check_mode=self.spec.supports_check_mode
+        )
+        client = FakeClient(FakeApi(self.responses, default=dict(entries={})))
+        return ModuleManager(module=module, client=client), client
+
+    def test_read_stats(self, *args):
+        mm, client = self.get_manager(include=['virtual_server', 'pool', 'pool_member'])
+        results = mm.exec_module()
+
+        assert results['changed'] is False
+        assert sorted(results['virtual_server'].keys()) == ['/Common/vs1', '/Other/vs2']
+        vs1 = results['virtual_server']['/Common/vs1']
+        assert vs1['clientside_bits_in'] == 8000
+        assert vs1['status_availability_state'] == 'available'
+        assert 'rates' not in vs1
+
+        # The members are not part of the stats of their pool.
+        assert sorted(results['pool']['/Common/foo'].keys()) == [
+            'active_member_cnt', 'serverside_bits_in', 'serverside_cur_conns',
+            'status_availability_state', 'tm_name'
+        ]
+        member = results['pool_member']['/Common/foo']['/Common/10.10.10.10:80']
+        assert member['serverside_cur_conns'] == 2
+
+        # One request is made for each type. The pools and their members
+        # share theirs.
+        assert sorted(client.api.calls) == [
+            ('/mgmt/tm/ltm/pool/stats', dict(expandSubcollections='true')),
+            ('/mgmt/tm/ltm/virtual/stats', None),
+        ]
+
+    def test_filter(self, *args):
+        mm, client = self.get_manager(include=['virtual_server', 'pool'], filter='/Common/*')
+        results = mm.exec_module()
+
+        assert list(results['virtual_server'].keys()) == ['/Common/vs1']
+        assert client.api.calls[0][1] is None
+
+    @patch('library.bigip_device_stats.time.time')
+    def test_rates(self, now):
+        path = tempfile.mkdtemp()
+        try:
+            now.return_value = 1000.0
+            mm, client = self.get_manager(include=['virtual_server'], snapshot_dir=path)
+            first = mm.exec_module()
+            assert 'interval' not in first
+            assert first['virtual_server']['/Common/vs1']['rates'] == dict()
+
+            entries = self.responses['/mgmt/tm/ltm/virtual/stats']['entries']
+            stats = entries['https://localhost/mgmt/tm/ltm/virtual/~Common~vs1/stats']['nestedStats']['entries']
+            stats['clientside.bitsIn']['value'] = 14000
+            stats['clientside.curConns']['value'] = 9
+            stats['totRequests']['value'] = 500
+
+            now.return_value = 1060.0
+            mm, client = self.get_manager(include=['virtual_server'], snapshot_dir=path)
+            second = mm.exec_module()
+        finally:
+            shutil.rmtree(path)
+
+        assert second['interval'] == dict(virtual_server=60.0)
+        assert second['virtual_server']['/Common/vs1']['rates'] == dict(
+            clientside_bits_in=100.0,
+            clientside_bits_out=0.0,
+            clientside_tot_conns=0.0,
+            tot_requests=5.0
+        )
+        assert second['virtual_server']['/Common/vs1']['clientside_cur_conns'] == 9
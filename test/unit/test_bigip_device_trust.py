@@ -168,3 +168,28 @@ class TestManager(unittest.TestCase):
         results = mm.exec_module()
 
         assert results['changed'] is False
+
+    def test_exists_with_sdk_resources(self, *args):
+        set_module_args(dict(
+            peer_server='10.10.10.10',
+            peer_hostname='foo.bar.baz',
+            peer_user='admin',
+            peer_password='secret',
+            server='localhost',
+            password='password',
+            user='admin'
+        ))
+
+        module = AnsibleModule(
+            argument_spec=self.spec.argument_spec,
+            supports_check_mode=self.spec.supports_check_mode
+        )
+
+        # Devices may be read as dicts, or as f5-sdk resources.
+        mm = ModuleManager(module=module)
+        mm.devices.fetch = Mock(return_value=[
+            dict(name='bigip1', managementIp='10.10.10.9'),
+            Mock(managementIp='10.10.10.10')
+        ])
+
+        assert mm.exists() is True
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017 F5 Networks Inc.
+# GNU General Public License v3.0 (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import sys
+import threading
+
+from nose.plugins.skip import SkipTest
+if sys.version_info < (2, 7):
+    raise SkipTest("F5 Ansible modules require Python >= 2.7")
+
+from ansible.compat.tests import unittest
+
+try:
+    from library._bigip_facts import FieldPool
+    from library._bigip_facts import Pools
+    from library._bigip_facts import generate_dict
+    from library._bigip_facts import generate_simple_dict
+except ImportError:
+    try:
+        from ansible.modules.network.f5._bigip_facts import FieldPool
+        from ansible.modules.network.f5._bigip_facts import Pools
+        from ansible.modules.network.f5._bigip_facts import generate_dict
+        from ansible.modules.network.f5._bigip_facts import generate_simple_dict
+    except ImportError:
+        raise SkipTest("F5 Ansible modules require the bigsuds Python library")
+
+
+class FakePoolInterface(object):
+    """Stands in for the LocalLB.Pool interface of a bigsuds connection
+    """
+    def __init__(self, calls):
+        self.calls = calls
+
+    def get_list(self):
+        self.calls.append(('get_list', threading.current_thread().name))
+        return ['/Common/foo', '/Common/bar', '/Other/baz']
+
+    def get_description(self, names):
+        self.calls.append(('get_description', threading.current_thread().name))
+        return ['description of {0}'.format(x) for x in names]
+
+    def get_lb_method(self, names):
+        self.calls.append(('get_lb_method', threading.current_thread().name))
+        return ['LB_METHOD_ROUND_ROBIN' for x in names]
+
+
+class FakeApi(object):
+    def __init__(self, calls):
+        self.LocalLB = type('LocalLB', (object,), {})()
+        self.LocalLB.Pool = FakePoolInterface(calls)
+
+
+class FakeF5(object):
+    def __init__(self):
+        self.calls = []
+        self.clones = 0
+
+    def clone(self):
+        self.clones += 1
+        return self
+
+    def get_api(self):
+        return FakeApi(self.calls)
+
+
+class TestGenerateDict(unittest.TestCase):
+    def test_generate_dict(self):
+        f5 = FakeF5()
+        pools = Pools(f5.get_api(), regex='Common')
+        result = generate_dict(pools, ['description', 'lb_method', 'name'])
+
+        assert result == {
+            '/Common/foo': dict(
+                description='description of /Common/foo',
+                lb_method='round-robin',
+                name='foo'
+            ),
+            '/Common/bar': dict(
+                description='description of /Common/bar',
+                lb_method='round-robin',
+                name='bar'
+            ),
+        }
+
+        # The list of objects is fetched once and then re-used
+        assert [x[0] for x in f5.calls].count('get_list') == 1
+
+    def test_generate_dict_concurrently(self):
+        f5 = FakeF5()
+        pools = Pools(f5.get_api())
+        pool = FieldPool(f5, 2)
+        try:
+            serial = generate_dict(pools, ['description', 'lb_method', 'name'])
+            f5.calls[:] = []
+            concurrent = generate_dict(pools, ['description', 'lb_method', 'name'], pool)
+        finally:
+            pool.close()
+
+        assert concurrent == serial
+        main = threading.current_thread().name
+        assert sorted(x[0] for x in f5.calls) == ['get_description', 'get_lb_method']
+        assert all(x[1] != main for x in f5.calls)
+        assert 1 <= f5.clones <= 2
+
+    def test_generate_simple_dict(self):
+        class Info(object):
+            def get_uptime(self):
+                return 100
+
+        assert generate_simple_dict(Info(), ['uptime']) == dict(uptime=100)
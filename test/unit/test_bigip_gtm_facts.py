@@ -34,6 +34,7 @@ try:
     from library.bigip_gtm_facts import TypedWideIpFactManager
     from library.bigip_gtm_facts import UntypedWideIpFactManager
     from library.bigip_gtm_facts import ArgumentSpec
+    from library.bigip_gtm_facts import parse_collection_stats
     from library.module_utils.network.f5.common import F5ModuleError
     from library.module_utils.network.f5.common import iControlUnexpectedHTTPError
     from f5.bigip.tm.gtm.pool import A
@@ -54,6 +55,7 @@ except ImportError:
         from ansible.modules.network.f5.bigip_gtm_pool import TypedWideIpFactManager
         from ansible.modules.network.f5.bigip_gtm_pool import UntypedWideIpFactManager
         from ansible.modules.network.f5.bigip_gtm_pool import ArgumentSpec
+        from ansible.modules.network.f5.bigip_gtm_pool import parse_collection_stats
         from ansible.module_utils.network.f5.common import F5ModuleError
         from ansible.module_utils.network.f5.common import iControlUnexpectedHTTPError
         from f5.bigip.tm.gtm.pool import A
@@ -134,6 +136,7 @@ class TestManager(unittest.TestCase):
         tfm = TypedPoolFactManager(module=module)
         tfm.read_collection_from_device = Mock(return_value=collection)
         tfm.read_stats_from_device = Mock(return_value=stats.stat)
+        tfm.read_collection_stats_from_device = Mock(return_value={})
 
         tm = PoolFactManager(module=module)
         tm.version_is_less_than_12 = Mock(return_value=False)
@@ -150,3 +153,50 @@ class TestManager(unittest.TestCase):
         assert 'pool' in results
         assert len(results['pool']) > 0
         assert 'load_balancing_mode' in results['pool'][0]
+
+    def test_typed_pool_stats_are_read_in_bulk(self, *args):
+        set_module_args(dict(
+            include='pool',
+            password='passsword',
+            server='localhost',
+            user='admin',
+            workers=2
+        ))
+
+        fixture1 = load_fixture('load_gtm_pool_a_collection.json')
+        fixture2 = load_fixture('load_gtm_pool_a_example_stats.json')
+
+        module = AnsibleModule(
+            argument_spec=self.spec.argument_spec,
+            supports_check_mode=self.spec.supports_check_mode
+        )
+
+        client = Mock()
+        client.request.return_value.json.return_value = fixture2
+
+        tfm = TypedPoolFactManager(module=module, client=client)
+        tfm.read_collection_from_device = Mock(
+            side_effect=lambda x: [FakeARecord(attrs=y) for y in fixture1['items']] if x == 'a_s' else []
+        )
+        tfm.read_stats_from_device = Mock()
+
+        results = tfm.exec_module()
+
+        assert len(results) == 1
+        assert results[0]['type'] == 'a'
+        assert results[0]['availability_status'] == 'red'
+
+        # One stats request is made for each record type, instead of one
+        # for each pool.
+        paths = sorted(x[0][1] for x in client.request.call_args_list)
+        assert paths == [
+            '/mgmt/tm/gtm/pool/{0}/stats'.format(x)
+            for x in ['a', 'aaaa', 'cname', 'mx', 'naptr', 'srv']
+        ]
+        assert tfm.read_stats_from_device.call_count == 0
+
+    def test_parse_collection_stats(self):
+        fixture = load_fixture('load_gtm_pool_a_example_stats.json')
+        stats = parse_collection_stats(fixture)
+        assert list(stats.keys()) == ['/Common/foo.pool']
+        assert stats['/Common/foo.pool']['status_availabilityState'] == dict(description='offline')
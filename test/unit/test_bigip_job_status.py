@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017 F5 Networks Inc.
+# GNU General Public License v3.0 (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import os
+import shutil
+import sys
+import tempfile
+
+from nose.plugins.skip import SkipTest
+if sys.version_info < (2, 7):
+    raise SkipTest("F5 Ansible modules require Python >= 2.7")
+
+from ansible.compat.tests import unittest
+from ansible.module_utils.basic import AnsibleModule
+
+try:
+    from library.bigip_job_status import Parameters
+    from library.bigip_job_status import ModuleManager
+    from library.bigip_job_status import ArgumentSpec
+    from library.module_utils.network.f5.common import F5ModuleError
+    from library.module_utils.network.f5.icontrol import iControlRestError
+    from test.unit.modules.utils import set_module_args
+    from test.unit.modules.utils import FakeApi
+    from test.unit.modules.utils import FakeClient
+    from test.unit.modules.utils import FakeResponse
+except ImportError:
+    try:
+        from ansible.modules.network.f5.bigip_job_status import Parameters
+        from ansible.modules.network.f5.bigip_job_status import ModuleManager
+        from ansible.modules.network.f5.bigip_job_status import ArgumentSpec
+        from ansible.module_utils.network.f5.common import F5ModuleError
+        from ansible.module_utils.network.f5.icontrol import iControlRestError
+        from units.modules.utils import set_module_args
+        from units.modules.utils import FakeApi
+        from units.modules.utils import FakeClient
+        from units.modules.utils import FakeResponse
+    except ImportError:
+        raise SkipTest("F5 Ansible modules require the requests Python library")
+
+
+MCP_STATE_RUNNING = '''
+Sys::mcpd State
+-------------------------------------------------------
+Running Phase                      running
+Last Configuration Load Status     full-config-load-succeed
+End Platform ID Received           true
+'''
+
+
+def bash_output(output):
+    return {'/mgmt/tm/util/bash': output}
+
+
+class TestParameters(unittest.TestCase):
+    def test_invalid_job(self):
+        p = Parameters(params=dict(jobs=[dict(type='foo')]))
+        with self.assertRaises(F5ModuleError):
+            p.jobs
+
+
+class TestManager(unittest.TestCase):
+    def setUp(self):
+        self.spec = ArgumentSpec()
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def get_manager(self, api, jobs, check_mode=False):
+        set_module_args(dict(
+            jobs=jobs,
+            server='localhost',
+            password='password',
+            user='admin',
+            _ansible_check_mode=check_mode
+        ))
+        module = AnsibleModule(
+            argument_spec=self.spec.argument_spec,
+            supports_check_mode=self.spec.supports_check_mode
+        )
+        return ModuleManager(module=module, client=FakeClient(api))
+
+    def test_check_jobs(self, *args):
+        dest = os.path.join(self.path, 'foo.qkview')
+        api = FakeApi(
+            {
+                '/mgmt/tm/sys/software/volume': [
+                    dict(name='HD1.1', status='complete', active=True),
+                    dict(name='HD1.2', status='installing 40.000 pct'),
+                ],
+                '/mgmt/tm/sys/provision': [
+                    dict(name='asm', level='nominal'),
+                ],
+            },
+            outputs=bash_output('/var/tmp/foo.qkview.job:0\n/var/tmp/bar.ucs.job:0\n' + MCP_STATE_RUNNING)
+        )
+        jobs = [
+            dict(type='software', volume='HD1.2', activate=False),
+            dict(type='provision', module='asm', level='nominal'),
+            dict(type='ucs', ucs='bar.ucs', marker='/var/tmp/bar.ucs.job'),
+            dict(
+                type='qkview', filename='foo.qkview', path='/var/config/rest/bulk/foo.qkview',
+                download='/mgmt/shared/file-transfer/bulk/foo.qkview',
+                marker='/var/tmp/foo.qkview.job', dest=dest
+            ),
+        ]
+        mm = self.get_manager(api, jobs)
+        results = mm.exec_module()
+
+        assert results['changed'] is True
+        assert results['finished'] is False
+        assert [x['status'] for x in results['jobs']] == ['running', 'finished', 'finished', 'finished']
+        assert results['jobs'][0]['message'] == 'installing 40.000 pct'
+
+        # The markers, mprov and mcpd are read with one command.
+        bash = [x for x in api.commands if x[0] == '/mgmt/tm/util/bash']
+        assert len(bash) == 1
+        assert 'grep -H . /var/tmp/foo.qkview.job /var/tmp/bar.ucs.job' in bash[0][1]
+
+        # The finished qkview is downloaded, and then removed from the device.
+        assert api.downloads == [('/mgmt/shared/file-transfer/bulk/foo.qkview', dest)]
+        assert ('/mgmt/tm/util/unix-rm', '/var/config/rest/bulk/foo.qkview /var/tmp/foo.qkview.job') in api.commands
+
+        # The marker of the finished UCS is removed.
+        assert ('/mgmt/tm/util/unix-rm', '/var/tmp/bar.ucs.job') in api.commands
+
+    def test_qkview_check_mode(self, *args):
+        dest = os.path.join(self.path, 'foo.qkview')
+        api = FakeApi(outputs=bash_output('/var/tmp/foo.qkview.job:0\n'))
+        job = dict(
+            type='qkview', filename='foo.qkview', path='/var/config/rest/bulk/foo.qkview',
+            download='/mgmt/shared/file-transfer/bulk/foo.qkview',
+            marker='/var/tmp/foo.qkview.job', dest=dest
+        )
+        mm = self.get_manager(api, [job], check_mode=True)
+        results = mm.exec_module()
+
+        assert results['changed'] is False
+        assert results['finished'] is True
+        assert api.downloads == []
+        assert not any(x[0] == '/mgmt/tm/util/unix-rm' for x in api.commands)
+        assert os.path.exists(dest) is False
+
+    def test_qkview_dest_older_than_job(self, *args):
+        dest = os.path.join(self.path, 'foo.qkview')
+        with open(dest, 'w') as fh:
+            fh.write('old qkview')
+        os.utime(dest, (1000.0, 1000.0))
+        job = dict(
+            type='qkview', filename='foo.qkview', path='/var/config/rest/bulk/foo.qkview',
+            download='/mgmt/shared/file-transfer/bulk/foo.qkview',
+            marker='/var/tmp/foo.qkview.job', dest=dest, started=2000.0
+        )
+
+        # A dest left from before the job is not taken for its download.
+        mm = self.get_manager(FakeApi(), [dict(job)])
+        results = mm.exec_module()
+        assert results['jobs'][0]['status'] == 'running'
+
+        os.utime(dest, (3000.0, 3000.0))
+        mm = self.get_manager(FakeApi(), [dict(job)])
+        results = mm.exec_module()
+        assert results['jobs'][0]['status'] == 'finished'
+
+    def test_nothing_downloaded(self, *args):
+        api = FakeApi({
+            '/mgmt/tm/sys/provision': [
+                dict(name='asm', level='nominal'),
+            ]
+        })
+        mm = self.get_manager(api, [dict(type='provision', module='asm', level='nominal')])
+        results = mm.exec_module()
+        assert results['changed'] is False
+
+    def test_provision_several_modules(self, *args):
+        api = FakeApi({
+            '/mgmt/tm/sys/provision': [
+                dict(name='ltm', level='none'),
+                dict(name='asm', level='nominal'),
+            ]
+        })
+        job = dict(type='provision', modules=dict(ltm='none', asm='nominal', apm='none'))
+        mm = self.get_manager(api, [job])
+        results = mm.exec_module()
+        assert results['jobs'][0]['status'] == 'finished'
+
+        job = dict(type='provision', modules=dict(ltm='none', asm='minimum'))
+        mm = self.get_manager(api, [job])
+        results = mm.exec_module()
+        assert results['jobs'][0]['status'] == 'running'
+
+    def test_activation_waits_for_reboot(self, *args):
+        api = FakeApi({
+            '/mgmt/tm/sys/software/volume': [
+                dict(name='HD1.2', status='complete'),
+            ]
+        })
+        mm = self.get_manager(api, [dict(type='software', volume='HD1.2', activate=True)])
+        results = mm.exec_module()
+        assert results['jobs'][0]['status'] == 'running'
+
+    def test_device_unavailable(self, *args):
+        error = iControlRestError('503 Service Unavailable', response=FakeResponse(503))
+        api = FakeApi(outputs=bash_output(error))
+        mm = self.get_manager(api, [dict(type='provision', module='asm', level='nominal')])
+        results = mm.exec_module()
+
+        assert results['finished'] is False
+        assert results['jobs'][0]['status'] == 'running'
+
+    def test_failed_job(self, *args):
+        api = FakeApi(outputs=bash_output('/var/tmp/bar.ucs.job:1\n'))
+        mm = self.get_manager(api, [dict(type='ucs', ucs='bar.ucs', marker='/var/tmp/bar.ucs.job')])
+        with self.assertRaises(F5ModuleError) as ex:
+            mm.exec_module()
+        assert 'Loading the UCS exited with status 1' in str(ex.exception)
@@ -167,3 +167,43 @@ class TestSimpleTrafficPolicyManager(unittest.TestCase):
         results = mm.exec_module()
 
         assert results['changed'] is True
+
+    def test_upsert_rules_in_one_transaction(self, *args):
+        set_module_args(dict(
+            name="Policy-Foo",
+            state='present',
+            strategy='best',
+            rules=['rule1', 'rule2', 'rule3'],
+            password='password',
+            server='localhost',
+            user='admin'
+        ))
+
+        module = AnsibleModule(
+            argument_spec=self.spec.argument_spec,
+            supports_check_mode=self.spec.supports_check_mode
+        )
+
+        client = Mock()
+        client.request.return_value.json.return_value = dict(transId=1, state='COMPLETED')
+        tm = SimpleManager(module=module, params=module.params, client=client)
+        tm._set_changed_options()
+        tm.have.update(dict(rules=['rule2', 'rule4']))
+
+        policy = Mock(selfLink='https://localhost/mgmt/tm/ltm/policy/~Common~Policy-Foo?ver=12.1.0')
+        rules = [Mock(ordinal='0'), Mock(ordinal='1')]
+        rules[0].name = 'rule2'
+        rules[1].name = 'rule4'
+        policy.rules_s.get_collection.return_value = rules
+        tm._upsert_policy_rules_on_device(policy)
+
+        uri = '/mgmt/tm/ltm/policy/~Common~Policy-Foo/rules'
+        calls = [x[0][:2] for x in client.request.call_args_list]
+        assert calls == [
+            ('POST', '/mgmt/tm/transaction'),
+            ('POST', uri),
+            ('PATCH', uri + '/rule2'),
+            ('POST', uri),
+            ('DELETE', uri + '/rule4'),
+            ('PATCH', '/mgmt/tm/transaction/1'),
+        ]
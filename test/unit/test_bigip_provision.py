@@ -70,6 +70,19 @@ class TestParameters(unittest.TestCase):
         p = Parameters(params=args)
         assert p.module == 'gtm'
 
+    def test_module_parameters_modules(self):
+        p = Parameters(params=dict(modules=dict(ltm='nominal', asm='none')))
+        assert p.modules == dict(ltm='nominal', asm='none')
+
+    def test_module_parameters_invalid_modules(self):
+        p = Parameters(params=dict(modules=dict(ltm='nominal', asm='huge')))
+        with self.assertRaises(F5ModuleError):
+            p.modules
+
+        p = Parameters(params=dict(modules=dict(swg='dedicated', ltm='nominal')))
+        with self.assertRaises(F5ModuleError):
+            p.modules
+
 
 class TestManager(unittest.TestCase):
 
@@ -103,14 +116,112 @@ class TestManager(unittest.TestCase):
         mm.update_on_device = Mock(return_value=True)
         mm.read_current_from_device = Mock(return_value=current)
 
-        # this forced sleeping can cause these tests to take 15
-        # or more seconds to run. This is deliberate.
+        # mprov must be seen as finished three times in a row.
         mm._is_mprov_running_on_device = Mock(side_effect=[True, False, False, False, False])
 
-        results = mm.exec_module()
+        with patch('library.module_utils.network.f5.common.time.sleep') as sleep:
+            results = mm.exec_module()
 
         assert results['changed'] is True
         assert results['level'] == 'nominal'
+        assert mm._is_mprov_running_on_device.call_count == 4
+        assert [x[0][0] for x in sleep.call_args_list] == [5, 5, 7.5, 11.25]
+
+    def test_provision_one_module_async_job(self, *args):
+        set_module_args(dict(
+            module='asm',
+            async_job=True,
+            password='passsword',
+            server='localhost',
+            user='admin'
+        ))
+
+        current = Parameters(
+            dict(
+                module='asm',
+                level='none'
+            )
+        )
+        module = AnsibleModule(
+            argument_spec=self.spec.argument_spec,
+            supports_check_mode=self.spec.supports_check_mode
+        )
+        mm = ModuleManager(module=module)
+        mm.update_on_device = Mock(return_value=True)
+        mm.read_current_from_device = Mock(return_value=current)
+        mm._wait_for_module_provisioning = Mock()
+        mm._wait_for_asm_ready = Mock()
+
+        results = mm.exec_module()
+
+        assert results['changed'] is True
+        assert results['job'] == dict(type='provision', module='asm', level='nominal')
+        assert mm._wait_for_module_provisioning.called is False
+        assert mm._wait_for_asm_ready.called is False
+
+    def get_modules_manager(self, **kwargs):
+        args = dict(
+            password='passsword',
+            server='localhost',
+            user='admin'
+        )
+        args.update(kwargs)
+        set_module_args(args)
+
+        module = AnsibleModule(
+            argument_spec=self.spec.argument_spec,
+            supports_check_mode=self.spec.supports_check_mode,
+            mutually_exclusive=self.spec.mutually_exclusive,
+            required_one_of=self.spec.required_one_of
+        )
+        mm = ModuleManager(module=module)
+        mm.read_levels_from_device = Mock(return_value=dict(
+            ltm='nominal', asm='none', afm='none', apm='none', gtm='nominal'
+        ))
+        mm.update_modules_on_device = Mock()
+        mm._wait_for_module_provisioning = Mock()
+        mm._wait_for_asm_ready = Mock()
+        mm._wait_for_reboot = Mock()
+        return mm
+
+    def test_provision_several_modules(self, *args):
+        mm = self.get_modules_manager(
+            modules=dict(ltm='nominal', asm='nominal', afm='nominal', apm='minimum')
+        )
+        results = mm.exec_module()
+
+        changes = dict(asm='nominal', afm='nominal', apm='minimum')
+        assert results['changed'] is True
+        assert results['modules'] == changes
+
+        # The modules are changed together, and waited on once.
+        mm.update_modules_on_device.assert_called_once_with(changes)
+        assert mm._wait_for_module_provisioning.call_count == 1
+        assert mm._wait_for_asm_ready.call_count == 1
+        assert mm._wait_for_reboot.called is False
+
+    def test_provision_several_modules_unchanged(self, *args):
+        mm = self.get_modules_manager(modules=dict(ltm='nominal', asm='none'))
+        results = mm.exec_module()
+
+        assert results['changed'] is False
+        assert mm.update_modules_on_device.called is False
+
+    def test_provision_several_modules_dedicated(self, *args):
+        mm = self.get_modules_manager(modules=dict(swg='dedicated'))
+        results = mm.exec_module()
+
+        assert results['modules'] == dict(swg='dedicated', ltm='none', gtm='none')
+        assert mm._wait_for_asm_ready.called is False
+
+    def test_deprovision_several_modules_async_job(self, *args):
+        mm = self.get_modules_manager(
+            modules=dict(ltm='nominal', gtm='nominal'), state='absent', async_job=True
+        )
+        results = mm.exec_module()
+
+        assert results['job'] == dict(type='provision', modules=dict(ltm='none', gtm='none'))
+        assert mm._wait_for_module_provisioning.called is False
 
     def test_provision_all_modules(self, *args):
         modules = [
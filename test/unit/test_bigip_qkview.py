@@ -169,3 +169,45 @@ class TestBulkLocationManager(unittest.TestCase):
             results = mm.exec_module()
 
         assert results['changed'] is False
+
+    def test_create_qkview_async_job(self, *args):
+        set_module_args(dict(
+            dest='/tmp/foo.qkview',
+            filename='foo.qkview',
+            exclude=['audit'],
+            async_job=True,
+            server='localhost',
+            user='admin',
+            password='password'
+        ))
+
+        module = AnsibleModule(
+            argument_spec=self.spec.argument_spec,
+            supports_check_mode=self.spec.supports_check_mode
+        )
+
+        client = Mock()
+        tm = BulkLocationManager(module=module, client=client)
+        tm.execute_on_device = Mock()
+        tm._download_file = Mock()
+
+        with patch('library.bigip_qkview.time.time', return_value=1000.0):
+            results = tm.exec_module()
+
+        # The qkview is generated in the background, and not downloaded.
+        assert tm.execute_on_device.called is False
+        assert tm._download_file.called is False
+        assert results['job'] == dict(
+            type='qkview',
+            filename='foo.qkview',
+            path='/var/config/rest/bulk/foo.qkview',
+            download='/mgmt/shared/file-transfer/bulk/foo.qkview',
+            marker='/var/tmp/foo.qkview.job',
+            dest='/tmp/foo.qkview',
+            started=1000.0
+        )
+        command = client.api.tm.util.bash.exec_cmd.call_args[1]['utilCmdArgs']
+        assert command.startswith('-c "rm -f /var/tmp/foo.qkview.job; { qkview ')
+        assert "--exclude='audit'" in command
+        assert 'mv /var/tmp/foo.qkview /var/config/rest/bulk/foo.qkview' in command
+        assert command.endswith('echo $? > /var/tmp/foo.qkview.job; } > /dev/null 2>&1 &"')
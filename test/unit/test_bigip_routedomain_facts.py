@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017 F5 Networks Inc.
+# GNU General Public License v3.0 (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import sys
+
+from nose.plugins.skip import SkipTest
+if sys.version_info < (2, 7):
+    raise SkipTest("F5 Ansible modules require Python >= 2.7")
+
+from ansible.compat.tests import unittest
+from ansible.module_utils.basic import AnsibleModule
+
+try:
+    from library.bigip_routedomain_facts import ModuleParameters
+    from library.bigip_routedomain_facts import ModuleManager
+    from library.bigip_routedomain_facts import ArgumentSpec
+    from test.unit.modules.utils import set_module_args
+    from test.unit.modules.utils import FakeApi
+    from test.unit.modules.utils import FakeClient
+except ImportError:
+    try:
+        from ansible.modules.network.f5.bigip_routedomain_facts import ModuleParameters
+        from ansible.modules.network.f5.bigip_routedomain_facts import ModuleManager
+        from ansible.modules.network.f5.bigip_routedomain_facts import ArgumentSpec
+        from units.modules.utils import set_module_args
+        from units.modules.utils import FakeApi
+        from units.modules.utils import FakeClient
+    except ImportError:
+        raise SkipTest("F5 Ansible modules require the requests Python library")
+
+
+ROUTE_DOMAINS = [
+    dict(name='0', partition='Common', fullPath='/Common/0', id=0, strict='enabled'),
+    dict(name='rd-1', partition='tenant-a', fullPath='/tenant-a/rd-1', id=1,
+         parent='/Common/0', vlans=['/tenant-a/vlan1'], flowEvictionPolicy='/Common/default-eviction-policy'),
+    dict(name='rd-2', partition='tenant-b', fullPath='/tenant-b/rd-2', id=2),
+]
+
+RESOURCES = dict(('/mgmt/tm/net/route-domain/' + x['fullPath'].replace('/', '~'), x) for x in ROUTE_DOMAINS)
+RESOURCES['/mgmt/tm/net/route-domain'] = dict(items=ROUTE_DOMAINS)
+
+
+class TestParameters(unittest.TestCase):
+    def test_exact_names(self):
+        p = ModuleParameters(params=dict(name=['/Common/0', 'rd-1'], partition=['tenant-a']))
+        assert p.exact_names == ['/Common/0', '/tenant-a/rd-1']
+
+        p = ModuleParameters(params=dict(name=['rd-1']))
+        assert p.exact_names is None
+
+        p = ModuleParameters(params=dict(name=['rd-*'], partition=['tenant-a']))
+        assert p.exact_names is None
+
+
+class TestManager(unittest.TestCase):
+    def setUp(self):
+        self.spec = ArgumentSpec()
+
+    def get_manager(self, **kwargs):
+        args = dict(
+            server='localhost',
+            password='password',
+            user='admin'
+        )
+        args.update(kwargs)
+        set_module_args(args)
+        module = AnsibleModule(
+            argument_spec=self.spec.argument_spec,
+            supports_check_mode=self.spec.supports_check_mode
+        )
+        client = FakeClient(FakeApi(RESOURCES))
+        return ModuleManager(module=module, client=client), client
+
+    def test_read_all(self, *args):
+        mm, client = self.get_manager()
+        results = mm.exec_module()
+
+        assert results['changed'] is False
+        assert [x['full_path'] for x in results['route_domains']] == [
+            '/Common/0', '/tenant-a/rd-1', '/tenant-b/rd-2'
+        ]
+        assert results['route_domains'][1]['evict_policy'] == '/Common/default-eviction-policy'
+        assert len(client.api.calls) == 1
+
+    def test_partitions_are_filtered_on_the_device(self, *args):
+        mm, client = self.get_manager(name=['rd-*'], partition=['tenant-a', 'tenant-b'])
+        results = mm.exec_module()
+
+        assert [x['full_path'] for x in results['route_domains']] == ['/tenant-a/rd-1', '/tenant-b/rd-2']
+        filters = sorted(x[1]['$filter'] for x in client.api.calls)
+        assert filters == ['partition eq tenant-a', 'partition eq tenant-b']
+
+    def test_exact_names_are_read_one_at_a_time(self, *args):
+        mm, client = self.get_manager(name=['/Common/0', '/tenant-a/rd-1', '/Common/missing'])
+        results = mm.exec_module()
+
+        assert [x['id'] for x in results['route_domains']] == [0, 1]
+        assert sorted(x[0] for x in client.api.calls) == [
+            '/mgmt/tm/net/route-domain/~Common~0',
+            '/mgmt/tm/net/route-domain/~Common~missing',
+            '/mgmt/tm/net/route-domain/~tenant-a~rd-1',
+        ]
+
+    def test_filter_on_id(self, *args):
+        mm, client = self.get_manager(id=['2'])
+        results = mm.exec_module()
+
+        assert [x['name'] for x in results['route_domains']] == ['rd-2']
@@ -8,7 +8,9 @@ __metaclass__ = type
 
 import os
 import json
+import shutil
 import sys
+import tempfile
 import pytest
 
 from nose.plugins.skip import SkipTest
@@ -90,7 +92,7 @@ class TestParameters(unittest.TestCase):
 
         p = Parameters(params=args)
 
-        assert p.filter == ('version', '12.1.1')
+        assert p.filter == [('version', '12.1.1')]
         assert p.include == ['image', 'hotfix', 'volume']
 
 
@@ -272,6 +274,57 @@ class TestFactManagerBase(unittest.TestCase):
         assert volumes['product'] == 'BIG-IP'
         assert volumes['name'] == 'HD1.1'
 
+    def test_get_volume_multiple_filters(self, *args):
+        set_module_args(dict(
+            server='localhost',
+            password='password',
+            user='admin',
+            include='volume',
+            filter=['name:HD1.1', 'name:HD1.2', 'active:false']
+        ))
+
+        module = AnsibleModule(
+            argument_spec=self.spec.argument_spec,
+            supports_check_mode=self.spec.supports_check_mode
+        )
+
+        mm = ModuleManager(module=module)
+        results = mm.exec_module()
+
+        # Values of the same key are alternatives, and keys must all match.
+        assert [x['name'] for x in results['volumes']] == ['HD1.2']
+
+    def test_write_facts_to_file(self, *args):
+        path = tempfile.mkdtemp()
+        dest = os.path.join(path, 'software.jsonl')
+        set_module_args(dict(
+            server='localhost',
+            password='password',
+            user='admin',
+            include='all',
+            dest=dest
+        ))
+
+        module = AnsibleModule(
+            argument_spec=self.spec.argument_spec,
+            supports_check_mode=self.spec.supports_check_mode
+        )
+
+        mm = ModuleManager(module=module)
+        try:
+            results = mm.exec_module()
+            with open(dest) as fh:
+                lines = [json.loads(x) for x in fh]
+        finally:
+            shutil.rmtree(path)
+
+        assert results['changed'] is True
+        assert results['counts'] == dict(images=8, hotfixes=5, volumes=4)
+        assert results['total'] == 17
+        assert 'images' not in results
+        assert len(lines) == 17
+        assert lines[0]['section'] == 'images'
+
     def test_invalid_filter_raises(self, *args):
         set_module_args(dict(
             server='localhost',
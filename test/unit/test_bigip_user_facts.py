@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017 F5 Networks Inc.
+# GNU General Public License v3.0 (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import sys
+
+from nose.plugins.skip import SkipTest
+if sys.version_info < (2, 7):
+    raise SkipTest("F5 Ansible modules require Python >= 2.7")
+
+from ansible.compat.tests import unittest
+from ansible.module_utils.basic import AnsibleModule
+
+try:
+    from library.bigip_user_facts import ModuleManager
+    from library.bigip_user_facts import ArgumentSpec
+    from test.unit.modules.utils import set_module_args
+    from test.unit.modules.utils import FakeApi
+    from test.unit.modules.utils import FakeClient
+except ImportError:
+    try:
+        from ansible.modules.network.f5.bigip_user_facts import ModuleManager
+        from ansible.modules.network.f5.bigip_user_facts import ArgumentSpec
+        from units.modules.utils import set_module_args
+        from units.modules.utils import FakeApi
+        from units.modules.utils import FakeClient
+    except ImportError:
+        raise SkipTest("F5 Ansible modules require the requests Python library")
+
+
+USERS = [
+    dict(name='admin', description='Admin User', shell='none',
+         partitionAccess=[dict(name='all-partitions', role='admin')]),
+    dict(name='op-a', encryptedPassword='$6$abc', shell='tmsh',
+         partitionAccess=[dict(name='tenant-a', role='operator')]),
+    dict(name='op-b', partitionAccess=[dict(name='tenant-b', role='operator')]),
+]
+
+RESOURCES = dict(('/mgmt/tm/auth/user/' + x['name'], x) for x in USERS)
+RESOURCES['/mgmt/tm/auth/user'] = dict(items=USERS)
+
+
+class TestManager(unittest.TestCase):
+    def setUp(self):
+        self.spec = ArgumentSpec()
+
+    def get_manager(self, **kwargs):
+        args = dict(
+            server='localhost',
+            password='password',
+            user='admin'
+        )
+        args.update(kwargs)
+        set_module_args(args)
+        module = AnsibleModule(
+            argument_spec=self.spec.argument_spec,
+            supports_check_mode=self.spec.supports_check_mode
+        )
+        client = FakeClient(FakeApi(RESOURCES))
+        return ModuleManager(module=module, client=client), client
+
+    def test_read_user(self, *args):
+        mm, client = self.get_manager(name='op-a')
+        results = mm.exec_module()
+
+        assert results['changed'] is False
+        assert results['users'] == [dict(
+            username_credential='op-a',
+            encrypted_password='$6$abc',
+            shell='tmsh',
+            partition_access=[dict(name='tenant-a', role='operator')]
+        )]
+
+        # The user is loaded directly, without a separate exists check.
+        assert client.api.calls == [('/mgmt/tm/auth/user/op-a', None)]
+
+    def test_read_many_users(self, *args):
+        mm, client = self.get_manager(name=['op-a', 'op-b', 'missing'])
+        results = mm.exec_module()
+
+        assert [x['username_credential'] for x in results['users']] == ['op-a', 'op-b']
+        assert len(client.api.calls) == 3
+
+    def test_glob_and_partition(self, *args):
+        mm, client = self.get_manager(name=['*'], partition=['tenant-a'])
+        results = mm.exec_module()
+
+        # Users with access to all partitions have access to tenant-a too.
+        assert [x['username_credential'] for x in results['users']] == ['admin', 'op-a']
+        assert len(client.api.calls) == 1
+        assert '$select' in client.api.calls[0][1]
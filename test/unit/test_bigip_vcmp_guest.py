@@ -173,7 +173,8 @@ class TestManager(unittest.TestCase):
         mm.is_deployed = Mock(side_effect=[False, True, True, True, True])
         mm.deploy_on_device = Mock(return_value=True)
 
-        results = mm.exec_module()
+        with patch('library.module_utils.network.f5.common.time.sleep'):
+            results = mm.exec_module()
 
         assert results['changed'] is True
         assert results['name'] == 'guest1'
@@ -25,18 +25,26 @@ try:
     from library.bigip_wait import ModuleManager
     from library.bigip_wait import ArgumentSpec
     from library.module_utils.network.f5.common import F5ModuleError
-    from library.module_utils.network.f5.common import iControlUnexpectedHTTPError
+    from library.module_utils.network.f5.icontrol import iControlRestError
     from test.unit.modules.utils import set_module_args
+    from test.unit.modules.utils import FakeApi
+    from test.unit.modules.utils import FakeClient
+    from test.unit.modules.utils import FakeResponse
+    from test.unit.modules.utils import in_turn
 except ImportError:
     try:
         from ansible.modules.network.f5.bigip_wait import Parameters
         from ansible.modules.network.f5.bigip_wait import ModuleManager
         from ansible.modules.network.f5.bigip_wait import ArgumentSpec
         from ansible.module_utils.network.f5.common import F5ModuleError
-        from ansible.module_utils.network.f5.common import iControlUnexpectedHTTPError
+        from ansible.module_utils.network.f5.icontrol import iControlRestError
         from units.modules.utils import set_module_args
+        from units.modules.utils import FakeApi
+        from units.modules.utils import FakeClient
+        from units.modules.utils import FakeResponse
+        from units.modules.utils import in_turn
     except ImportError:
-        raise SkipTest("F5 Ansible modules require the f5-sdk Python library")
+        raise SkipTest("F5 Ansible modules require the requests Python library")
 
 fixture_path = os.path.join(os.path.dirname(__file__), 'fixtures')
 fixture_data = {}
@@ -60,6 +68,32 @@ def load_fixture(name):
     return data
 
 
+def stats(**kwargs):
+    entries = dict((k, dict(description=v)) for k, v in kwargs.items())
+    return dict(entries={
+        'https://localhost/mgmt/tm/sys/foo/0/stats': dict(nestedStats=dict(entries=entries))
+    })
+
+
+def device(resources, runlevel='N 3'):
+    return FakeApi(resources, outputs=dict(runlevel=runlevel))
+
+
+def not_found():
+    return iControlRestError('404 Unexpected Error: Not Found', response=FakeResponse(404))
+
+
+def unavailable():
+    return iControlRestError('503 Unexpected Error: Service Unavailable', response=FakeResponse(503))
+
+
+READY = dict((
+    ('/mgmt/shared/echo', dict()),
+    ('/mgmt/tm/sys/mcp-state/stats', stats(phase='running', endPlatformIdReceived='true')),
+    ('/mgmt/tm/sys/ready', stats(configReady='yes', licenseReady='yes', provisionReady='yes')),
+))
+
+
 class TestParameters(unittest.TestCase):
     def test_module_parameters(self):
         args = dict(
@@ -89,30 +123,189 @@ class TestParameters(unittest.TestCase):
         assert p.sleep == 10
         assert p.msg == 'We timed out during waiting for BIG-IP :-('
 
+    def test_conditions(self):
+        p = Parameters(params=dict(conditions=['asm_ready', 'mcpd_running']))
+        assert p.conditions == ['rest_available', 'mcpd_running', 'asm_ready']
+
+    def test_services_are_required(self):
+        p = Parameters(params=dict(conditions=['services_running']))
+        with self.assertRaises(F5ModuleError):
+            p.conditions
+
 
 class TestManager(unittest.TestCase):
     def setUp(self):
         self.spec = ArgumentSpec()
 
-    def test_wait_already_available(self, *args):
-        set_module_args(dict(
+    def get_manager(self, api, **kwargs):
+        args = dict(
             password='passsword',
             server='localhost',
             user='admin'
-        ))
+        )
+        args.update(kwargs)
+        set_module_args(args)
 
         module = AnsibleModule(
             argument_spec=self.spec.argument_spec,
             supports_check_mode=self.spec.supports_check_mode
         )
+        return ModuleManager(module=module, client=FakeClient(api))
 
-        # Override methods to force specific logic in the module to happen
-        mm = ModuleManager(module=module)
-        mm._connect_to_device = Mock(return_value=True)
-        mm._device_is_rebooting = Mock(return_value=False)
-        mm._is_mprov_running_on_device = Mock(return_value=False)
+    def test_wait_already_available(self, *args):
+        api = device(READY)
+        mm = self.get_manager(api)
 
-        results = mm.exec_module()
+        with patch('library.module_utils.network.f5.common.time.sleep') as sleep:
+            results = mm.exec_module()
 
         assert results['changed'] is False
-        assert results['elapsed'] == 1
+        assert results['elapsed'] == 0
+        assert sleep.call_count == 0
+        assert sorted(x[0] for x in api.calls) == sorted(READY.keys())
+
+        # Readiness is read from REST. Only the runlevel is read with bash.
+        assert [x[1] for x in api.commands] == ['-c "runlevel"']
+
+    def test_wait_for_device_to_start(self, *args):
+        paths = dict(READY)
+        paths['/mgmt/shared/echo'] = in_turn(ConnectionError('Connection refused'), unavailable(), dict())
+        paths['/mgmt/tm/sys/mcp-state/stats'] = in_turn(
+            stats(phase='base-config-load'), stats(phase='running')
+        )
+        api = device(paths)
+        mm = self.get_manager(api, sleep=2)
+
+        with patch('library.module_utils.network.f5.common.time.sleep') as sleep:
+            mm.exec_module()
+
+        # The interval grows after each check.
+        assert [x[0][0] for x in sleep.call_args_list] == [2, 3.0, 4.5]
+
+        # Nothing else is read while REST is unavailable.
+        assert [x[0] for x in api.calls].count('/mgmt/tm/sys/ready') == 2
+
+        # The runlevel is read only when REST first answers.
+        assert [x[1] for x in api.commands] == ['-c "runlevel"']
+
+    def test_timeout(self, *args):
+        paths = dict(READY)
+        paths['/mgmt/tm/sys/ready'] = stats(provisionReady='no')
+        api = device(paths)
+        mm = self.get_manager(api, timeout=30)
+
+        clock = [1000.0]
+
+        def sleep(seconds):
+            clock[0] += seconds
+
+        with patch('library.module_utils.network.f5.common.time.time', side_effect=lambda: clock[0]):
+            with patch('library.module_utils.network.f5.common.time.sleep', side_effect=sleep):
+                with self.assertRaises(F5ModuleError) as ex:
+                    mm.exec_module()
+
+        assert 'provisioning_done: Modules are being provisioned' in str(ex.exception)
+        assert 'mcpd_running' not in str(ex.exception)
+        assert mm.changes.to_return()['elapsed'] == 30
+
+    def test_provisioning_on_older_versions(self, *args):
+        paths = dict(READY)
+        paths['/mgmt/tm/sys/ready'] = not_found()
+        api = device(paths)
+        mm = self.get_manager(api)
+        mm.exec_module()
+
+        assert len(api.commands) == 2
+        assert '[m]prov' in api.commands[1][1]
+
+    def test_device_rebooting(self, *args):
+        api = device(READY, runlevel='3 6')
+        mm = self.get_manager(api)
+        results = mm.check_conditions(mm.want.conditions)
+
+        assert results['rest_available'] == 'The device is rebooting'
+        assert results['mcpd_running'] == 'The REST API is not available'
+        assert api.calls == [('/mgmt/shared/echo', None)]
+
+    def test_runlevel_read_until_reboot_ruled_out(self, *args):
+        paths = dict(READY)
+        paths['/mgmt/tm/sys/mcp-state/stats'] = in_turn(
+            stats(phase='base-config-load'), stats(phase='base-config-load'), stats(phase='running')
+        )
+        api = device(paths, runlevel=in_turn('3 6', 'N 3'))
+        mm = self.get_manager(api)
+
+        with patch('library.module_utils.network.f5.common.time.sleep') as sleep:
+            mm.exec_module()
+
+        assert sleep.call_count == 3
+        assert [x[1] for x in api.commands] == ['-c "runlevel"', '-c "runlevel"']
+
+    def test_requests_time_out_with_the_wait(self, *args):
+        paths = dict(READY)
+        paths['/mgmt/tm/sys/ready'] = stats(provisionReady='no')
+        api = device(paths)
+        mm = self.get_manager(api, timeout=45)
+
+        clock = [1000.0]
+        timeouts = []
+        load = api.load
+
+        def sleep(seconds):
+            clock[0] += seconds
+
+        def timed_load(path, params=None):
+            timeouts.append((clock[0], api.timeout))
+            return load(path, params)
+
+        api.load = timed_load
+        with patch('library.module_utils.network.f5.common.time.time', side_effect=lambda: clock[0]):
+            with patch('library.module_utils.network.f5.common.time.sleep', side_effect=sleep):
+                with self.assertRaises(F5ModuleError):
+                    mm.exec_module()
+
+        # No request may take longer than is left of the timeout.
+        assert timeouts[0] == (1000.0, 30)
+        for now, timeout in timeouts:
+            assert timeout == max(min(1045.0 - now, 30), 1)
+        assert timeouts[-1][1] < 30
+
+    def test_device_group_in_sync(self, *args):
+        sync_status = dict(entries={
+            'https://localhost/mgmt/tm/cm/sync-status/0': dict(nestedStats=dict(entries={
+                'status': dict(description='Changes Pending'),
+                'https://localhost/mgmt/tm/cm/syncStatus/0/details': dict(nestedStats=dict(entries={
+                    'https://localhost/mgmt/tm/cm/syncStatus/0/details/0': dict(nestedStats=dict(entries={
+                        'details': dict(description='device-group-failover (In Sync): All devices in the device group are in sync')
+                    })),
+                    'https://localhost/mgmt/tm/cm/syncStatus/0/details/1': dict(nestedStats=dict(entries={
+                        'details': dict(description='web (Changes Pending): There is a possible change conflict')
+                    })),
+                }))
+            }))
+        })
+        api = device({
+            '/mgmt/shared/echo': dict(),
+            '/mgmt/tm/cm/sync-status': sync_status
+        })
+        mm = self.get_manager(api, conditions=['in_sync'], device_group='device-group-failover')
+        assert mm.check_conditions(mm.want.conditions) == dict(rest_available=None, in_sync=None)
+
+        mm = self.get_manager(api, conditions=['in_sync'], device_group='web')
+        assert mm.check_conditions(mm.want.conditions)['in_sync'] == 'The device group is Changes Pending'
+
+        mm = self.get_manager(api, conditions=['in_sync'])
+        assert mm.check_conditions(mm.want.conditions)['in_sync'] == 'The device is Changes Pending'
+
+    def test_services_running(self, *args):
+        api = device({
+            '/mgmt/shared/echo': dict(),
+            '/mgmt/tm/asm/policies': dict(items=[]),
+            '/mgmt/tm/sys/service/tmm/stats': dict(apiRawValues=dict(apiAnonymous='tmm run (pid 5123) 2 days')),
+            '/mgmt/tm/sys/service/asm/stats': dict(apiRawValues=dict(apiAnonymous='asm down, Not provisioned')),
+        })
+        mm = self.get_manager(api, conditions=['asm_ready', 'services_running'], services=['tmm', 'asm'])
+        results = mm.check_conditions(mm.want.conditions)
+
+        assert results['asm_ready'] is None
+        assert results['services_running'] == 'The services are not running: asm'
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2017 F5 Networks Inc.
+# GNU General Public License v3.0 (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import csv
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+from nose.plugins.skip import SkipTest
+if sys.version_info < (2, 7):
+    raise SkipTest("F5 Ansible modules require Python >= 2.7")
+
+from ansible.compat.tests import unittest
+from ansible.compat.tests.mock import Mock
+
+try:
+    from plugins.callback.f5_timings import CallbackModule
+    from plugins.callback.f5_timings import endpoint
+    from plugins.callback.f5_timings import get_polling
+    from plugins.callback.f5_timings import percentile
+except ImportError:
+    raise SkipTest("The f5_timings callback plugin could not be imported")
+
+
+def get_result(host, action, result):
+    return Mock(
+        _host=Mock(get_name=Mock(return_value=host)),
+        _task=Mock(action=action),
+        _result=result
+    )
+
+
+def get_timings(calls, logins=1, wait=0.0, polls=None):
+    return dict(
+        logins=logins,
+        phases=dict(wait=wait),
+        polls=[dict(name='foo', attempts=3, elapsed=x, outcome='success') for x in polls or []],
+        calls=[
+            dict(method=method, path=path, elapsed=elapsed, bytes=size)
+            for method, path, elapsed, size in calls
+        ]
+    )
+
+
+class TestPercentile(unittest.TestCase):
+    def test_empty(self):
+        assert percentile([], 50) is None
+
+    def test_nearest_rank(self):
+        values = [float(x) for x in range(1, 101)]
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 95) == 95.0
+        assert percentile(values, 99) == 99.0
+        assert percentile(values, 100) == 100.0
+
+    def test_few_values(self):
+        assert percentile([0.5], 99) == 0.5
+        assert percentile([0.1, 0.2, 0.3], 50) == 0.2
+        assert percentile([0.1, 0.2, 0.3], 0) == 0.1
+
+
+class TestEndpoint(unittest.TestCase):
+    def test_names_are_removed(self):
+        assert endpoint('GET', '/mgmt/tm/ltm/pool/~Common~foo') == 'GET /mgmt/tm/ltm/pool/{name}'
+
+    def test_member_names_are_removed(self):
+        result = endpoint('PATCH', '/mgmt/tm/ltm/pool/~Common~foo/members/~Common~bar:80')
+        assert result == 'PATCH /mgmt/tm/ltm/pool/{name}/members/{name}'
+
+    def test_collections_are_kept(self):
+        assert endpoint('GET', '/mgmt/tm/ltm/pool') == 'GET /mgmt/tm/ltm/pool'
+
+
+class TestPolling(unittest.TestCase):
+    def test_polls_are_added_up(self):
+        timings = get_timings([], wait=9.0, polls=[1.5, 2.0])
+        assert get_polling(timings) == 3.5
+
+    def test_wait_phase_without_polls(self):
+        assert get_polling(get_timings([], wait=1.5)) == 1.5
+        assert get_polling(dict()) == 0.0
+
+
+class TestCallback(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.callback = CallbackModule()
+        self.callback._display = Mock()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def record(self):
+        self.callback.v2_runner_on_ok(get_result('bigip1', 'bigip_pool', dict(
+            _timings=get_timings([
+                ('GET', '/mgmt/tm/ltm/pool/~Common~foo', 0.1, 100),
+                ('PATCH', '/mgmt/tm/ltm/pool/~Common~foo', 0.3, 50),
+            ], wait=1.5)
+        )))
+        # Loops return the timings of each item.
+        self.callback.v2_runner_on_ok(get_result('bigip1', 'bigip_pool', dict(
+            results=[
+                dict(_timings=get_timings([('GET', '/mgmt/tm/ltm/pool/~Common~bar', 0.2, 200)])),
+                dict(_timings=get_timings([('GET', '/mgmt/tm/ltm/pool/~Common~baz', 0.4, 300)], logins=0)),
+                dict(changed=False),
+            ]
+        )))
+        self.callback.v2_runner_on_failed(get_result('bigip2', 'bigip_node', dict(
+            _timings=get_timings([('POST', '/mgmt/tm/ltm/node', 1.0, 10)], polls=[2.0, 0.5])
+        )))
+        # Results without timings are ignored.
+        self.callback.v2_runner_on_ok(get_result('bigip2', 'debug', dict(msg='foo')))
+
+    def test_record_aggregates_across_tasks(self):
+        self.record()
+        report = self.callback.to_return()
+
+        host = report['hosts']['bigip1']
+        assert host['calls'] == 4
+        assert host['tasks'] == 3
+        assert host['logins'] == 2
+        assert host['polling'] == 1.5
+        assert host['bytes'] == 650
+        assert host['p50'] == 0.2
+        assert host['p99'] == 0.4
+
+        assert report['modules']['bigip_node']['calls'] == 1
+        assert report['modules']['bigip_node']['polling'] == 2.5
+        assert 'debug' not in report['modules']
+
+        endpoints = dict(
+            ((x['host'], x['endpoint']), x) for x in report['endpoints']
+        )
+        get = endpoints[('bigip1', 'GET /mgmt/tm/ltm/pool/{name}')]
+        assert get['calls'] == 3
+        assert get['total'] == 0.7
+        assert get['bytes'] == 600
+        assert 'logins' not in get
+        assert endpoints[('bigip2', 'POST /mgmt/tm/ltm/node')]['module'] == 'bigip_node'
+
+    def test_report_output(self):
+        self.record()
+        self.callback.output_limit = 2
+        self.callback.v2_playbook_on_stats(Mock())
+
+        self.callback._display.banner.assert_called_once_with('F5 ICONTROL CALLS')
+        lines = [x[0][0] for x in self.callback._display.display.call_args_list]
+
+        # One line per host, then the slowest endpoints up to the limit.
+        assert len(lines) == 4
+        assert lines[0] == 'bigip1: 4 calls, 2 logins, 1.50s polling, 650 bytes'
+        assert lines[2].startswith('bigip2 bigip_node POST /mgmt/tm/ltm/node: 1 calls')
+        assert lines[3].startswith('bigip1 bigip_pool GET /mgmt/tm/ltm/pool/{name}: 3 calls')
+
+    def test_json_report(self):
+        self.record()
+        self.callback.report = os.path.join(self.path, 'timings.json')
+        self.callback.v2_playbook_on_stats(Mock())
+
+        with open(self.callback.report) as fh:
+            report = json.load(fh)
+        assert report == json.loads(json.dumps(self.callback.to_return()))
+
+    def test_csv_report(self):
+        self.record()
+        self.callback.report = os.path.join(self.path, 'timings.csv')
+        self.callback.v2_playbook_on_stats(Mock())
+
+        with open(self.callback.report) as fh:
+            rows = list(csv.DictReader(fh))
+        assert len(rows) == 3
+        assert rows[0]['host'] == 'bigip1'
+        assert rows[0]['calls'] == '3'
+
+    def test_nothing_recorded(self):
+        self.callback.v2_playbook_on_stats(Mock())
+        assert self.callback._display.banner.called is False
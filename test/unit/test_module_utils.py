@@ -7,8 +7,50 @@
 from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 
+import base64
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from multiprocessing.pool import ThreadPool
+
+import pytest
+
 from ansible.compat.tests import unittest
+from ansible.compat.tests.mock import Mock
+from ansible.compat.tests.mock import patch
+from library.module_utils.network.f5.bigip import F5Client
 from library.module_utils.network.f5.common import AnsibleF5Parameters
+from library.module_utils.network.f5.common import F5CollectionIndex
+from library.module_utils.network.f5.common import F5Governor
+from library.module_utils.network.f5.common import F5ModuleError
+from library.module_utils.network.f5.common import F5Poller
+from library.module_utils.network.f5.common import F5PollTimeout
+from library.module_utils.network.f5.common import F5RetryPolicy
+from library.module_utils.network.f5.common import F5Snapshot
+from library.module_utils.network.f5.common import GovernedAdapter
+from library.module_utils.network.f5.common import F5Timings
+from library.module_utils.network.f5.common import F5TokenCache
+from library.module_utils.network.f5.common import F5Transaction
+from library.module_utils.network.f5.common import F5TransactionError
+from library.module_utils.network.f5.common import PersistentConnectionAdapter
+from library.module_utils.network.f5.common import RetryAdapter
+from library.module_utils.network.f5.common import cleanup_tokens
+from library.module_utils.network.f5.common import f5_argument_spec
+from library.module_utils.network.f5.common import filter_params
+from library.module_utils.network.f5.common import select_params
+from library.module_utils.network.f5.common import iControlUnexpectedHTTPError
+from library.module_utils.network.f5.common import iter_pages
+from library.module_utils.network.f5.common import map_requests
+from library.module_utils.network.f5.common import transform_name
+from library.module_utils.network.f5.config import F5FactsWriter
+from library.module_utils.network.f5.config import parse_tmsh_config
+from library.module_utils.network.f5.icontrol import F5RestClient
+from library.module_utils.network.f5.icontrol import iControlRestError
+from library.module_utils.network.f5.icontrol import iControlRestSession
 
 
 class TestRegular(unittest.TestCase):
@@ -199,3 +241,1309 @@ class TestAssureNoInstanceAttributes(unittest.TestCase):
         assert test.destination == '10.10.10.10'
         assert test.reject == 'yes'
         assert 'destination' not in dir(test)
+
+
+class TestClientSession(unittest.TestCase):
+    def setUp(self):
+        self.params = dict(
+            server='localhost',
+            user='admin',
+            password='password',
+            server_port=443,
+            validate_certs=False
+        )
+        self.p1 = patch('library.module_utils.network.f5.bigip.ManagementRoot')
+        self.m1 = self.p1.start()
+        self.m1.side_effect = lambda *args, **kwargs: Mock()
+
+    def tearDown(self):
+        self.p1.stop()
+
+    def test_no_login_until_used(self):
+        client = F5Client(**self.params)
+        assert client.login_count == 0
+        assert self.m1.call_count == 0
+
+    def test_api_is_reused(self):
+        client = F5Client(**self.params)
+        api = client.api
+        for x in range(20):
+            assert client.api.tm is api.tm
+        assert client.login_count == 1
+        assert self.m1.call_count == 1
+
+    def test_reconnect(self):
+        client = F5Client(**self.params)
+        api1 = client.api
+        api2 = client.reconnect()
+        assert api1 is not api2
+        assert client.api is api2
+        assert client.login_count == 2
+
+    def test_invalidate(self):
+        client = F5Client(**self.params)
+        api1 = client.api
+        client.invalidate()
+        assert client.login_count == 1
+        assert client.api is not api1
+        assert client.login_count == 2
+
+    def test_cleanup_tokens_without_login(self):
+        client = F5Client(**self.params)
+        cleanup_tokens(client)
+        assert client.login_count == 0
+
+    def test_cleanup_tokens_after_login(self):
+        client = F5Client(**self.params)
+        api = client.api
+        cleanup_tokens(client)
+        assert client.login_count == 1
+        assert api.shared.authz.tokens_s.token.load.call_count == 1
+
+    def test_client_options_from_provider(self):
+        self.params['provider'] = dict(timings=True, rest_retries=0)
+        client = F5Client(**self.params)
+        assert client.timings is not None
+        assert client.retry_policy is None
+
+    def test_client_options_from_environment(self):
+        with patch.dict(os.environ, {'F5_TIMINGS': 'yes', 'F5_MAX_IN_FLIGHT': '2'}):
+            client = F5Client(**self.params)
+        assert client.timings is not None
+        assert client.governor.max_in_flight == 2
+
+    def test_client_options_only_in_provider(self):
+        assert 'timings' not in f5_argument_spec
+        assert 'timings' in f5_argument_spec['provider']['options']
+
+
+class FakeClock(object):
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeTokenEndpoint(object):
+    """Stands in for ManagementRoot and the device's token service
+    """
+    def __init__(self, clock, lifetime=1200):
+        self.clock = clock
+        self.lifetime = lifetime
+        self.logins = 0
+        self.revoked = set()
+
+    def __call__(self, *args, **kwargs):
+        token = kwargs.get('token_to_use')
+        if token is None:
+            self.logins += 1
+            token = 'token-{0}'.format(self.logins)
+            expiration = self.clock() + self.lifetime
+        elif token in self.revoked:
+            response = Mock(status_code=401)
+            raise iControlUnexpectedHTTPError('401 Unauthorized', response=response)
+        else:
+            expiration = None
+        result = Mock()
+        result.icrs.token = token
+        result.icrs.session.auth.expiration = expiration
+        return result
+
+
+class TestTokenCache(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.clock = FakeClock()
+        self.endpoint = FakeTokenEndpoint(self.clock)
+        self.params = dict(
+            server='localhost',
+            user='admin',
+            password='password',
+            server_port=443,
+            validate_certs=False,
+            token_cache=self.path
+        )
+        self.p1 = patch('library.module_utils.network.f5.bigip.ManagementRoot')
+        self.m1 = self.p1.start()
+        self.m1.side_effect = self.endpoint
+
+    def tearDown(self):
+        self.p1.stop()
+        shutil.rmtree(self.path)
+
+    def get_client(self):
+        client = F5Client(**self.params)
+        client.token_cache.clock = self.clock
+        return client
+
+    def test_cache_get_set(self):
+        cache = F5TokenCache(self.path, clock=self.clock)
+        assert cache.get('localhost', 443, 'admin') is None
+        cache.set('localhost', 443, 'admin', token='abc', expiration=1100)
+        assert cache.get('localhost', 443, 'admin') == 'abc'
+        assert cache.get('localhost', 443, 'bob') is None
+        assert cache.get('localhost', 8443, 'admin') is None
+
+    def test_cache_expires(self):
+        cache = F5TokenCache(self.path, clock=self.clock)
+        cache.set('localhost', 443, 'admin', token='abc', expiration=1100)
+        self.clock.now = 1100
+        assert cache.get('localhost', 443, 'admin') is None
+
+    def test_token_shared_across_clients(self):
+        for x in range(5):
+            client = self.get_client()
+            assert client.api.icrs.token == 'token-1'
+            cleanup_tokens(client)
+        assert self.endpoint.logins == 1
+
+        # Cached tokens must not be deleted by the module
+        api = client.api
+        assert api.shared.authz.tokens_s.token.load.call_count == 0
+
+    def test_token_refreshed_after_expiration(self):
+        client = self.get_client()
+        assert client.api.icrs.token == 'token-1'
+
+        self.clock.now += 1200
+        client = self.get_client()
+        assert client.api.icrs.token == 'token-2'
+        assert client.login_count == 1
+        assert self.endpoint.logins == 2
+
+    def test_token_refreshed_on_401(self):
+        client = self.get_client()
+        assert client.api.icrs.token == 'token-1'
+        self.endpoint.revoked.add('token-1')
+
+        client = self.get_client()
+        assert client.api.icrs.token == 'token-2'
+        assert self.endpoint.logins == 2
+
+        client = self.get_client()
+        assert client.api.icrs.token == 'token-2'
+        assert self.endpoint.logins == 2
+
+    def test_uncached_token_is_cleaned_up(self):
+        self.params.pop('token_cache')
+        client = F5Client(**self.params)
+        api = client.api
+        cleanup_tokens(client)
+        assert api.shared.authz.tokens_s.token.load.call_count == 1
+
+
+class FakePersistentConnection(object):
+    """Stands in for the bigip httpapi plugin on the far side of the socket
+    """
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+
+    def send_request(self, data, **kwargs):
+        if data is not None:
+            data = json.loads(base64.b64decode(data).decode('utf-8'))
+        self.requests.append((kwargs['method'], kwargs['path'], data))
+        code, body = self.responses[kwargs['path'].split('?')[0]]
+        return dict(
+            code=code,
+            reason='OK',
+            headers={'Content-Type': 'application/json'},
+            contents=base64.b64encode(json.dumps(body).encode('utf-8')).decode('utf-8')
+        )
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_get_and_set(self):
+        snapshot = F5Snapshot(os.path.join(self.path, 'snapshots'))
+        assert snapshot.get('localhost', 443, 'facts') is None
+
+        snapshot.set('localhost', 443, 'facts', dict(foo=[1, 2]))
+        assert snapshot.get('localhost', 443, 'facts') == dict(foo=[1, 2])
+
+        # Each device, and each kind of data, is kept separately.
+        assert snapshot.get('localhost', 443, 'stats') is None
+        assert snapshot.get('other', 443, 'facts') is None
+
+    def test_corrupt_snapshot_is_ignored(self):
+        snapshot = F5Snapshot(self.path)
+        snapshot.set('localhost', 443, 'facts', dict(foo='bar'))
+        with open(snapshot._filename('localhost', 443, 'facts'), 'w') as fh:
+            fh.write('{')
+        assert snapshot.get('localhost', 443, 'facts') is None
+
+
+class TestPersistentConnection(unittest.TestCase):
+    def setUp(self):
+        self.connection = FakePersistentConnection({
+            '/mgmt/tm/sys/': (200, dict(selfLink='https://localhost/mgmt/tm/sys?ver=13.1.0')),
+            '/mgmt/tm/sys/db/setup.run': (200, dict(
+                kind='tm:sys:db:dbstate',
+                name='setup.run',
+                value='false',
+                selfLink='https://localhost/mgmt/tm/sys/db/setup.run?ver=13.1.0'
+            )),
+        })
+        self.p1 = patch('library.module_utils.network.f5.common.Connection')
+        self.m1 = self.p1.start()
+        self.m1.return_value = self.connection
+
+    def tearDown(self):
+        self.p1.stop()
+
+    def test_adapter_send(self):
+        import requests
+        session = requests.Session()
+        session.mount('https://', PersistentConnectionAdapter('/path/to/socket'))
+        resp = session.post('https://localhost/mgmt/tm/sys/db/setup.run?ver=13.1.0', json=dict(value='false'))
+        assert resp.status_code == 200
+        assert resp.json()['value'] == 'false'
+        assert self.connection.requests == [
+            ('POST', '/mgmt/tm/sys/db/setup.run?ver=13.1.0', dict(value='false'))
+        ]
+
+    def test_client_requests_use_connection(self):
+        client = F5Client(
+            socket_path='/path/to/socket',
+            server=None,
+            user=None,
+            password=None,
+            server_port=443,
+            validate_certs=False
+        )
+        assert client.api.tmos_version == '13.1.0'
+        resource = client.api.tm.sys.dbs.db.load(name='setup.run')
+        assert resource.value == 'false'
+        assert client.login_count == 0
+        assert [x[1].split('?')[0] for x in self.connection.requests] == [
+            '/mgmt/tm/sys/', '/mgmt/tm/sys/db/setup.run'
+        ]
+
+    def test_client_requests_are_timed(self):
+        client = F5Client(
+            socket_path='/path/to/socket',
+            server=None,
+            user=None,
+            password=None,
+            server_port=443,
+            validate_certs=False,
+            timings=True
+        )
+        client.api.tm.sys.dbs.db.load(name='setup.run')
+        result = client.timings.to_return()
+
+        # Requests made while the management root is built are counted in
+        # the connect phase rather than recorded individually.
+        assert 'connect' in result['phases']
+        assert [(x['method'], x['path'], x['status']) for x in result['calls']] == [
+            ('GET', '/mgmt/tm/sys/db/setup.run', 200)
+        ]
+        assert result['calls'][0]['bytes'] > 0
+
+    def test_client_requests_are_governed(self):
+        client = F5Client(
+            socket_path='/path/to/socket',
+            server=None,
+            user=None,
+            password=None,
+            server_port=443,
+            validate_certs=False,
+            max_in_flight=1
+        )
+        path = tempfile.mkdtemp()
+        try:
+            client.governor.path = path
+            resource = client.api.tm.sys.dbs.db.load(name='setup.run')
+            assert resource.value == 'false'
+            adapter = client.api.icrs.session.get_adapter('https://').adapter
+            assert isinstance(adapter, GovernedAdapter)
+            assert isinstance(adapter.adapter, PersistentConnectionAdapter)
+        finally:
+            shutil.rmtree(path)
+
+
+class FakeResponse(object):
+    def __init__(self, status_code, body=None, content=None, headers=None):
+        self.status_code = status_code
+        self.reason = 'reason'
+        self.url = 'https://localhost'
+        self.headers = headers or {}
+        self.text = json.dumps(body)
+        self._body = body
+        self.content = content
+
+    def json(self):
+        return self._body
+
+
+class FakeSession(object):
+    """Stands in for the requests session of iControlRestSession
+    """
+    def __init__(self, routes):
+        self.routes = routes
+        self.headers = {}
+        self.calls = []
+        self.valid_tokens = set()
+        self.logins = 0
+        self.adapters = {}
+
+    def mount(self, prefix, adapter):
+        self.adapters[prefix] = adapter
+
+    def get_adapter(self, url):
+        return self.adapters.get('https://')
+
+    def post(self, url, json=None, timeout=None):
+        self.logins += 1
+        token = 'token-{0}'.format(self.logins)
+        self.valid_tokens.add(token)
+        return FakeResponse(200, dict(token=dict(
+            token=token,
+            timeout=1200,
+            lastUpdateMicros=1000000,
+            expirationMicros=1201000000
+        )))
+
+    def request(self, method, url, **kwargs):
+        path = url.replace('https://localhost:443', '')
+        self.calls.append((method, path, kwargs))
+        if self.headers.get('X-F5-Auth-Token') not in self.valid_tokens:
+            return FakeResponse(401, dict(code=401))
+        route = self.routes.get((method, path.split('?')[0]))
+        if route is None:
+            return FakeResponse(404, dict(code=404))
+        return route(kwargs) if callable(route) else route
+
+
+class TestRestSession(unittest.TestCase):
+    def setUp(self):
+        self.routes = {
+            ('GET', '/mgmt/tm/ltm/pool/~Common~foo'): FakeResponse(200, dict(name='foo')),
+            ('GET', '/mgmt/tm/ltm/pool/'): FakeResponse(200, dict(items=[dict(name='foo'), dict(name='bar')])),
+            ('POST', '/mgmt/tm/util/bash'): lambda kw: FakeResponse(200, kw['json']),
+        }
+        self.fake = FakeSession(self.routes)
+        self.logins = []
+        self.session = iControlRestSession(
+            'localhost', 'admin', 'admin',
+            on_login=lambda token, expiration: self.logins.append((token, expiration))
+        )
+        self.session.session = self.fake
+
+    def test_no_login_until_request(self):
+        assert self.fake.logins == 0
+        self.session.load('/mgmt/tm/ltm/pool/~Common~foo')
+        self.session.load('/mgmt/tm/ltm/pool/~Common~foo')
+        assert self.fake.logins == 1
+        assert len(self.logins) == 1
+
+    def test_token_lifetime(self):
+        self.session.load('/mgmt/tm/ltm/pool/~Common~foo')
+        token, expiration = self.logins[0]
+        assert token == 'token-1'
+
+        # Tokens are expired locally one minute early
+        assert 1130 < expiration - time.time() <= 1140
+
+    def test_relogin_on_401(self):
+        self.session.token = 'stale'
+        result = self.session.load('/mgmt/tm/ltm/pool/~Common~foo')
+        assert result['name'] == 'foo'
+        assert self.session.token == 'token-1'
+        assert len(self.fake.calls) == 2
+
+    def test_exists(self):
+        assert self.session.exists('/mgmt/tm/ltm/pool/~Common~foo') is True
+        assert self.session.exists('/mgmt/tm/ltm/pool/~Common~baz') is False
+
+    def test_error(self):
+        with pytest.raises(iControlRestError) as ex:
+            self.session.delete('/mgmt/tm/ltm/pool/~Common~baz')
+        assert ex.value.status_code == 404
+
+    def test_collection(self):
+        result = self.session.collection('/mgmt/tm/ltm/pool/')
+        assert [x['name'] for x in result] == ['foo', 'bar']
+
+    def test_exec_cmd(self):
+        result = self.session.exec_cmd('/mgmt/tm/util/bash', 'run', utilCmdArgs='-c "uptime"')
+        assert result == dict(command='run', utilCmdArgs='-c "uptime"')
+
+    def test_upload(self):
+        chunks = []
+
+        def upload(kwargs):
+            chunks.append((kwargs['headers']['Content-Range'], len(kwargs['data'])))
+            return FakeResponse(200, {})
+
+        self.routes[('POST', '/mgmt/shared/file-transfer/uploads/foo.iso')] = upload
+        fd, path = tempfile.mkstemp()
+        os.write(fd, b'x' * (512 * 1024 + 10))
+        os.close(fd)
+        try:
+            self.session.upload('/mgmt/shared/file-transfer/uploads/foo.iso', path)
+        finally:
+            os.remove(path)
+        assert chunks == [
+            ('0-524287/524298', 524288),
+            ('524288-524297/524298', 10)
+        ]
+
+    def test_upload_empty_file(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            with pytest.raises(F5ModuleError) as ex:
+                self.session.upload('/mgmt/shared/file-transfer/uploads/foo.iso', path)
+        finally:
+            os.remove(path)
+        assert 'is empty' in str(ex.value)
+
+    def test_download(self):
+        data = b'y' * (512 * 1024 + 10)
+
+        def download(kwargs):
+            start, end = kwargs['headers']['Content-Range'].split('/')[0].split('-')
+            start, end = int(start), min(int(end), len(data) - 1)
+            headers = {'Content-Range': '{0}-{1}/{2}'.format(start, end, len(data))}
+            return FakeResponse(200, content=data[start:end + 1], headers=headers)
+
+        self.routes[('GET', '/mgmt/shared/file-transfer/ucs-downloads/foo.ucs')] = download
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            self.session.download('/mgmt/shared/file-transfer/ucs-downloads/foo.ucs', path)
+            with open(path, 'rb') as fh:
+                assert fh.read() == data
+        finally:
+            os.remove(path)
+
+
+class TestRestClient(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.params = dict(
+            server='localhost',
+            user='admin',
+            password='password',
+            server_port=443,
+            validate_certs=False,
+            token_cache=self.path
+        )
+        self.fake = FakeSession({
+            ('GET', '/mgmt/tm/sys/db/setup.run'): FakeResponse(200, dict(value='false')),
+        })
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def get_client(self):
+        client = F5RestClient(**self.params)
+        original = client._get_mgmt_root
+
+        def get_mgmt_root(**kwargs):
+            result = original(**kwargs)
+            result.session = self.fake
+            return result
+
+        client._get_mgmt_root = get_mgmt_root
+        return client
+
+    def test_token_cache(self):
+        for x in range(3):
+            client = self.get_client()
+            assert client.api.load('/mgmt/tm/sys/db/setup.run')['value'] == 'false'
+            cleanup_tokens(client)
+        assert self.fake.logins == 1
+
+    def test_token_cache_refreshed_on_401(self):
+        client = self.get_client()
+        client.api.load('/mgmt/tm/sys/db/setup.run')
+        self.fake.valid_tokens.clear()
+
+        client = self.get_client()
+        client.api.load('/mgmt/tm/sys/db/setup.run')
+        assert client.login_count == 1
+
+        client = self.get_client()
+        client.api.load('/mgmt/tm/sys/db/setup.run')
+        assert client.login_count == 0
+        assert self.fake.logins == 2
+
+    def test_reauthenticate(self):
+        client = self.get_client()
+        client.api.load('/mgmt/tm/sys/db/setup.run')
+        request = Mock(url='https://localhost/mgmt/tm/sys/db/setup.run', headers={})
+        assert client.reauthenticate(request) is True
+        assert request.headers['X-F5-Auth-Token'] == 'token-2'
+
+        # A rejected login is not retried with another login.
+        request = Mock(url='https://localhost/mgmt/shared/authn/login', headers={})
+        assert client.reauthenticate(request) is False
+        assert self.fake.logins == 2
+
+
+class TestTransformName(unittest.TestCase):
+    def test_partition_and_name(self):
+        assert transform_name('Common', 'foo') == '~Common~foo'
+
+    def test_sub_path(self):
+        assert transform_name('Common', 'foo', 'bar.app') == '~Common~bar.app~foo'
+
+    def test_name_only(self):
+        assert transform_name(name='foo') == 'foo'
+
+
+class TestQueryParams(unittest.TestCase):
+    class Foo(AnsibleF5Parameters):
+        api_map = {
+            'loadBalancingMode': 'lb_method',
+            'defaultValue': 'default_value',
+        }
+        api_attributes = ['description', 'loadBalancingMode']
+        updatables = ['lb_method', 'quorum']
+
+    def test_select(self):
+        result = select_params(TestQueryParams.Foo)
+        assert result == {
+            '$select': 'description,fullPath,kind,loadBalancingMode,name,partition'
+        }
+
+    def test_select_extra_and_subcollections(self):
+        result = select_params(
+            TestQueryParams.Foo, subcollections=['membersReference'], extra=['defaultValue']
+        )
+        assert result['expandSubcollections'] == 'true'
+        assert 'membersReference' in result['$select'].split(',')
+        assert 'defaultValue' in result['$select'].split(',')
+
+    def test_filter(self):
+        assert filter_params(partition='Common') == {'$filter': 'partition eq Common'}
+        assert filter_params(partition='Common', name="'foo'") == {
+            '$filter': "name eq 'foo' and partition eq Common"
+        }
+
+
+class TestCollectionIndex(unittest.TestCase):
+    def setUp(self):
+        self.reads = 0
+        self.items = [
+            dict(name='foo', partition='Common', managementIp='10.0.0.1'),
+            dict(name='bar', partition='Other', managementIp='10.0.0.2'),
+        ]
+
+    def fetch(self):
+        self.reads += 1
+        return list(self.items)
+
+    def test_lookups_read_the_collection_once(self):
+        index = F5CollectionIndex(self.fetch)
+        assert '/Common/foo' in index
+        assert '/Other/foo' not in index
+        assert index.get('/Other/bar')['managementIp'] == '10.0.0.2'
+        assert index.get('/Common/baz') is None
+        assert self.reads == 1
+
+    def test_invalidate(self):
+        index = F5CollectionIndex(self.fetch, key=lambda x: x['managementIp'])
+        assert '10.0.0.1' in index
+
+        self.items.pop(0)
+        assert '10.0.0.1' in index
+        index.invalidate()
+        assert '10.0.0.1' not in index
+        assert self.reads == 2
+
+
+class TestParseTmshConfig(unittest.TestCase):
+    def test_parse(self):
+        text = '\n'.join([
+            '#TMSH-VERSION: 13.1.0',
+            'ltm pool /Common/foo {',
+            '    description "a \\"quoted\\" {text}"',
+            '    members {',
+            '        /Common/10.10.10.10:80 {',
+            '            address 10.10.10.10',
+            '        }',
+            '    }',
+            '    monitor /Common/http and /Common/tcp',
+            '}',
+            'ltm rule /Common/r {',
+            'when HTTP_REQUEST { if { 1 } { log local0. "\\}" } }',
+            '}',
+            'ltm virtual /Common/vs {',
+            '    disabled',
+            '    vlans {',
+            '        /Common/a',
+            '        /Common/b',
+            '    }',
+            '}',
+        ])
+        result = parse_tmsh_config(text, raw=['ltm rule'])
+        assert result == [
+            (['ltm', 'pool', '/Common/foo'], {
+                'description': 'a "quoted" {text}',
+                'members': {'/Common/10.10.10.10:80': {'address': '10.10.10.10'}},
+                'monitor': '/Common/http and /Common/tcp'
+            }),
+            (['ltm', 'rule', '/Common/r'], 'when HTTP_REQUEST { if { 1 } { log local0. "\\}" } }'),
+            (['ltm', 'virtual', '/Common/vs'], {
+                'disabled': True,
+                'vlans': ['/Common/a', '/Common/b']
+            }),
+        ]
+
+
+class FakeTransactionClient(object):
+    """Records requests and rejects those whose path is in ``reject``
+    """
+    def __init__(self, reject=None, commit=None):
+        self.reject = reject or []
+        self.commit = commit or dict(state='COMPLETED')
+        self.calls = []
+
+    def request(self, method, path, **kwargs):
+        self.calls.append((method, path, kwargs))
+        if method == 'POST' and path == '/mgmt/tm/transaction':
+            return FakeResponse(200, dict(transId=1234))
+        if method == 'PATCH' and path == '/mgmt/tm/transaction/1234':
+            return FakeResponse(200, self.commit)
+        if path in self.reject:
+            raise iControlRestError('400', response=FakeResponse(400, dict(message='invalid')))
+        return FakeResponse(200, dict())
+
+
+class TestTransaction(unittest.TestCase):
+    def test_commit(self):
+        client = FakeTransactionClient()
+        with F5Transaction(client) as tx:
+            tx.create('/mgmt/tm/ltm/policy/~Common~foo/rules', dict(name='bar'))
+            tx.modify('/mgmt/tm/ltm/policy/~Common~foo/rules/baz', dict(ordinal=1))
+            tx.delete('/mgmt/tm/ltm/policy/~Common~foo/rules/qux')
+
+        methods = [x[0] for x in client.calls]
+        assert methods == ['POST', 'POST', 'PATCH', 'DELETE', 'PATCH']
+        for call in client.calls[1:4]:
+            assert call[2]['headers'] == {'X-F5-REST-Coordination-Id': '1234'}
+        assert client.calls[-1][2]['json'] == dict(state='VALIDATING')
+        assert all(x['status'] == 200 for x in tx.operations)
+
+    def test_failed_operation_discards(self):
+        client = FakeTransactionClient(reject=['/mgmt/tm/ltm/policy/~Common~foo/rules/baz'])
+        with pytest.raises(F5TransactionError) as ex:
+            with F5Transaction(client) as tx:
+                tx.create('/mgmt/tm/ltm/policy/~Common~foo/rules', dict(name='bar'))
+                tx.modify('/mgmt/tm/ltm/policy/~Common~foo/rules/baz', dict(ordinal=1))
+
+        assert 'PATCH /mgmt/tm/ltm/policy/~Common~foo/rules/baz: invalid' in str(ex.value)
+        assert [x['status'] for x in ex.value.operations] == [200, 400]
+        assert client.calls[-1][:2] == ('DELETE', '/mgmt/tm/transaction/1234')
+
+    def test_failed_commit(self):
+        client = FakeTransactionClient(commit=dict(state='FAILED', failureReason='bad rule'))
+        with pytest.raises(F5TransactionError) as ex:
+            with F5Transaction(client) as tx:
+                tx.delete('/mgmt/tm/ltm/policy/~Common~foo/rules/qux')
+        assert 'bad rule' in str(ex.value)
+
+    def test_empty_transaction_is_not_committed(self):
+        client = FakeTransactionClient()
+        with F5Transaction(client):
+            pass
+        assert [x[0] for x in client.calls] == ['POST', 'DELETE']
+
+    def test_exception_discards(self):
+        client = FakeTransactionClient()
+        with pytest.raises(ValueError):
+            with F5Transaction(client) as tx:
+                tx.delete('/mgmt/tm/ltm/policy/~Common~foo/rules/qux')
+                raise ValueError()
+        assert client.calls[-1][:2] == ('DELETE', '/mgmt/tm/transaction/1234')
+
+
+class FakeManager(object):
+    def __init__(self, clock):
+        self.clock = clock
+
+    def exists(self):
+        self.clock.now += 1
+        return True
+
+    def read_current_from_device(self):
+        self.clock.now += 2
+        self.exists()
+
+    def update_on_device(self):
+        self.clock.now += 4
+
+    def exec_module(self):
+        self.clock.now += 8
+        self.read_current_from_device()
+        self.update_on_device()
+
+
+class FakeBigsuds(object):
+    class LocalLB(object):
+        class Pool(object):
+            @staticmethod
+            def get_list():
+                return ['/Common/foo']
+
+            @staticmethod
+            def get_description(pools):
+                raise ValueError()
+
+    def with_session_id(self):
+        return FakeBigsuds()
+
+
+class TestTimings(unittest.TestCase):
+    def test_nested_phases_are_exclusive(self):
+        clock = FakeClock()
+        timings = F5Timings(clock=clock)
+        manager = FakeManager(clock)
+        timings.instrument(manager)
+        manager.exec_module()
+
+        result = timings.to_return()
+        assert result['total'] == 15
+        assert result['phases'] == dict(read=3, write=4)
+        assert 'logins' not in result
+
+    def test_get_manager_is_instrumented(self):
+        clock = FakeClock()
+        timings = F5Timings(clock=clock)
+        inner = FakeManager(clock)
+        outer = Mock()
+        outer.get_manager.return_value = inner
+        timings.instrument(outer)
+        outer.get_manager('simple').update_on_device()
+        assert timings.to_return()['phases'] == dict(write=4)
+
+    def test_response_is_recorded(self):
+        timings = F5Timings()
+        response = Mock(status_code=200, content=b'{"value":"false"}', headers={})
+        response.request.method = 'GET'
+        response.request.url = 'https://localhost/mgmt/tm/sys/db/setup.run?$select=value'
+        response.request.body = None
+        response.elapsed.total_seconds.return_value = 0.25
+        timings._on_response(response)
+
+        assert timings.calls == [dict(
+            method='GET', path='/mgmt/tm/sys/db/setup.run', status=200, bytes=17, elapsed=0.25
+        )]
+
+    def test_client_records_logins(self):
+        client = F5RestClient(
+            server='localhost', user='admin', password='password',
+            server_port=443, validate_certs=False, timings=True
+        )
+        assert client.timings is not None
+        assert client.timings.to_return()['logins'] == 0
+
+    def test_disabled_by_default(self):
+        client = F5RestClient(
+            server='localhost', user='admin', password='password',
+            server_port=443, validate_certs=False
+        )
+        assert client.timings is None
+
+    def test_bigsuds(self):
+        timings = F5Timings()
+        api = timings.instrument_bigsuds(FakeBigsuds())
+        api = api.with_session_id()
+        assert api.LocalLB.Pool.get_list() == ['/Common/foo']
+        with pytest.raises(ValueError):
+            api.LocalLB.Pool.get_description(['/Common/foo'])
+
+        calls = [(x['path'], x['status']) for x in timings.calls]
+        assert calls == [('LocalLB.Pool.get_list', 200), ('LocalLB.Pool.get_description', 500)]
+
+
+class FakeSleep(object):
+    """Advances a fake clock instead of sleeping
+    """
+    def __init__(self, clock, callback=None):
+        self.clock = clock
+        self.callback = callback
+        self.calls = []
+
+    def __call__(self, seconds):
+        self.calls.append(seconds)
+        self.clock.now += seconds
+        if self.callback:
+            self.callback()
+
+
+class TestGovernor(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def get_governor(self, sleep=None, **kwargs):
+        return F5Governor(
+            'localhost', 443, path=self.path, clock=self.clock,
+            sleep=sleep or FakeSleep(self.clock), **kwargs
+        )
+
+    def test_max_in_flight(self):
+        first = self.get_governor(max_in_flight=1)
+        held = first.slot()
+        held.__enter__()
+
+        # The second governor stands in for another process. It waits until
+        # the first releases its slot.
+        sleep = FakeSleep(self.clock, callback=lambda: held.__exit__(None, None, None))
+        second = self.get_governor(sleep=sleep, max_in_flight=1)
+        with second.slot():
+            pass
+        assert len(sleep.calls) == 1
+        assert second.delay == pytest.approx(sleep.calls[0])
+
+    def test_leaked_slot_times_out(self):
+        first = self.get_governor(max_in_flight=1)
+        held = first.slot()
+        held.__enter__()
+
+        second = self.get_governor(max_in_flight=1, timeout=1)
+        with pytest.raises(F5ModuleError) as ex:
+            with second.slot():
+                pass
+        assert 'Timed out after 1 seconds' in str(ex.value)
+        held.__exit__(None, None, None)
+
+    def test_rate_times_out(self):
+        governor = self.get_governor(rate=0.5, timeout=1)
+        with governor.slot():
+            pass
+        with pytest.raises(F5ModuleError):
+            with governor.slot():
+                pass
+
+        # Nothing was reserved by the request that timed out.
+        self.clock.now += 2
+        with governor.slot():
+            pass
+
+    def test_slots_are_per_device(self):
+        first = self.get_governor(max_in_flight=1)
+        sleep = FakeSleep(self.clock)
+        other = F5Governor(
+            'other', 443, path=self.path, clock=self.clock, sleep=sleep, max_in_flight=1
+        )
+        with first.slot():
+            with other.slot():
+                pass
+        assert sleep.calls == []
+
+    def test_nested_slots_do_not_wait(self):
+        sleep = FakeSleep(self.clock)
+        governor = self.get_governor(sleep=sleep, max_in_flight=1)
+        with governor.slot():
+            with governor.slot():
+                pass
+        assert sleep.calls == []
+
+    def test_slots_in_other_threads_wait(self):
+        governor = self.get_governor(max_in_flight=1)
+        held = governor.slot()
+        held.__enter__()
+
+        # A slot taken in another thread is not nested in this one, so it
+        # waits for the slot held here to be released.
+        sleep = FakeSleep(self.clock, callback=lambda: held.__exit__(None, None, None))
+        governor.sleep = sleep
+
+        def worker():
+            with governor.slot():
+                pass
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        assert len(sleep.calls) == 1
+
+    def test_rate(self):
+        sleep = FakeSleep(self.clock)
+        governor = self.get_governor(sleep=sleep, rate=2)
+        for x in range(3):
+            with governor.slot():
+                pass
+        assert sleep.calls == [0.5, 0.5]
+        assert governor.delay == 1.0
+
+    def test_delay_is_reported_in_timings(self):
+        client = F5RestClient(
+            server='localhost', user='admin', password='password', server_port=443,
+            validate_certs=False, timings=True, max_requests_per_second=2
+        )
+        client.governor.path = self.path
+        client.governor.clock = client.timings.clock = self.clock
+        client.governor.sleep = FakeSleep(self.clock)
+        for x in range(2):
+            with client.governor.slot():
+                pass
+
+        result = client.timings.to_return()
+        assert result['queue_delay'] == 0.5
+        assert result['phases']['queue'] == 0.5
+
+
+class FaultInjectingAdapter(object):
+    """Stands in for a device that fails requests as scripted
+
+    Each item of the script is either a status to respond with, or an
+    exception to raise. Once the script is exhausted every request succeeds.
+    """
+    def __init__(self, script):
+        self.script = list(script)
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        import requests
+        self.requests.append((request.method, request.headers.get('X-F5-Auth-Token')))
+        fault = self.script.pop(0) if self.script else 200
+        if isinstance(fault, Exception):
+            raise fault
+        response = requests.models.Response()
+        response.status_code = fault
+        response._content = b'{}'
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.sleep = FakeSleep(self.clock)
+        self.policy = F5RetryPolicy(
+            retries=3, backoff=1, breaker_threshold=4, breaker_cooldown=30,
+            clock=self.clock, sleep=self.sleep, random=lambda: 0.5
+        )
+
+    def get_session(self, script, reauthenticate=None):
+        import requests
+        self.device = FaultInjectingAdapter(script)
+        session = requests.Session()
+        session.mount('https://', RetryAdapter(self.policy, self.device, reauthenticate))
+        return session
+
+    def test_reads_are_retried_with_backoff(self):
+        session = self.get_session([503, 503])
+        resp = session.get('https://localhost/mgmt/tm/sys/db/setup.run')
+        assert resp.status_code == 200
+        assert len(self.device.requests) == 3
+        # Full jitter of a 1s, then 2s, ceiling
+        assert self.sleep.calls == [0.5, 1.0]
+
+    def test_retries_are_bounded(self):
+        session = self.get_session([503] * 3 + [504])
+        resp = session.get('https://localhost/mgmt/tm/sys/db/setup.run')
+        assert resp.status_code == 504
+        assert len(self.device.requests) == 4
+
+    def test_writes_are_not_retried(self):
+        session = self.get_session([503])
+        resp = session.post('https://localhost/mgmt/tm/ltm/pool', json=dict(name='foo'))
+        assert resp.status_code == 503
+        assert len(self.device.requests) == 1
+
+    def test_client_errors_are_not_retried(self):
+        session = self.get_session([400, 404])
+        assert session.get('https://localhost/mgmt/tm/ltm/pool/foo').status_code == 400
+        assert len(self.device.requests) == 1
+
+    def test_connection_errors(self):
+        from requests.exceptions import ConnectionError, ConnectTimeout
+        session = self.get_session([ConnectionError()])
+        assert session.get('https://localhost/mgmt/tm/sys').status_code == 200
+
+        session = self.get_session([ConnectionError()])
+        with pytest.raises(ConnectionError):
+            session.post('https://localhost/mgmt/tm/ltm/pool', json=dict(name='foo'))
+
+        # The connection was never made, so the write is safe to retry.
+        session = self.get_session([ConnectTimeout()])
+        assert session.post('https://localhost/mgmt/tm/ltm/pool', json=dict(name='foo')).status_code == 200
+
+    def test_reauthenticate_on_401(self):
+        def reauthenticate(request):
+            request.headers['X-F5-Auth-Token'] = 'new'
+            return True
+
+        session = self.get_session([401, 401], reauthenticate=reauthenticate)
+        session.headers['X-F5-Auth-Token'] = 'old'
+        resp = session.post('https://localhost/mgmt/tm/ltm/pool', json=dict(name='foo'))
+
+        # Only one new token is requested per request.
+        assert resp.status_code == 401
+        assert self.device.requests == [('POST', 'old'), ('POST', 'new')]
+
+    def test_circuit_breaker(self):
+        session = self.get_session([503] * 4)
+        resp = session.get('https://localhost/mgmt/tm/sys')
+        assert resp.status_code == 503
+        assert self.policy.is_open
+
+        # The device is not contacted while the breaker is open
+        with pytest.raises(F5ModuleError):
+            session.get('https://localhost/mgmt/tm/sys')
+        assert len(self.device.requests) == 4
+
+        # After the cooldown, a probe is let through and closes the breaker
+        self.clock.now += 30
+        assert session.get('https://localhost/mgmt/tm/sys').status_code == 200
+        assert not self.policy.is_open
+        assert self.policy.failures == 0
+
+    def test_failed_probe_reopens_breaker(self):
+        session = self.get_session([503] * 5)
+        session.get('https://localhost/mgmt/tm/sys')
+        self.clock.now += 30
+        assert session.get('https://localhost/mgmt/tm/sys').status_code == 503
+        assert len(self.device.requests) == 5
+        assert self.policy.is_open
+
+    def test_call(self):
+        responses = [iControlRestError('503', response=FakeResponse(503)), None]
+
+        def connect():
+            error = responses.pop(0)
+            if error:
+                raise error
+            return 'api'
+
+        assert self.policy.call(connect) == 'api'
+        assert self.sleep.calls == [0.5]
+
+    def test_call_does_not_retry_bad_credentials(self):
+        def connect():
+            raise iControlRestError('401', response=FakeResponse(401))
+
+        with pytest.raises(iControlRestError):
+            self.policy.call(connect)
+        assert self.sleep.calls == []
+
+
+class TestPoller(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.sleep = FakeSleep(self.clock)
+
+    def get_poller(self, **kwargs):
+        return F5Poller('the task', clock=self.clock, sleep=self.sleep, **kwargs)
+
+    def test_backoff(self):
+        values = iter(['RUNNING'] * 5 + ['FINISHED'])
+        poller = self.get_poller(delay=1, backoff=2, max_delay=5)
+        result = poller.wait(lambda: next(values), success=lambda x: x == 'FINISHED')
+
+        assert result == 'FINISHED'
+        assert self.sleep.calls == [1, 2, 4, 5, 5]
+        assert poller.to_return() == dict(
+            name='the task', attempts=6, waited=17, elapsed=17, outcome='success'
+        )
+
+    def test_deadline(self):
+        poller = self.get_poller(delay=4, backoff=1, timeout=10, initial_delay=1)
+        with pytest.raises(F5PollTimeout) as ex:
+            poller.wait(lambda: 'RUNNING', success=lambda x: x == 'FINISHED')
+
+        # The last sleep is cut short so the deadline is not overshot.
+        assert self.sleep.calls == [1, 4, 4, 1]
+        assert ex.value.value == 'RUNNING'
+        assert 'Timed out after 10 seconds waiting for the task' in str(ex.value)
+        assert poller.outcome == 'timeout'
+
+    def test_failure(self):
+        values = iter(['RUNNING', 'FAILED'])
+        poller = self.get_poller()
+        with pytest.raises(F5ModuleError) as ex:
+            poller.wait(
+                lambda: next(values),
+                success=lambda x: x == 'FINISHED',
+                failure=lambda x: x == 'FAILED',
+                error=lambda x: 'The task {0}'.format(x.lower())
+            )
+        assert str(ex.value) == 'The task failed'
+        assert poller.attempts == 2
+        assert poller.outcome == 'failure'
+
+    def test_required_successes_in_a_row(self):
+        values = iter([True, True, False, True, True, True])
+        poller = self.get_poller(required=3)
+        poller.wait(lambda: next(values))
+        assert poller.attempts == 6
+
+    def test_ignored_exceptions(self):
+        values = iter([ValueError('rebooting'), ValueError('rebooting'), True])
+
+        def check():
+            value = next(values)
+            if isinstance(value, Exception):
+                raise value
+            return value
+
+        poller = self.get_poller()
+        assert poller.wait(check, ignore=ValueError) is True
+        assert poller.attempts == 3
+
+        with pytest.raises(KeyError):
+            poller.wait(Mock(side_effect=KeyError('foo')), ignore=ValueError)
+
+    def test_timings(self):
+        timings = F5Timings(clock=self.clock)
+        poller = self.get_poller(timings=timings)
+        values = iter([False, True])
+        poller.wait(lambda: next(values))
+
+        assert timings.to_return()['polls'] == [
+            dict(name='the task', attempts=2, waited=1, elapsed=1, outcome='success')
+        ]
+
+
+class TestPages(unittest.TestCase):
+    def get_fetch(self, items, ignore_paging=False):
+        calls = []
+
+        def fetch(top, skip):
+            calls.append((top, skip))
+            if ignore_paging:
+                return list(items)
+            return items[skip:skip + top]
+
+        return fetch, calls
+
+    def test_iter_pages(self):
+        fetch, calls = self.get_fetch(list(range(25)))
+        assert list(iter_pages(fetch, page_size=10)) == list(range(25))
+        assert calls == [(10, 0), (10, 10), (10, 20)]
+
+    def test_full_last_page(self):
+        fetch, calls = self.get_fetch(list(range(20)))
+        assert list(iter_pages(fetch, page_size=10)) == list(range(20))
+        assert calls == [(10, 0), (10, 10), (10, 20)]
+
+    def test_skip_ignored(self):
+        calls = []
+
+        def fetch(top, skip):
+            calls.append((top, skip))
+            return [dict(selfLink='https://localhost/mgmt/tm/ltm/pool/~Common~{0}'.format(x)) for x in range(10)]
+
+        assert len(list(iter_pages(fetch, page_size=10))) == 10
+        assert calls == [(10, 0), (10, 10)]
+
+    def test_skip_ignored_sdk_resources(self):
+        def fetch(top, skip):
+            return [Mock(selfLink='https://localhost/mgmt/tm/ltm/pool/~Common~{0}'.format(x)) for x in range(10)]
+
+        assert len(list(iter_pages(fetch, page_size=10))) == 10
+
+    def test_paging_ignored(self):
+        fetch, calls = self.get_fetch(list(range(25)), ignore_paging=True)
+        assert list(iter_pages(fetch, page_size=10)) == list(range(25))
+        assert calls == [(10, 0)]
+
+
+class TestMapRequests(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.sizes = []
+
+        def get_pool(size):
+            self.sizes.append(size)
+            return ThreadPool(size)
+
+        self.p1 = patch('library.module_utils.network.f5.common.ThreadPool', side_effect=get_pool)
+        self.p1.start()
+
+    def tearDown(self):
+        self.p1.stop()
+        shutil.rmtree(self.path)
+
+    def get_client(self, **kwargs):
+        governor = None
+        if kwargs:
+            governor = F5Governor('localhost', 443, path=self.path, **kwargs)
+        return Mock(governor=governor)
+
+    def test_results_are_in_order(self):
+        calls = []
+
+        def func(item):
+            calls.append(item)
+            return item * 2
+
+        assert map_requests(self.get_client(), func, range(10)) == [x * 2 for x in range(10)]
+        # The first item is done before the others, so that they share its login.
+        assert calls[0] == 0
+        assert self.sizes == [4]
+
+    def test_no_items(self):
+        assert map_requests(self.get_client(), Mock(), []) == []
+        assert self.sizes == []
+
+    def test_one_remaining_item_is_not_threaded(self):
+        assert map_requests(self.get_client(), lambda x: x, [1, 2]) == [1, 2]
+        assert self.sizes == []
+
+    def test_workers(self):
+        map_requests(self.get_client(), lambda x: x, range(10), workers=2)
+        assert self.sizes == [2]
+
+    def test_sized_by_max_in_flight(self):
+        map_requests(self.get_client(max_in_flight=3), lambda x: x, range(10), workers=8)
+        assert self.sizes == [3]
+
+    def test_no_limit_without_max_in_flight(self):
+        map_requests(self.get_client(rate=100), lambda x: x, range(10), workers=8)
+        assert self.sizes == [8]
+
+
+class TestFactsWriter(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.dest = os.path.join(self.path, 'facts.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_write(self):
+        with F5FactsWriter(self.dest) as writer:
+            writer.write('pool', dict(name='foo'))
+            writer.write('pool', dict(name='bar'))
+            writer.write('vlan', dict(name='baz'))
+            # Nothing is at the destination until the writer is closed.
+            assert not os.path.exists(self.dest)
+
+        with open(self.dest) as fh:
+            lines = [json.loads(x) for x in fh]
+        assert lines == [
+            dict(section='pool', facts=dict(name='foo')),
+            dict(section='pool', facts=dict(name='bar')),
+            dict(section='vlan', facts=dict(name='baz')),
+        ]
+        assert writer.to_return() == dict(
+            dest=self.dest, counts=dict(pool=2, vlan=1), total=3
+        )
+
+    def test_failure_leaves_no_file(self):
+        with pytest.raises(F5ModuleError):
+            with F5FactsWriter(self.dest) as writer:
+                writer.write('pool', dict(name='foo'))
+                raise F5ModuleError('failed')
+        assert os.listdir(self.path) == []